@@ -14,6 +14,7 @@ UFO Galaxy Core 模块
 - device_status_api: 设备状态 API
 - microsoft_ufo_integration: 微软 UFO 集成
 - system_load_monitor: 系统负载监控
+- image_preprocess: 图像预处理进程池
 """
 
 from .node_registry import (
@@ -66,6 +67,10 @@ def get_vision_pipeline(config=None):
     from .vision_pipeline import get_vision_pipeline as _get
     return _get(config)
 
+def get_image_preprocess_pool(**kwargs):
+    from .image_preprocess import get_image_preprocess_pool as _get
+    return _get(**kwargs)
+
 __all__ = [
     # 节点注册表
     'NodeRegistry',
@@ -100,6 +105,7 @@ __all__ = [
     'get_microsoft_ufo_integration',
     'get_system_load_monitor',
     'get_vision_pipeline',
+    'get_image_preprocess_pool',
 ]
 
 __version__ = '2.0.0'
@@ -0,0 +1,319 @@
+"""
+UFO Galaxy - 图像预处理池
+==========================
+
+将图像解码、缩放、重编码和 base64 编码从事件循环线程移到进程池中执行。
+供 Node_15_OCR 和 VisionPipeline 共用。
+
+数据传递：
+  - 输入字节写入 multiprocessing.shared_memory 段，工作进程按名称挂载，
+    不经过 pickle 传输图像数据
+  - 工作进程把结果写回同一共享内存段（放得下时），主进程直接从共享内存
+    读取；放不下时才退回到 pickle 返回
+
+快速路径：
+  图像尺寸已在限制内且格式已符合要求时跳过解码/重编码，只做（可选的）
+  base64 编码；小图直接在当前线程完成，不进入进程池。
+
+进程池不可用（沙箱禁止 fork/共享内存等）时自动降级到线程池执行同一逻辑。
+"""
+
+import asyncio
+import base64
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger("UFO-Galaxy.ImagePreprocess")
+
+# PIL 格式名 -> MIME 类型
+_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+    "BMP": "image/bmp",
+}
+
+
+@dataclass
+class PreparedImage:
+    """预处理结果"""
+    data: bytes          # 编码后的图像字节；is_base64 为 True 时为 base64 ASCII 字节
+    width: int
+    height: int
+    format: str          # PIL 格式名，如 JPEG / PNG
+    reencoded: bool      # 是否经过解码 + 重编码（False 表示走了快速路径）
+    is_base64: bool = False
+
+    @property
+    def mime_type(self) -> str:
+        return _MIME_TYPES.get(self.format, "application/octet-stream")
+
+    def to_base64(self) -> str:
+        if self.is_base64:
+            return self.data.decode("ascii")
+        return base64.b64encode(self.data).decode("ascii")
+
+    def to_data_url(self) -> str:
+        return f"data:{self.mime_type};base64,{self.to_base64()}"
+
+
+def probe_image(image_bytes) -> Tuple[str, int, int]:
+    """只解析图像头部，返回 (格式, 宽, 高)，不解码像素"""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return (image.format or "", image.width, image.height)
+
+
+def _fits(width: int, height: int, max_size: int) -> bool:
+    return max_size <= 0 or (width <= max_size and height <= max_size)
+
+
+def _process(
+    image_bytes,
+    max_size: int,
+    quality: int,
+    target_format: str,
+    keep_formats: Tuple[str, ...],
+    encode_base64: bool,
+) -> Tuple[Any, int, int, str, bool]:
+    """
+    预处理核心逻辑（在工作进程或线程中执行）
+
+    返回 (输出缓冲区, 宽, 高, 格式, 是否重编码)
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    fmt = image.format or ""
+    width, height = image.width, image.height
+
+    if _fits(width, height, max_size) and fmt in keep_formats:
+        output = image_bytes
+        reencoded = False
+    else:
+        if not _fits(width, height, max_size):
+            ratio = min(max_size / width, max_size / height)
+            new_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+            if fmt == "JPEG":
+                # JPEG 可在解码阶段按 1/2、1/4、1/8 缩小，大幅减少解码量
+                image.draft("RGB", new_size)
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+            width, height = new_size
+        if target_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        save_kwargs = {"quality": quality} if target_format in ("JPEG", "WEBP") else {}
+        image.save(buffer, format=target_format, **save_kwargs)
+        output = buffer.getbuffer()
+        fmt = target_format
+        reencoded = True
+
+    if encode_base64:
+        output = base64.b64encode(output)
+    return output, width, height, fmt, reencoded
+
+
+def _worker_entry(
+    shm_name: str,
+    input_size: int,
+    max_size: int,
+    quality: int,
+    target_format: str,
+    keep_formats: Tuple[str, ...],
+    encode_base64: bool,
+) -> Tuple[int, Optional[bytes], int, int, str, bool]:
+    """
+    工作进程入口：挂载共享内存段处理图像，结果尽量写回同一段
+
+    返回 (结果长度, 溢出字节或 None, 宽, 高, 格式, 是否重编码)
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        view = shm.buf[:input_size]
+        try:
+            output, width, height, fmt, reencoded = _process(
+                view, max_size, quality, target_format, keep_formats, encode_base64
+            )
+            size = len(output)
+            if size <= shm.size:
+                shm.buf[:size] = output
+                overflow = None
+            else:
+                overflow = bytes(output)
+            del output
+        finally:
+            view.release()
+        return size, overflow, width, height, fmt, reencoded
+    finally:
+        shm.close()
+
+
+class ImagePreprocessPool:
+    """
+    图像预处理进程池
+
+    用法:
+        pool = get_image_preprocess_pool()
+        prepared = await pool.prepare(image_bytes, max_size=4096, encode_base64=True)
+        data_url = prepared.to_data_url()
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        inline_threshold: int = 256 * 1024,
+        use_processes: bool = True,
+    ):
+        """
+        Args:
+            max_workers: 工作进程数，默认 min(4, CPU 数)
+            inline_threshold: 快速路径下，小于此字节数的图像直接在当前线程编码
+            use_processes: False 时只使用线程池
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.inline_threshold = inline_threshold
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._process_mode = False
+        self._stats = {
+            "total": 0,
+            "fast_path": 0,
+            "inline": 0,
+            "reencoded": 0,
+            "overflow_returns": 0,
+            "thread_fallbacks": 0,
+        }
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                try:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                    self._process_mode = True
+                except (OSError, NotImplementedError, ValueError) as e:
+                    logger.warning(f"进程池不可用，降级为线程池: {e}")
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="image-preprocess",
+                )
+                self._process_mode = False
+        return self._executor
+
+    async def prepare(
+        self,
+        image_bytes: bytes,
+        max_size: int = 4096,
+        quality: int = 85,
+        target_format: str = "JPEG",
+        keep_formats: Tuple[str, ...] = ("JPEG",),
+        encode_base64: bool = False,
+    ) -> PreparedImage:
+        """
+        预处理图像
+
+        Args:
+            image_bytes: 原始图像字节
+            max_size: 最长边上限（像素），0 表示不限制
+            quality: 重编码质量（JPEG/WEBP）
+            target_format: 需要重编码时的目标格式
+            keep_formats: 尺寸合规时可原样保留的格式
+            encode_base64: 是否同时完成 base64 编码
+
+        Raises:
+            PIL.UnidentifiedImageError: 无法识别的图像数据
+        """
+        self._stats["total"] += 1
+        keep_formats = tuple(keep_formats)
+        fmt, width, height = probe_image(image_bytes)
+
+        if _fits(width, height, max_size) and fmt in keep_formats:
+            self._stats["fast_path"] += 1
+            if not encode_base64:
+                return PreparedImage(image_bytes, width, height, fmt, False)
+            if len(image_bytes) <= self.inline_threshold:
+                self._stats["inline"] += 1
+                return PreparedImage(
+                    base64.b64encode(image_bytes), width, height, fmt, False, True
+                )
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        args = (max_size, quality, target_format, keep_formats, encode_base64)
+
+        if self._process_mode:
+            try:
+                return await self._prepare_in_process(loop, executor, image_bytes, args)
+            except (OSError, RuntimeError) as e:
+                # 共享内存不可用或进程池损坏（BrokenProcessPool 是 RuntimeError 子类）
+                logger.warning(f"进程池预处理失败，降级为线程池: {e}")
+                self._stats["thread_fallbacks"] += 1
+                self.shutdown(wait=False)
+                self.use_processes = False
+                executor = self._get_executor()
+
+        output, width, height, fmt, reencoded = await loop.run_in_executor(
+            executor, _process, image_bytes, *args
+        )
+        if reencoded:
+            self._stats["reencoded"] += 1
+        if not isinstance(output, bytes):
+            output = bytes(output)
+        return PreparedImage(output, width, height, fmt, reencoded, encode_base64)
+
+    async def _prepare_in_process(
+        self, loop, executor: Executor, image_bytes: bytes, args: tuple
+    ) -> PreparedImage:
+        encode_base64 = args[-1]
+        size = len(image_bytes)
+        # base64 输出约为输入的 4/3，预留空间让结果能写回同一段
+        capacity = size + size // 3 + 4 if encode_base64 else size
+        shm = shared_memory.SharedMemory(create=True, size=max(1, capacity))
+        try:
+            shm.buf[:size] = image_bytes
+            out_size, overflow, width, height, fmt, reencoded = await loop.run_in_executor(
+                executor, _worker_entry, shm.name, size, *args
+            )
+            if overflow is not None:
+                self._stats["overflow_returns"] += 1
+                data = overflow
+            else:
+                data = bytes(shm.buf[:out_size])
+        finally:
+            shm.close()
+            shm.unlink()
+        if reencoded:
+            self._stats["reencoded"] += 1
+        return PreparedImage(data, width, height, fmt, reencoded, encode_base64)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "mode": "process" if self._process_mode else "thread",
+            "max_workers": self.max_workers,
+        }
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+
+_pool_instance: Optional[ImagePreprocessPool] = None
+
+
+def get_image_preprocess_pool(**kwargs) -> ImagePreprocessPool:
+    """获取全局图像预处理池（首次调用时的参数生效）"""
+    global _pool_instance
+    if _pool_instance is None:
+        _pool_instance = ImagePreprocessPool(**kwargs)
+    return _pool_instance
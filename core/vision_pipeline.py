@@ -23,19 +23,31 @@ UFO Galaxy - 融合视觉理解管线 (Vision Pipeline)
 
 import asyncio
 import base64
+import copy
+import hashlib
+import io
 import json
 import logging
 import os
 import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+from PIL import Image, ImageChops, UnidentifiedImageError
+
+from .image_preprocess import get_image_preprocess_pool
 
 logger = logging.getLogger("VisionPipeline")
 
 
+def _read_file_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
 # =============================================================================
 # 数据结构
 # =============================================================================
@@ -267,6 +279,99 @@ class VisionResult:
         }
 
 
+# =============================================================================
+# 帧差分（增量理解）
+# =============================================================================
+
+def detect_changed_regions(
+    prev_gray: Image.Image,
+    cur_gray: Image.Image,
+    tile_size: int = 32,
+    threshold: int = 24,
+    margin: int = 8,
+) -> List[BoundingBox]:
+    """
+    按网格比较两帧灰度图，返回变化区域列表
+
+    像素差超过 threshold 的网格块记为变化块，相邻（含对角）变化块合并为
+    连通区域，区域外扩 margin 像素后裁剪到画面范围内。两帧完全相同时返回空列表。
+    """
+    width, height = cur_gray.size
+    diff = ImageChops.difference(prev_gray, cur_gray)
+    mask = diff.point(lambda v: 255 if v > threshold else 0)
+    envelope = mask.getbbox()
+    if envelope is None:
+        return []
+
+    # 只扫描变化包络内的网格块
+    col0, row0 = envelope[0] // tile_size, envelope[1] // tile_size
+    col1 = (envelope[2] - 1) // tile_size
+    row1 = (envelope[3] - 1) // tile_size
+    changed = set()
+    for row in range(row0, row1 + 1):
+        top = row * tile_size
+        for col in range(col0, col1 + 1):
+            left = col * tile_size
+            tile = mask.crop((left, top, min(left + tile_size, width), min(top + tile_size, height)))
+            if tile.getbbox() is not None:
+                changed.add((col, row))
+
+    regions = []
+    while changed:
+        seed = changed.pop()
+        queue = deque([seed])
+        min_c = max_c = seed[0]
+        min_r = max_r = seed[1]
+        while queue:
+            col, row = queue.popleft()
+            min_c, max_c = min(min_c, col), max(max_c, col)
+            min_r, max_r = min(min_r, row), max(max_r, row)
+            for dc in (-1, 0, 1):
+                for dr in (-1, 0, 1):
+                    neighbor = (col + dc, row + dr)
+                    if neighbor in changed:
+                        changed.remove(neighbor)
+                        queue.append(neighbor)
+        x0 = max(0, min_c * tile_size - margin)
+        y0 = max(0, min_r * tile_size - margin)
+        x1 = min(width, (max_c + 1) * tile_size + margin)
+        y1 = min(height, (max_r + 1) * tile_size + margin)
+        regions.append(BoundingBox(x=x0, y=y0, width=x1 - x0, height=y1 - y0))
+    return regions
+
+
+def _intersection_area(a: BoundingBox, b: BoundingBox) -> int:
+    x1, y1 = max(a.x, b.x), max(a.y, b.y)
+    x2 = min(a.x + a.width, b.x + b.width)
+    y2 = min(a.y + a.height, b.y + b.height)
+    if x2 <= x1 or y2 <= y1:
+        return 0
+    return (x2 - x1) * (y2 - y1)
+
+
+def _mostly_inside(bbox: BoundingBox, regions: List[BoundingBox], ratio: float = 0.5) -> bool:
+    """bbox 是否有超过 ratio 的面积落在变化区域内（面积为 0 时按中心点判断）"""
+    if bbox.area <= 0:
+        cx, cy = bbox.center
+        return any(r.contains(cx, cy) for r in regions)
+    covered = sum(_intersection_area(bbox, r) for r in regions)
+    return covered / bbox.area > ratio
+
+
+def _offset_bbox(bbox: BoundingBox, dx: int, dy: int) -> BoundingBox:
+    return BoundingBox(x=bbox.x + dx, y=bbox.y + dy, width=bbox.width, height=bbox.height)
+
+
+@dataclass
+class _DeviceFrame:
+    """设备上一帧的差分基准和识别结果"""
+    gray: Image.Image
+    result: VisionResult
+    prompt_digest: str
+    sequence: int = 0
+    updated_at: float = field(default_factory=time.time)
+
+
 # =============================================================================
 # 融合视觉引擎
 # =============================================================================
@@ -386,8 +491,24 @@ If not found, return: {{"found": false, "reason": "why not found"}}"""
             "tesseract_calls": 0,
             "avg_time_ms": 0,
             "errors": 0,
+            "incremental_calls": 0,
+            "incremental_frame_reuses": 0,
+            "incremental_region_calls": 0,
+            "incremental_fallbacks": 0,
         }
 
+        # 增量理解配置（按设备做帧差分）
+        self.incremental_enabled = bool(self.config.get("incremental_enabled", True))
+        self.incremental_tile_size = int(self.config.get("incremental_tile_size", 32))
+        self.incremental_diff_threshold = int(self.config.get("incremental_diff_threshold", 24))
+        self.incremental_region_margin = int(self.config.get("incremental_region_margin", 8))
+        self.incremental_max_regions = int(self.config.get("incremental_max_regions", 4))
+        self.incremental_max_changed_ratio = float(
+            self.config.get("incremental_max_changed_ratio", 0.4)
+        )
+        self.incremental_max_devices = int(self.config.get("incremental_max_devices", 32))
+        self._device_frames: "OrderedDict[str, _DeviceFrame]" = OrderedDict()
+
         # HTTP 客户端
         self._client: Optional[httpx.AsyncClient] = None
 
@@ -416,6 +537,7 @@ If not found, return: {{"found": false, "reason": "why not found"}}"""
         image_path: Optional[str] = None,
         mode: str = "full",
         task_context: str = "",
+        device_id: Optional[str] = None,
     ) -> VisionResult:
         """
         统一视觉理解入口
@@ -429,6 +551,8 @@ If not found, return: {{"found": false, "reason": "why not found"}}"""
                 - "gui_only": 仅 GUI 元素分析
                 - "find_element": 查找特定元素（需要 task_context 描述）
             task_context: 任务上下文（用于 find_element 模式或增强理解）
+            device_id: 设备标识。提供时 "full" 模式按设备做帧差分，
+                未变化区域直接复用上一帧的识别结果，只分析变化区域
 
         Returns:
             VisionResult: 统一的视觉理解结果
@@ -436,11 +560,10 @@ If not found, return: {{"found": false, "reason": "why not found"}}"""
         start_time = time.time()
         self._stats["total_calls"] += 1
 
-        # 准备图片
+        # 准备图片（文件读取和编码不在事件循环线程上执行）
         if image_path and not image_base64:
             try:
-                with open(image_path, "rb") as f:
-                    image_base64 = base64.b64encode(f.read()).decode()
+                image_base64 = await self._load_image_file(image_path)
             except Exception as e:
                 return VisionResult(success=False, error=f"无法读取图片: {e}")
 
@@ -457,59 +580,100 @@ If not found, return: {{"found": false, "reason": "why not found"}}"""
             if task_context:
                 prompt += f"\n\nAdditional context: {task_context}"
 
-        # 按降级策略尝试各引擎
-        result = None
-        engine_used = ""
+        # 增量理解：同一设备的连续帧只把变化区域送往引擎
+        if mode == "full" and device_id and self.incremental_enabled:
+            incremental = await self._understand_incremental(
+                device_id, image_base64, prompt, start_time
+            )
+            if incremental is not None:
+                return incremental
+
+        result, engine_used = await self._call_engines(image_base64, prompt)
+
+        if not result:
+            self._stats["errors"] += 1
+            return VisionResult(success=False, error="所有视觉引擎均不可用")
+
+        # 解析结果
+        processing_time = (time.time() - start_time) * 1000
+        vision_result = self._parse_result(result, mode, engine_used)
+        vision_result.processing_time_ms = processing_time
+        vision_result.engine_used = engine_used
+
+        # 融合：将 OCR 文本与 GUI 元素关联
+        if mode == "full":
+            self._fuse_ocr_and_gui(vision_result)
+
+        if mode == "full" and device_id and self.incremental_enabled:
+            await self._remember_frame(device_id, image_base64, prompt, vision_result)
+
+        self._record_time(processing_time)
+        return vision_result
+
+    def _record_time(self, processing_time: float):
+        """更新平均耗时统计"""
+        total = self._stats["total_calls"]
+        self._stats["avg_time_ms"] = (
+            (self._stats["avg_time_ms"] * (total - 1) + processing_time) / total
+        )
 
+    async def _call_engines(
+        self, image_base64: str, prompt: str, allow_offline: bool = True
+    ) -> Tuple[Optional[Dict], str]:
+        """按降级策略依次尝试各引擎，返回 (原始结果, 引擎名)"""
         # Level 1: DeepSeek OCR 2
         if self.deepseek_api_key or self.local_vllm_url:
             result = await self._call_deepseek_ocr2(image_base64, prompt)
             if result:
-                engine_used = "deepseek_ocr2"
                 self._stats["deepseek_calls"] += 1
+                return result, "deepseek_ocr2"
 
         # Level 2: Gemini
-        if not result and self.gemini_api_key:
+        if self.gemini_api_key:
             result = await self._call_gemini(image_base64, prompt)
             if result:
-                engine_used = "gemini"
                 self._stats["gemini_calls"] += 1
+                return result, "gemini"
 
         # Level 3: Qwen3-VL via OpenRouter
-        if not result and self.openrouter_api_key:
+        if self.openrouter_api_key:
             result = await self._call_qwen_vl(image_base64, prompt)
             if result:
-                engine_used = "qwen3_vl"
                 self._stats["qwen_calls"] += 1
+                return result, "qwen3_vl"
 
         # Level 4: Tesseract 离线降级
-        if not result:
+        if allow_offline:
             result = await self._call_tesseract_fallback(image_base64)
             if result:
-                engine_used = "tesseract"
                 self._stats["tesseract_calls"] += 1
+                return result, "tesseract"
 
-        if not result:
-            self._stats["errors"] += 1
-            return VisionResult(success=False, error="所有视觉引擎均不可用")
-
-        # 解析结果
-        processing_time = (time.time() - start_time) * 1000
-        vision_result = self._parse_result(result, mode, engine_used)
-        vision_result.processing_time_ms = processing_time
-        vision_result.engine_used = engine_used
-
-        # 融合：将 OCR 文本与 GUI 元素关联
-        if mode == "full":
-            self._fuse_ocr_and_gui(vision_result)
+        return None, ""
 
-        # 更新统计
-        total = self._stats["total_calls"]
-        self._stats["avg_time_ms"] = (
-            (self._stats["avg_time_ms"] * (total - 1) + processing_time) / total
-        )
+    async def _load_image_file(self, image_path: str) -> str:
+        """
+        读取图片文件并编码为 base64
 
-        return vision_result
+        默认不缩放，保证引擎返回的 bbox 与原图坐标一致；配置 max_image_size
+        后超限图片会在预处理池中缩放重编码。
+        """
+        image_bytes = await asyncio.to_thread(_read_file_bytes, image_path)
+        try:
+            prepared = await get_image_preprocess_pool().prepare(
+                image_bytes,
+                max_size=int(self.config.get("max_image_size", 0)),
+                quality=int(self.config.get("jpeg_quality", 85)),
+                target_format="PNG",
+                keep_formats=("PNG", "JPEG", "WEBP"),
+                encode_base64=True,
+            )
+        except UnidentifiedImageError:
+            # 非图像文件交给引擎自行报错，保持原有行为
+            return await asyncio.to_thread(
+                lambda: base64.b64encode(image_bytes).decode()
+            )
+        return prepared.to_base64()
 
     async def find_element(
         self,
@@ -569,7 +733,202 @@ If not found, return: {{"found": false, "reason": "why not found"}}"""
 
     def get_stats(self) -> Dict:
         """获取统计信息"""
-        return dict(self._stats)
+        return {**self._stats, "tracked_devices": len(self._device_frames)}
+
+    # =========================================================================
+    # 增量理解
+    # =========================================================================
+
+    @staticmethod
+    def _decode_frame(image_base64: str) -> Image.Image:
+        image = Image.open(io.BytesIO(base64.b64decode(image_base64)))
+        return image.convert("RGB")
+
+    @staticmethod
+    def _prompt_digest(prompt: str) -> str:
+        return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+    async def _remember_frame(
+        self, device_id: str, image_base64: str, prompt: str, result: VisionResult
+    ):
+        """记录设备最新一帧及其 prompt，作为下次差分的基准"""
+        try:
+            gray = await asyncio.to_thread(
+                lambda: self._decode_frame(image_base64).convert("L")
+            )
+        except Exception as e:
+            logger.debug(f"无法解码设备 {device_id} 的帧，跳过增量缓存: {e}")
+            self._device_frames.pop(device_id, None)
+            return
+        previous = self._device_frames.pop(device_id, None)
+        self._device_frames[device_id] = _DeviceFrame(
+            gray=gray,
+            result=copy.deepcopy(result),
+            prompt_digest=self._prompt_digest(prompt),
+            sequence=previous.sequence + 1 if previous else 0,
+        )
+        while len(self._device_frames) > self.incremental_max_devices:
+            self._device_frames.popitem(last=False)
+
+    def invalidate_device_frame(self, device_id: Optional[str] = None):
+        """丢弃设备（或全部设备）的增量基准，下次调用做完整分析"""
+        if device_id is None:
+            self._device_frames.clear()
+        else:
+            self._device_frames.pop(device_id, None)
+
+    def _diff_against(self, frame: _DeviceFrame, image_base64: str):
+        """在工作线程中解码当前帧并与基准比较，返回 (RGB 图, 灰度图, 变化区域)"""
+        image = self._decode_frame(image_base64)
+        gray = image.convert("L")
+        if gray.size != frame.gray.size:
+            return image, gray, None
+        regions = detect_changed_regions(
+            frame.gray,
+            gray,
+            tile_size=self.incremental_tile_size,
+            threshold=self.incremental_diff_threshold,
+            margin=self.incremental_region_margin,
+        )
+        return image, gray, regions
+
+    @staticmethod
+    def _encode_crops(image: Image.Image, regions: List[BoundingBox]) -> List[str]:
+        crops = []
+        for region in regions:
+            crop = image.crop((region.x, region.y, region.x + region.width, region.y + region.height))
+            buffer = io.BytesIO()
+            crop.save(buffer, format="PNG")
+            crops.append(base64.b64encode(buffer.getvalue()).decode())
+        return crops
+
+    async def _understand_incremental(
+        self,
+        device_id: str,
+        image_base64: str,
+        prompt: str,
+        start_time: float,
+    ) -> Optional[VisionResult]:
+        """
+        基于帧差分的增量理解
+
+        返回 None 表示需要走完整分析（无基准帧、prompt 与基准帧不同、
+        分辨率变化、变化面积过大、区域过多或区域分析失败）。
+        """
+        frame = self._device_frames.get(device_id)
+        if frame is None:
+            return None
+        prompt_digest = self._prompt_digest(prompt)
+        if frame.prompt_digest != prompt_digest:
+            # 基准结果回答的是另一个问题，既不能复用也不能在其上合并区域结果
+            self._stats["incremental_fallbacks"] += 1
+            return None
+
+        try:
+            image, gray, regions = await asyncio.to_thread(
+                self._diff_against, frame, image_base64
+            )
+        except Exception as e:
+            logger.debug(f"帧差分失败，回退完整分析: {e}")
+            return None
+
+        total_area = gray.size[0] * gray.size[1]
+        if (
+            regions is None
+            or len(regions) > self.incremental_max_regions
+            or sum(r.area for r in regions) > total_area * self.incremental_max_changed_ratio
+        ):
+            self._stats["incremental_fallbacks"] += 1
+            return None
+
+        self._stats["incremental_calls"] += 1
+        sequence = frame.sequence + 1
+
+        if not regions:
+            # 画面未变化：直接复用上一帧结果
+            self._stats["incremental_frame_reuses"] += 1
+            merged = copy.deepcopy(frame.result)
+            merged.engine_used = "frame_cache"
+        else:
+            crops = await asyncio.to_thread(self._encode_crops, image, regions)
+            responses = await asyncio.gather(
+                *(self._call_engines(crop, prompt) for crop in crops)
+            )
+            if any(raw is None for raw, _ in responses):
+                self._stats["incremental_fallbacks"] += 1
+                return None
+            self._stats["incremental_region_calls"] += len(crops)
+
+            region_results = []
+            for region, (raw, engine) in zip(regions, responses):
+                partial = self._parse_result(raw, "full", engine)
+                self._fuse_ocr_and_gui(partial)
+                region_results.append((region, partial))
+            merged = self._merge_region_results(frame.result, region_results, sequence)
+            merged.engine_used = "+".join(sorted({engine for _, engine in responses}))
+
+        processing_time = (time.time() - start_time) * 1000
+        merged.processing_time_ms = processing_time
+
+        self._device_frames.pop(device_id, None)
+        self._device_frames[device_id] = _DeviceFrame(
+            gray=gray,
+            result=copy.deepcopy(merged),
+            prompt_digest=prompt_digest,
+            sequence=sequence,
+        )
+        self._record_time(processing_time)
+        return merged
+
+    def _merge_region_results(
+        self,
+        previous: VisionResult,
+        region_results: List[Tuple[BoundingBox, VisionResult]],
+        sequence: int,
+    ) -> VisionResult:
+        """
+        合并上一帧结果与变化区域的新结果
+
+        上一帧中大部分面积落在变化区域内的元素和文本被丢弃，由区域结果
+        （坐标已映射回整帧）替代；场景信息沿用上一帧。
+        """
+        regions = [region for region, _ in region_results]
+        merged = VisionResult(success=True, scene=copy.deepcopy(previous.scene))
+
+        kept_ids = set()
+        for elem in previous.gui_elements:
+            if not _mostly_inside(elem.bbox, regions):
+                merged.gui_elements.append(copy.deepcopy(elem))
+                kept_ids.add(elem.element_id)
+        for word in previous.ocr_words:
+            if not _mostly_inside(word.bbox, regions):
+                merged.ocr_words.append(copy.deepcopy(word))
+        for hint in previous.action_hints:
+            if hint.target_element_id is None or hint.target_element_id in kept_ids:
+                merged.action_hints.append(copy.deepcopy(hint))
+
+        for index, (region, partial) in enumerate(region_results):
+            prefix = f"f{sequence}r{index}_"
+            id_map = {}
+            for elem in partial.gui_elements:
+                new_id = prefix + elem.element_id
+                id_map[elem.element_id] = new_id
+                elem.element_id = new_id
+                elem.bbox = _offset_bbox(elem.bbox, region.x, region.y)
+                if elem.parent_id:
+                    elem.parent_id = prefix + elem.parent_id
+                merged.gui_elements.append(elem)
+            for word in partial.ocr_words:
+                word.bbox = _offset_bbox(word.bbox, region.x, region.y)
+                merged.ocr_words.append(word)
+            for hint in partial.action_hints:
+                if hint.target_element_id:
+                    hint.target_element_id = id_map.get(
+                        hint.target_element_id, prefix + hint.target_element_id
+                    )
+                merged.action_hints.append(hint)
+
+        return merged
 
     # =========================================================================
     # 引擎调用
@@ -969,10 +1328,11 @@ async def understand_screen(
     image_path: Optional[str] = None,
     mode: str = "full",
     task_context: str = "",
+    device_id: Optional[str] = None,
 ) -> VisionResult:
     """便捷函数：理解屏幕"""
     pipeline = get_vision_pipeline()
-    return await pipeline.understand(image_base64, image_path, mode, task_context)
+    return await pipeline.understand(image_base64, image_path, mode, task_context, device_id)
 
 
 async def find_element(
@@ -70,6 +70,7 @@ from .search_integrator import (
     SearchQuery,
     RateLimiter,
     ResultCache,
+    MinHasher,
     SearchIntegrator
 )
 
@@ -152,6 +153,7 @@ __all__ = [
     "SearchQuery",
     "RateLimiter",
     "ResultCache",
+    "MinHasher",
     "SearchIntegrator",
     
     # Feedback Loop
@@ -0,0 +1,261 @@
+"""
+UFO Galaxy v5.0 - Knowledge Graph Query Benchmark
+
+Builds a random knowledge graph and measures the query paths against the
+straightforward implementations they replace:
+- similarity: common-neighbor / Jaccard / Adamic-Adar scoring of one entity
+  (full scan over all nodes vs. CSR snapshot vs. live adjacency sets)
+- search: substring search over names and descriptions (full scan vs.
+  token index)
+- neighborhood: find_connected_entities with one BFS per depth vs. one pass
+- analytics: top-N degree centrality and community detection, from scratch
+  vs. incrementally maintained (after a small batch of edge changes, and
+  cached while the graph is unchanged)
+- persistence: JSON save / load vs. the columnar snapshot, file sizes, and
+  delta log append / replay
+
+Usage:
+    python -m enhancements.learning.benchmark_knowledge_graph [--entities 100000] [--edges 1000000]
+        [--community-entities 5000] [--persist-entities 100000]
+"""
+
+import argparse
+import gc
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+import networkx as nx
+
+try:
+    from .knowledge_graph import Entity, EntityType, KnowledgeGraph, Relationship, RelationshipType
+except ImportError:
+    from enhancements.learning.knowledge_graph import (
+        Entity, EntityType, KnowledgeGraph, Relationship, RelationshipType
+    )
+
+WORDS = (
+    "learning neural graph vector model data network deep signal pattern "
+    "agent memory policy reward search index token cluster device sensor "
+    "vision language robot planner kernel tensor gradient sample metric"
+).split()
+
+
+def build_graph(entities: int, edges: int, rng: random.Random) -> KnowledgeGraph:
+    kg = KnowledgeGraph("benchmark")
+    entity_types = list(EntityType)
+    ids = kg.add_entities([
+        Entity(
+            id=f"e{i}",
+            entity_type=entity_types[i % len(entity_types)],
+            name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            description=" ".join(rng.choice(WORDS) for _ in range(8)),
+        )
+        for i in range(entities)
+    ])
+    # Preferential endpoints give the skewed degree distribution of real graphs
+    hubs = ids[:max(1, entities // 100)]
+    relationship_types = list(RelationshipType)
+    relationships = []
+    for i in range(edges):
+        source = rng.choice(ids)
+        target = rng.choice(hubs) if rng.random() < 0.3 else rng.choice(ids)
+        if source != target:
+            relationships.append(Relationship(
+                id=f"r{i}", source_id=source, target_id=target,
+                relationship_type=relationship_types[i % len(relationship_types)],
+            ))
+    kg.add_relationships(relationships)
+    return kg
+
+
+def timed(func: Callable[[], object], repeat: int) -> float:
+    """Median milliseconds per call"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def scan_similar(kg: KnowledgeGraph, entity_id: str, min_common: int = 2) -> List:
+    """The original full-scan implementation"""
+    graph = kg._graph
+    entity_neighbors = set(graph.neighbors(entity_id))
+    similarities = []
+    for other_id in graph.nodes():
+        if other_id == entity_id:
+            continue
+        common = entity_neighbors & set(graph.neighbors(other_id))
+        if len(common) >= min_common:
+            similarities.append((other_id, len(common)))
+    return sorted(similarities, key=lambda x: x[1], reverse=True)
+
+
+def scan_search(kg: KnowledgeGraph, query: str, limit: int = 10) -> List:
+    """The original full-scan search"""
+    query_lower = query.lower()
+    results = []
+    for entity in kg._entity_index.values():
+        score = 0
+        if query_lower in entity.name.lower():
+            score += 2
+        if query_lower in entity.description.lower():
+            score += 1
+        if score > 0:
+            results.append((entity, score))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return [entity for entity, _ in results[:limit]]
+
+
+def per_depth_bfs(kg: KnowledgeGraph, entity_id: str, max_depth: int) -> dict:
+    """The original one-BFS-per-depth neighborhood query"""
+    connected = {}
+    for depth in range(1, max_depth + 1):
+        nodes = set()
+        kg._bfs_collect(entity_id, depth, nodes)
+        connected[f"depth_{depth}"] = list(nodes - {entity_id})
+    return connected
+
+
+def scan_centrality(kg: KnowledgeGraph, top_n: int = 10) -> dict:
+    """The original full recomputation"""
+    centrality = nx.degree_centrality(kg._graph)
+    return dict(sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:top_n])
+
+
+def churn(kg: KnowledgeGraph, rng: random.Random, changes: int) -> None:
+    """Replace `changes` random relationships"""
+    ids = list(kg._entity_index)
+    for rid in rng.sample(list(kg._relationship_index), changes):
+        rel = kg._relationship_index[rid]
+        kg.remove_relationship(rid)
+        kg.add_relationship(Relationship(
+            id=rid + "'", source_id=rel.source_id, target_id=rng.choice(ids),
+            relationship_type=rel.relationship_type,
+        ))
+
+
+def bench_analytics(kg: KnowledgeGraph, rng: random.Random, label: str) -> None:
+    before = timed(lambda: scan_centrality(kg), 3)
+    assert list(kg.calculate_centrality(10).items()) == list(scan_centrality(kg).items())
+    churn(kg, rng, 10)
+    started = time.perf_counter()
+    kg.calculate_centrality(10)
+    after = (time.perf_counter() - started) * 1000
+    cached = timed(lambda: kg.calculate_centrality(10), 5)
+    print(f"{'centrality top 10 ' + label:<34} {before:>10.1f} {after:>10.2f}   cached {cached:.3f}")
+
+    undirected = kg._graph.to_undirected()
+    started = time.perf_counter()
+    greedy = kg._compute_communities("greedy_modularity")
+    before = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    kg.detect_communities()
+    first = (time.perf_counter() - started) * 1000
+    churn(kg, rng, 10)
+    started = time.perf_counter()
+    propagated = kg.detect_communities()
+    after = (time.perf_counter() - started) * 1000
+    cached = timed(kg.detect_communities, 5)
+    print(f"{'communities ' + label:<34} {before:>10.1f} {after:>10.2f}   "
+          f"first run {first:.0f} ms, cached {cached:.2f}")
+    print(f"{'  modularity (greedy / propagated)':<34} "
+          f"{nx.community.modularity(undirected, greedy):>10.3f} "
+          f"{nx.community.modularity(kg._graph.to_undirected(), propagated):>10.3f}")
+
+
+def bench_persistence(kg: KnowledgeGraph, rng: random.Random, changes: int = 10_000) -> None:
+    print()
+    print(f"{'persistence':<34} {'save s':>10} {'load s':>10} {'MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, filename in (("json", "graph.json"), ("snapshot", "graph.kg")):
+            path = os.path.join(directory, filename)
+            gc.collect()
+            started = time.perf_counter()
+            kg.save(path)
+            saved = time.perf_counter() - started
+            started = time.perf_counter()
+            loaded = KnowledgeGraph.load(path)
+            elapsed = time.perf_counter() - started
+            assert len(loaded._entity_index) == len(kg._entity_index)
+            assert loaded._graph.number_of_edges() == kg._graph.number_of_edges()
+            del loaded
+            print(f"{label:<34} {saved:>10.2f} {elapsed:>10.2f} {os.path.getsize(path) / 1e6:>10.1f}")
+
+        # Save column: appending the logged changes (remove + add per churned relationship)
+        path = os.path.join(directory, "graph.kg")
+        kg.save(path, delta_log=True)
+        gc.collect()
+        started = time.perf_counter()
+        churn(kg, rng, changes // 2)
+        appended = time.perf_counter() - started
+        kg.close_delta_log()
+        started = time.perf_counter()
+        loaded = KnowledgeGraph.load(path)
+        elapsed = time.perf_counter() - started
+        assert set(loaded._relationship_index) == set(kg._relationship_index)
+        print(f"{f'snapshot + {changes:,} logged changes':<34} {appended:>10.2f} {elapsed:>10.2f} "
+              f"{os.path.getsize(path + '.delta') / 1e6:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Knowledge graph query benchmark")
+    parser.add_argument("--entities", type=int, default=100_000)
+    parser.add_argument("--edges", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--community-entities", type=int, default=5000,
+                        help="graph size for the from-scratch community comparison (greedy is slow)")
+    parser.add_argument("--persist-entities", type=int, default=100_000,
+                        help="graph size for the save / load comparison (0 reuses the query graph)")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    kg = build_graph(args.entities, args.edges, rng)
+    print(f"graph: {len(kg._entity_index):,} entities, {kg._graph.number_of_edges():,} edges "
+          f"(built in {time.perf_counter() - started:.1f}s)")
+
+    sample = rng.sample(list(kg._entity_index), args.queries)
+    kg.find_similar_entities(sample[0])  # stale: served from adjacency sets
+    started = time.perf_counter()
+    kg._adjacency.build(kg._graph)
+    print(f"CSR snapshot build: {(time.perf_counter() - started) * 1000:.0f} ms")
+    print()
+
+    print(f"{'query':<34} {'before ms':>10} {'after ms':>10}")
+    cursor = iter(sample * 1000)
+    scan = timed(lambda: scan_similar(kg, next(cursor)), min(3, args.queries))
+    for metric in ("common_neighbors", "jaccard", "adamic_adar"):
+        csr = timed(lambda: kg.find_similar_entities(next(cursor), metric=metric), args.queries)
+        sets = timed(lambda: kg._adjacency.score_from_sets(
+            kg._graph, next(cursor), metric, 2, kg._entity_order.__getitem__), args.queries)
+        print(f"{'similar ' + metric + ' (CSR)':<34} {scan:>10.1f} {csr:>10.2f}")
+        print(f"{'similar ' + metric + ' (sets)':<34} {scan:>10.1f} {sets:>10.2f}")
+
+    for query in ("gradient", "ten", "neural graph", "12345"):
+        before = timed(lambda: scan_search(kg, query), 3)
+        after = timed(lambda: kg.search(query), 3)
+        print(f"{'search ' + repr(query):<34} {before:>10.1f} {after:>10.2f}")
+
+    before = timed(lambda: per_depth_bfs(kg, next(cursor), 2), 5)
+    after = timed(lambda: kg.find_connected_entities(next(cursor), 2), 5)
+    print(f"{'find_connected_entities depth 2':<34} {before:>10.1f} {after:>10.2f}")
+
+    small = build_graph(args.community_entities, args.community_entities * 10, rng)
+    bench_analytics(small, rng, f"({args.community_entities:,})")
+
+    if args.persist_entities and args.persist_entities != args.entities:
+        kg = build_graph(args.persist_entities, args.persist_entities * 10, rng)
+    bench_persistence(kg, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,7 @@ from dataclasses import asdict
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 
@@ -581,6 +582,38 @@ async def integrated_search(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/search/stream")
+async def integrated_search_stream(
+    query: str,
+    sources: Optional[str] = "web,arxiv,github",
+    max_results: int = 10
+):
+    """
+    Integrated search streamed as newline-delimited JSON.
+    
+    One line is written as each source finishes, carrying the fused
+    ranking so far; the last line has "final": true.
+    """
+    if not state.search_integrator:
+        raise HTTPException(status_code=503, detail="Search integrator not initialized")
+    
+    source_list = [s.strip() for s in sources.split(",")]
+    
+    async def lines():
+        try:
+            async for update in state.search_integrator.integrated_search_stream(
+                query=query,
+                sources=source_list,
+                max_results=max_results
+            ):
+                yield json.dumps(update, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming search error: {e}")
+            yield json.dumps({'error': str(e), 'final': True}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 # WebSocket Endpoint
 
 @app.websocket("/ws")
@@ -9,9 +9,12 @@ Integrates multiple search sources:
 
 Features:
 - Unified search interface
-- Result aggregation and ranking
+- Result aggregation and ranking (MinHash near-duplicate clustering,
+  reciprocal-rank fusion across sources)
+- Streaming results as each source answers, with per-source deadlines
 - Async operations for performance
-- Caching and rate limiting
+- Caching (LRU + TTL, stale-while-revalidate, single-flight, optional
+  SQLite tier) and rate limiting
 
 Author: UFO Galaxy Team
 Version: 5.0.0
@@ -21,11 +24,15 @@ import asyncio
 import json
 import logging
 import hashlib
+import re
+import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Set, Callable
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Any, Set, Callable, Awaitable, Tuple, AsyncIterator
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
 from enum import Enum
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+import random
 import time
 
 try:
@@ -72,13 +79,13 @@ class SearchResult:
         content = f"{self.source.value}:{self.title}:{self.url}"
         return hashlib.md5(content.encode()).hexdigest()[:16]
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary."""
+    def to_dict(self, full: bool = False) -> Dict[str, Any]:
+        """Convert to dictionary (content is truncated unless full=True)."""
         return {
             'id': self.id,
             'source': self.source.value,
             'title': self.title,
-            'content': self.content[:500] if self.content else "",
+            'content': (self.content if full else self.content[:500]) if self.content else "",
             'url': self.url,
             'author': self.author,
             'published_date': self.published_date.isoformat() if self.published_date else None,
@@ -86,6 +93,22 @@ class SearchResult:
             'relevance_score': self.relevance_score,
             'fetched_at': self.fetched_at.isoformat()
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SearchResult':
+        """Rebuild a result from to_dict() output."""
+        return cls(
+            id=data['id'],
+            source=SearchSource(data['source']),
+            title=data['title'],
+            content=data.get('content', ""),
+            url=data['url'],
+            author=data.get('author'),
+            published_date=datetime.fromisoformat(data['published_date']) if data.get('published_date') else None,
+            metadata=data.get('metadata', {}),
+            relevance_score=data.get('relevance_score', 0.0),
+            fetched_at=datetime.fromisoformat(data['fetched_at']) if data.get('fetched_at') else datetime.now()
+        )
 
 
 @dataclass
@@ -120,44 +143,370 @@ class RateLimiter:
             self.last_call_time[key] = time.time()
 
 
+@dataclass
+class _CacheEntry:
+    """One cached result list and the wall-clock time it was stored."""
+    results: List[SearchResult]
+    stored_at: float
+
+
 class ResultCache:
-    """Simple cache for search results."""
+    """
+    Search result cache keyed by (source, query).
+    
+    - Size-bounded LRU: the least recently used entry is evicted once
+      max_entries is exceeded
+    - Stale-while-revalidate: an entry younger than ttl_seconds is fresh;
+      for stale_ttl_seconds after that it is still served by get_or_fetch(),
+      which refreshes it in the background. Older entries are dropped
+    - Single flight: concurrent misses for the same key share one fetch
+    - Optional SQLite tier (persist_path) that is written through on every
+      set() and consulted on memory misses, so results survive restarts
+    
+    get()/set() keep their plain semantics (get() returns fresh entries only).
+    """
+    
+    FRESH = "fresh"
+    STALE = "stale"
+    MISS = "miss"
+    
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS search_cache (
+        key TEXT PRIMARY KEY,
+        source TEXT NOT NULL,
+        query TEXT NOT NULL,
+        stored_at REAL NOT NULL,
+        results TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_search_cache_stored ON search_cache(stored_at);
+    """
     
-    def __init__(self, ttl_seconds: int = 3600):
+    def __init__(
+        self,
+        ttl_seconds: int = 3600,
+        max_entries: int = 1024,
+        stale_ttl_seconds: Optional[float] = None,
+        persist_path: Optional[str] = None,
+        max_disk_entries: int = 10000,
+        clock: Callable[[], float] = time.time
+    ):
         self.ttl_seconds = ttl_seconds
-        self._cache: Dict[str, Dict] = {}
+        self.max_entries = max(1, max_entries)
+        self.stale_ttl_seconds = ttl_seconds if stale_ttl_seconds is None else stale_ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self._clock = clock
+        self._cache: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self._disk_writes = 0
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'disk_hits': 0,
+            'coalesced': 0,
+            'fetches': 0,
+            'refreshes': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+        
+        self.persist_path = persist_path
+        self._db: Optional[sqlite3.Connection] = None
+        if persist_path:
+            self._db = sqlite3.connect(persist_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(self._SCHEMA)
+            self._prune_disk()
     
     def _make_key(self, query: str, source: str) -> str:
         """Create cache key."""
         return hashlib.md5(f"{source}:{query}".encode()).hexdigest()
     
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    
+    def _state(self, entry: _CacheEntry, now: float) -> str:
+        age = now - entry.stored_at
+        if age < self.ttl_seconds:
+            return self.FRESH
+        if age < self.ttl_seconds + self.stale_ttl_seconds:
+            return self.STALE
+        return self.MISS
+    
+    def _lookup_key(self, key: str) -> Tuple[Optional[List[SearchResult]], str]:
+        now = self._clock()
+        entry = self._cache.get(key)
+        from_disk = False
+        if entry is None:
+            entry = self._disk_get(key)
+            from_disk = entry is not None
+        if entry is None:
+            self._stats['misses'] += 1
+            return None, self.MISS
+        
+        state = self._state(entry, now)
+        if state == self.MISS:
+            self._cache.pop(key, None)
+            self._disk_delete(key)
+            self._stats['expirations'] += 1
+            self._stats['misses'] += 1
+            return None, self.MISS
+        
+        if from_disk:
+            self._stats['disk_hits'] += 1
+            self._store(key, entry)
+        else:
+            self._cache.move_to_end(key)
+        self._stats['hits' if state == self.FRESH else 'stale_hits'] += 1
+        return entry.results, state
+    
+    def lookup(self, query: str, source: str) -> Tuple[Optional[List[SearchResult]], str]:
+        """Return (results, state) where state is fresh, stale or miss."""
+        return self._lookup_key(self._make_key(query, source))
+    
     def get(self, query: str, source: str) -> Optional[List[SearchResult]]:
-        """Get cached results if valid."""
+        """Get cached results if still fresh."""
+        results, state = self.lookup(query, source)
+        return results if state == self.FRESH else None
+    
+    # ------------------------------------------------------------------
+    # Storing
+    # ------------------------------------------------------------------
+    
+    def _store(self, key: str, entry: _CacheEntry):
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self._stats['evictions'] += 1
+    
+    def set(self, query: str, source: str, results: List[SearchResult]):
+        """Cache search results."""
         key = self._make_key(query, source)
+        entry = _CacheEntry(results=results, stored_at=self._clock())
+        self._store(key, entry)
+        self._disk_put(key, query, source, entry)
+    
+    async def get_or_fetch(
+        self,
+        query: str,
+        source: str,
+        fetch: Callable[[], Awaitable[Optional[List[SearchResult]]]]
+    ) -> Tuple[Optional[List[SearchResult]], str]:
+        """
+        Serve from cache, refreshing stale entries in the background, or
+        fetch on a miss. Concurrent misses for one key await the same fetch.
         
-        if key not in self._cache:
-            return None
+        fetch returns the results to cache, or None when there is nothing
+        cacheable (e.g. an upstream error). Returns (results, state).
+        """
+        key = self._make_key(query, source)
+        results, state = self._lookup_key(key)
+        if state == self.FRESH:
+            return results, state
+        if state == self.STALE:
+            if key not in self._inflight:
+                self._stats['refreshes'] += 1
+                self._start_fetch(key, query, source, fetch)
+            return results, state
         
-        entry = self._cache[key]
-        age = (datetime.now() - entry['timestamp']).total_seconds()
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._start_fetch(key, query, source, fetch)
+        else:
+            self._stats['coalesced'] += 1
+        # shield: one waiter being cancelled must not cancel the shared fetch
+        return await asyncio.shield(future), state
+    
+    def _start_fetch(self, key: str, query: str, source: str, fetch: Callable) -> asyncio.Future:
+        future = asyncio.ensure_future(self._fetch_and_store(key, query, source, fetch))
+        self._inflight[key] = future
         
-        if age > self.ttl_seconds:
-            del self._cache[key]
-            return None
+        def done(f: asyncio.Future):
+            if self._inflight.get(key) is f:
+                del self._inflight[key]
+            if not f.cancelled() and f.exception() is not None:
+                logger.error(f"Cache fetch for {source}:{query} failed: {f.exception()}")
         
-        return entry['results']
+        future.add_done_callback(done)
+        return future
     
-    def set(self, query: str, source: str, results: List[SearchResult]):
-        """Cache search results."""
-        key = self._make_key(query, source)
-        self._cache[key] = {
-            'timestamp': datetime.now(),
-            'results': results
-        }
+    async def _fetch_and_store(self, key: str, query: str, source: str,
+                               fetch: Callable) -> Optional[List[SearchResult]]:
+        generation = self._generation
+        self._stats['fetches'] += 1
+        results = await fetch()
+        # Do not resurrect entries removed by clear() while the fetch ran
+        if results is not None and generation == self._generation:
+            self.set(query, source, results)
+        return results
     
     def clear(self):
         """Clear all cached results."""
         self._cache.clear()
+        self._generation += 1
+        if self._db is not None:
+            self._db.execute("DELETE FROM search_cache")
+    
+    def close(self):
+        """Cancel background refreshes and close the disk tier."""
+        for future in list(self._inflight.values()):
+            if not future.done() and not future.get_loop().is_closed():
+                future.cancel()
+        self._inflight.clear()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    @property
+    def stats(self) -> Dict[str, Any]:
+        hits = self._stats['hits'] + self._stats['stale_hits']
+        lookups = hits + self._stats['misses']
+        return {
+            **self._stats,
+            'entries': len(self._cache),
+            'inflight': len(self._inflight),
+            'persistent': self._db is not None,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+    
+    # ------------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------------
+    
+    def _disk_get(self, key: str) -> Optional[_CacheEntry]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT stored_at, results FROM search_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            results = [SearchResult.from_dict(r) for r in json.loads(row[1])]
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Dropping unreadable cache row {key}: {e}")
+            self._disk_delete(key)
+            return None
+        return _CacheEntry(results=results, stored_at=row[0])
+    
+    def _disk_put(self, key: str, query: str, source: str, entry: _CacheEntry):
+        if self._db is None:
+            return
+        payload = json.dumps([r.to_dict(full=True) for r in entry.results], ensure_ascii=False)
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO search_cache (key, source, query, stored_at, results) "
+                "VALUES (?, ?, ?, ?, ?)", (key, source, query, entry.stored_at, payload))
+        except sqlite3.Error as e:
+            logger.warning(f"Search cache write failed: {e}")
+            return
+        self._disk_writes += 1
+        if self._disk_writes % 256 == 0:
+            self._prune_disk()
+    
+    def _disk_delete(self, key: str):
+        if self._db is not None:
+            self._db.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+    
+    def _prune_disk(self):
+        """Drop rows past the stale window, then the oldest beyond max_disk_entries."""
+        horizon = self._clock() - self.ttl_seconds - self.stale_ttl_seconds
+        self._db.execute("DELETE FROM search_cache WHERE stored_at < ?", (horizon,))
+        self._db.execute(
+            "DELETE FROM search_cache WHERE key NOT IN "
+            "(SELECT key FROM search_cache ORDER BY stored_at DESC LIMIT ?)",
+            (self.max_disk_entries,))
+
+
+class MinHasher:
+    """
+    MinHash signatures with LSH banding for near-duplicate candidates.
+    
+    signature() maps a token set to num_perm minimum hashes; two sets agree
+    on a position with probability equal to their Jaccard similarity.
+    band_keys() splits a signature into bands so that similar sets share
+    at least one band key with high probability. text_signature() memoizes
+    signatures of recently seen texts, since streamed rankings are rebuilt
+    from mostly the same results.
+    """
+    
+    _PRIME = (1 << 61) - 1
+    
+    def __init__(self, num_perm: int = 64, bands: int = 32, seed: int = 1, cache_size: int = 4096):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, self._PRIME), rng.randrange(0, self._PRIME))
+            for _ in range(num_perm)
+        ]
+        self.text_signature = lru_cache(maxsize=cache_size)(self._text_signature)
+    
+    @staticmethod
+    def _hash(token: str) -> int:
+        return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), 'little')
+    
+    def signature(self, tokens: Set[str]) -> Tuple[int, ...]:
+        if not tokens:
+            return ()
+        hashes = [self._hash(t) for t in tokens]
+        prime = self._PRIME
+        return tuple(
+            min((a * h + b) % prime for h in hashes)
+            for a, b in self._perms
+        )
+    
+    def _text_signature(self, text: str) -> Tuple[int, ...]:
+        return self.signature(shingles(text))
+    
+    def band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        if not signature:
+            return []
+        return [
+            (band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str, max_words: Optional[int] = None) -> Set[str]:
+    """Lowercased word unigrams and bigrams of text."""
+    words = _WORD_RE.findall(text.lower())
+    if max_words is not None:
+        words = words[:max_words]
+    grams = set(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return grams
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used for exact-duplicate matching across sources."""
+    url = url.strip().lower()
+    url = re.sub(r"^[a-z]+://", "", url)
+    url = re.sub(r"^www\.", "", url)
+    url = url.split('#', 1)[0].rstrip('/')
+    # arxiv.org/abs/1234.5678v2 and arxiv.org/pdf/1234.5678.pdf are the same paper
+    match = re.match(r"(?:export\.)?arxiv\.org/(?:abs|pdf)/([^/?]+?)(?:v\d+)?(?:\.pdf)?$", url)
+    if match:
+        return f"arxiv:{match.group(1)}"
+    return url
 
 
 class SearchIntegrator:
@@ -175,24 +524,46 @@ class SearchIntegrator:
     def __init__(
         self,
         cache_ttl: int = 3600,
-        rate_limit_per_minute: int = 60
+        rate_limit_per_minute: int = 60,
+        cache_max_entries: int = 1024,
+        cache_stale_ttl: Optional[float] = None,
+        cache_path: Optional[str] = None
     ):
-        self.cache = ResultCache(ttl_seconds=cache_ttl)
+        self.cache = ResultCache(
+            ttl_seconds=cache_ttl,
+            max_entries=cache_max_entries,
+            stale_ttl_seconds=cache_stale_ttl,
+            persist_path=cache_path
+        )
         self.rate_limiter = RateLimiter(calls_per_minute=rate_limit_per_minute)
         
         # API configurations
         self._arxiv_base_url = "http://export.arxiv.org/api/query"
         self._github_base_url = "https://api.github.com"
         
+        # Per-source deadlines (seconds) for integrated searches; a source
+        # that misses its deadline is reported as timed out and skipped
+        self.source_deadlines: Dict[str, float] = {
+            'web': 10.0,
+            'arxiv': 15.0,
+            'github': 15.0
+        }
+        
+        # Near-duplicate detection and fusion parameters
+        self._minhash = MinHasher()
+        self.title_similarity = 0.6     # Jaccard of title shingles
+        self.content_similarity = 0.7   # Jaccard of leading content shingles
+        self.rrf_k = 60
+        
         # Session for HTTP requests
         self._session: Optional[ClientSession] = None
         
         # Statistics
         self._stats = {
             'total_searches': 0,
-            'cache_hits': 0,
             'api_calls': defaultdict(int),
-            'errors': defaultdict(int)
+            'errors': defaultdict(int),
+            'timeouts': defaultdict(int)
         }
         
         logger.info("SearchIntegrator initialized")
@@ -205,10 +576,39 @@ class SearchIntegrator:
         return self._session
     
     async def close(self):
-        """Close HTTP session."""
+        """Close HTTP session and the result cache."""
+        self.cache.close()
         if self._session and not self._session.closed:
             await self._session.close()
     
+    async def _cached_search(
+        self,
+        source: str,
+        query: str,
+        fetch: Callable[[], Awaitable[Optional[List[SearchResult]]]]
+    ) -> List[SearchResult]:
+        """
+        Run fetch through the result cache.
+        
+        The rate limiter is only taken for real upstream calls. Errors are
+        logged and counted here and yield an empty, uncached result; a
+        failed background refresh keeps serving the stale entry.
+        """
+        async def guarded() -> Optional[List[SearchResult]]:
+            await self.rate_limiter.acquire(source)
+            try:
+                results = await fetch()
+            except Exception as e:
+                logger.error(f"{source} search error: {e}")
+                self._stats['errors'][source] += 1
+                return None
+            if results is not None:
+                self._stats['api_calls'][source] += 1
+            return results
+        
+        results, _ = await self.cache.get_or_fetch(query, source, guarded)
+        return results if results is not None else []
+    
     async def search_web(
         self,
         query: str,
@@ -221,28 +621,12 @@ class SearchIntegrator:
         In production, integrate with actual search APIs
         (Google Custom Search, Bing API, etc.)
         """
-        # Check cache
-        cached = self.cache.get(query, "web")
-        if cached:
-            self._stats['cache_hits'] += 1
-            return cached
-        
-        await self.rate_limiter.acquire("web")
-        
-        try:
+        async def fetch():
             # Simulated web search results
             # In production, replace with actual API call
-            results = self._simulate_web_search(query, max_results)
-            
-            self.cache.set(query, "web", results)
-            self._stats['api_calls']['web'] += 1
-            
-            return results
-            
-        except Exception as e:
-            logger.error(f"Web search error: {e}")
-            self._stats['errors']['web'] += 1
-            return []
+            return self._simulate_web_search(query, max_results)
+        
+        return await self._cached_search("web", query, fetch)
     
     def _simulate_web_search(
         self,
@@ -288,15 +672,7 @@ class SearchIntegrator:
         
         Uses the ArXiv API to search for papers.
         """
-        # Check cache
-        cached = self.cache.get(query, "arxiv")
-        if cached:
-            self._stats['cache_hits'] += 1
-            return cached
-        
-        await self.rate_limiter.acquire("arxiv")
-        
-        try:
+        async def fetch():
             session = await self._get_session()
             
             # Build ArXiv API query
@@ -312,21 +688,13 @@ class SearchIntegrator:
             async with session.get(url) as response:
                 if response.status != 200:
                     logger.warning(f"ArXiv API returned {response.status}")
-                    return []
+                    return None
                 
                 # Parse XML response
                 xml_content = await response.text()
-                results = self._parse_arxiv_response(xml_content)
-                
-                self.cache.set(query, "arxiv", results)
-                self._stats['api_calls']['arxiv'] += 1
-                
-                return results
-                
-        except Exception as e:
-            logger.error(f"ArXiv search error: {e}")
-            self._stats['errors']['arxiv'] += 1
-            return []
+                return self._parse_arxiv_response(xml_content)
+        
+        return await self._cached_search("arxiv", query, fetch)
     
     def _parse_arxiv_response(self, xml_content: str) -> List[SearchResult]:
         """Parse ArXiv XML response."""
@@ -382,15 +750,7 @@ class SearchIntegrator:
         
         Uses the GitHub Search API.
         """
-        # Check cache
-        cached = self.cache.get(query, "github")
-        if cached:
-            self._stats['cache_hits'] += 1
-            return cached
-        
-        await self.rate_limiter.acquire("github")
-        
-        try:
+        async def fetch():
             session = await self._get_session()
             
             # Build GitHub API query
@@ -409,20 +769,12 @@ class SearchIntegrator:
             async with session.get(url, params=params, headers=headers) as response:
                 if response.status != 200:
                     logger.warning(f"GitHub API returned {response.status}")
-                    return []
+                    return None
                 
                 data = await response.json()
-                results = self._parse_github_response(data, search_type)
-                
-                self.cache.set(query, "github", results)
-                self._stats['api_calls']['github'] += 1
-                
-                return results
-                
-        except Exception as e:
-            logger.error(f"GitHub search error: {e}")
-            self._stats['errors']['github'] += 1
-            return []
+                return self._parse_github_response(data, search_type)
+        
+        return await self._cached_search("github", query, fetch)
     
     def _parse_github_response(
         self,
@@ -467,11 +819,114 @@ class SearchIntegrator:
         
         return results
     
+    def _source_searches(self) -> Dict[str, Callable[..., Awaitable[List[SearchResult]]]]:
+        return {
+            'web': self.search_web,
+            'arxiv': self.search_arxiv,
+            'github': self.search_github
+        }
+    
+    async def integrated_search_stream(
+        self,
+        query: str,
+        sources: List[str] = None,
+        max_results: int = 10,
+        deadlines: Optional[Dict[str, float]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Search all sources concurrently and yield an update as each one
+        finishes, so the first ranking is available as soon as the fastest
+        source answers.
+        
+        Every update carries the finished source, its status (ok, error or
+        timeout), the fused ranking over all sources finished so far and the
+        sources still pending; the last update has final=True. A source that
+        misses its deadline is cancelled (a shared upstream fetch still
+        completes and fills the cache).
+        
+        Args:
+            query: Search query
+            sources: List of sources to search (web, arxiv, github)
+            max_results: Maximum results per source and in the ranking
+            deadlines: Per-source deadline overrides in seconds
+        """
+        if sources is None:
+            sources = ["web", "arxiv", "github"]
+        searches = self._source_searches()
+        unknown = [source for source in sources if source not in searches]
+        if unknown:
+            logger.warning(f"Ignoring unknown search sources: {unknown}")
+        sources = [source for source in dict.fromkeys(sources) if source in searches]
+        
+        self._stats['total_searches'] += 1
+        started = time.monotonic()
+        limits = dict(self.source_deadlines, **(deadlines or {}))
+        
+        tasks: Dict[asyncio.Task, str] = {
+            asyncio.ensure_future(searches[source](query, max_results)): source
+            for source in sources
+        }
+        expires = {
+            source: started + limits[source]
+            for source in sources if limits.get(source) is not None
+        }
+        results_by_source: Dict[str, List[SearchResult]] = {}
+        
+        try:
+            while tasks:
+                now = time.monotonic()
+                pending_deadlines = [expires[s] for s in tasks.values() if s in expires]
+                timeout = max(0.0, min(pending_deadlines) - now) if pending_deadlines else None
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                finished: List[Tuple[str, str]] = []
+                for task in done:
+                    source = tasks.pop(task)
+                    if task.exception() is not None:
+                        logger.error(f"Search failed for {source}: {task.exception()}")
+                        results_by_source[source] = []
+                        finished.append((source, 'error'))
+                    else:
+                        results_by_source[source] = task.result()
+                        finished.append((source, 'ok'))
+                
+                now = time.monotonic()
+                for task, source in list(tasks.items()):
+                    if source in expires and expires[source] <= now:
+                        task.cancel()
+                        del tasks[task]
+                        results_by_source[source] = []
+                        self._stats['timeouts'][source] += 1
+                        logger.warning(f"Search source {source} missed its {limits[source]}s deadline")
+                        finished.append((source, 'timeout'))
+                
+                if not finished:
+                    continue
+                ranked = self._fuse_results(results_by_source)
+                ranked_dicts = [r.to_dict() for r in ranked[:max_results]]
+                for position, (source, status) in enumerate(finished, start=1):
+                    yield {
+                        'query': query,
+                        'source': source,
+                        'status': status,
+                        'results': [r.to_dict() for r in results_by_source[source]],
+                        'elapsed_ms': round((time.monotonic() - started) * 1000, 1),
+                        'completed_sources': list(results_by_source),
+                        'pending_sources': list(tasks.values()),
+                        'unique_results': len(ranked),
+                        'ranked_results': ranked_dicts,
+                        'final': not tasks and position == len(finished)
+                    }
+        finally:
+            for task in tasks:
+                task.cancel()
+    
     async def integrated_search(
         self,
         query: str,
         sources: List[str] = None,
-        max_results: int = 10
+        max_results: int = 10,
+        deadlines: Optional[Dict[str, float]] = None
     ) -> Dict[str, Any]:
         """
         Perform integrated search across multiple sources.
@@ -480,104 +935,162 @@ class SearchIntegrator:
             query: Search query
             sources: List of sources to search (web, arxiv, github)
             max_results: Maximum results per source
+            deadlines: Per-source deadline overrides in seconds
             
         Returns:
-            Aggregated and ranked results
+            Aggregated results, near-duplicates merged and ranked by
+            reciprocal-rank fusion
         """
         if sources is None:
             sources = ["web", "arxiv", "github"]
         
-        self._stats['total_searches'] += 1
+        source_results: Dict[str, List[Dict[str, Any]]] = {source: [] for source in sources}
+        statuses: Dict[str, str] = {}
+        final: Dict[str, Any] = {'ranked_results': [], 'unique_results': 0}
+        async for update in self.integrated_search_stream(query, sources, max_results, deadlines):
+            source_results[update['source']] = update['results']
+            statuses[update['source']] = update['status']
+            final = update
         
-        # Create search tasks
-        tasks = []
-        source_mapping = {
-            'web': self.search_web,
-            'arxiv': self.search_arxiv,
-            'github': self.search_github
+        return {
+            'query': query,
+            'sources': sources,
+            'total_results': sum(len(r) for r in source_results.values()),
+            'unique_results': final['unique_results'],
+            'by_source': source_results,
+            'source_status': statuses,
+            'ranked_results': final['ranked_results']
         }
+    
+    def _composite_score(self, result: SearchResult) -> float:
+        """Source relevance plus recency and academic-source boosts, capped at 1."""
+        score = result.relevance_score
         
-        for source in sources:
-            if source in source_mapping:
-                tasks.append(source_mapping[source](query, max_results))
+        # Boost for recency
+        if result.published_date:
+            age_days = (datetime.now(result.published_date.tzinfo) - result.published_date).days
+            if age_days < 30:
+                score += 0.1
         
-        # Execute searches concurrently
-        results_by_source = await asyncio.gather(*tasks, return_exceptions=True)
+        # Boost for academic sources
+        if result.source == SearchSource.ARXIV:
+            score += 0.05
         
-        # Aggregate results
-        all_results = []
-        source_results = {}
+        return min(1.0, score)
+    
+    def _cluster_duplicates(self, results: List[SearchResult]) -> List[List[int]]:
+        """
+        Group near-duplicate results, returning clusters of indexes.
         
-        for source, results in zip(sources, results_by_source):
-            if isinstance(results, Exception):
-                logger.error(f"Search failed for {source}: {results}")
-                source_results[source] = []
-            else:
-                source_results[source] = [r.to_dict() for r in results]
-                all_results.extend(results)
+        Candidates come from identical normalized URLs and from MinHash LSH
+        buckets over title shingles. Identical URLs are always merged; other
+        candidates only across sources (a source's own results are already
+        distinct), when the titles' Jaccard similarity reaches
+        title_similarity or the leading content reaches content_similarity.
+        """
+        parent = list(range(len(results)))
         
-        # Rank and deduplicate
-        ranked_results = self._rank_results(all_results)
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
         
-        return {
-            'query': query,
-            'sources': sources,
-            'total_results': len(all_results),
-            'unique_results': len(ranked_results),
-            'by_source': source_results,
-            'ranked_results': [r.to_dict() for r in ranked_results[:max_results]]
-        }
+        def union(i: int, j: int):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+        
+        titles = [shingles(r.title) for r in results]
+        contents = [shingles(r.content or "", max_words=60) for r in results]
+        
+        first_by_url: Dict[str, int] = {}
+        buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+        for i, result in enumerate(results):
+            url = normalize_url(result.url)
+            if url:
+                union(i, first_by_url.setdefault(url, i))
+            for key in self._minhash.band_keys(self._minhash.text_signature(result.title)):
+                buckets[key].append(i)
+        
+        checked: Set[Tuple[int, int]] = set()
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    i, j = members[a], members[b]
+                    if results[i].source == results[j].source:
+                        continue
+                    if (i, j) in checked or find(i) == find(j):
+                        continue
+                    checked.add((i, j))
+                    if (jaccard(titles[i], titles[j]) >= self.title_similarity
+                            or (len(contents[i]) > 10
+                                and jaccard(contents[i], contents[j]) >= self.content_similarity)):
+                        union(i, j)
+        
+        clusters: Dict[int, List[int]] = defaultdict(list)
+        for i in range(len(results)):
+            clusters[find(i)].append(i)
+        return list(clusters.values())
     
-    def _rank_results(self, results: List[SearchResult]) -> List[SearchResult]:
+    def _fuse_results(self, results_by_source: Dict[str, List[SearchResult]]) -> List[SearchResult]:
         """
-        Rank and deduplicate search results.
+        Merge near-duplicates across sources and rank clusters by
+        reciprocal-rank fusion: sum over sources of 1 / (rrf_k + rank), using
+        each source's best-ranked member of the cluster.
         
-        Uses multiple factors:
-        - Source relevance score
-        - Recency
-        - Cross-source validation
+        The representative of a cluster is its highest composite-scored
+        member; copies are returned with the fused score, the contributing
+        sources and the duplicate URLs in metadata (cached results are not
+        modified).
         """
-        # Deduplicate by URL
-        seen_urls = set()
-        unique_results = []
-        
-        for result in results:
-            if result.url not in seen_urls:
-                seen_urls.add(result.url)
-                unique_results.append(result)
-        
-        # Calculate composite score
-        for result in unique_results:
-            score = result.relevance_score
-            
-            # Boost for recency
-            if result.published_date:
-                age_days = (datetime.now() - result.published_date).days
-                if age_days < 30:
-                    score += 0.1
-            
-            # Boost for academic sources
-            if result.source == SearchSource.ARXIV:
-                score += 0.05
-            
-            result.relevance_score = min(1.0, score)
+        results: List[SearchResult] = []
+        ranks: List[Tuple[str, int]] = []
+        scores: List[float] = []
+        for source, source_results in results_by_source.items():
+            scored = [(self._composite_score(r), r) for r in source_results]
+            scored.sort(key=lambda item: item[0], reverse=True)
+            for rank, (score, result) in enumerate(scored, start=1):
+                results.append(result)
+                ranks.append((source, rank))
+                scores.append(score)
         
-        # Sort by relevance
-        unique_results.sort(key=lambda r: r.relevance_score, reverse=True)
+        fused: List[Tuple[float, float, SearchResult]] = []
+        for cluster in self._cluster_duplicates(results):
+            best_rank: Dict[str, int] = {}
+            for i in cluster:
+                source, rank = ranks[i]
+                best_rank[source] = min(rank, best_rank.get(source, rank))
+            rrf = sum(1.0 / (self.rrf_k + rank) for rank in best_rank.values())
+            lead = max(cluster, key=lambda i: scores[i])
+            representative = results[lead]
+            merged = replace(
+                representative,
+                relevance_score=scores[lead],
+                metadata={
+                    **representative.metadata,
+                    'fused_score': round(rrf, 6),
+                    'sources': sorted(best_rank),
+                    'duplicates': [results[i].url for i in cluster if i != lead]
+                }
+            )
+            fused.append((rrf, scores[lead], merged))
         
-        return unique_results
+        fused.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [merged for _, _, merged in fused]
     
     def get_stats(self) -> Dict[str, Any]:
         """Get search statistics."""
+        cache_stats = self.cache.stats
         return {
             'total_searches': self._stats['total_searches'],
-            'cache_hits': self._stats['cache_hits'],
-            'cache_hit_rate': (
-                self._stats['cache_hits'] / self._stats['total_searches']
-                if self._stats['total_searches'] > 0 else 0
-            ),
+            'cache_hits': cache_stats['hits'] + cache_stats['stale_hits'],
+            'cache_misses': cache_stats['misses'],
+            'cache_hit_rate': cache_stats['hit_rate'],
+            'cache': cache_stats,
             'api_calls': dict(self._stats['api_calls']),
-            'errors': dict(self._stats['errors'])
+            'errors': dict(self._stats['errors']),
+            'timeouts': dict(self._stats['timeouts'])
         }
     
     def clear_cache(self):
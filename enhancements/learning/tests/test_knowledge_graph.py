@@ -0,0 +1,573 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Knowledge Graph query paths
+"""
+
+import math
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta, timezone
+
+import networkx as nx
+
+import sys
+sys.path.insert(0, '/mnt/okcomputer/output/ufo-galaxy-v5/enhancements/learning')
+
+from knowledge_graph import (
+    ColumnReader,
+    Entity,
+    EntityType,
+    KnowledgeGraph,
+    Relationship,
+    RelationshipType,
+    TokenIndex
+)
+
+WORDS = "learning neural graph vector model data network deep signal pattern".split()
+
+
+def build_graph(entities=120, edges=900, seed=3):
+    rng = random.Random(seed)
+    kg = KnowledgeGraph("test")
+    entity_types = list(EntityType)
+    kg.add_entities([
+        Entity(
+            id=f"e{i}",
+            entity_type=entity_types[i % 3],
+            name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+            description=" ".join(rng.choice(WORDS) for _ in range(4)),
+        )
+        for i in range(entities)
+    ])
+    kg.add_relationships([
+        Relationship(
+            id=f"r{i}",
+            source_id=f"e{rng.randrange(entities)}",
+            target_id=f"e{rng.randrange(entities // 4)}",
+            relationship_type=RelationshipType.RELATED_TO,
+        )
+        for i in range(edges)
+    ])
+    return kg
+
+
+def brute_force_similar(kg, entity_id, metric, min_common):
+    graph = kg._graph
+    mine = set(graph.successors(entity_id))
+    scored = []
+    for other in graph.nodes():
+        if other == entity_id:
+            continue
+        theirs = set(graph.successors(other))
+        common = mine & theirs
+        if len(common) < min_common:
+            continue
+        if metric == "common_neighbors":
+            score = len(common)
+        elif metric == "jaccard":
+            union = mine | theirs
+            score = len(common) / len(union) if union else 0.0
+        else:
+            score = sum(1 / math.log(graph.in_degree(n)) for n in common if graph.in_degree(n) > 1)
+        scored.append((other, score))
+    # Rounded so ties summed in a different order still rank in insertion order
+    return sorted(scored, key=lambda item: -round(item[1], 9))
+
+
+def brute_force_search(kg, query, entity_types=None, limit=10):
+    query_lower = query.lower()
+    results = []
+    for entity in kg._entity_index.values():
+        if entity_types and entity.entity_type not in entity_types:
+            continue
+        score = (2 if query_lower in entity.name.lower() else 0) + \
+                (1 if query_lower in entity.description.lower() else 0)
+        if score:
+            results.append((entity, score))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return [entity.id for entity, _ in results[:limit]]
+
+
+class TestTokenIndex(unittest.TestCase):
+    """Test TokenIndex candidate narrowing."""
+
+    def setUp(self):
+        self.index = TokenIndex(max_fraction=1.0)
+        self.index.add("a", "Neural Networks", "deep learning")
+        self.index.add("b", "Graph theory", "networks of nodes")
+        self.index.add("c", "Cooking", "recipes")
+
+    def test_substring_of_token(self):
+        """Test words match inside longer tokens."""
+        self.assertEqual(self.index.candidates("work"), {"a", "b"})
+        self.assertEqual(self.index.candidates("NEURAL"), {"a"})
+
+    def test_all_words_required(self):
+        """Test every query word must occur in the entity."""
+        self.assertEqual(self.index.candidates("network deep"), {"a"})
+        self.assertEqual(self.index.candidates("network recipe"), set())
+
+    def test_no_words_falls_back(self):
+        """Test queries without word characters fall back to a scan."""
+        self.assertIsNone(self.index.candidates("  -- "))
+
+    def test_unselective_falls_back(self):
+        """Test queries matching too many entities fall back to a scan."""
+        index = TokenIndex(max_fraction=0.5)
+        for i in range(10):
+            index.add(str(i), f"common {i}")
+        self.assertIsNone(index.candidates("common"))
+        self.assertEqual(index.candidates("7"), {"7"})
+
+    def test_reindex_and_remove(self):
+        """Test re-adding replaces old tokens and removal drops them."""
+        self.assertEqual(self.index.candidates("cook"), {"c"})
+        self.index.add("c", "Baking", "bread")
+        self.assertEqual(self.index.candidates("cook"), set())
+        self.assertEqual(self.index.candidates("bread"), {"c"})
+        self.index.remove("c")
+        self.assertEqual(self.index.candidates("bread"), set())
+
+
+class TestSimilarEntities(unittest.TestCase):
+    """Test find_similar_entities against a brute-force scan."""
+
+    def setUp(self):
+        self.kg = build_graph()
+        self.sample = [f"e{i}" for i in range(0, 120, 7)]
+
+    def check_all(self):
+        for metric in ("common_neighbors", "jaccard", "adamic_adar"):
+            for min_common in (0, 1, 2, 3):
+                for entity_id in self.sample:
+                    expected = brute_force_similar(self.kg, entity_id, metric, min_common)
+                    actual = self.kg.find_similar_entities(entity_id, min_common, metric=metric)
+                    self.assertEqual([e for e, _ in actual], [e for e, _ in expected])
+                    for (_, got), (_, want) in zip(actual, expected):
+                        self.assertAlmostEqual(got, want, places=9)
+
+    def test_set_path_matches_brute_force(self):
+        """Test scores from the live adjacency sets."""
+        self.kg._adjacency.rebuild_after = 10 ** 9
+        self.check_all()
+        self.assertEqual(self.kg._adjacency.stats['csr_queries'], 0)
+
+    def test_csr_path_matches_brute_force(self):
+        """Test scores from the CSR snapshot."""
+        self.kg._adjacency.build(self.kg._graph)
+        self.check_all()
+        self.assertEqual(self.kg._adjacency.stats['set_queries'], 0)
+
+    def test_common_neighbors_are_ints(self):
+        """Test common-neighbor counts keep their integer type."""
+        results = self.kg.find_similar_entities("e1", 1)
+        self.assertTrue(results)
+        self.assertTrue(all(isinstance(score, int) for _, score in results))
+
+    def test_limit(self):
+        """Test limit keeps the best entities."""
+        full = self.kg.find_similar_entities("e1", 1)
+        self.assertEqual(self.kg.find_similar_entities("e1", 1, limit=3), full[:3])
+
+    def test_unknown_metric(self):
+        """Test unknown metrics are rejected."""
+        with self.assertRaises(ValueError):
+            self.kg.find_similar_entities("e1", metric="cosine")
+
+    def test_unknown_entity(self):
+        """Test unknown entities have no similar entities."""
+        self.assertEqual(self.kg.find_similar_entities("missing"), [])
+
+    def test_snapshot_invalidated_by_mutation(self):
+        """Test structural changes are visible before and after the rebuild."""
+        self.kg._adjacency.build(self.kg._graph)
+        builds = self.kg._adjacency.stats['builds']
+
+        self.kg.add_entity(Entity(id="new", entity_type=EntityType.CONCEPT, name="new"))
+        for target in list(self.kg._graph.successors("e1")):
+            self.kg.add_relationship(Relationship(
+                id=f"new-{target}", source_id="new", target_id=target,
+                relationship_type=RelationshipType.RELATED_TO))
+        self.assertFalse(self.kg._adjacency.fresh)
+
+        for _ in range(3):
+            expected = brute_force_similar(self.kg, "e1", "common_neighbors", 1)
+            self.assertEqual(self.kg.find_similar_entities("e1", 1), expected)
+            self.assertIn("new", dict(expected))
+        self.assertEqual(self.kg._adjacency.stats['builds'], builds + 1)
+
+        self.kg.remove_relationship(next(
+            rel.id for rel in self.kg._relationship_index.values() if rel.source_id == "new"))
+        self.assertFalse(self.kg._adjacency.fresh)
+        self.assertEqual(
+            self.kg.find_similar_entities("e1", 1),
+            brute_force_similar(self.kg, "e1", "common_neighbors", 1)
+        )
+
+    def test_property_update_keeps_snapshot(self):
+        """Test non-structural updates do not invalidate the snapshot."""
+        self.kg._adjacency.build(self.kg._graph)
+        self.kg.update_entity("e1", {"description": "changed"})
+        self.kg.add_entity(Entity(id="e2", entity_type=EntityType.CONCEPT, name="renamed"))
+        self.assertTrue(self.kg._adjacency.fresh)
+
+
+class TestSearch(unittest.TestCase):
+    """Test search against a brute-force scan."""
+
+    def setUp(self):
+        self.kg = build_graph()
+
+    def test_matches_brute_force(self):
+        """Test results and order match a full scan."""
+        queries = ["neural", "GRAPH", "ork", "deep signal", "1", "17", "data 4", "zzz", "", " "]
+        for query in queries:
+            for entity_types in (None, [EntityType.CONCEPT]):
+                for limit in (3, 10, 200):
+                    self.assertEqual(
+                        [e.id for e in self.kg.search(query, entity_types, limit)],
+                        brute_force_search(self.kg, query, entity_types, limit),
+                        msg=f"{query!r} {entity_types} {limit}"
+                    )
+
+    def test_sees_updates(self):
+        """Test renamed and removed entities are searched by their current text."""
+        self.kg.update_entity("e5", {"name": "Quantum widget"})
+        self.assertEqual([e.id for e in self.kg.search("quantum")], ["e5"])
+        self.kg.add_entity(Entity(id="e5", entity_type=EntityType.CONCEPT, name="Plain"))
+        self.assertEqual(self.kg.search("quantum"), [])
+        self.assertEqual([e.id for e in self.kg.search("plain")], ["e5"])
+        self.assertIn("e5", [e.id for e in self.kg.get_entities_by_type(EntityType.CONCEPT)])
+
+
+class TestConnectedEntities(unittest.TestCase):
+    """Test find_connected_entities."""
+
+    def test_levels_are_cumulative(self):
+        """Test depth_k holds everything within k hops, excluding the entity."""
+        kg = build_graph()
+        for entity_id in ("e0", "e3", "e50"):
+            connected = kg.find_connected_entities(entity_id, max_depth=3)
+            for depth in range(1, 4):
+                expected = set()
+                kg._bfs_collect(entity_id, depth, expected)
+                expected.discard(entity_id)
+                self.assertEqual(set(connected[f"depth_{depth}"]), expected)
+                self.assertEqual(len(connected[f"depth_{depth}"]), len(expected))
+
+    def test_chain(self):
+        """Test a chain graph level by level, following edge direction."""
+        kg = KnowledgeGraph("chain")
+        for i in range(4):
+            kg.add_entity(Entity(id=f"n{i}", entity_type=EntityType.CONCEPT, name=f"n{i}"))
+        for i in range(3):
+            kg.add_relationship(Relationship(
+                id=f"r{i}", source_id=f"n{i}", target_id=f"n{i + 1}",
+                relationship_type=RelationshipType.RELATED_TO))
+        connected = kg.find_connected_entities("n1", max_depth=3)
+        self.assertEqual(connected["depth_1"], ["n2"])
+        self.assertEqual(connected["depth_2"], ["n2", "n3"])
+        self.assertEqual(connected["depth_3"], ["n2", "n3"])
+
+
+class TestAnalytics(unittest.TestCase):
+    """Test incrementally maintained centrality and communities."""
+
+    def setUp(self):
+        self.kg = build_graph()
+        self.rng = random.Random(11)
+
+    def mutate(self, steps):
+        for step in range(steps):
+            ids = list(self.kg._entity_index)
+            roll = self.rng.random()
+            if roll < 0.5:
+                self.kg.add_relationship(Relationship(
+                    id=f"m{step}", source_id=self.rng.choice(ids), target_id=self.rng.choice(ids),
+                    relationship_type=RelationshipType.RELATED_TO))
+            elif roll < 0.8:
+                self.kg.remove_relationship(self.rng.choice(list(self.kg._relationship_index)))
+            elif roll < 0.9:
+                self.kg.remove_entity(self.rng.choice(ids))
+            else:
+                self.kg.add_entity(Entity(id=f"n{step}", entity_type=EntityType.CONCEPT, name="n"))
+
+    def assert_centrality_matches(self):
+        centrality = nx.degree_centrality(self.kg._graph)
+        expected = sorted(centrality.items(), key=lambda x: x[1], reverse=True)[:15]
+        self.assertEqual(list(self.kg.calculate_centrality(15).items()), expected)
+
+    def assert_valid_partition(self, communities):
+        members = [node for c in communities for node in c]
+        self.assertEqual(sorted(members), sorted(self.kg._graph.nodes()))
+        undirected = self.kg._graph.to_undirected()
+        for c in communities:
+            self.assertTrue(nx.is_connected(undirected.subgraph(c)))
+        self.assertEqual([len(c) for c in communities], sorted((len(c) for c in communities), reverse=True))
+
+    def test_centrality_matches_networkx(self):
+        """Test top-N centrality values and tie order under mutations."""
+        self.assert_centrality_matches()
+        for _ in range(10):
+            self.mutate(30)
+            self.assert_centrality_matches()
+
+    def test_remove_entity_removes_relationships(self):
+        """Test removing a connected entity drops its relationships."""
+        entity_id = max(self.kg._graph.degree(), key=lambda x: x[1])[0]
+        self.assertTrue(self.kg.remove_entity(entity_id))
+        self.assertNotIn(entity_id, self.kg._graph)
+        for rel in self.kg._relationship_index.values():
+            self.assertNotIn(entity_id, (rel.source_id, rel.target_id))
+        self.assertNotIn(entity_id, self.kg.calculate_centrality(200))
+
+    def test_communities_stay_valid(self):
+        """Test incremental updates keep a partition into connected communities."""
+        self.assert_valid_partition(self.kg.detect_communities())
+        for _ in range(10):
+            self.mutate(20)
+            self.assert_valid_partition(self.kg.detect_communities())
+
+    def test_planted_communities(self):
+        """Test two cliques joined by one edge are found, and split when it goes."""
+        kg = KnowledgeGraph("cliques")
+        for group in "ab":
+            for i in range(6):
+                kg.add_entity(Entity(id=f"{group}{i}", entity_type=EntityType.CONCEPT, name=f"{group}{i}"))
+            for i in range(6):
+                for j in range(i + 1, 6):
+                    kg.add_relationship(Relationship(
+                        id=f"{group}{i}-{j}", source_id=f"{group}{i}", target_id=f"{group}{j}",
+                        relationship_type=RelationshipType.RELATED_TO))
+        kg.add_relationship(Relationship(
+            id="bridge", source_id="a0", target_id="b0", relationship_type=RelationshipType.RELATED_TO))
+        expected = [{f"a{i}" for i in range(6)}, {f"b{i}" for i in range(6)}]
+
+        communities = kg.detect_communities()
+        self.assertCountEqual([set(c) for c in communities], expected)
+
+        kg.remove_relationship("a0-1")
+        kg.remove_relationship("bridge")
+        self.assertCountEqual([set(c) for c in kg.detect_communities()], expected)
+
+        kg.remove_entity("a0")
+        self.assertCountEqual([set(c) for c in kg.detect_communities()],
+                              [expected[0] - {"a0"}, expected[1]])
+
+    def test_results_cached_until_mutation(self):
+        """Test polling is served from the cache and mutations invalidate it."""
+        first = self.kg.detect_communities()
+        self.kg.calculate_centrality()
+        hits = self.kg._analytics.stats['cache_hits']
+        updates = self.kg._analytics.stats['community_updates']
+
+        self.assertEqual(self.kg.detect_communities(), first)
+        self.kg.calculate_centrality()
+        self.assertEqual(self.kg._analytics.stats['cache_hits'], hits + 2)
+
+        first[0].append("tampered")
+        self.assertNotIn("tampered", self.kg.detect_communities()[0])
+
+        self.mutate(5)
+        self.kg.detect_communities()
+        self.assertEqual(self.kg._analytics.stats['community_updates'], updates + 1)
+
+    def test_greedy_method(self):
+        """Test the from-scratch greedy modularity method is still available."""
+        communities = self.kg.detect_communities(method="greedy_modularity")
+        self.assertEqual(sorted(n for c in communities for n in c), sorted(self.kg._graph.nodes()))
+        with self.assertRaises(ValueError):
+            self.kg.detect_communities(method="louvain")
+
+
+class TestPersistence(unittest.TestCase):
+    """Test snapshot and delta log persistence."""
+
+    def setUp(self):
+        self.kg = build_graph()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "graph.kg")
+
+    def tearDown(self):
+        self.kg.close_delta_log()
+        shutil.rmtree(self.directory)
+
+    def assert_same_graph(self, loaded, kg=None):
+        kg = kg or self.kg
+        self.assertEqual({k: e.to_dict() for k, e in loaded._entity_index.items()},
+                         {k: e.to_dict() for k, e in kg._entity_index.items()})
+        self.assertEqual({k: r.to_dict() for k, r in loaded._relationship_index.items()},
+                         {k: r.to_dict() for k, r in kg._relationship_index.items()})
+        self.assertEqual(dict(loaded._graph.nodes(data=True)), dict(kg._graph.nodes(data=True)))
+        self.assertEqual({(u, v): d for u, v, d in loaded._graph.edges(data=True)},
+                         {(u, v): d for u, v, d in kg._graph.edges(data=True)})
+        self.assertEqual({t: ids for t, ids in loaded._entity_type_index.items() if ids},
+                         {t: ids for t, ids in kg._entity_type_index.items() if ids})
+        self.assertEqual({t: ids for t, ids in loaded._relationship_type_index.items() if ids},
+                         {t: ids for t, ids in kg._relationship_type_index.items() if ids})
+        self.assertEqual(list(loaded.calculate_centrality(15).items()),
+                         list(kg.calculate_centrality(15).items()))
+        for query in ("graph", "neural data", "7"):
+            self.assertEqual([e.id for e in loaded.search(query)], [e.id for e in kg.search(query)])
+
+    def assert_valid_partition(self, kg):
+        members = sorted(n for c in kg.detect_communities() for n in c)
+        self.assertEqual(members, sorted(kg._graph.nodes()))
+
+    def test_snapshot_round_trip(self):
+        """Test a snapshot restores entities, relationships, indexes and queries."""
+        self.kg.update_entity("e1", {"name": "nul\0byte ünïcode 图谱", "description": "",
+                                     "properties": {"tags": ["a", "b"], "score": 0.5}})
+        self.kg.update_entity("e2", {"source": "crawler", "confidence": 0.25})
+        self.kg.get_relationship("r3").properties["weight"] = 2
+
+        self.kg.save(self.path)
+        self.assertTrue(ColumnReader.is_snapshot(self.path))
+        loaded = KnowledgeGraph.load(self.path)
+
+        self.assertEqual(loaded.name, "test")
+        self.assertEqual(loaded.get_entity("e1").name, "nul\0byte ünïcode 图谱")
+        self.assertEqual(loaded.get_relationship("r3").properties, {"weight": 2})
+        self.assert_same_graph(loaded)
+        self.assert_valid_partition(loaded)
+
+    def test_snapshot_load_without_direct_graph_writes(self):
+        """Test the public networkx path builds the same graph as the direct one."""
+        self.kg.save(self.path)
+        direct = KnowledgeGraph.load(self.path)
+        self.assertTrue(KnowledgeGraph._direct_load_supported(direct._graph))
+        with mock.patch.object(KnowledgeGraph, "_direct_load_supported", return_value=False):
+            public = KnowledgeGraph.load(self.path)
+        self.assert_same_graph(public)
+        self.assert_same_graph(public, direct)
+        self.assertEqual(list(public._graph.edges()), list(direct._graph.edges()))
+
+    def test_empty_graph(self):
+        """Test an empty graph round-trips."""
+        KnowledgeGraph("empty").save(self.path)
+        loaded = KnowledgeGraph.load(self.path)
+        self.assertEqual(loaded.name, "empty")
+        self.assertEqual(len(loaded._entity_index), 0)
+        self.assertEqual(loaded._graph.number_of_edges(), 0)
+
+    def test_timezone_aware_timestamps(self):
+        """Test aware timestamps are stored as the same instant in naive UTC."""
+        moment = datetime(2024, 5, 1, 12, 30, 15, 250, tzinfo=timezone(timedelta(hours=8)))
+        self.kg.add_entity(Entity(id="tz", entity_type=EntityType.CONCEPT, name="tz",
+                                  created_at=moment, updated_at=moment.replace(microsecond=0)))
+        self.kg.save(self.path)
+        entity = KnowledgeGraph.load(self.path).get_entity("tz")
+        self.assertEqual(entity.created_at, datetime(2024, 5, 1, 4, 30, 15, 250))
+        self.assertEqual(entity.updated_at, datetime(2024, 5, 1, 4, 30, 15))
+
+    def test_json_format(self):
+        """Test JSON saves still load, with the format chosen by extension."""
+        path = os.path.join(self.directory, "graph.json")
+        self.kg.save(path)
+        self.assertFalse(ColumnReader.is_snapshot(path))
+        self.assert_same_graph(KnowledgeGraph.load(path))
+
+        self.kg.save(self.path, format="json")
+        self.assert_same_graph(KnowledgeGraph.load(self.path))
+        with self.assertRaises(ValueError):
+            self.kg.save(self.path, format="xml")
+
+    def mutate(self):
+        rng = random.Random(5)
+        self.kg.add_entity(Entity(id="new", entity_type=EntityType.PERSON, name="fresh face"))
+        for i in range(20):
+            self.kg.add_relationship(Relationship(
+                id=f"d{i}", source_id="new", target_id=f"e{rng.randrange(120)}",
+                relationship_type=RelationshipType.PART_OF))
+        for rid in ("r1", "r2", "d3"):
+            self.kg.remove_relationship(rid)
+        self.kg.remove_entity("e5")
+        self.kg.update_entity("e6", {"entity_type": EntityType.EVENT, "name": "renamed"})
+
+    def test_delta_log_replay(self):
+        """Test changes after a snapshot are restored from its delta log."""
+        self.kg.save(self.path, delta_log=True)
+        self.mutate()
+        self.kg.close_delta_log()
+
+        loaded = KnowledgeGraph.load(self.path)
+        self.assert_same_graph(loaded)
+        self.assertIn("e6", [e.id for e in loaded.get_entities_by_type(EntityType.EVENT)])
+
+    def test_delta_log_continues_after_load(self):
+        """Test a graph loaded with delta_log keeps appending to the same log."""
+        self.kg.save(self.path, delta_log=True)
+        self.kg.remove_entity("e9")
+        self.kg.close_delta_log()
+
+        self.kg = KnowledgeGraph.load(self.path, delta_log=True)
+        self.mutate()
+        self.kg.close_delta_log()
+
+        self.assert_same_graph(KnowledgeGraph.load(self.path))
+
+    def test_new_snapshot_discards_log(self):
+        """Test saving again folds the log into the snapshot."""
+        self.kg.save(self.path, delta_log=True)
+        self.mutate()
+        self.kg.save(self.path)
+        self.assertFalse(os.path.exists(self.path + ".delta"))
+        self.assert_same_graph(KnowledgeGraph.load(self.path))
+
+    def test_stale_log_ignored(self):
+        """Test a log written for another snapshot is not replayed."""
+        self.kg.save(self.path, delta_log=True)
+        self.kg.remove_entity("e1")
+        self.kg.close_delta_log()
+        stale = open(self.path + ".delta", "rb").read()
+
+        self.kg.add_entity(Entity(id="e1", entity_type=EntityType.CONCEPT, name="back"))
+        self.kg.save(self.path)
+        with open(self.path + ".delta", "wb") as f:
+            f.write(stale)
+        self.assertIsNotNone(KnowledgeGraph.load(self.path).get_entity("e1"))
+
+    def test_torn_tail_dropped(self):
+        """Test a partially written last record is skipped on load and on append."""
+        self.kg.save(self.path, delta_log=True)
+        self.kg.remove_entity("e1")
+        self.kg.close_delta_log()
+        with open(self.path + ".delta", "ab") as f:
+            f.write(b'{"op": "remove_entity", "data": {"id": "e2"')
+
+        loaded = KnowledgeGraph.load(self.path, delta_log=True)
+        self.assertIsNone(loaded.get_entity("e1"))
+        self.assertIsNotNone(loaded.get_entity("e2"))
+        loaded.remove_entity("e3")
+        loaded.close_delta_log()
+
+        reloaded = KnowledgeGraph.load(self.path)
+        self.assertIsNotNone(reloaded.get_entity("e2"))
+        self.assertIsNone(reloaded.get_entity("e3"))
+
+
+def run_tests():
+    """Run all tests."""
+    loader = unittest.TestLoader()
+    suite = unittest.TestSuite()
+
+    suite.addTests(loader.loadTestsFromTestCase(TestTokenIndex))
+    suite.addTests(loader.loadTestsFromTestCase(TestSimilarEntities))
+    suite.addTests(loader.loadTestsFromTestCase(TestSearch))
+    suite.addTests(loader.loadTestsFromTestCase(TestConnectedEntities))
+    suite.addTests(loader.loadTestsFromTestCase(TestAnalytics))
+    suite.addTests(loader.loadTestsFromTestCase(TestPersistence))
+
+    runner = unittest.TextTestRunner(verbosity=2)
+    result = runner.run(suite)
+
+    return result.wasSuccessful()
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    exit(0 if success else 1)
@@ -4,6 +4,9 @@ Unit tests for Search Integrator
 """
 
 import asyncio
+import os
+import shutil
+import tempfile
 import unittest
 from datetime import datetime
 
@@ -16,7 +19,10 @@ from search_integrator import (
     SearchQuery,
     RateLimiter,
     ResultCache,
-    SearchIntegrator
+    SearchIntegrator,
+    MinHasher,
+    normalize_url,
+    shingles
 )
 
 
@@ -236,12 +242,14 @@ class TestSearchIntegrator(unittest.TestCase):
                         content="C", url="U3", relevance_score=0.7),
         ]
         
-        ranked = self.integrator._rank_results(results)
+        ranked = self.integrator._fuse_results({r.source.value: [r] for r in results})
         
         # Should be sorted by relevance
         self.assertEqual(ranked[0].id, "r2")  # Highest score
         self.assertEqual(ranked[1].id, "r3")
         self.assertEqual(ranked[2].id, "r1")
+        # Cached inputs keep their original scores
+        self.assertEqual([r.relevance_score for r in results], [0.5, 0.9, 0.7])
     
     def test_rank_results_deduplication(self):
         """Test result deduplication."""
@@ -252,10 +260,11 @@ class TestSearchIntegrator(unittest.TestCase):
                         content="C", url="https://example.com", relevance_score=0.9),
         ]
         
-        ranked = self.integrator._rank_results(results)
+        ranked = self.integrator._fuse_results({r.source.value: [r] for r in results})
         
         # Should deduplicate by URL
         self.assertEqual(len(ranked), 1)
+        self.assertEqual(ranked[0].id, "r2")
     
     def test_get_stats(self):
         """Test statistics retrieval."""
@@ -380,6 +389,265 @@ class TestIntegration(unittest.TestCase):
         asyncio.run(test())
 
 
+def make_results(tag, count=2):
+    """Build a small result list whose titles carry tag."""
+    return [
+        SearchResult(id="", source=SearchSource.WEB, title=f"{tag} {i}",
+                     content=f"content {i}", url=f"https://example.com/{tag}/{i}")
+        for i in range(count)
+    ]
+
+
+class TestResultCacheLRU(unittest.TestCase):
+    """Test size bound, stale window and disk tier of ResultCache."""
+    
+    def setUp(self):
+        self.now = [1000.0]
+        self.tmp = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+    
+    def clock(self):
+        return self.now[0]
+    
+    def test_lru_eviction(self):
+        """Least recently used entry goes first."""
+        cache = ResultCache(ttl_seconds=60, max_entries=2, clock=self.clock)
+        cache.set("a", "web", make_results("a"))
+        cache.set("b", "web", make_results("b"))
+        self.assertIsNotNone(cache.get("a", "web"))  # a is now most recent
+        cache.set("c", "web", make_results("c"))
+        
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("b", "web"))
+        self.assertIsNotNone(cache.get("a", "web"))
+        self.assertIsNotNone(cache.get("c", "web"))
+        self.assertEqual(cache.stats['evictions'], 1)
+    
+    def test_fresh_stale_expired(self):
+        """Entries move from fresh to stale to expired."""
+        cache = ResultCache(ttl_seconds=10, stale_ttl_seconds=20, clock=self.clock)
+        cache.set("q", "web", make_results("q"))
+        
+        self.assertEqual(cache.lookup("q", "web")[1], ResultCache.FRESH)
+        self.now[0] += 15
+        self.assertEqual(cache.lookup("q", "web")[1], ResultCache.STALE)
+        self.assertIsNone(cache.get("q", "web"))  # get() only serves fresh entries
+        self.now[0] += 20
+        self.assertEqual(cache.lookup("q", "web"), (None, ResultCache.MISS))
+        self.assertEqual(len(cache), 0)
+    
+    def test_disk_tier_survives_restart(self):
+        """Results written through to SQLite are found by a new cache."""
+        path = os.path.join(self.tmp, "cache.db")
+        cache = ResultCache(ttl_seconds=60, persist_path=path, clock=self.clock)
+        long_content = "x" * 2000
+        results = make_results("disk")
+        results[0].content = long_content
+        cache.set("q", "arxiv", results)
+        cache.close()
+        
+        reopened = ResultCache(ttl_seconds=60, persist_path=path, clock=self.clock)
+        cached = reopened.get("q", "arxiv")
+        self.assertEqual([r.title for r in cached], ["disk 0", "disk 1"])
+        self.assertEqual(cached[0].content, long_content)
+        self.assertEqual(cached[0].id, results[0].id)
+        self.assertEqual(reopened.stats['disk_hits'], 1)
+        
+        # Expired rows are pruned when the cache is opened
+        reopened.close()
+        self.now[0] += 1000
+        expired = ResultCache(ttl_seconds=60, persist_path=path, clock=self.clock)
+        self.assertIsNone(expired.get("q", "arxiv"))
+        expired.close()
+
+
+class TestResultCacheAsync(unittest.IsolatedAsyncioTestCase):
+    """Test single flight and stale-while-revalidate."""
+    
+    async def test_concurrent_misses_share_one_fetch(self):
+        """Identical concurrent lookups hit the upstream once."""
+        cache = ResultCache(ttl_seconds=60)
+        calls = []
+        
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return make_results("shared")
+        
+        outcomes = await asyncio.gather(*[cache.get_or_fetch("q", "web", fetch) for _ in range(10)])
+        
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(results[0].title == "shared 0" for results, _ in outcomes))
+        self.assertEqual(cache.stats['coalesced'], 9)
+        self.assertEqual(cache.stats['inflight'], 0)
+    
+    async def test_stale_entry_refreshed_in_background(self):
+        """A stale entry is returned at once while a refresh runs."""
+        now = [1000.0]
+        cache = ResultCache(ttl_seconds=10, stale_ttl_seconds=100, clock=lambda: now[0])
+        cache.set("q", "web", make_results("old"))
+        now[0] += 20
+        refreshed = asyncio.Event()
+        
+        async def fetch():
+            await refreshed.wait()
+            return make_results("new")
+        
+        results, state = await cache.get_or_fetch("q", "web", fetch)
+        self.assertEqual(state, ResultCache.STALE)
+        self.assertEqual(results[0].title, "old 0")
+        # A second stale read does not start another refresh
+        await cache.get_or_fetch("q", "web", fetch)
+        self.assertEqual(cache.stats['refreshes'], 1)
+        
+        refreshed.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        results, state = await cache.get_or_fetch("q", "web", fetch)
+        self.assertEqual(state, ResultCache.FRESH)
+        self.assertEqual(results[0].title, "new 0")
+    
+    async def test_failed_fetch_is_not_cached(self):
+        """None from fetch means nothing is stored."""
+        cache = ResultCache(ttl_seconds=60)
+        
+        async def fetch():
+            return None
+        
+        results, state = await cache.get_or_fetch("q", "web", fetch)
+        self.assertIsNone(results)
+        self.assertEqual(state, ResultCache.MISS)
+        self.assertEqual(len(cache), 0)
+    
+    async def test_integrator_coalesces_and_reports_stats(self):
+        """Concurrent identical searches make a single upstream call."""
+        integrator = SearchIntegrator(rate_limit_per_minute=6000)
+        await asyncio.gather(*[integrator.search_web("same query", max_results=3) for _ in range(5)])
+        await integrator.search_web("same query", max_results=3)
+        
+        stats = integrator.get_stats()
+        self.assertEqual(stats['api_calls']['web'], 1)
+        self.assertEqual(stats['cache']['coalesced'], 4)
+        self.assertEqual(stats['cache_hits'], 1)
+        self.assertIn('hit_rate', stats['cache'])
+        await integrator.close()
+
+
+def paper(source, title, url, content="", score=0.5):
+    return SearchResult(id="", source=source, title=title, content=content,
+                        url=url, relevance_score=score)
+
+
+class TestNearDuplicateFusion(unittest.TestCase):
+    """Test near-duplicate clustering and reciprocal-rank fusion."""
+    
+    def setUp(self):
+        self.integrator = SearchIntegrator()
+    
+    def test_normalize_url(self):
+        """arXiv abs/pdf/version variants share one key."""
+        self.assertEqual(normalize_url("https://arxiv.org/abs/1706.03762v5"), "arxiv:1706.03762")
+        self.assertEqual(normalize_url("http://arxiv.org/pdf/1706.03762.pdf"), "arxiv:1706.03762")
+        self.assertEqual(normalize_url("https://www.Example.com/a/#top"), "example.com/a")
+    
+    def test_minhash_similarity(self):
+        """Similar sets share a band key, unrelated ones rarely do."""
+        hasher = MinHasher()
+        a = hasher.signature(shingles("Attention Is All You Need"))
+        b = hasher.signature(shingles("[1706.03762] Attention Is All You Need"))
+        c = hasher.signature(shingles("Deep Residual Learning for Image Recognition"))
+        self.assertEqual(len(a), 64)
+        self.assertTrue(set(hasher.band_keys(a)) & set(hasher.band_keys(b)))
+        self.assertFalse(set(hasher.band_keys(a)) & set(hasher.band_keys(c)))
+    
+    def test_cross_source_copies_are_merged(self):
+        """Copies of one paper from arXiv, web and GitHub become one result."""
+        results_by_source = {
+            'arxiv': [
+                paper(SearchSource.ARXIV, "Attention Is All You Need",
+                      "http://arxiv.org/abs/1706.03762v7", score=0.6),
+                paper(SearchSource.ARXIV, "Deep Residual Learning for Image Recognition",
+                      "http://arxiv.org/abs/1512.03385v1", score=0.5),
+            ],
+            'web': [
+                paper(SearchSource.WEB, "[1706.03762] Attention Is All You Need",
+                      "https://example.org/transformer", score=0.9),
+                paper(SearchSource.WEB, "Attention paper PDF",
+                      "https://arxiv.org/pdf/1706.03762.pdf", score=0.8),
+            ],
+            'github': [
+                paper(SearchSource.GITHUB, "tensorflow/tensor2tensor",
+                      "https://github.com/tensorflow/tensor2tensor", score=0.9),
+            ],
+        }
+        fused = self.integrator._fuse_results(results_by_source)
+        
+        self.assertEqual(len(fused), 3)
+        top = fused[0]
+        self.assertEqual(top.metadata['sources'], ['arxiv', 'web'])
+        self.assertEqual(len(top.metadata['duplicates']), 2)
+        self.assertAlmostEqual(top.metadata['fused_score'], 1 / 61 + 1 / 61, places=6)
+        # Cached inputs are left untouched
+        self.assertNotIn('fused_score', results_by_source['arxiv'][0].metadata)
+    
+    def test_same_source_results_stay_separate(self):
+        """Near-identical results from one source are not merged."""
+        results = self.integrator._simulate_web_search("transformers", 5)
+        fused = self.integrator._fuse_results({'web': results})
+        self.assertEqual(len(fused), 5)
+        self.assertEqual([r.url for r in fused], [r.url for r in results])
+
+
+class TestStreamingSearch(unittest.IsolatedAsyncioTestCase):
+    """Test incremental integrated search."""
+    
+    async def asyncSetUp(self):
+        self.integrator = SearchIntegrator(rate_limit_per_minute=6000)
+        
+        def fake(source, delay, title):
+            async def search(query, max_results=10):
+                await asyncio.sleep(delay)
+                return [paper(source, title, f"https://{source.value}.example/{title}")]
+            return search
+        
+        self.integrator.search_web = fake(SearchSource.WEB, 0.01, "fast")
+        self.integrator.search_arxiv = fake(SearchSource.ARXIV, 0.2, "slow")
+        self.integrator.search_github = fake(SearchSource.GITHUB, 5.0, "stuck")
+    
+    async def asyncTearDown(self):
+        await self.integrator.close()
+    
+    async def test_first_update_from_fastest_source(self):
+        """Updates arrive in completion order, the stuck source times out."""
+        updates = []
+        async for update in self.integrator.integrated_search_stream(
+                "q", deadlines={'github': 0.3}):
+            updates.append(update)
+        
+        self.assertEqual([u['source'] for u in updates], ['web', 'arxiv', 'github'])
+        self.assertEqual([u['status'] for u in updates], ['ok', 'ok', 'timeout'])
+        self.assertLess(updates[0]['elapsed_ms'], 150)
+        self.assertEqual(updates[0]['ranked_results'][0]['title'], 'fast')
+        self.assertEqual(updates[0]['pending_sources'], ['arxiv', 'github'])
+        self.assertEqual(len(updates[1]['ranked_results']), 2)
+        self.assertLess(updates[2]['elapsed_ms'], 1000)
+        self.assertEqual([u['final'] for u in updates], [False, False, True])
+        self.assertEqual(self.integrator.get_stats()['timeouts'], {'github': 1})
+    
+    async def test_integrated_search_reports_status(self):
+        """The collected result keeps the old keys and adds source status."""
+        result = await self.integrator.integrated_search(
+            "q", sources=["web", "arxiv", "github", "nope"], deadlines={'github': 0.1})
+        
+        self.assertEqual(result['source_status'], {'web': 'ok', 'arxiv': 'ok', 'github': 'timeout'})
+        self.assertEqual(result['total_results'], 2)
+        self.assertEqual(result['unique_results'], 2)
+        self.assertEqual(result['by_source']['github'], [])
+        self.assertEqual(len(result['ranked_results']), 2)
+
+
 def run_tests():
     """Run all tests."""
     loader = unittest.TestLoader()
@@ -390,10 +658,14 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestSearchQuery))
     suite.addTests(loader.loadTestsFromTestCase(TestRateLimiter))
     suite.addTests(loader.loadTestsFromTestCase(TestResultCache))
+    suite.addTests(loader.loadTestsFromTestCase(TestResultCacheLRU))
+    suite.addTests(loader.loadTestsFromTestCase(TestResultCacheAsync))
     suite.addTests(loader.loadTestsFromTestCase(TestSearchIntegrator))
     suite.addTests(loader.loadTestsFromTestCase(TestArxivParsing))
     suite.addTests(loader.loadTestsFromTestCase(TestGitHubParsing))
     suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
+    suite.addTests(loader.loadTestsFromTestCase(TestNearDuplicateFusion))
+    suite.addTests(loader.loadTestsFromTestCase(TestStreamingSearch))
     
     runner = unittest.TextTestRunner(verbosity=2)
     result = runner.run(suite)
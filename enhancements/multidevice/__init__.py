@@ -47,6 +47,10 @@ from .device_protocol import (
     DeviceInfo,
     TaskInfo,
     AIPMessage,
+    FrameCodec,
+    AIPStreamDecoder,
+    available_codecs,
+    available_compressors,
     ProtocolError,
     ProtocolValidator,
     MessageBuilder,
@@ -105,6 +109,9 @@ from .android_bridge import (
     TouchEvent,
     SwipeEvent,
     KeyEvent,
+    TextEvent,
+    GestureBatch,
+    GestureResult,
     ADBCommandExecutor,
     AndroidBridge
 )
@@ -142,6 +149,10 @@ __all__ = [
     'DeviceInfo',
     'TaskInfo',
     'AIPMessage',
+    'FrameCodec',
+    'AIPStreamDecoder',
+    'available_codecs',
+    'available_compressors',
     'ProtocolError',
     'ProtocolValidator',
     'MessageBuilder',
@@ -192,6 +203,9 @@ __all__ = [
     'TouchEvent',
     'SwipeEvent',
     'KeyEvent',
+    'TextEvent',
+    'GestureBatch',
+    'GestureResult',
     'ADBCommandExecutor',
     'AndroidBridge',
     
@@ -7,7 +7,8 @@ screen capture, device control, and app management.
 
 Features:
 - ADB command wrapper
-- Screen capture and streaming
+- Persistent per-device shell session with command multiplexing
+- In-memory screen capture (exec-out) and screenrecord H.264 streaming
 - Touch/Key input control
 - App installation and management
 - Device information retrieval
@@ -24,9 +25,11 @@ import os
 import re
 import json
 import logging
-import tempfile
 import base64
-from typing import Dict, List, Optional, Tuple, Any, Union, Callable
+import itertools
+import uuid
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Tuple, Any, Union, Callable, Deque
 from dataclasses import dataclass, field
 from pathlib import Path
 from enum import Enum
@@ -187,6 +190,18 @@ class KeyEvent:
         return f"input keyevent {self.keycode}"
 
 
+@dataclass
+class TextEvent:
+    """Text event for input injection"""
+    text: str
+    
+    def to_adb_command(self) -> str:
+        """Convert to ADB input command"""
+        # Escape special characters
+        escaped = self.text.replace(' ', '%s').replace("'", "'\"'\"'")
+        return f"input text '{escaped}'"
+
+
 class ADBCommandExecutor:
     """Execute ADB commands"""
     
@@ -214,12 +229,33 @@ class ADBCommandExecutor:
         Returns:
             Tuple of (returncode, stdout, stderr)
         """
-        cmd = [self.adb_path]
+        returncode, stdout, stderr = await self.execute_raw(command, device_id, timeout)
         
-        if device_id:
-            cmd.extend(["-s", device_id])
+        stdout_str = stdout.decode('utf-8', errors='ignore')
+        stderr_str = stderr.decode('utf-8', errors='ignore')
         
-        cmd.extend(command)
+        if check_error and returncode != 0:
+            raise self.error_for(stderr_str or stdout_str, device_id)
+        
+        return returncode, stdout_str, stderr_str
+    
+    @staticmethod
+    def error_for(error_msg: str, device_id: Optional[str] = None) -> ADBError:
+        """Map ADB error output to the matching exception"""
+        if "device offline" in error_msg.lower():
+            return DeviceNotFoundError(f"Device is offline: {device_id}")
+        elif "device not found" in error_msg.lower():
+            return DeviceNotFoundError(f"Device not found: {device_id}")
+        return ADBError(f"ADB command failed: {error_msg}")
+    
+    async def execute_raw(
+        self,
+        command: List[str],
+        device_id: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Tuple[int, bytes, bytes]:
+        """Execute ADB command and return undecoded output (for exec-out binaries)"""
+        cmd = self.build_command(command, device_id)
         
         try:
             proc = await asyncio.create_subprocess_exec(
@@ -228,23 +264,19 @@ class ADBCommandExecutor:
                 stderr=asyncio.subprocess.PIPE
             )
             
-            stdout, stderr = await asyncio.wait_for(
-                proc.communicate(),
-                timeout=timeout or self.default_timeout
-            )
-            
-            stdout_str = stdout.decode('utf-8', errors='ignore')
-            stderr_str = stderr.decode('utf-8', errors='ignore')
-            
-            if check_error and proc.returncode != 0:
-                error_msg = stderr_str or stdout_str
-                if "device offline" in error_msg.lower():
-                    raise DeviceNotFoundError(f"Device is offline: {device_id}")
-                elif "device not found" in error_msg.lower():
-                    raise DeviceNotFoundError(f"Device not found: {device_id}")
-                raise ADBError(f"ADB command failed: {error_msg}")
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    proc.communicate(),
+                    timeout=timeout or self.default_timeout
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # Don't leave the adb process behind on timeout or cancellation
+                if proc.returncode is None:
+                    proc.kill()
+                await proc.wait()
+                raise
             
-            return proc.returncode, stdout_str, stderr_str
+            return proc.returncode, stdout, stderr
         
         except asyncio.TimeoutError:
             raise ADBError(f"ADB command timed out after {timeout or self.default_timeout}s")
@@ -253,6 +285,14 @@ class ADBCommandExecutor:
                 raise
             raise ADBError(f"ADB command error: {e}")
     
+    def build_command(self, command: List[str], device_id: Optional[str] = None) -> List[str]:
+        """Full argv for an ADB command"""
+        cmd = [self.adb_path]
+        if device_id:
+            cmd.extend(["-s", device_id])
+        cmd.extend(command)
+        return cmd
+    
     async def shell(
         self,
         command: str,
@@ -292,6 +332,632 @@ class ADBCommandExecutor:
         )
 
 
+class ADBShellSession:
+    """
+    Long-lived `adb shell` process for one device.
+    
+    Each command is written to the shell's stdin followed by a printf of an
+    end marker carrying a sequence number and the exit status. The reader
+    task assigns output to commands in FIFO order, so many commands can be
+    in flight on one process and no adb process is spawned per command.
+    """
+    
+    def __init__(self, executor: ADBCommandExecutor, device_id: str, timeout: Optional[float] = None):
+        self.executor = executor
+        self.device_id = device_id
+        self.timeout = timeout or executor.default_timeout
+        self._marker = f"__ufo_end_{uuid.uuid4().hex[:12]}__"
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Deque[List[Any]] = deque()  # [seq, future, output lines]
+        self._seq = itertools.count(1)
+        self._start_lock = asyncio.Lock()
+        self.stats = {'spawns': 0, 'commands': 0, 'timeouts': 0}
+    
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+    
+    async def start(self) -> None:
+        """Spawn the shell process if it is not running"""
+        if self.alive:
+            return
+        async with self._start_lock:
+            if self.alive:
+                return
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *self.executor.build_command(["shell"], self.device_id),
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT
+                )
+            except Exception as e:
+                raise ADBError(f"Failed to start shell session: {e}")
+            self._proc = proc
+            self._reader_task = asyncio.create_task(self._read_loop(proc))
+            self.stats['spawns'] += 1
+            logger.debug(f"Shell session started for {self.device_id}")
+    
+    async def run(self, command: str, timeout: Optional[float] = None, check: bool = True) -> str:
+        """Run a shell command and return its (stripped) output"""
+        returncode, output = await self.run_status(command, timeout)
+        if check and returncode != 0:
+            raise self.executor.error_for(output.strip() or f"exit status {returncode}", self.device_id)
+        return output.strip()
+    
+    async def run_status(self, command: str, timeout: Optional[float] = None) -> Tuple[int, str]:
+        """Run a shell command and return (exit status, combined output)"""
+        await self.start()
+        proc = self._proc
+        seq = next(self._seq)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append([seq, future, []])
+        # stdin is redirected so a command can never consume the following ones
+        proc.stdin.write(
+            f"{{ {command}\n}} </dev/null 2>&1; printf '\\n{self._marker} {seq} %d\\n' $?\n".encode('utf-8')
+        )
+        self.stats['commands'] += 1
+        try:
+            await proc.stdin.drain()
+            return await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            # A hung command blocks everything queued behind it; start over
+            future.cancel()
+            self.stats['timeouts'] += 1
+            await self._reset(ADBError(f"Shell command timed out after {timeout or self.timeout}s: {command}"))
+            raise ADBError(f"Shell command timed out after {timeout or self.timeout}s: {command}")
+        except (ConnectionError, BrokenPipeError) as e:
+            future.cancel()
+            await self._reset(ADBError(f"Shell session lost: {e}"))
+            raise ADBError(f"Shell session lost: {e}")
+    
+    async def _read_loop(self, proc: asyncio.subprocess.Process) -> None:
+        marker = self._marker
+        try:
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+                text = line.decode('utf-8', errors='ignore')
+                if text.startswith(marker):
+                    self._complete(text[len(marker):].split())
+                elif self._pending:
+                    self._pending[0][2].append(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Shell session reader error for {self.device_id}: {e}")
+        finally:
+            # EOF can arrive before the exit status is reaped; forget the
+            # process now so the next command spawns a new shell
+            if self._proc is proc:
+                self._proc = None
+                self._fail_pending(ADBError(f"Shell session closed for {self.device_id}"))
+        # Reap the exited shell (only reached on EOF, not on cancellation)
+        await proc.wait()
+    
+    def _complete(self, fields: List[str]) -> None:
+        try:
+            seq, returncode = int(fields[0]), int(fields[1])
+        except (IndexError, ValueError):
+            return
+        while self._pending:
+            entry_seq, future, lines = self._pending.popleft()
+            if entry_seq != seq:
+                continue
+            if not future.done():
+                output = "".join(lines)
+                # Drop the newline printf put in front of the marker
+                future.set_result((returncode, output[:-1] if output.endswith("\n") else output))
+            return
+    
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+    
+    async def _reset(self, error: Exception) -> None:
+        proc, self._proc = self._proc, None
+        self._fail_pending(error)
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    
+    async def close(self) -> None:
+        """Terminate the shell session"""
+        proc = self._proc
+        if proc is not None and proc.returncode is None:
+            try:
+                proc.stdin.write(b"exit\n")
+                await proc.stdin.drain()
+                await asyncio.wait_for(proc.wait(), 2.0)
+            except Exception:
+                pass
+        await self._reset(ADBError(f"Shell session closed for {self.device_id}"))
+
+
+@dataclass
+class H264Frame:
+    """One H.264 access unit in Annex-B format (start codes included)"""
+    data: bytes
+    keyframe: bool
+    timestamp: float = field(default_factory=time.time)
+
+
+class H264AccessUnitParser:
+    """
+    Splits an Annex-B H.264 byte stream into access units (frames).
+    
+    A NAL unit is only known to be complete once the next start code
+    arrives, so feed() returns frames one NAL late; flush() treats the
+    buffered tail as complete (use it when the producer has gone idle).
+    """
+    
+    START_CODE = b"\x00\x00\x01"
+    _PREFIX = b"\x00\x00\x00\x01"
+    _NON_VCL_AU_START = (6, 7, 8, 9)  # SEI, SPS, PPS, access unit delimiter
+    
+    def __init__(self):
+        self._buffer = bytearray()
+        self._nals: List[bytes] = []
+        self._has_vcl = False
+        self._keyframe = False
+    
+    def feed(self, data: bytes) -> List[H264Frame]:
+        self._buffer += data
+        frames: List[H264Frame] = []
+        start = self._buffer.find(self.START_CODE)
+        if start < 0:
+            # Keep the last bytes in case a start code straddles the chunk
+            if len(self._buffer) > 2:
+                del self._buffer[:-2]
+            return frames
+        while True:
+            nxt = self._buffer.find(self.START_CODE, start + 3)
+            if nxt < 0:
+                break
+            self._add_nal(bytes(self._buffer[start + 3:nxt]).rstrip(b"\x00"), frames)
+            start = nxt
+        del self._buffer[:start]
+        return frames
+    
+    def flush(self) -> List[H264Frame]:
+        frames: List[H264Frame] = []
+        if self._buffer.startswith(self.START_CODE) and len(self._buffer) > 3:
+            self._add_nal(bytes(self._buffer[3:]).rstrip(b"\x00"), frames)
+            self._buffer.clear()
+        self._emit(frames)
+        return frames
+    
+    def _add_nal(self, nal: bytes, frames: List[H264Frame]) -> None:
+        if not nal:
+            return
+        nal_type = nal[0] & 0x1F
+        if nal_type in (1, 5):
+            # first_mb_in_slice == 0 (ue(v) '1') marks the first slice of a picture
+            if self._has_vcl and len(nal) > 1 and nal[1] & 0x80:
+                self._emit(frames)
+            self._has_vcl = True
+            self._keyframe = self._keyframe or nal_type == 5
+        elif nal_type in self._NON_VCL_AU_START and self._has_vcl:
+            self._emit(frames)
+        self._nals.append(nal)
+    
+    def _emit(self, frames: List[H264Frame]) -> None:
+        if self._has_vcl:
+            frames.append(H264Frame(
+                data=b"".join(self._PREFIX + nal for nal in self._nals),
+                keyframe=self._keyframe
+            ))
+            self._nals = []
+            self._has_vcl = False
+            self._keyframe = False
+
+
+class ScreenRecordStream:
+    """
+    Continuous capture through `adb exec-out screenrecord --output-format=h264`.
+    
+    The device encodes the screen in hardware, so frames arrive at display
+    rate instead of one PNG round trip at a time. screenrecord exits at its
+    time limit; the stream restarts it transparently (the new process begins
+    with SPS/PPS and a keyframe). With decode=True frames are decoded to
+    images with PyAV before the callback.
+    """
+    
+    def __init__(
+        self,
+        executor: ADBCommandExecutor,
+        device_id: str,
+        callback: Callable[[Any], Any],
+        size: Optional[Tuple[int, int]] = None,
+        bit_rate: int = 8_000_000,
+        time_limit: int = 180,
+        decode: bool = False,
+        idle_flush: float = 0.05
+    ):
+        self.executor = executor
+        self.device_id = device_id
+        self.callback = callback
+        self.size = size
+        self.bit_rate = bit_rate
+        self.time_limit = time_limit
+        self.idle_flush = idle_flush
+        self._codec = None
+        if decode:
+            try:
+                import av
+            except ImportError:
+                raise ScreenCaptureError("decode=True requires PyAV (pip install av)")
+            self._codec = av.CodecContext.create('h264', 'r')
+        self._task: Optional[asyncio.Task] = None
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self.stats = {'frames': 0, 'keyframes': 0, 'bytes': 0, 'restarts': 0}
+    
+    def command(self) -> List[str]:
+        cmd = ["exec-out", "screenrecord", "--output-format=h264", f"--bit-rate={self.bit_rate}"]
+        if self.size:
+            cmd.append(f"--size={self.size[0]}x{self.size[1]}")
+        if self.time_limit:
+            cmd.append(f"--time-limit={self.time_limit}")
+        cmd.append("-")
+        return cmd
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+    
+    async def _run(self) -> None:
+        first = True
+        try:
+            while True:
+                if not first:
+                    self.stats['restarts'] += 1
+                first = False
+                try:
+                    await self._record_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"screenrecord stream error for {self.device_id}: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            proc, self._proc = self._proc, None
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+    
+    async def _record_once(self) -> None:
+        proc = await asyncio.create_subprocess_exec(
+            *self.executor.build_command(self.command(), self.device_id),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        self._proc = proc
+        parser = H264AccessUnitParser()
+        received = 0
+        # One read stays outstanding across idle timeouts instead of being
+        # cancelled and re-issued every idle_flush seconds
+        read: Optional[asyncio.Future] = None
+        try:
+            while True:
+                if read is None:
+                    read = asyncio.ensure_future(proc.stdout.read(65536))
+                done, _ = await asyncio.wait({read}, timeout=self.idle_flush)
+                if not done:
+                    # The encoder only writes when the screen changes; an idle
+                    # pipe means the last NAL unit is complete
+                    await self._deliver(parser.flush())
+                    continue
+                chunk, read = read.result(), None
+                if not chunk:
+                    break
+                received += len(chunk)
+                self.stats['bytes'] += len(chunk)
+                await self._deliver(parser.feed(chunk))
+        finally:
+            if read is not None:
+                read.cancel()
+        await self._deliver(parser.flush())
+        await proc.wait()
+        self._proc = None
+        if not received:
+            raise ScreenCaptureError(f"screenrecord produced no data (exit {proc.returncode})")
+    
+    async def _deliver(self, frames: List[H264Frame]) -> None:
+        for frame in frames:
+            self.stats['frames'] += 1
+            if frame.keyframe:
+                self.stats['keyframes'] += 1
+            if self._codec is not None:
+                outputs = [decoded.to_image() for packet in self._codec.parse(frame.data)
+                           for decoded in self._codec.decode(packet)]
+            else:
+                outputs = [frame]
+            for output in outputs:
+                try:
+                    result = self.callback(output)
+                    if asyncio.iscoroutine(result):
+                        await result
+                except Exception as e:
+                    logger.error(f"Screen stream callback error: {e}")
+
+
+class DeviceTransport:
+    """
+    Persistent per-device transport.
+    
+    Shell commands (input events, getprop, dumpsys ...) go through one
+    ADBShellSession; screenshots are read straight from `exec-out screencap`
+    into memory; continuous capture uses ScreenRecordStream.
+    """
+    
+    def __init__(self, executor: ADBCommandExecutor, device_id: str):
+        self.executor = executor
+        self.device_id = device_id
+        self.session = ADBShellSession(executor, device_id)
+    
+    async def shell(self, command: str, timeout: Optional[float] = None) -> str:
+        return await self.session.run(command, timeout)
+    
+    async def screencap(self, format: str = "png", timeout: Optional[float] = None) -> bytes:
+        """Screenshot bytes: PNG, or the raw framebuffer dump for format='raw'"""
+        command = ["exec-out", "screencap"] if format == "raw" else ["exec-out", "screencap", "-p"]
+        returncode, stdout, stderr = await self.executor.execute_raw(command, self.device_id, timeout)
+        if returncode != 0 or not stdout:
+            error = stderr.decode('utf-8', errors='ignore') or f"exit status {returncode}"
+            raise ScreenCaptureError(f"screencap failed: {error}")
+        return stdout
+    
+    def screenrecord(self, callback: Callable[[Any], Any], **options) -> ScreenRecordStream:
+        return ScreenRecordStream(self.executor, self.device_id, callback, **options)
+    
+    async def close(self) -> None:
+        await self.session.close()
+
+
+@dataclass
+class TouchscreenSpec:
+    """Touchscreen input device and its axis ranges (from `getevent -p`)"""
+    device_path: str
+    max_x: int
+    max_y: int
+    screen_width: int = 0
+    screen_height: int = 0
+    
+    def scale(self, x: int, y: int) -> Tuple[int, int]:
+        """Screen pixels -> touchscreen axis units"""
+        if self.screen_width and self.screen_height:
+            x = round(x * self.max_x / max(1, self.screen_width - 1))
+            y = round(y * self.max_y / max(1, self.screen_height - 1))
+        return min(max(x, 0), self.max_x), min(max(y, 0), self.max_y)
+    
+    @classmethod
+    def parse_getevent(cls, output: str) -> Optional['TouchscreenSpec']:
+        """Find the first device reporting ABS_MT_POSITION_X/Y in `getevent -p` output"""
+        device_path = None
+        axes: Dict[str, int] = {}
+        for line in output.splitlines():
+            match = re.match(r'add device \d+:\s*(\S+)', line.strip())
+            if match:
+                if device_path and 'x' in axes and 'y' in axes:
+                    break
+                device_path, axes = match.group(1), {}
+                continue
+            match = re.search(r'\b(0035|0036)\s*:.*?max (\d+)', line)
+            if match and device_path:
+                axes['x' if match.group(1) == '0035' else 'y'] = int(match.group(2))
+        if device_path and 'x' in axes and 'y' in axes:
+            return cls(device_path, axes['x'], axes['y'])
+        return None
+
+
+@dataclass
+class GestureStepResult:
+    """Outcome of one step of a gesture batch"""
+    index: int
+    kind: str
+    command: str
+    executed: bool = False
+    success: bool = False
+    returncode: Optional[int] = None
+    duration_ms: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'index': self.index,
+            'kind': self.kind,
+            'command': self.command,
+            'executed': self.executed,
+            'success': self.success,
+            'returncode': self.returncode,
+            'duration_ms': self.duration_ms
+        }
+
+
+@dataclass
+class GestureResult:
+    """Outcome of a gesture batch"""
+    device_id: str
+    steps: List[GestureStepResult]
+    total_ms: float = 0.0
+    
+    @property
+    def success(self) -> bool:
+        return all(step.success for step in self.steps)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'device_id': self.device_id,
+            'success': self.success,
+            'total_ms': self.total_ms,
+            'steps': [step.to_dict() for step in self.steps]
+        }
+
+
+class GestureBatch:
+    """
+    A sequence of input steps executed in one shell round trip.
+    
+    compile() turns the steps into a single script run in a subshell; after
+    each step it prints a marker line with the step's exit status and a
+    device-side timestamp, from which per-step results are built. With a
+    TouchscreenSpec, taps and swipes are written as raw `sendevent` events
+    instead of starting the `input` tool for each one.
+    
+    Usage:
+        batch = GestureBatch().tap(540, 1200).wait(200).text("hello").key(KeyEvent.KEYCODE_BACK)
+        result = await bridge.run_gestures(device_id, batch)
+    """
+    
+    STEP_MARKER = "__ufo_step__"
+    START_MARKER = "__ufo_steps_start__"
+    # Interpolated points per second for sendevent swipes
+    SWIPE_POINTS_PER_SECOND = 60
+    
+    def __init__(self):
+        self.steps: List[Tuple[str, Dict[str, Any]]] = []
+    
+    def __len__(self) -> int:
+        return len(self.steps)
+    
+    def tap(self, x: int, y: int) -> 'GestureBatch':
+        self.steps.append(('tap', {'x': x, 'y': y}))
+        return self
+    
+    def long_press(self, x: int, y: int, duration_ms: int = 800) -> 'GestureBatch':
+        self.steps.append(('swipe', {'start_x': x, 'start_y': y, 'end_x': x, 'end_y': y,
+                                     'duration_ms': duration_ms}))
+        return self
+    
+    def swipe(self, start_x: int, start_y: int, end_x: int, end_y: int,
+              duration_ms: int = 300) -> 'GestureBatch':
+        self.steps.append(('swipe', {'start_x': start_x, 'start_y': start_y, 'end_x': end_x,
+                                     'end_y': end_y, 'duration_ms': duration_ms}))
+        return self
+    
+    def key(self, keycode: int, longpress: bool = False) -> 'GestureBatch':
+        self.steps.append(('key', {'keycode': keycode, 'longpress': longpress}))
+        return self
+    
+    def text(self, text: str) -> 'GestureBatch':
+        self.steps.append(('text', {'text': text}))
+        return self
+    
+    def wait(self, ms: int) -> 'GestureBatch':
+        self.steps.append(('wait', {'ms': ms}))
+        return self
+    
+    def shell(self, command: str) -> 'GestureBatch':
+        self.steps.append(('shell', {'command': command}))
+        return self
+    
+    def step_command(self, kind: str, params: Dict[str, Any],
+                     touchscreen: Optional[TouchscreenSpec] = None) -> str:
+        """Shell command for one step"""
+        if kind == 'tap':
+            if touchscreen:
+                return self._sendevent_path(touchscreen, [(params['x'], params['y'])], 0)
+            return TouchEvent(params['x'], params['y']).to_adb_command()
+        if kind == 'swipe':
+            if touchscreen:
+                count = max(2, int(params['duration_ms'] / 1000 * self.SWIPE_POINTS_PER_SECOND))
+                points = [
+                    (params['start_x'] + (params['end_x'] - params['start_x']) * i / (count - 1),
+                     params['start_y'] + (params['end_y'] - params['start_y']) * i / (count - 1))
+                    for i in range(count)
+                ]
+                return self._sendevent_path(touchscreen, points, params['duration_ms'] / (count - 1))
+            return SwipeEvent(**params).to_adb_command()
+        if kind == 'key':
+            return KeyEvent(params['keycode'], 'longpress' if params['longpress'] else 'down').to_adb_command()
+        if kind == 'text':
+            return TextEvent(params['text']).to_adb_command()
+        if kind == 'wait':
+            return f"sleep {params['ms'] / 1000:.3f}"
+        if kind == 'shell':
+            return params['command']
+        raise ValueError(f"Unknown gesture step: {kind}")
+    
+    @staticmethod
+    def _sendevent_path(touchscreen: TouchscreenSpec, points: List[Tuple[float, float]],
+                        step_ms: float) -> str:
+        """Multi-touch protocol B events: finger down, move through points, finger up"""
+        dev = touchscreen.device_path
+        commands = [f"sendevent {dev} 3 57 0", f"sendevent {dev} 1 330 1"]
+        for i, (x, y) in enumerate(points):
+            sx, sy = touchscreen.scale(round(x), round(y))
+            if i and step_ms > 0:
+                commands.append(f"sleep {step_ms / 1000:.3f}")
+            commands.extend([f"sendevent {dev} 3 53 {sx}", f"sendevent {dev} 3 54 {sy}",
+                             f"sendevent {dev} 0 0 0"])
+        commands.extend([f"sendevent {dev} 3 57 4294967295", f"sendevent {dev} 1 330 0",
+                         f"sendevent {dev} 0 0 0"])
+        return " && ".join(commands)
+    
+    def compile(self, touchscreen: Optional[TouchscreenSpec] = None,
+                stop_on_error: bool = False) -> str:
+        """Single shell script for the whole batch"""
+        lines = ["(", f'echo "{self.START_MARKER} $(date +%s%N)"']
+        for index, (kind, params) in enumerate(self.steps):
+            lines.append(f"{{ {self.step_command(kind, params, touchscreen)}\n}} >/dev/null 2>&1")
+            lines.append(f'r=$?; echo "{self.STEP_MARKER} {index} $r $(date +%s%N)"')
+            if stop_on_error:
+                lines.append('[ "$r" -eq 0 ] || exit "$r"')
+        lines.append(")")
+        return "\n".join(lines)
+    
+    def parse_results(self, device_id: str, output: str,
+                      touchscreen: Optional[TouchscreenSpec] = None) -> GestureResult:
+        """Build per-step results from the markers printed by the compiled script"""
+        steps = [
+            GestureStepResult(index=i, kind=kind, command=self.step_command(kind, params, touchscreen))
+            for i, (kind, params) in enumerate(self.steps)
+        ]
+        previous_ns: Optional[int] = None
+        for line in output.splitlines():
+            fields = line.split()
+            if len(fields) < 2:
+                continue
+            if fields[0] == self.START_MARKER:
+                previous_ns = int(fields[1]) if fields[1].isdigit() else None
+            elif fields[0] == self.STEP_MARKER and len(fields) >= 3:
+                try:
+                    index, returncode = int(fields[1]), int(fields[2])
+                except ValueError:
+                    continue
+                if not 0 <= index < len(steps):
+                    continue
+                step = steps[index]
+                step.executed = True
+                step.returncode = returncode
+                step.success = returncode == 0
+                # date without %N support prints a literal; timings are then unknown
+                now_ns = int(fields[3]) if len(fields) > 3 and fields[3].isdigit() else None
+                if now_ns is not None and previous_ns is not None:
+                    step.duration_ms = round((now_ns - previous_ns) / 1e6, 3)
+                previous_ns = now_ns
+        return GestureResult(device_id=device_id, steps=steps)
+
+
 class AndroidBridge:
     """
     Android Bridge for UFO Galaxy
@@ -300,15 +966,51 @@ class AndroidBridge:
     screen capture, device control, and app management.
     """
     
-    def __init__(self, adb_path: str = "adb"):
+    def __init__(self, adb_path: str = "adb", persistent_shell: bool = True):
         self.adb = ADBCommandExecutor(adb_path)
+        self.persistent_shell = persistent_shell
         self._devices: Dict[str, AndroidDeviceInfo] = {}
+        self._transports: Dict[str, DeviceTransport] = {}
         self._logcat_callbacks: Dict[str, List[Callable]] = defaultdict(list)
         self._logcat_tasks: Dict[str, asyncio.Task] = {}
         self._screen_stream_tasks: Dict[str, asyncio.Task] = {}
+        self._screen_recorders: Dict[str, ScreenRecordStream] = {}
+        self._touchscreens: Dict[str, Optional[TouchscreenSpec]] = {}
         
         logger.info("AndroidBridge initialized")
     
+    def transport(self, device_id: str) -> DeviceTransport:
+        """Persistent transport for a device (created on first use)"""
+        transport = self._transports.get(device_id)
+        if transport is None:
+            transport = DeviceTransport(self.adb, device_id)
+            self._transports[device_id] = transport
+        return transport
+    
+    async def _shell(self, command: str, device_id: str, timeout: Optional[float] = None) -> str:
+        """Run a shell command, through the persistent session when enabled"""
+        if self.persistent_shell:
+            return await self.transport(device_id).shell(command, timeout)
+        return await self.adb.shell(command, device_id, timeout)
+    
+    async def _shell_status(self, command: str, device_id: str,
+                            timeout: Optional[float] = None) -> Tuple[int, str]:
+        """Run a shell command and return (exit status, output) without raising on failure"""
+        if self.persistent_shell:
+            return await self.transport(device_id).session.run_status(command, timeout)
+        returncode, stdout, _ = await self.adb.execute(["shell", command], device_id, timeout, check_error=False)
+        return returncode, stdout
+    
+    async def close(self) -> None:
+        """Stop streams and close all persistent device sessions"""
+        for device_id in list(self._screen_stream_tasks) + list(self._screen_recorders):
+            await self.stop_screen_stream(device_id)
+        for device_id in list(self._logcat_tasks):
+            await self.stop_logcat(device_id)
+        transports, self._transports = self._transports, {}
+        for transport in transports.values():
+            await transport.close()
+    
     async def start_server(self) -> None:
         """Start ADB server"""
         await self.adb.execute(["start-server"], check_error=False)
@@ -339,28 +1041,28 @@ class AndroidBridge:
         
         try:
             # Get basic properties
-            info.model = await self.adb.shell("getprop ro.product.model", device_id) or "unknown"
-            info.manufacturer = await self.adb.shell("getprop ro.product.manufacturer", device_id) or "unknown"
-            info.android_version = await self.adb.shell("getprop ro.build.version.release", device_id) or "unknown"
+            info.model = await self._shell("getprop ro.product.model", device_id) or "unknown"
+            info.manufacturer = await self._shell("getprop ro.product.manufacturer", device_id) or "unknown"
+            info.android_version = await self._shell("getprop ro.build.version.release", device_id) or "unknown"
             
-            sdk_str = await self.adb.shell("getprop ro.build.version.sdk", device_id)
+            sdk_str = await self._shell("getprop ro.build.version.sdk", device_id)
             info.sdk_version = int(sdk_str) if sdk_str.isdigit() else 0
             
-            info.abi = await self.adb.shell("getprop ro.product.cpu.abi", device_id) or "unknown"
+            info.abi = await self._shell("getprop ro.product.cpu.abi", device_id) or "unknown"
             
             # Get screen info
-            wm_size = await self.adb.shell("wm size", device_id)
+            wm_size = await self._shell("wm size", device_id)
             match = re.search(r'(\d+)x(\d+)', wm_size)
             if match:
                 info.screen_resolution = (int(match.group(1)), int(match.group(2)))
             
-            wm_density = await self.adb.shell("wm density", device_id)
+            wm_density = await self._shell("wm density", device_id)
             match = re.search(r'(\d+)', wm_density)
             if match:
                 info.screen_density = int(match.group(1))
             
             # Get battery info
-            dumpsys_battery = await self.adb.shell("dumpsys battery", device_id)
+            dumpsys_battery = await self._shell("dumpsys battery", device_id)
             level_match = re.search(r'level: (\d+)', dumpsys_battery)
             if level_match:
                 info.battery_level = int(level_match.group(1))
@@ -369,13 +1071,13 @@ class AndroidBridge:
                 info.is_charging = status_match.group(1) in ['2', '5']
             
             # Get memory info
-            meminfo = await self.adb.shell("cat /proc/meminfo", device_id)
+            meminfo = await self._shell("cat /proc/meminfo", device_id)
             total_match = re.search(r'MemTotal:\s+(\d+)', meminfo)
             if total_match:
                 info.total_ram = int(total_match.group(1)) * 1024
             
             # Get storage info
-            df_output = await self.adb.shell("df /data", device_id)
+            df_output = await self._shell("df /data", device_id)
             lines = df_output.split('\n')
             if len(lines) >= 2:
                 parts = lines[1].split()
@@ -384,11 +1086,11 @@ class AndroidBridge:
                     info.available_storage = int(parts[3]) * 1024
             
             # Check root access
-            su_check = await self.adb.shell("which su", device_id)
+            su_check = await self._shell("which su", device_id)
             info.is_rooted = su_check.strip() != ''
             
             # Store all properties
-            props_output = await self.adb.shell("getprop", device_id)
+            props_output = await self._shell("getprop", device_id)
             for line in props_output.split('\n'):
                 match = re.search(r'\[([^\]]+)\]: \[([^\]]*)\]', line)
                 if match:
@@ -439,32 +1141,25 @@ class AndroidBridge:
         Args:
             device_id: Device ID
             output_path: Local output path (optional)
-            format: Image format (png or jpg)
+            format: "png", or "raw" for the uncompressed framebuffer dump
+                    (width, height, pixel format header + RGBA pixels)
             
         Returns:
             Screenshot as bytes
         """
         try:
-            # Capture to device
-            remote_path = f"/sdcard/screen_capture.{format}"
-            await self.adb.shell(f"screencap -p {remote_path}", device_id)
-            
-            # Pull to local
-            if output_path:
-                await self.adb.pull(remote_path, output_path, device_id)
-                with open(output_path, 'rb') as f:
-                    return f.read()
-            else:
-                # Pull to temp file
-                with tempfile.NamedTemporaryFile(suffix=f".{format}", delete=False) as tmp:
-                    await self.adb.pull(remote_path, tmp.name, device_id)
-                    with open(tmp.name, 'rb') as f:
-                        data = f.read()
-                    os.unlink(tmp.name)
-                    return data
-        
+            # exec-out streams the image straight into memory: one adb call,
+            # nothing written to /sdcard or to a local temp file
+            data = await self.transport(device_id).screencap(format)
+        except ScreenCaptureError:
+            raise
         except Exception as e:
             raise ScreenCaptureError(f"Screen capture failed: {e}")
+        
+        if output_path:
+            with open(output_path, 'wb') as f:
+                f.write(data)
+        return data
     
     async def capture_screen_base64(self, device_id: str, format: str = "png") -> str:
         """Capture screen and return as base64 string"""
@@ -474,28 +1169,51 @@ class AndroidBridge:
     async def start_screen_stream(
         self,
         device_id: str,
-        callback: Callable[[bytes], None],
-        fps: int = 10
+        callback: Callable[[Any], Any],
+        fps: int = 10,
+        mode: str = "screencap",
+        **record_options
     ) -> None:
         """
         Start screen streaming
         
         Args:
             device_id: Device ID
-            callback: Callback function for frame data
-            fps: Frames per second
+            callback: Callback for each frame (sync or async)
+            fps: Frames per second (screencap mode)
+            mode: "screencap" - PNG frames via exec-out screencap;
+                  "screenrecord" - H.264 frames (H264Frame, or images with
+                  decode=True) encoded on the device at display rate
+            record_options: ScreenRecordStream options (size, bit_rate, decode, ...)
         """
+        await self.stop_screen_stream(device_id)
+        
+        if mode == "screenrecord":
+            recorder = self.transport(device_id).screenrecord(callback, **record_options)
+            self._screen_recorders[device_id] = recorder
+            await recorder.start()
+            logger.info(f"Started screenrecord stream for {device_id}")
+            return
+        
         interval = 1.0 / fps
         
         async def stream_loop():
+            next_frame = time.monotonic()
             while device_id in self._screen_stream_tasks:
                 try:
                     frame = await self.capture_screen(device_id)
-                    callback(frame)
-                    await asyncio.sleep(interval)
+                    result = callback(frame)
+                    if asyncio.iscoroutine(result):
+                        await result
+                    # Pace by deadline so capture time counts against the interval
+                    next_frame = max(next_frame + interval, time.monotonic())
+                    await asyncio.sleep(next_frame - time.monotonic())
+                except asyncio.CancelledError:
+                    raise
                 except Exception as e:
                     logger.error(f"Screen stream error: {e}")
                     await asyncio.sleep(1)
+                    next_frame = time.monotonic()
         
         task = asyncio.create_task(stream_loop())
         self._screen_stream_tasks[device_id] = task
@@ -503,6 +1221,10 @@ class AndroidBridge:
     
     async def stop_screen_stream(self, device_id: str) -> None:
         """Stop screen streaming"""
+        recorder = self._screen_recorders.pop(device_id, None)
+        if recorder:
+            await recorder.stop()
+            logger.info(f"Stopped screenrecord stream for {device_id}")
         task = self._screen_stream_tasks.pop(device_id, None)
         if task:
             task.cancel()
@@ -518,21 +1240,70 @@ class AndroidBridge:
     
     async def send_touch(self, device_id: str, event: TouchEvent) -> None:
         """Send touch event"""
-        await self.adb.shell(event.to_adb_command(), device_id)
+        await self._shell(event.to_adb_command(), device_id)
     
     async def send_swipe(self, device_id: str, event: SwipeEvent) -> None:
         """Send swipe event"""
-        await self.adb.shell(event.to_adb_command(), device_id)
+        await self._shell(event.to_adb_command(), device_id)
     
     async def send_key(self, device_id: str, event: KeyEvent) -> None:
         """Send key event"""
-        await self.adb.shell(event.to_adb_command(), device_id)
+        await self._shell(event.to_adb_command(), device_id)
     
     async def send_text(self, device_id: str, text: str) -> None:
         """Send text input"""
-        # Escape special characters
-        escaped = text.replace(' ', '%s').replace("'", "'\"'\"'")
-        await self.adb.shell(f"input text '{escaped}'", device_id)
+        await self._shell(TextEvent(text).to_adb_command(), device_id)
+    
+    async def discover_touchscreen(self, device_id: str, refresh: bool = False) -> Optional[TouchscreenSpec]:
+        """Find the touchscreen input device and axis ranges (cached per device)"""
+        if device_id in self._touchscreens and not refresh:
+            return self._touchscreens[device_id]
+        spec = None
+        try:
+            returncode, output = await self._shell_status("getevent -p", device_id, timeout=10.0)
+            spec = TouchscreenSpec.parse_getevent(output) if returncode == 0 else None
+            if spec:
+                match = re.search(r'(\d+)x(\d+)', await self._shell("wm size", device_id))
+                if match:
+                    spec.screen_width, spec.screen_height = int(match.group(1)), int(match.group(2))
+        except ADBError as e:
+            logger.warning(f"Touchscreen discovery failed for {device_id}: {e}")
+        self._touchscreens[device_id] = spec
+        return spec
+    
+    def gesture_batch(self) -> GestureBatch:
+        """Start a new gesture batch"""
+        return GestureBatch()
+    
+    async def run_gestures(
+        self,
+        device_id: str,
+        batch: GestureBatch,
+        stop_on_error: bool = False,
+        use_sendevent: bool = False,
+        timeout: Optional[float] = None
+    ) -> GestureResult:
+        """
+        Execute a gesture batch in one shell round trip
+        
+        Args:
+            device_id: Device ID
+            batch: Steps to run
+            stop_on_error: Skip the remaining steps after the first failure
+            use_sendevent: Inject taps/swipes as raw touchscreen events
+                           (falls back to `input` if no touchscreen is found)
+            timeout: Timeout for the whole batch
+            
+        Returns:
+            GestureResult with per-step success and device-side timing
+        """
+        touchscreen = await self.discover_touchscreen(device_id) if use_sendevent else None
+        script = batch.compile(touchscreen, stop_on_error)
+        started = time.perf_counter()
+        _, output = await self._shell_status(script, device_id, timeout)
+        result = batch.parse_results(device_id, output, touchscreen)
+        result.total_ms = round((time.perf_counter() - started) * 1000, 3)
+        return result
     
     async def tap(self, device_id: str, x: int, y: int) -> None:
         """Tap at coordinates"""
@@ -674,7 +1445,7 @@ class AndroidBridge:
     async def get_app_info(self, device_id: str, package_name: str) -> Optional[AppInfo]:
         """Get app information"""
         try:
-            dumpsys = await self.adb.shell(
+            dumpsys = await self._shell(
                 f"dumpsys package {package_name}",
                 device_id
             )
@@ -710,7 +1481,7 @@ class AndroidBridge:
             else:
                 component = package_name
             
-            await self.adb.shell(
+            await self._shell(
                 f"monkey -p {package_name} -c android.intent.category.LAUNCHER 1",
                 device_id
             )
@@ -721,11 +1492,11 @@ class AndroidBridge:
     
     async def force_stop_app(self, device_id: str, package_name: str) -> None:
         """Force stop an app"""
-        await self.adb.shell(f"am force-stop {package_name}", device_id)
+        await self._shell(f"am force-stop {package_name}", device_id)
     
     async def clear_app_data(self, device_id: str, package_name: str) -> None:
         """Clear app data"""
-        await self.adb.shell(f"pm clear {package_name}", device_id)
+        await self._shell(f"pm clear {package_name}", device_id)
     
     # ===================================================================
     # Logcat
@@ -825,7 +1596,7 @@ class AndroidBridge:
         path: str
     ) -> List[Dict[str, Any]]:
         """List directory contents"""
-        output = await self.adb.shell(f"ls -la '{path}'", device_id)
+        output = await self._shell(f"ls -la '{path}'", device_id)
         
         entries = []
         for line in output.split('\n')[1:]:  # Skip total line
@@ -844,11 +1615,11 @@ class AndroidBridge:
     
     async def create_directory(self, device_id: str, path: str) -> None:
         """Create directory on device"""
-        await self.adb.shell(f"mkdir -p '{path}'", device_id)
+        await self._shell(f"mkdir -p '{path}'", device_id)
     
     async def remove_file(self, device_id: str, path: str) -> None:
         """Remove file or directory from device"""
-        await self.adb.shell(f"rm -rf '{path}'", device_id)
+        await self._shell(f"rm -rf '{path}'", device_id)
     
     # ===================================================================
     # System Operations
@@ -889,6 +1660,16 @@ __all__ = [
     'TouchEvent',
     'SwipeEvent',
     'KeyEvent',
+    'TextEvent',
+    'TouchscreenSpec',
+    'GestureStepResult',
+    'GestureResult',
+    'GestureBatch',
     'ADBCommandExecutor',
+    'ADBShellSession',
+    'H264Frame',
+    'H264AccessUnitParser',
+    'ScreenRecordStream',
+    'DeviceTransport',
     'AndroidBridge'
 ]
@@ -0,0 +1,170 @@
+"""
+UFO Galaxy v5.0 - AIP v2.0 Codec Benchmark
+
+Measures encode / decode throughput of AIP frames for every available body
+codec and compressor, on three payload shapes:
+- heartbeat: small dict with a few metrics
+- task: task submission with a nested payload (~1 KB)
+- screen: bulky, repetitive result payload (~64 KB)
+
+It also measures the stream decoder fed with random chunk sizes, to show the
+cost of reassembling frames from partial reads.
+
+Usage:
+    python -m enhancements.multidevice.benchmark_protocol [--seconds 0.5] [--seed 7]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .device_protocol import (
+        AIPMessage, AIPStreamDecoder, FrameCodec, MessageType,
+        available_codecs, available_compressors
+    )
+except ImportError:
+    from enhancements.multidevice.device_protocol import (
+        AIPMessage, AIPStreamDecoder, FrameCodec, MessageType,
+        available_codecs, available_compressors
+    )
+
+
+def build_messages(rng: random.Random) -> Dict[str, AIPMessage]:
+    heartbeat = AIPMessage(
+        msg_type=MessageType.DEVICE_HEARTBEAT,
+        payload={
+            'device_id': 'android-001',
+            'status': 1,
+            'timestamp': time.time(),
+            'metrics': {'cpu': 0.42, 'memory': 0.61, 'battery': 87, 'temperature': 36.5},
+        },
+        sequence=1,
+        source_device='android-001',
+        correlation_id='c0ffee',
+    )
+    task = AIPMessage(
+        msg_type=MessageType.TASK_SUBMIT,
+        payload={
+            'task_id': 'task-000123',
+            'task_type': 'ui_automation',
+            'priority': 1,
+            'payload': {
+                'steps': [
+                    {'action': 'tap', 'x': rng.randint(0, 1080), 'y': rng.randint(0, 2400), 'delay_ms': 50}
+                    for _ in range(12)
+                ],
+                'package': 'com.example.app',
+                'labels': ['login', 'smoke', 'nightly'],
+            },
+            'timeout_seconds': 30.0,
+        },
+        sequence=2,
+        source_device='coordinator',
+        target_device='android-001',
+        correlation_id='task-000123',
+    )
+    screen = AIPMessage(
+        msg_type=MessageType.TASK_RESULT,
+        payload={
+            'task_id': 'task-000124',
+            'success': True,
+            'result': {
+                'ui_tree': [
+                    {'class': 'android.widget.TextView', 'text': f'Item {i}',
+                     'bounds': [0, i * 48, 1080, i * 48 + 48], 'clickable': i % 3 == 0}
+                    for i in range(500)
+                ],
+            },
+        },
+        sequence=3,
+        source_device='android-001',
+        correlation_id='task-000124',
+    )
+    return {'heartbeat': heartbeat, 'task': task, 'screen': screen}
+
+
+def measure(func: Callable[[], Any], seconds: float) -> float:
+    """Operations per second of func over roughly `seconds`"""
+    count = 0
+    batch = 1
+    started = time.perf_counter()
+    deadline = started + seconds
+    while True:
+        for _ in range(batch):
+            func()
+        count += batch
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - started)
+        batch = min(batch * 2, 4096)
+
+
+def codec_matrix() -> List[Tuple[str, Optional[str]]]:
+    combos = [(codec, None) for codec in available_codecs()]
+    for codec in available_codecs():
+        for compression in available_compressors():
+            combos.append((codec, compression))
+    return sorted(combos, key=lambda c: (c[0] != 'json', c[0], c[1] or ''))
+
+
+def bench_codecs(messages: Dict[str, AIPMessage], seconds: float) -> None:
+    print(f"{'message':<10} {'codec':<8} {'compress':<9} {'bytes':>8} "
+          f"{'encode/s':>11} {'decode/s':>11} {'enc MB/s':>9} {'dec MB/s':>9}")
+    for name, message in messages.items():
+        for codec_name, compression in codec_matrix():
+            codec = FrameCodec(codec_name, compression, compress_threshold=512)
+            frame = message.to_bytes(codec)
+            assert AIPMessage.from_bytes(frame).payload == message.payload
+            encode_rate = measure(lambda: message.to_bytes(codec), seconds)
+            decode_rate = measure(lambda: AIPMessage.from_bytes(frame), seconds)
+            print(f"{name:<10} {codec_name:<8} {compression or '-':<9} {len(frame):>8} "
+                  f"{encode_rate:>11,.0f} {decode_rate:>11,.0f} "
+                  f"{encode_rate * len(frame) / 1e6:>9.1f} {decode_rate * len(frame) / 1e6:>9.1f}")
+
+
+def bench_stream(messages: Dict[str, AIPMessage], rng: random.Random, frames: int = 20000) -> None:
+    print()
+    print(f"{'stream':<10} {'codec':<8} {'frames':>8} {'chunks':>8} {'msg/s':>11} {'MB/s':>9}")
+    order = [rng.choice(['heartbeat', 'heartbeat', 'heartbeat', 'task']) for _ in range(frames)]
+    for codec_name in available_codecs():
+        codec = FrameCodec(codec_name)
+        encoded = {name: message.to_bytes(codec) for name, message in messages.items()}
+        stream = b''.join(encoded[name] for name in order)
+
+        # Split into random chunks, as partial reads from a socket would be
+        chunks = []
+        position = 0
+        while position < len(stream):
+            size = rng.randint(1, 4096)
+            chunks.append(stream[position:position + size])
+            position += size
+
+        decoder = AIPStreamDecoder()
+        started = time.perf_counter()
+        decoded = 0
+        for chunk in chunks:
+            decoded += len(decoder.feed(chunk))
+        elapsed = time.perf_counter() - started
+        assert decoded == frames and decoder.buffered == 0
+        print(f"{'mixed':<10} {codec_name:<8} {frames:>8} {len(chunks):>8} "
+              f"{frames / elapsed:>11,.0f} {len(stream) / elapsed / 1e6:>9.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AIP v2.0 codec benchmark")
+    parser.add_argument("--seconds", type=float, default=0.5, help="time per measurement")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = build_messages(rng)
+    print(f"codecs: {available_codecs()}  compression: {available_compressors()}")
+    print()
+    bench_codecs(messages, args.seconds)
+    bench_stream(messages, rng)
+
+
+if __name__ == "__main__":
+    main()
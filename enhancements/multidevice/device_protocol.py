@@ -8,6 +8,8 @@ protocol buffer schemas, and message serialization/deserialization for device co
 Features:
 - Protocol buffer message definitions
 - Message serialization/deserialization
+- Pluggable body codecs (JSON, MessagePack, CBOR) with per-message compression
+- Incremental stream decoder for partial reads
 - Protocol validation
 - Cross-platform message handling
 - Support for 500+ TPS
@@ -18,10 +20,10 @@ Version: 5.0.0
 
 import json
 import struct
-import hashlib
 import time
+import zlib
 from dataclasses import dataclass, field, asdict
-from typing import Dict, Any, Optional, List, Callable, Union, Type
+from typing import Dict, Any, Optional, List, Callable, Union, Type, Tuple, AsyncIterator
 from enum import Enum, IntEnum
 from abc import ABC, abstractmethod
 import logging
@@ -35,6 +37,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Optional binary codecs / compressors
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import cbor2
+    CBOR_AVAILABLE = True
+except ImportError:
+    CBOR_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
 
 class MessageType(IntEnum):
     """AIP v2.0 Message Types"""
@@ -229,6 +250,247 @@ class TaskInfo:
         return cls(**data)
 
 
+# =============================================================================
+# Payload Codecs
+# =============================================================================
+#
+# The reserved footer word of an AIP frame carries the frame flags:
+#   bits 0-7   body codec id      (0 = JSON, 1 = MessagePack, 2 = CBOR)
+#   bits 8-15  compression id     (0 = none, 1 = zlib, 2 = zstd)
+# Flags 0 is exactly the original JSON frame, so peers that never negotiated
+# anything keep interoperating.
+
+class PayloadCodec(ABC):
+    """Serializes the message body"""
+    
+    codec_id: int = 0
+    name: str = ""
+    # Compact codecs store the body as a positional array instead of a dict
+    compact: bool = False
+    
+    @abstractmethod
+    def dumps(self, obj: Any) -> bytes:
+        """Encode an object to bytes"""
+        pass
+    
+    @abstractmethod
+    def loads(self, data: Union[bytes, memoryview]) -> Any:
+        """Decode an object from a bytes-like buffer"""
+        pass
+
+
+class JSONCodec(PayloadCodec):
+    """JSON body (compatibility default)"""
+    
+    codec_id = 0
+    name = "json"
+    compact = False
+    
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    def loads(self, data: Union[bytes, memoryview]) -> Any:
+        # json needs a bytes/str object; this is the only copy on the decode path
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+class MsgpackCodec(PayloadCodec):
+    """MessagePack body (requires msgpack)"""
+    
+    codec_id = 1
+    name = "msgpack"
+    compact = True
+    
+    def dumps(self, obj: Any) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+    
+    def loads(self, data: Union[bytes, memoryview]) -> Any:
+        # unpackb reads straight from the buffer, no intermediate copy
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+class CBORCodec(PayloadCodec):
+    """CBOR body (requires cbor2)"""
+    
+    codec_id = 2
+    name = "cbor"
+    compact = True
+    
+    def dumps(self, obj: Any) -> bytes:
+        return cbor2.dumps(obj)
+    
+    def loads(self, data: Union[bytes, memoryview]) -> Any:
+        return cbor2.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+class Compressor(ABC):
+    """Per-message body compression"""
+    
+    compression_id: int = 0
+    name: str = ""
+    
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        pass
+    
+    @abstractmethod
+    def decompress(self, data: Union[bytes, memoryview], max_size: int) -> bytes:
+        """Decompress, raising ProtocolError if the output exceeds max_size bytes"""
+        pass
+
+
+class ZlibCompressor(Compressor):
+    """zlib compression"""
+    
+    compression_id = 1
+    name = "zlib"
+    
+    def __init__(self, level: int = 6):
+        self.level = level
+    
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, self.level)
+    
+    def decompress(self, data: Union[bytes, memoryview], max_size: int) -> bytes:
+        decompressor = zlib.decompressobj()
+        out = decompressor.decompress(data, max_size)
+        if decompressor.unconsumed_tail:
+            raise ProtocolError(f"Decompressed body exceeds {max_size} bytes")
+        if not decompressor.eof:
+            raise ProtocolError("Truncated zlib body")
+        return out
+
+
+class ZstdCompressor(Compressor):
+    """zstd compression (requires zstandard)"""
+    
+    compression_id = 2
+    name = "zstd"
+    
+    def __init__(self, level: int = 3):
+        self.level = level
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+    
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+    
+    def decompress(self, data: Union[bytes, memoryview], max_size: int) -> bytes:
+        # decompress() trusts the content size declared in the frame header;
+        # reading through a stream reader bounds the allocation instead
+        chunks = []
+        total = 0
+        with self._decompressor.stream_reader(data) as reader:
+            while True:
+                chunk = reader.read(min(max_size + 1 - total, 1 << 20))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                total += len(chunk)
+                if total > max_size:
+                    raise ProtocolError(f"Decompressed body exceeds {max_size} bytes")
+        return b''.join(chunks)
+
+
+_CODEC_CLASSES: Dict[str, Type[PayloadCodec]] = {"json": JSONCodec}
+if MSGPACK_AVAILABLE:
+    _CODEC_CLASSES["msgpack"] = MsgpackCodec
+if CBOR_AVAILABLE:
+    _CODEC_CLASSES["cbor"] = CBORCodec
+
+_COMPRESSOR_CLASSES: Dict[str, Type[Compressor]] = {"zlib": ZlibCompressor}
+if ZSTD_AVAILABLE:
+    _COMPRESSOR_CLASSES["zstd"] = ZstdCompressor
+
+_CODECS_BY_ID: Dict[int, PayloadCodec] = {cls.codec_id: cls() for cls in _CODEC_CLASSES.values()}
+_COMPRESSORS_BY_ID: Dict[int, Compressor] = {cls.compression_id: cls() for cls in _COMPRESSOR_CLASSES.values()}
+
+# Upper bound for a frame and for a decompressed body
+MAX_BODY_SIZE = 16 * 1024 * 1024
+
+# Preference order used when negotiating with a peer
+CODEC_PREFERENCE = ["msgpack", "cbor", "json"]
+COMPRESSION_PREFERENCE = ["zstd", "zlib"]
+
+
+def available_codecs() -> List[str]:
+    """Body codecs usable in this process, most preferred first"""
+    return [name for name in CODEC_PREFERENCE if name in _CODEC_CLASSES]
+
+
+def available_compressors() -> List[str]:
+    """Compressors usable in this process, most preferred first"""
+    return [name for name in COMPRESSION_PREFERENCE if name in _COMPRESSOR_CLASSES]
+
+
+class FrameCodec:
+    """
+    Encoding settings for outgoing frames.
+    
+    Decoding never needs a FrameCodec: the frame flags say how the body was
+    encoded. Bodies of at least compress_threshold bytes are compressed and
+    the compressed form is kept only if it is actually smaller.
+    """
+    
+    def __init__(
+        self,
+        codec: str = "json",
+        compression: Optional[str] = None,
+        compress_threshold: int = 1024,
+        compress_level: Optional[int] = None
+    ):
+        if codec not in _CODEC_CLASSES:
+            raise ProtocolError(f"Codec not available: {codec}")
+        if compression is not None and compression not in _COMPRESSOR_CLASSES:
+            raise ProtocolError(f"Compression not available: {compression}")
+        
+        self.codec = _CODECS_BY_ID[_CODEC_CLASSES[codec].codec_id]
+        self.compressor: Optional[Compressor] = None
+        if compression is not None:
+            cls = _COMPRESSOR_CLASSES[compression]
+            self.compressor = cls(compress_level) if compress_level is not None else cls()
+        self.compress_threshold = compress_threshold
+    
+    @staticmethod
+    def capabilities() -> Dict[str, List[str]]:
+        """Capabilities to advertise to a peer (e.g. in DEVICE_REGISTER metadata)"""
+        return {"codecs": available_codecs(), "compression": available_compressors()}
+    
+    @classmethod
+    def negotiate(cls, remote: Dict[str, List[str]], compress_threshold: int = 1024) -> 'FrameCodec':
+        """Pick the most preferred codec/compression both sides support (JSON if none)"""
+        remote_codecs = set(remote.get("codecs") or ["json"])
+        remote_compression = set(remote.get("compression") or [])
+        codec = next((c for c in available_codecs() if c in remote_codecs), "json")
+        compression = next((c for c in available_compressors() if c in remote_compression), None)
+        return cls(codec, compression, compress_threshold)
+    
+    def encode_body(self, body: Any) -> Tuple[bytes, int]:
+        """Return (wire body, frame flags)"""
+        data = self.codec.dumps(body)
+        flags = self.codec.codec_id
+        if self.compressor is not None and len(data) >= self.compress_threshold:
+            compressed = self.compressor.compress(data)
+            if len(compressed) < len(data):
+                data = compressed
+                flags |= self.compressor.compression_id << 8
+        return data, flags
+    
+    def __repr__(self) -> str:
+        compression = self.compressor.name if self.compressor else None
+        return f"FrameCodec(codec={self.codec.name!r}, compression={compression!r}, threshold={self.compress_threshold})"
+
+
+DEFAULT_FRAME_CODEC: Optional[FrameCodec] = None
+
+
+def _default_frame_codec() -> FrameCodec:
+    global DEFAULT_FRAME_CODEC
+    if DEFAULT_FRAME_CODEC is None:
+        DEFAULT_FRAME_CODEC = FrameCodec()
+    return DEFAULT_FRAME_CODEC
+
+
 @dataclass
 class AIPMessage:
     """
@@ -241,10 +503,11 @@ class AIPMessage:
         - Message Type (2 bytes)
         - Payload Length (4 bytes)
         - Sequence Number (4 bytes)
-    - Body (variable): JSON payload
+    - Body (variable): payload encoded by the codec named in the flags,
+      optionally compressed
     - Footer (8 bytes):
-        - Checksum (4 bytes)
-        - Reserved (4 bytes)
+        - Checksum (4 bytes): CRC32 of the body as sent
+        - Flags (4 bytes): codec id | compression id << 8 (0 = plain JSON)
     """
     msg_type: MessageType
     payload: Dict[str, Any]
@@ -260,86 +523,132 @@ class AIPMessage:
     HEADER_SIZE: int = 16
     FOOTER_SIZE: int = 8
     
-    def to_bytes(self) -> bytes:
-        """Serialize message to bytes"""
-        # Build payload with metadata
-        full_payload = {
-            'payload': self.payload,
-            'timestamp': self.timestamp,
-            'source_device': self.source_device,
-            'target_device': self.target_device,
-            'correlation_id': self.correlation_id
-        }
+    _HEADER = struct.Struct('>IHHII')
+    _FOOTER = struct.Struct('>II')
+    
+    def to_bytes(self, codec: Optional[FrameCodec] = None) -> bytes:
+        """Serialize message to bytes (JSON unless a negotiated codec is given)"""
+        codec = codec or _default_frame_codec()
         
-        # Serialize payload to JSON
-        payload_bytes = json.dumps(full_payload, ensure_ascii=False).encode('utf-8')
-        payload_length = len(payload_bytes)
+        if codec.codec.compact:
+            body = [self.payload, self.timestamp, self.source_device,
+                    self.target_device, self.correlation_id]
+        else:
+            body = {
+                'payload': self.payload,
+                'timestamp': self.timestamp,
+                'source_device': self.source_device,
+                'target_device': self.target_device,
+                'correlation_id': self.correlation_id
+            }
+        payload_bytes, flags = codec.encode_body(body)
         
-        # Build header
-        header = struct.pack(
-            '>IHHII',
+        header = self._HEADER.pack(
             self.MAGIC,
             self.VERSION,
             self.msg_type.value,
-            payload_length,
+            len(payload_bytes),
             self.sequence
         )
-        
-        # Calculate checksum
-        checksum = self._calculate_checksum(payload_bytes)
-        
-        # Build footer
-        footer = struct.pack('>II', checksum, 0)
-        
-        return header + payload_bytes + footer
+        footer = self._FOOTER.pack(self._calculate_checksum(payload_bytes), flags)
+        return b''.join((header, payload_bytes, footer))
     
     @classmethod
-    def from_bytes(cls, data: bytes) -> 'AIPMessage':
-        """Deserialize message from bytes"""
-        if len(data) < cls.HEADER_SIZE + cls.FOOTER_SIZE:
-            raise ProtocolError("Message too short")
-        
-        # Parse header
-        magic, version, msg_type_val, payload_length, sequence = struct.unpack(
-            '>IHHII', data[:cls.HEADER_SIZE]
-        )
-        
-        # Validate magic
+    def peek_frame_length(cls, data: Union[bytes, bytearray, memoryview], offset: int = 0) -> Optional[int]:
+        """Total frame length if a full header is available at offset, else None"""
+        if len(data) - offset < cls.HEADER_SIZE:
+            return None
+        magic, version, _, payload_length, _ = cls._HEADER.unpack_from(data, offset)
         if magic != cls.MAGIC:
             raise ProtocolError(f"Invalid magic: {hex(magic)}")
-        
-        # Validate version
         if version != cls.VERSION:
             raise ProtocolError(f"Unsupported version: {hex(version)}")
+        return cls.HEADER_SIZE + payload_length + cls.FOOTER_SIZE
+    
+    @classmethod
+    def from_bytes(cls, data: Union[bytes, bytearray, memoryview],
+                   max_body_size: int = MAX_BODY_SIZE) -> 'AIPMessage':
+        """Deserialize one message from a bytes-like object (no slice copies)"""
+        view = data if isinstance(data, memoryview) else memoryview(data)
+        if len(view) < cls.HEADER_SIZE + cls.FOOTER_SIZE:
+            raise ProtocolError("Message too short")
         
-        # Extract payload
+        frame_length = cls.peek_frame_length(view)
+        if len(view) < frame_length:
+            raise ProtocolError("Message truncated")
+        _, _, msg_type_val, payload_length, sequence = cls._HEADER.unpack_from(view)
+        return cls._decode_frame(view, msg_type_val, payload_length, sequence, max_body_size)
+    
+    @classmethod
+    def _decode_frame(cls, view: memoryview, msg_type_val: int, payload_length: int,
+                      sequence: int, max_body_size: int = MAX_BODY_SIZE) -> 'AIPMessage':
         payload_start = cls.HEADER_SIZE
         payload_end = payload_start + payload_length
-        payload_bytes = data[payload_start:payload_end]
+        stored_checksum, flags = cls._FOOTER.unpack_from(view, payload_end)
         
-        # Validate checksum
-        stored_checksum = struct.unpack('>I', data[payload_end:payload_end+4])[0]
-        calculated_checksum = cls._calculate_checksum(payload_bytes)
-        if stored_checksum != calculated_checksum:
-            raise ProtocolError("Checksum mismatch")
+        # The payload view must be released before any error propagates:
+        # a traceback holding it would pin the caller's receive buffer
+        # (BufferError on resize), so the error is raised after the block.
+        error = None
+        with view[payload_start:payload_end] as payload_view:
+            try:
+                body = cls._decode_body(payload_view, stored_checksum, flags, max_body_size)
+            except ProtocolError as e:
+                error = str(e)
+            except Exception as e:
+                error = f"Malformed message body: {e}"
+        if error is not None:
+            raise ProtocolError(error)
         
-        # Parse payload
-        full_payload = json.loads(payload_bytes.decode('utf-8'))
+        try:
+            msg_type = MessageType(msg_type_val)
+        except ValueError:
+            raise ProtocolError(f"Unknown message type: {msg_type_val}")
         
-        return cls(
-            msg_type=MessageType(msg_type_val),
-            payload=full_payload.get('payload', {}),
-            sequence=sequence,
-            timestamp=full_payload.get('timestamp', time.time()),
-            source_device=full_payload.get('source_device'),
-            target_device=full_payload.get('target_device'),
-            correlation_id=full_payload.get('correlation_id')
-        )
+        if isinstance(body, dict):
+            return cls(
+                msg_type=msg_type,
+                payload=body.get('payload', {}),
+                sequence=sequence,
+                timestamp=body.get('timestamp', time.time()),
+                source_device=body.get('source_device'),
+                target_device=body.get('target_device'),
+                correlation_id=body.get('correlation_id')
+            )
+        if isinstance(body, (list, tuple)) and len(body) == 5:
+            payload, timestamp, source_device, target_device, correlation_id = body
+            return cls(
+                msg_type=msg_type,
+                payload=payload,
+                sequence=sequence,
+                timestamp=timestamp,
+                source_device=source_device,
+                target_device=target_device,
+                correlation_id=correlation_id
+            )
+        raise ProtocolError("Malformed message body")
+    
+    @classmethod
+    def _decode_body(cls, payload_view: memoryview, stored_checksum: int, flags: int,
+                     max_body_size: int) -> Any:
+        if stored_checksum != cls._calculate_checksum(payload_view):
+            raise ProtocolError("Checksum mismatch")
+        
+        codec = _CODECS_BY_ID.get(flags & 0xFF)
+        if codec is None:
+            raise ProtocolError(f"Unsupported codec id: {flags & 0xFF}")
+        compression_id = (flags >> 8) & 0xFF
+        if compression_id:
+            compressor = _COMPRESSORS_BY_ID.get(compression_id)
+            if compressor is None:
+                raise ProtocolError(f"Unsupported compression id: {compression_id}")
+            return codec.loads(compressor.decompress(payload_view, max_body_size))
+        return codec.loads(payload_view)
     
     @staticmethod
-    def _calculate_checksum(data: bytes) -> int:
+    def _calculate_checksum(data: Union[bytes, memoryview]) -> int:
         """Calculate CRC32 checksum"""
-        return hashlib.crc32(data) & 0xFFFFFFFF
+        return zlib.crc32(data) & 0xFFFFFFFF
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -356,8 +665,111 @@ class AIPMessage:
 
 
 class ProtocolError(Exception):
-    """Protocol-related error"""
-    pass
+    """
+    Protocol-related error
+    
+    When raised by AIPStreamDecoder.feed(), messages holds the good messages
+    decoded from the same chunk before (or around) the failing frame.
+    """
+    
+    def __init__(self, message: str = "", messages: Optional[List['AIPMessage']] = None):
+        super().__init__(message)
+        self.messages: List['AIPMessage'] = messages or []
+
+
+class AIPStreamDecoder:
+    """
+    Incremental decoder for a byte stream of AIP frames.
+    
+    feed() accepts chunks of any size (partial frames, several frames at
+    once) and returns every message completed by that chunk. Frames are
+    decoded in place through a memoryview of the receive buffer; consumed
+    bytes are dropped lazily so the buffer is not shifted for every frame.
+    """
+    
+    def __init__(self, max_frame_size: int = MAX_BODY_SIZE):
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        self._offset = 0
+        self.messages_decoded = 0
+        self.frames_dropped = 0
+        self.bytes_consumed = 0
+    
+    @property
+    def buffered(self) -> int:
+        """Bytes received but not yet part of a complete frame"""
+        return len(self._buffer) - self._offset
+    
+    def feed(self, data: Union[bytes, bytearray, memoryview]) -> List[AIPMessage]:
+        """
+        Add received bytes and return the messages they complete
+        
+        A frame that fails its checksum, codec or body check is skipped (its
+        length is known, so the stream stays in sync) and the rest of the
+        chunk is still decoded; a ProtocolError carrying the good messages is
+        raised afterwards and the decoder can keep being fed. A bad header
+        (magic, version, frame size) loses framing: the error also carries
+        the messages decoded so far, and the caller should reset().
+        """
+        self._buffer += data
+        messages = []
+        error = None
+        header = AIPMessage._HEADER
+        try:
+            with memoryview(self._buffer) as view:
+                while True:
+                    frame_length = AIPMessage.peek_frame_length(view, self._offset)
+                    if frame_length is None:
+                        break
+                    if frame_length > self.max_frame_size:
+                        raise ProtocolError(f"Frame too large: {frame_length} bytes")
+                    end = self._offset + frame_length
+                    if end > len(view):
+                        break
+                    _, _, msg_type_val, payload_length, sequence = header.unpack_from(view, self._offset)
+                    with view[self._offset:end] as frame:
+                        try:
+                            messages.append(AIPMessage._decode_frame(
+                                frame, msg_type_val, payload_length, sequence, self.max_frame_size
+                            ))
+                        except ProtocolError as e:
+                            self.frames_dropped += 1
+                            error = error or f"{e} (frame {sequence} dropped)"
+                    self._offset = end
+        except ProtocolError as e:
+            error = str(e)
+        self.messages_decoded += len(messages)
+        
+        # Compact once the consumed prefix dominates the buffer
+        if self._offset and self._offset * 2 >= len(self._buffer):
+            del self._buffer[:self._offset]
+            self.bytes_consumed += self._offset
+            self._offset = 0
+        if error is not None:
+            raise ProtocolError(error, messages)
+        return messages
+    
+    def reset(self) -> None:
+        """Drop buffered bytes (e.g. after a protocol error)"""
+        self._buffer.clear()
+        self._offset = 0
+    
+    async def iter_reader(self, reader: asyncio.StreamReader, chunk_size: int = 65536) -> AsyncIterator[AIPMessage]:
+        """Yield messages read from an asyncio stream until EOF"""
+        while True:
+            chunk = await reader.read(chunk_size)
+            if not chunk:
+                if self.buffered:
+                    raise ProtocolError(f"Stream ended inside a frame ({self.buffered} bytes buffered)")
+                return
+            try:
+                messages = self.feed(chunk)
+            except ProtocolError as e:
+                for message in e.messages:
+                    yield message
+                raise
+            for message in messages:
+                yield message
 
 
 class ProtocolValidator:
@@ -759,6 +1171,17 @@ __all__ = [
     'DeviceInfo',
     'TaskInfo',
     'AIPMessage',
+    'PayloadCodec',
+    'JSONCodec',
+    'MsgpackCodec',
+    'CBORCodec',
+    'Compressor',
+    'ZlibCompressor',
+    'ZstdCompressor',
+    'FrameCodec',
+    'AIPStreamDecoder',
+    'available_codecs',
+    'available_compressors',
     'ProtocolError',
     'ProtocolValidator',
     'MessageBuilder',
@@ -0,0 +1,3 @@
+"""
+Unit tests for UFO Galaxy Multi-Device Coordination System
+"""
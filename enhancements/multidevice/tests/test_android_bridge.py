@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Android Bridge persistent transport
+
+A fake `adb` executable stands in for the real one: `adb shell` runs a
+local sh, `exec-out screencap` prints a fixed PNG and `exec-out screenrecord`
+writes a synthetic H.264 stream. Every invocation is logged so the tests can
+count process spawns.
+"""
+
+import asyncio
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from enhancements.multidevice.android_bridge import (
+    ADBError,
+    AndroidBridge,
+    GestureBatch,
+    H264AccessUnitParser,
+    KeyEvent,
+    TouchscreenSpec,
+)
+
+DEVICE = "emulator-5554"
+FAKE_PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+
+def h264_frame(index: int) -> bytes:
+    """SPS + PPS + IDR for every 5th frame, a single P slice otherwise"""
+    if index % 5 == 0:
+        return (b"\x00\x00\x00\x01\x67\x42\x00\x1f\xe9" +
+                b"\x00\x00\x00\x01\x68\xce\x38\x80" +
+                b"\x00\x00\x00\x01\x65\x88\x84" + bytes([index + 1]) * 40)
+    return b"\x00\x00\x00\x01\x41\x9a\x02" + bytes([index + 1]) * 20
+
+
+GETEVENT_OUTPUT = """\
+add device 1: /dev/input/event1
+  name:     "gpio-keys"
+  events:
+    KEY (0001): 0072  0073  0074
+add device 2: /dev/input/event2
+  name:     "touchscreen"
+  events:
+    KEY (0001): 014a
+    ABS (0003): 002f  : value 0, min 0, max 9, fuzz 0, flat 0, resolution 0
+                0035  : value 0, min 0, max 2159, fuzz 0, flat 0, resolution 0
+                0036  : value 0, min 0, max 4799, fuzz 0, flat 0, resolution 0
+                0039  : value 0, min 0, max 65535, fuzz 0, flat 0, resolution 0
+"""
+
+FAKE_ADB = textwrap.dedent('''\
+    #!{python}
+    import os, subprocess, sys, time
+    args = sys.argv[1:]
+    if args[:1] == ["-s"]:
+        args = args[2:]
+    with open(os.environ["FAKE_ADB_LOG"], "a") as log:
+        log.write(" ".join(args) + "\\n")
+    if args == ["devices"]:
+        print("List of devices attached\\n{device}\\tdevice")
+    elif args == ["shell"]:
+        os.execvp("sh", ["sh"])
+    elif args[0] == "shell":
+        sys.exit(subprocess.call(["sh", "-c", " ".join(args[1:])]))
+    elif args[:2] == ["exec-out", "screencap"]:
+        sys.stdout.buffer.write({png!r})
+    elif args[:2] == ["exec-out", "screenrecord"]:
+        frames = {frames!r}
+        for frame in frames:
+            sys.stdout.buffer.write(frame)
+            sys.stdout.buffer.flush()
+            time.sleep(0.01)
+    else:
+        sys.exit(1)
+''')
+
+
+class FakeADBTestCase(unittest.IsolatedAsyncioTestCase):
+    """Installs the fake adb and a fake `input` command on PATH"""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.log = os.path.join(self.tmp, "adb.log")
+        self.input_log = os.path.join(self.tmp, "input.log")
+        adb = os.path.join(self.tmp, "adb")
+        with open(adb, "w") as f:
+            f.write(FAKE_ADB.format(python=sys.executable, device=DEVICE, png=FAKE_PNG,
+                                    frames=[h264_frame(i) for i in range(10)]))
+        # Device-side tools: input/sendevent log their arguments, wm/getevent
+        # print what a 1080x2400 phone with a 2x touchscreen would
+        self.sendevent_log = os.path.join(self.tmp, "sendevent.log")
+        getevent_output = os.path.join(self.tmp, "getevent.txt")
+        with open(getevent_output, "w") as f:
+            f.write(GETEVENT_OUTPUT)
+        tools = {
+            "input": f'#!/bin/sh\necho "$@" >> {self.input_log}\n',
+            "sendevent": f'#!/bin/sh\necho "$@" >> {self.sendevent_log}\n',
+            "getevent": f'#!/bin/sh\ncat {getevent_output}\n',
+            "wm": '#!/bin/sh\necho "Physical size: 1080x2400"\n',
+        }
+        paths = [adb]
+        for name, script in tools.items():
+            path = os.path.join(self.tmp, name)
+            with open(path, "w") as f:
+                f.write(script)
+            paths.append(path)
+        for path in paths:
+            os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+        self._env = {k: os.environ.get(k) for k in ("PATH", "FAKE_ADB_LOG")}
+        os.environ["PATH"] = self.tmp + os.pathsep + os.environ.get("PATH", "")
+        os.environ["FAKE_ADB_LOG"] = self.log
+        self.bridge = AndroidBridge(adb_path=adb)
+
+    async def asyncTearDown(self):
+        await self.bridge.close()
+
+    def tearDown(self):
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def adb_calls(self):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as f:
+            return f.read().splitlines()
+
+
+class TestShellSession(FakeADBTestCase):
+    """Persistent shell session"""
+
+    async def test_commands_share_one_process(self):
+        """Concurrent commands are multiplexed over one adb shell"""
+        outputs = await asyncio.gather(*[
+            self.bridge._shell(f"echo line-{i}", DEVICE) for i in range(50)
+        ])
+        self.assertEqual(outputs, [f"line-{i}" for i in range(50)])
+        self.assertEqual(self.adb_calls().count("shell"), 1)
+
+    async def test_output_and_exit_status(self):
+        """Output without trailing newline, multi-line output and failures"""
+        self.assertEqual(await self.bridge._shell("printf abc", DEVICE), "abc")
+        self.assertEqual(await self.bridge._shell("printf 'a\\nb\\n'", DEVICE), "a\nb")
+        with self.assertRaises(ADBError):
+            await self.bridge._shell("echo boom; false", DEVICE)
+        returncode, output = await self.bridge.transport(DEVICE).session.run_status("echo err >&2; exit_code=7; (exit 7)")
+        self.assertEqual((returncode, output), (7, "err\n"))
+        # The session is still usable after a failed command
+        self.assertEqual(await self.bridge._shell("echo ok", DEVICE), "ok")
+
+    async def test_commands_cannot_read_following_commands(self):
+        """stdin of a command is not the session's command stream"""
+        self.assertEqual(await self.bridge._shell("cat", DEVICE), "")
+        self.assertEqual(await self.bridge._shell("echo after", DEVICE), "after")
+
+    async def test_timeout_restarts_session(self):
+        """A hung command fails and the next command gets a fresh shell"""
+        with self.assertRaises(ADBError):
+            await self.bridge.transport(DEVICE).shell("sleep 5", timeout=0.2)
+        self.assertEqual(await self.bridge._shell("echo back", DEVICE), "back")
+        self.assertEqual(self.bridge.transport(DEVICE).session.stats["spawns"], 2)
+
+    async def test_shell_exit_restarts_session(self):
+        """Pending commands fail when the shell exits; the next one respawns it"""
+        with self.assertRaises(ADBError):
+            await self.bridge._shell("exit 3", DEVICE)
+        self.assertEqual(await self.bridge._shell("echo again", DEVICE), "again")
+
+    async def test_non_persistent_mode(self):
+        """persistent_shell=False keeps one adb process per command"""
+        bridge = AndroidBridge(adb_path=self.bridge.adb.adb_path, persistent_shell=False)
+        self.assertEqual(await bridge._shell("echo one", DEVICE), "one")
+        self.assertEqual(await bridge._shell("echo two", DEVICE), "two")
+        self.assertEqual(self.adb_calls(), ["shell echo one", "shell echo two"])
+
+
+class TestInputAndCapture(FakeADBTestCase):
+    """Input events and screen capture"""
+
+    async def test_input_events_use_session(self):
+        await self.bridge.tap(DEVICE, 10, 20)
+        await self.bridge.swipe(DEVICE, 1, 2, 3, 4, 100)
+        await self.bridge.press_home(DEVICE)
+        with open(self.input_log) as f:
+            self.assertEqual(f.read().splitlines(), [
+                "touchscreen tap 10 20",
+                "touchscreen swipe 1 2 3 4 100",
+                "keyevent 3",
+            ])
+        self.assertEqual(self.adb_calls(), ["shell"])
+
+    async def test_capture_screen_in_memory(self):
+        data = await self.bridge.capture_screen(DEVICE)
+        self.assertEqual(data, FAKE_PNG)
+        self.assertEqual(self.adb_calls(), ["exec-out screencap -p"])
+
+        output_path = os.path.join(self.tmp, "shot.png")
+        await self.bridge.capture_screen(DEVICE, output_path=output_path)
+        with open(output_path, "rb") as f:
+            self.assertEqual(f.read(), FAKE_PNG)
+
+    async def test_screencap_stream(self):
+        frames = []
+        await self.bridge.start_screen_stream(DEVICE, frames.append, fps=50)
+        await asyncio.sleep(0.5)
+        await self.bridge.stop_screen_stream(DEVICE)
+        self.assertGreater(len(frames), 3)
+        self.assertTrue(all(frame == FAKE_PNG for frame in frames))
+
+
+class TestGestureBatch(FakeADBTestCase):
+    """Batched input injection"""
+
+    def read_lines(self, path):
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return f.read().splitlines()
+
+    async def test_batch_runs_in_one_round_trip(self):
+        batch = (GestureBatch()
+                 .tap(100, 200)
+                 .swipe(0, 0, 500, 500, 50)
+                 .wait(20)
+                 .text("hi there")
+                 .key(KeyEvent.KEYCODE_BACK))
+        result = await self.bridge.run_gestures(DEVICE, batch)
+
+        self.assertTrue(result.success)
+        self.assertEqual([step.kind for step in result.steps], ["tap", "swipe", "wait", "text", "key"])
+        self.assertTrue(all(step.executed and step.returncode == 0 for step in result.steps))
+        self.assertGreaterEqual(result.steps[2].duration_ms, 15)
+        self.assertEqual(self.read_lines(self.input_log), [
+            "touchscreen tap 100 200",
+            "touchscreen swipe 0 0 500 500 50",
+            "text hi%sthere",
+            "keyevent 4",
+        ])
+        self.assertEqual(self.adb_calls(), ["shell"])
+
+    async def test_failed_step_reporting(self):
+        batch = GestureBatch().tap(1, 1).shell("false").tap(2, 2)
+
+        result = await self.bridge.run_gestures(DEVICE, batch)
+        self.assertFalse(result.success)
+        self.assertEqual([s.success for s in result.steps], [True, False, True])
+
+        result = await self.bridge.run_gestures(DEVICE, batch, stop_on_error=True)
+        self.assertEqual([s.executed for s in result.steps], [True, True, False])
+        self.assertEqual(result.steps[1].returncode, 1)
+        # The session survives the early exit of the batch subshell
+        self.assertEqual(await self.bridge._shell("echo alive", DEVICE), "alive")
+
+    def test_parse_getevent(self):
+        spec = TouchscreenSpec.parse_getevent(GETEVENT_OUTPUT)
+        self.assertEqual((spec.device_path, spec.max_x, spec.max_y), ("/dev/input/event2", 2159, 4799))
+        spec.screen_width, spec.screen_height = 1080, 2400
+        self.assertEqual(spec.scale(1079, 2399), (2159, 4799))
+        self.assertIsNone(TouchscreenSpec.parse_getevent("add device 1: /dev/input/event0\n"))
+
+    async def test_sendevent_taps(self):
+        result = await self.bridge.run_gestures(
+            DEVICE, GestureBatch().tap(540, 1200).key(KeyEvent.KEYCODE_HOME), use_sendevent=True
+        )
+        self.assertTrue(result.success)
+        events = self.read_lines(self.sendevent_log)
+        dev = "/dev/input/event2"
+        self.assertEqual(events, [
+            f"{dev} 3 57 0", f"{dev} 1 330 1",
+            f"{dev} 3 53 1081", f"{dev} 3 54 2401", f"{dev} 0 0 0",
+            f"{dev} 3 57 4294967295", f"{dev} 1 330 0", f"{dev} 0 0 0",
+        ])
+        # Keys still go through `input`
+        self.assertEqual(self.read_lines(self.input_log), ["keyevent 3"])
+
+
+class TestH264Stream(FakeADBTestCase):
+    """screenrecord H.264 streaming"""
+
+    def test_parser_splits_access_units(self):
+        stream = b"".join(h264_frame(i) for i in range(10))
+        expected = [h264_frame(i) for i in range(10)]
+
+        for chunk_size in (1, 3, 7, 64, len(stream)):
+            parser = H264AccessUnitParser()
+            frames = []
+            for offset in range(0, len(stream), chunk_size):
+                frames.extend(parser.feed(stream[offset:offset + chunk_size]))
+            frames.extend(parser.flush())
+            self.assertEqual([f.data for f in frames], expected, f"chunk size {chunk_size}")
+            self.assertEqual([f.keyframe for f in frames], [i % 5 == 0 for i in range(10)])
+
+    async def test_screenrecord_stream_restarts(self):
+        frames = []
+        await self.bridge.start_screen_stream(DEVICE, frames.append, mode="screenrecord")
+        for _ in range(100):
+            if len(frames) >= 15:
+                break
+            await asyncio.sleep(0.05)
+        recorder = self.bridge._screen_recorders[DEVICE]
+        await self.bridge.stop_screen_stream(DEVICE)
+
+        self.assertGreaterEqual(len(frames), 15)
+        self.assertEqual(frames[0].data, h264_frame(0))
+        self.assertTrue(frames[0].keyframe)
+        self.assertGreaterEqual(recorder.stats["restarts"], 1)
+        self.assertIn("exec-out screenrecord --output-format=h264", self.adb_calls()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
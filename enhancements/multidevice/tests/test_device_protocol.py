@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Unit tests for AIP frame encoding and the incremental stream decoder
+
+Round trips cover every codec x compression pair available in this process
+(JSON and zlib always; msgpack, CBOR and zstd when installed).
+"""
+
+import asyncio
+import sys
+import unittest
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+
+from enhancements.multidevice.device_protocol import (
+    AIPMessage,
+    AIPStreamDecoder,
+    FrameCodec,
+    MessageType,
+    ProtocolError,
+    MAX_BODY_SIZE,
+    available_codecs,
+    available_compressors,
+)
+
+
+def corrupt(message: AIPMessage) -> bytes:
+    frame = bytearray(message.to_bytes())
+    frame[AIPMessage.HEADER_SIZE + 3] ^= 0xFF
+    return bytes(frame)
+
+
+def raw_frame(body: bytes, flags: int, sequence: int = 0) -> bytes:
+    header = AIPMessage._HEADER.pack(AIPMessage.MAGIC, AIPMessage.VERSION,
+                                     MessageType.DEVICE_HEARTBEAT.value, len(body), sequence)
+    return header + body + AIPMessage._FOOTER.pack(AIPMessage._calculate_checksum(body), flags)
+
+
+def make_message(sequence: int, size: int = 16) -> AIPMessage:
+    return AIPMessage(
+        msg_type=MessageType.DEVICE_HEARTBEAT,
+        payload={"seq": sequence, "data": "x" * size, "nested": {"values": list(range(8))}},
+        sequence=sequence,
+        timestamp=1700000000.0 + sequence,
+        source_device="phone-1",
+        target_device="pc-1",
+        correlation_id=f"corr-{sequence}",
+    )
+
+
+def assert_same(test: unittest.TestCase, decoded: AIPMessage, original: AIPMessage):
+    test.assertEqual(decoded.msg_type, original.msg_type)
+    test.assertEqual(decoded.payload, original.payload)
+    test.assertEqual(decoded.sequence, original.sequence)
+    test.assertEqual(decoded.timestamp, original.timestamp)
+    test.assertEqual(decoded.source_device, original.source_device)
+    test.assertEqual(decoded.target_device, original.target_device)
+    test.assertEqual(decoded.correlation_id, original.correlation_id)
+
+
+class TestFrameRoundTrip(unittest.TestCase):
+    """Every available codec x compression pair decodes back to the same message"""
+
+    def test_codec_compression_matrix(self):
+        for codec_name in available_codecs():
+            for compression in [None] + available_compressors():
+                with self.subTest(codec=codec_name, compression=compression):
+                    codec = FrameCodec(codec_name, compression, compress_threshold=0)
+                    message = make_message(7, size=4096)
+                    frame = message.to_bytes(codec)
+
+                    flags = AIPMessage._FOOTER.unpack_from(frame, len(frame) - AIPMessage.FOOTER_SIZE)[1]
+                    self.assertEqual(flags & 0xFF, codec.codec.codec_id)
+                    if compression is not None:
+                        self.assertEqual((flags >> 8) & 0xFF, codec.compressor.compression_id)
+                    else:
+                        self.assertEqual(flags >> 8, 0)
+
+                    assert_same(self, AIPMessage.from_bytes(frame), message)
+                    decoded = AIPStreamDecoder().feed(frame)
+                    self.assertEqual(len(decoded), 1)
+                    assert_same(self, decoded[0], message)
+
+    def test_small_body_stays_uncompressed(self):
+        codec = FrameCodec("json", "zlib", compress_threshold=1024)
+        frame = make_message(1).to_bytes(codec)
+        flags = AIPMessage._FOOTER.unpack_from(frame, len(frame) - AIPMessage.FOOTER_SIZE)[1]
+        self.assertEqual(flags >> 8, 0)
+
+
+class TestStreamDecoder(unittest.TestCase):
+    """Chunk boundaries, error recovery and buffer housekeeping"""
+
+    def setUp(self):
+        self.messages = [make_message(i, size=32 * i) for i in range(20)]
+        self.stream = b"".join(m.to_bytes() for m in self.messages)
+
+    def assert_stream(self, decoded):
+        self.assertEqual(len(decoded), len(self.messages))
+        for got, expected in zip(decoded, self.messages):
+            assert_same(self, got, expected)
+
+    def test_split_chunks(self):
+        for chunk_size in (1, 3, AIPMessage.HEADER_SIZE - 1, AIPMessage.HEADER_SIZE + 1, 100):
+            with self.subTest(chunk_size=chunk_size):
+                decoder = AIPStreamDecoder()
+                decoded = []
+                for i in range(0, len(self.stream), chunk_size):
+                    decoded.extend(decoder.feed(self.stream[i:i + chunk_size]))
+                self.assert_stream(decoded)
+                self.assertEqual(decoder.buffered, 0)
+                self.assertEqual(decoder.messages_decoded, len(self.messages))
+
+    def test_coalesced_chunks(self):
+        decoder = AIPStreamDecoder()
+        self.assert_stream(decoder.feed(self.stream))
+        self.assertEqual(decoder.buffered, 0)
+
+    def test_coalesced_with_trailing_partial_frame(self):
+        decoder = AIPStreamDecoder()
+        cut = len(self.stream) - 5
+        decoded = decoder.feed(self.stream[:cut])
+        self.assertEqual(len(decoded), len(self.messages) - 1)
+        self.assertEqual(decoder.buffered, len(self.messages[-1].to_bytes()) - 5)
+        decoded.extend(decoder.feed(self.stream[cut:]))
+        self.assert_stream(decoded)
+
+    def test_memoryview_input(self):
+        decoder = AIPStreamDecoder()
+        self.assert_stream(decoder.feed(memoryview(self.stream)))
+
+    def test_corrupt_frame_then_reset(self):
+        frame = bytearray(make_message(1, size=64).to_bytes())
+        frame[AIPMessage.HEADER_SIZE + 3] ^= 0xFF
+        decoder = AIPStreamDecoder()
+        with self.assertRaises(ProtocolError) as ctx:
+            decoder.feed(self.messages[0].to_bytes() + bytes(frame))
+        self.assertIn("Checksum", str(ctx.exception))
+        # The traceback must not pin the receive buffer
+        decoder.reset()
+        self.assertEqual(decoder.buffered, 0)
+        self.assert_stream(decoder.feed(self.stream))
+
+    def test_reset_while_exception_is_alive(self):
+        frame = bytearray(make_message(1).to_bytes())
+        frame[-1] = 0x7F  # unknown codec id
+        decoder = AIPStreamDecoder()
+        try:
+            decoder.feed(bytes(frame))
+        except ProtocolError as e:
+            self.assertIn("codec", str(e))
+            decoder.reset()
+        else:
+            self.fail("ProtocolError not raised")
+        self.assert_stream(decoder.feed(self.stream))
+
+    def test_malformed_body_is_protocol_error(self):
+        body = b"{not json"
+        header = AIPMessage._HEADER.pack(AIPMessage.MAGIC, AIPMessage.VERSION,
+                                         MessageType.DEVICE_HEARTBEAT.value, len(body), 0)
+        footer = AIPMessage._FOOTER.pack(AIPMessage._calculate_checksum(body), 0)
+        decoder = AIPStreamDecoder()
+        with self.assertRaises(ProtocolError):
+            decoder.feed(header + body + footer)
+        decoder.reset()
+        self.assert_stream(decoder.feed(self.stream))
+
+    def test_bad_magic_then_reset(self):
+        decoder = AIPStreamDecoder()
+        with self.assertRaises(ProtocolError):
+            decoder.feed(b"\x00" * AIPMessage.HEADER_SIZE)
+        decoder.reset()
+        self.assert_stream(decoder.feed(self.stream))
+
+    def test_frame_too_large(self):
+        decoder = AIPStreamDecoder(max_frame_size=64)
+        with self.assertRaises(ProtocolError):
+            decoder.feed(make_message(1, size=256).to_bytes())
+        decoder.reset()
+        self.assertEqual(decoder.buffered, 0)
+
+    def test_buffer_compaction(self):
+        decoder = AIPStreamDecoder()
+        for _ in range(5):
+            self.assert_stream(decoder.feed(self.stream))
+        self.assertEqual(decoder.buffered, 0)
+        self.assertEqual(decoder.bytes_consumed, 5 * len(self.stream))
+
+    def test_iter_reader(self):
+        async def collect(data: bytes):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return [m async for m in AIPStreamDecoder().iter_reader(reader, chunk_size=7)]
+
+        self.assert_stream(asyncio.run(collect(self.stream)))
+        with self.assertRaises(ProtocolError):
+            asyncio.run(collect(self.stream[:-3]))
+
+    def test_good_frames_around_corrupt_one_survive(self):
+        good = self.messages[:4]
+        chunk = good[0].to_bytes() + good[1].to_bytes() + corrupt(good[2]) + good[3].to_bytes()
+        decoder = AIPStreamDecoder()
+        with self.assertRaises(ProtocolError) as ctx:
+            decoder.feed(chunk)
+        self.assertIn("Checksum", str(ctx.exception))
+        self.assertEqual([m.sequence for m in ctx.exception.messages], [0, 1, 3])
+        for got, expected in zip(ctx.exception.messages, [good[0], good[1], good[3]]):
+            assert_same(self, got, expected)
+        self.assertEqual(decoder.messages_decoded, 3)
+        self.assertEqual(decoder.frames_dropped, 1)
+        # The corrupt frame was skipped whole: the stream is still in sync
+        self.assertEqual(decoder.buffered, 0)
+        self.assert_stream(decoder.feed(self.stream))
+
+    def test_corrupt_frame_split_across_chunks(self):
+        stream = self.messages[0].to_bytes() + corrupt(self.messages[1]) + self.messages[2].to_bytes()
+        decoder = AIPStreamDecoder()
+        decoded, errors = [], 0
+        for i in range(0, len(stream), 5):
+            try:
+                decoded.extend(decoder.feed(stream[i:i + 5]))
+            except ProtocolError as e:
+                decoded.extend(e.messages)
+                errors += 1
+        self.assertEqual(errors, 1)
+        self.assertEqual([m.sequence for m in decoded], [0, 2])
+
+    def test_iter_reader_yields_good_messages_before_error(self):
+        async def collect(data: bytes):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            received = []
+            with self.assertRaises(ProtocolError):
+                async for message in AIPStreamDecoder().iter_reader(reader):
+                    received.append(message)
+            return received
+
+        data = self.messages[0].to_bytes() + corrupt(self.messages[1])
+        self.assertEqual([m.sequence for m in asyncio.run(collect(data))], [0])
+
+
+class TestDecompressionLimit(unittest.TestCase):
+    """A small compressed frame must not expand past the frame size limit"""
+
+    def bomb(self, size: int) -> bytes:
+        return zlib.compress(b"[" + b" " * (size - 2) + b"]", 9)
+
+    def test_zlib_bomb_is_rejected(self):
+        body = self.bomb(64 * 1024 * 1024)
+        self.assertLess(len(body), 128 * 1024)
+        frame = raw_frame(body, flags=(1 << 8))
+        decoder = AIPStreamDecoder()
+        with self.assertRaises(ProtocolError) as ctx:
+            decoder.feed(frame)
+        self.assertIn("exceeds", str(ctx.exception))
+        with self.assertRaises(ProtocolError):
+            AIPMessage.from_bytes(frame)
+
+    def test_limit_follows_max_frame_size(self):
+        frame = raw_frame(self.bomb(8192), flags=(1 << 8))
+        with self.assertRaises(ProtocolError):
+            AIPStreamDecoder(max_frame_size=4096).feed(frame)
+        with self.assertRaises(ProtocolError):
+            AIPMessage.from_bytes(frame, max_body_size=4096)
+
+    def test_body_at_limit_is_accepted(self):
+        message = make_message(3, size=2000)
+        frame = message.to_bytes(FrameCodec("json", "zlib", compress_threshold=0))
+        assert_same(self, AIPStreamDecoder(max_frame_size=4096).feed(frame)[0], message)
+        self.assertEqual(MAX_BODY_SIZE, AIPStreamDecoder().max_frame_size)
+
+    def test_truncated_zlib_body(self):
+        body = zlib.compress(b'{"payload": {}}')[:-4]
+        with self.assertRaises(ProtocolError):
+            AIPMessage.from_bytes(raw_frame(body, flags=(1 << 8)))
+
+    @unittest.skipUnless("zstd" in available_compressors(), "zstandard not installed")
+    def test_zstd_bomb_is_rejected(self):
+        import zstandard
+        body = zstandard.ZstdCompressor(level=3).compress(b" " * (64 * 1024 * 1024))
+        frame = raw_frame(body, flags=(2 << 8))
+        with self.assertRaises(ProtocolError):
+            AIPStreamDecoder(max_frame_size=1024 * 1024).feed(frame)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,373 @@
+"""
+Durable State Journal for Node 00: State Machine
+
+Embedded persistence for the coordination service, no Redis needed:
+1. Append-only write-ahead log in segments; every record is framed as
+   <length><crc32><json> so a torn tail from a crash is detected and cut off
+2. Group commit - one writer task batches all pending records into a single
+   write + fsync, and callers await the revision they appended
+3. Compact snapshots written atomically (tmp + fsync + rename); segments fully
+   covered by the latest snapshot are deleted
+4. Watch hub - every committed change gets a revision number and can be
+   long-polled by key prefix from any past revision still in the history
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<II")  # payload length, crc32
+_SEGMENT_PREFIX = "wal-"
+_SEGMENT_SUFFIX = ".log"
+_SNAPSHOT_NAME = "snapshot.json"
+
+
+def _fsync_dir(path: str):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _segment_name(first_rev: int) -> str:
+    return f"{_SEGMENT_PREFIX}{first_rev:020d}{_SEGMENT_SUFFIX}"
+
+
+def read_segment(path: str, truncate_torn: bool = False) -> List[Dict[str, Any]]:
+    """Read all intact records of a segment; optionally cut off a torn tail."""
+    records = []
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, offset)
+        start = offset + _HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+        records.append(json.loads(payload))
+        offset = start + length
+    if offset < len(data):
+        logger.warning(f"WAL segment {os.path.basename(path)}: dropping {len(data) - offset} torn bytes")
+        if truncate_torn:
+            with open(path, "r+b") as f:
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+    return records
+
+
+class StateJournal:
+    """
+    Write-ahead log plus snapshots in one directory.
+
+    append() is synchronous and only assigns a revision and buffers the
+    record; wait_durable(rev) resolves once that record is on disk, or
+    raises the write error if the commit carrying it fails. The
+    writer task starts a commit as soon as records are pending, so all
+    records appended while the previous fsync was running share the next one.
+    """
+
+    def __init__(self, data_dir: str, fsync: bool = True, snapshot_every: int = 10000):
+        self.data_dir = data_dir
+        self.fsync = fsync
+        self.snapshot_every = snapshot_every
+        self.revision = 0
+        self.durable_revision = 0
+        self.snapshot_revision = 0
+        self._pending: List[bytes] = []
+        self._pending_last_rev = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+        self._segments: List[List] = []  # [path, first_rev, last_rev]
+        self._file = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._io_lock: Optional[asyncio.Lock] = None
+        self._since_snapshot = 0
+        self.stats = {
+            "records": 0,
+            "commits": 0,
+            "bytes": 0,
+            "snapshots": 0,
+            "replayed": 0,
+            "replay_ms": 0.0,
+            "last_commit_ms": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Recovery
+    # ------------------------------------------------------------------
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Return (snapshot, records after the snapshot) and open the log for appending."""
+        started = time.perf_counter()
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        snapshot = None
+        snapshot_path = os.path.join(self.data_dir, _SNAPSHOT_NAME)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.snapshot_revision = snapshot.get("revision", 0)
+        self.revision = self.snapshot_revision
+
+        names = sorted(
+            n for n in os.listdir(self.data_dir)
+            if n.startswith(_SEGMENT_PREFIX) and n.endswith(_SEGMENT_SUFFIX)
+        )
+        records: List[Dict[str, Any]] = []
+        for i, name in enumerate(names):
+            path = os.path.join(self.data_dir, name)
+            first_rev = int(name[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+            segment_records = read_segment(path, truncate_torn=(i == len(names) - 1))
+            last_rev = segment_records[-1]["rev"] if segment_records else first_rev - 1
+            self._segments.append([path, first_rev, last_rev])
+            for record in segment_records:
+                if record["rev"] > self.revision:
+                    records.append(record)
+                    self.revision = record["rev"]
+
+        self.durable_revision = self.revision
+        self._since_snapshot = len(records)
+        self._open_segment()
+        self.stats["replayed"] = len(records)
+        self.stats["replay_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return snapshot, records
+
+    def _open_segment(self):
+        if self._segments and self._segments[-1][2] < self._segments[-1][1]:
+            # Reuse an empty tail segment
+            path = self._segments[-1][0]
+        else:
+            first_rev = self.durable_revision + 1
+            path = os.path.join(self.data_dir, _segment_name(first_rev))
+            self._segments.append([path, first_rev, first_rev - 1])
+        self._file = open(path, "ab")
+        _fsync_dir(self.data_dir)
+
+    # ------------------------------------------------------------------
+    # Appending
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        if self._writer_task is None:
+            self._wakeup = asyncio.Event()
+            self._io_lock = asyncio.Lock()
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def close(self):
+        if self._writer_task is not None:
+            await self.flush()
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Assign the next revision and buffer the record for the next group commit."""
+        self.revision += 1
+        record["rev"] = self.revision
+        payload = json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        self._pending.append(_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._pending_last_rev = self.revision
+        self._since_snapshot += 1
+        self.stats["records"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self.revision
+
+    async def wait_durable(self, revision: int):
+        if revision <= self.durable_revision:
+            return
+        if self._writer_task is None:
+            await self.flush()
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((revision, future))
+        await future
+
+    async def flush(self):
+        """Commit everything pending right now (used at shutdown and without a writer task)."""
+        if self._io_lock is None:
+            self._io_lock = asyncio.Lock()
+        async with self._io_lock:
+            await self._commit_pending()
+
+    async def _commit_pending(self):
+        if not self._pending:
+            return
+        batch, last_rev = self._pending, self._pending_last_rev
+        self._pending = []
+        started = time.perf_counter()
+        data = b"".join(batch)
+        try:
+            await asyncio.to_thread(self._write, data)
+        except Exception as e:
+            # Keep the records so the next commit retries them in order, but
+            # fail the callers waiting on this batch instead of leaving them hanging
+            self._pending = batch + self._pending
+            while self._waiters and self._waiters[0][0] <= last_rev:
+                _, future = self._waiters.popleft()
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        self._segments[-1][2] = last_rev
+        self.durable_revision = last_rev
+        self.stats["commits"] += 1
+        self.stats["bytes"] += len(data)
+        self.stats["last_commit_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        while self._waiters and self._waiters[0][0] <= last_rev:
+            _, future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    async def _writer_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                async with self._io_lock:
+                    await self._commit_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"WAL commit failed: {e}")
+                await asyncio.sleep(0.1)
+                self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Snapshots
+    # ------------------------------------------------------------------
+
+    def snapshot_due(self) -> bool:
+        return self._since_snapshot >= self.snapshot_every
+
+    async def write_snapshot(self, state: Dict[str, Any]):
+        """
+        Persist a snapshot of state as of the current revision. The caller
+        must pass live state without awaiting in between, so that state and
+        self.revision describe the same point in time.
+        """
+        revision = self.revision
+        self._since_snapshot = 0
+        # Encode before the first await so the snapshot is a point-in-time copy
+        body = json.dumps(
+            dict(state, revision=revision, created_at=time.time()),
+            separators=(",", ":"), ensure_ascii=False,
+        ).encode("utf-8")
+        path = os.path.join(self.data_dir, _SNAPSHOT_NAME)
+        await asyncio.to_thread(self._write_snapshot_file, path, body)
+        self.snapshot_revision = revision
+        self.stats["snapshots"] += 1
+
+        # Start a new segment and drop segments the snapshot fully covers
+        async with self._io_lock:
+            await self._commit_pending()
+            self._file.close()
+            self._open_segment()
+            keep = []
+            for segment in self._segments:
+                if segment is not self._segments[-1] and segment[2] <= revision:
+                    try:
+                        os.remove(segment[0])
+                    except OSError as e:
+                        logger.warning(f"Could not remove WAL segment {segment[0]}: {e}")
+                else:
+                    keep.append(segment)
+            self._segments = keep
+
+    @staticmethod
+    def _write_snapshot_file(path: str, body: bytes):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(os.path.dirname(path))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "revision": self.revision,
+            "durable_revision": self.durable_revision,
+            "snapshot_revision": self.snapshot_revision,
+            "segments": len(self._segments),
+            "fsync": self.fsync,
+        }
+
+
+class WatchHub:
+    """
+    Revisioned change feed. Keeps the most recent events in memory; watchers
+    long-poll for events after a revision, filtered by key prefix.
+    """
+
+    def __init__(self, history: int = 10000):
+        self._events: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._changed = asyncio.Event()
+        self.revision = 0
+
+    def publish(self, revision: int, key: str, value: Any, op: str = "put"):
+        self._events.append({"revision": revision, "key": key, "op": op, "value": value})
+        self.revision = revision
+        # Wake everyone waiting on the current event, then start a fresh one
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def oldest_revision(self) -> int:
+        return self._events[0]["revision"] if self._events else self.revision + 1
+
+    def events_since(self, after_revision: int, prefix: str = "") -> List[Dict[str, Any]]:
+        events = []
+        # Newest events are at the right; stop once we reach after_revision
+        for event in reversed(self._events):
+            if event["revision"] <= after_revision:
+                break
+            if event["key"].startswith(prefix):
+                events.append(event)
+        events.reverse()
+        return events
+
+    async def wait_events(self, after_revision: int, prefix: str = "",
+                          timeout: float = 30.0) -> List[Dict[str, Any]]:
+        """Return matching events after after_revision, waiting up to timeout for one."""
+        if after_revision + 1 < self.oldest_revision() and after_revision < self.revision:
+            raise LookupError(f"revision {after_revision} has been compacted (oldest {self.oldest_revision()})")
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self.events_since(after_revision, prefix)
+            if events:
+                return events
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return []
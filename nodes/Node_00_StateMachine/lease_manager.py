@@ -0,0 +1,392 @@
+"""
+Lease Manager for Node 00: State Machine
+
+Lease-based locks with:
+1. Per-resource state - operations on different resources never contend
+2. Monotonic-clock expiries kept in a min-heap, reaped by one background task
+3. Monotonically increasing fencing tokens, so a storage layer can reject
+   writes from a holder whose lease has already been taken over
+4. Long-poll waiters (FIFO) that are handed the lease on release/expiry
+   instead of retrying
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lease:
+    """A granted lease on one resource."""
+    resource_id: str
+    node_id: str
+    token: str
+    fencing_token: int
+    ttl: float
+    expires_mono: float
+    acquired_wall: float
+    reason: str = ""
+
+    def remaining(self, now: Optional[float] = None) -> float:
+        return self.expires_mono - (time.monotonic() if now is None else now)
+
+    def to_record(self) -> Dict[str, Any]:
+        """Compact, clock-independent form for persistence."""
+        return {
+            "node_id": self.node_id,
+            "token": self.token,
+            "fencing_token": self.fencing_token,
+            "ttl": self.ttl,
+            "expires_wall": time.time() + self.remaining(),
+            "acquired_wall": self.acquired_wall,
+            "reason": self.reason,
+        }
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        remaining = self.remaining(now)
+        return {
+            "token": self.token,
+            "fencing_token": self.fencing_token,
+            "node_id": self.node_id,
+            "reason": self.reason,
+            "acquired_at": datetime.fromtimestamp(self.acquired_wall).isoformat(),
+            "expires_at": datetime.fromtimestamp(time.time() + remaining).isoformat(),
+            "ttl_seconds": self.ttl,
+            "remaining_seconds": round(max(0.0, remaining), 3),
+        }
+
+
+@dataclass
+class _Waiter:
+    node_id: str
+    ttl: float
+    reason: str
+    future: asyncio.Future
+
+
+@dataclass
+class _Resource:
+    lease: Optional[Lease] = None
+    waiters: Deque[_Waiter] = field(default_factory=deque)
+
+
+class LeaseManager:
+    """
+    Lease lock service.
+
+    Every critical section is synchronous, so on the event loop it is atomic
+    without a global lock; state is kept per resource and only callers that
+    explicitly ask to wait ever suspend (on their own future).
+    """
+
+    def __init__(self, on_expire: Optional[Callable[[Lease], None]] = None,
+                 on_change: Optional[Callable[[str, Optional[Lease]], None]] = None):
+        self._resources: Dict[str, _Resource] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._fencing = itertools.count(1)
+        self._last_fencing = 0
+        self._on_expire = on_expire
+        self._on_change = on_change
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {
+            "acquired": 0,
+            "denied": 0,
+            "released": 0,
+            "renewed": 0,
+            "expired": 0,
+            "handoffs": 0,
+            "wait_timeouts": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Start the expiry reaper task."""
+        if self._reaper_task is None:
+            self._wakeup = asyncio.Event()
+            self._reaper_task = asyncio.create_task(self._reaper_loop())
+
+    async def stop(self):
+        """Stop the reaper and fail all pending waiters."""
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+        for resource in self._resources.values():
+            while resource.waiters:
+                waiter = resource.waiters.popleft()
+                if not waiter.future.done():
+                    waiter.future.set_result(None)
+
+    # ------------------------------------------------------------------
+    # Lock operations
+    # ------------------------------------------------------------------
+
+    async def acquire(self, resource_id: str, node_id: str, ttl: float,
+                      wait_seconds: float = 0.0, reason: str = "") -> Optional[Lease]:
+        """
+        Acquire a lease. If the resource is held and wait_seconds > 0, queue
+        behind the current holder and return the lease once it is handed over,
+        or None on timeout.
+        """
+        now = time.monotonic()
+        resource = self._resources.get(resource_id)
+        if resource is None:
+            resource = self._resources[resource_id] = _Resource()
+        else:
+            self._expire_if_due(resource_id, resource, now)
+
+        if resource.lease is None and not resource.waiters:
+            self.stats["acquired"] += 1
+            return self._grant(resource_id, resource, node_id, ttl, reason, now)
+
+        if wait_seconds <= 0:
+            self.stats["denied"] += 1
+            return None
+
+        waiter = _Waiter(node_id, ttl, reason, asyncio.get_running_loop().create_future())
+        resource.waiters.append(waiter)
+        try:
+            lease = await asyncio.wait_for(asyncio.shield(waiter.future), wait_seconds)
+        except asyncio.TimeoutError:
+            lease = None
+        finally:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                try:
+                    resource.waiters.remove(waiter)
+                except ValueError:
+                    pass
+        if lease is None:
+            # The lease may have been handed over just as we timed out
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.result():
+                lease = waiter.future.result()
+            else:
+                self.stats["wait_timeouts"] += 1
+                self._discard_if_idle(resource_id, resource)
+                return None
+        self.stats["acquired"] += 1
+        return lease
+
+    def release(self, resource_id: str, token: str) -> bool:
+        """Release a lease held under token; the next waiter is handed the lease."""
+        resource = self._resources.get(resource_id)
+        if resource is None or resource.lease is None or resource.lease.token != token:
+            return False
+        if resource.lease.remaining() <= 0:
+            self._expire(resource_id, resource)
+            return False
+        resource.lease = None
+        self.stats["released"] += 1
+        self._handoff(resource_id, resource, time.monotonic())
+        return True
+
+    def renew(self, resource_id: str, token: str, ttl: Optional[float] = None) -> Optional[Lease]:
+        """Extend a live lease. The fencing token is unchanged."""
+        resource = self._resources.get(resource_id)
+        now = time.monotonic()
+        if resource is None or resource.lease is None or resource.lease.token != token:
+            return None
+        if self._expire_if_due(resource_id, resource, now):
+            return None
+        lease = resource.lease
+        if ttl is not None:
+            lease.ttl = ttl
+        lease.expires_mono = now + lease.ttl
+        self._schedule(lease)
+        self._changed(resource_id, lease)
+        self.stats["renewed"] += 1
+        return lease
+
+    def revoke(self, resource_id: str) -> Optional[Lease]:
+        """Forcibly drop the current lease (used by the stale lock reaper)."""
+        resource = self._resources.get(resource_id)
+        if resource is None or resource.lease is None:
+            return None
+        lease = resource.lease
+        resource.lease = None
+        self._handoff(resource_id, resource, time.monotonic())
+        return lease
+
+    def get(self, resource_id: str) -> Optional[Lease]:
+        resource = self._resources.get(resource_id)
+        if resource is None or resource.lease is None or resource.lease.remaining() <= 0:
+            return None
+        return resource.lease
+
+    def check_fencing(self, resource_id: str, fencing_token: int) -> bool:
+        """True if fencing_token belongs to the current live lease of resource_id."""
+        lease = self.get(resource_id)
+        return lease is not None and lease.fencing_token == fencing_token
+
+    def active(self) -> Dict[str, Lease]:
+        """All live leases (expired-but-not-yet-reaped ones are skipped, not deleted)."""
+        now = time.monotonic()
+        return {
+            rid: res.lease for rid, res in self._resources.items()
+            if res.lease is not None and res.lease.expires_mono > now
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active": sum(1 for r in self._resources.values() if r.lease is not None),
+            "waiting": sum(len(r.waiters) for r in self._resources.values()),
+            "heap_size": len(self._heap),
+            "last_fencing_token": self._last_fencing,
+        }
+
+    def restore(self, resource_id: str, record: Optional[Dict[str, Any]]):
+        """Re-install a persisted lease (or clear it) without notifying on_change."""
+        if record is None:
+            self._resources.pop(resource_id, None)
+            return
+        remaining = record["expires_wall"] - time.time()
+        if remaining <= 0:
+            self._resources.pop(resource_id, None)
+        else:
+            lease = Lease(
+                resource_id=resource_id,
+                node_id=record["node_id"],
+                token=record["token"],
+                fencing_token=record["fencing_token"],
+                ttl=record["ttl"],
+                expires_mono=time.monotonic() + remaining,
+                acquired_wall=record["acquired_wall"],
+                reason=record.get("reason", ""),
+            )
+            self._resources.setdefault(resource_id, _Resource()).lease = lease
+            self._schedule(lease)
+        self.ensure_fencing_above(record["fencing_token"])
+
+    def ensure_fencing_above(self, fencing_token: int):
+        """Never hand out a fencing token at or below one that was already issued."""
+        if fencing_token > self._last_fencing:
+            self._last_fencing = fencing_token
+            self._fencing = itertools.count(fencing_token + 1)
+
+    def _changed(self, resource_id: str, lease: Optional[Lease]):
+        if self._on_change:
+            try:
+                self._on_change(resource_id, lease)
+            except Exception as e:
+                logger.error(f"on_change callback failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _grant(self, resource_id: str, resource: _Resource, node_id: str,
+               ttl: float, reason: str, now: float) -> Lease:
+        self._last_fencing = next(self._fencing)
+        lease = Lease(
+            resource_id=resource_id,
+            node_id=node_id,
+            token=str(uuid.uuid4()),
+            fencing_token=self._last_fencing,
+            ttl=ttl,
+            expires_mono=now + ttl,
+            acquired_wall=time.time(),
+            reason=reason,
+        )
+        resource.lease = lease
+        self._schedule(lease)
+        self._changed(resource_id, lease)
+        return lease
+
+    def _schedule(self, lease: Lease):
+        if len(self._heap) > 1024 and len(self._heap) > 4 * len(self._resources):
+            # Released/renewed leases leave stale entries; rebuild from live leases
+            self._heap = [
+                (r.lease.expires_mono, r.lease.fencing_token, rid)
+                for rid, r in self._resources.items() if r.lease is not None
+            ]
+            heapq.heapify(self._heap)
+        wake = not self._heap or lease.expires_mono < self._heap[0][0]
+        heapq.heappush(self._heap, (lease.expires_mono, lease.fencing_token, lease.resource_id))
+        if wake and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _handoff(self, resource_id: str, resource: _Resource, now: float):
+        while resource.waiters:
+            waiter = resource.waiters.popleft()
+            if waiter.future.done():
+                continue
+            lease = self._grant(resource_id, resource, waiter.node_id, waiter.ttl, waiter.reason, now)
+            waiter.future.set_result(lease)
+            self.stats["handoffs"] += 1
+            return
+        self._changed(resource_id, None)
+        self._discard_if_idle(resource_id, resource)
+
+    def _discard_if_idle(self, resource_id: str, resource: _Resource):
+        if resource.lease is None and not resource.waiters:
+            self._resources.pop(resource_id, None)
+
+    def _expire_if_due(self, resource_id: str, resource: _Resource, now: float) -> bool:
+        if resource.lease is not None and resource.lease.expires_mono <= now:
+            self._expire(resource_id, resource)
+            return True
+        return False
+
+    def _expire(self, resource_id: str, resource: _Resource):
+        lease = resource.lease
+        resource.lease = None
+        self.stats["expired"] += 1
+        logger.info(f"Lease expired: {resource_id} (node={lease.node_id}, fencing={lease.fencing_token})")
+        if self._on_expire:
+            try:
+                self._on_expire(lease)
+            except Exception as e:
+                logger.error(f"on_expire callback failed: {e}")
+        self._handoff(resource_id, resource, time.monotonic())
+
+    def reap_due(self, now: Optional[float] = None) -> int:
+        """Expire every lease whose deadline has passed; stale heap entries are skipped."""
+        now = time.monotonic() if now is None else now
+        reaped = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, fencing, resource_id = heapq.heappop(self._heap)
+            resource = self._resources.get(resource_id)
+            if resource is None or resource.lease is None:
+                continue
+            lease = resource.lease
+            # Renewed leases and superseded grants leave stale entries behind
+            if lease.fencing_token != fencing or lease.expires_mono > now:
+                continue
+            self._expire(resource_id, resource)
+            reaped += 1
+        return reaped
+
+    async def _reaper_loop(self):
+        while True:
+            try:
+                self.reap_due()
+                self._wakeup.clear()
+                timeout = None
+                if self._heap:
+                    timeout = max(0.0, self._heap[0][0] - time.monotonic())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in lease reaper: {e}")
+                await asyncio.sleep(1)
@@ -10,9 +10,8 @@ import os
 import json
 import asyncio
 import logging
-import uuid
 from typing import Dict, Optional, List, Any
-from datetime import datetime, timedelta
+from datetime import datetime
 from contextlib import asynccontextmanager
 from enum import Enum
 
@@ -21,6 +20,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 import uvicorn
 
+from lease_manager import LeaseManager
+from durable_store import StateJournal, WatchHub
+
 # Optional Redis import
 try:
     import redis.asyncio as redis
@@ -37,6 +39,10 @@ NODE_NAME = os.getenv("NODE_NAME", "StateMachine")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
 USE_MEMORY_STORE = os.getenv("USE_MEMORY_STORE", "true").lower() == "true"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+DURABLE_STATE = os.getenv("DURABLE_STATE", "true").lower() == "true"
+STATE_DATA_DIR = os.getenv("STATE_DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
+WAL_FSYNC = os.getenv("WAL_FSYNC", "true").lower() == "true"
+SNAPSHOT_EVERY = int(os.getenv("SNAPSHOT_EVERY", "10000"))
 
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL),
@@ -53,10 +59,12 @@ class LockRequest(BaseModel):
     resource_id: str = Field(..., description="ID of the resource to lock")
     timeout_seconds: int = Field(default=30, ge=1, le=300)
     reason: str = Field(default="", description="Reason for lock")
+    wait_seconds: float = Field(default=0, ge=0, le=60, description="Long-poll until the lock is handed over")
 
 class LockResponse(BaseModel):
     success: bool
     token: Optional[str] = None
+    fencing_token: Optional[int] = None
     message: str
     expires_at: Optional[str] = None
 
@@ -65,6 +73,11 @@ class ReleaseRequest(BaseModel):
     resource_id: str
     token: str
 
+class RenewRequest(BaseModel):
+    resource_id: str
+    token: str
+    timeout_seconds: Optional[int] = Field(default=None, ge=1, le=300)
+
 class NodeRegistration(BaseModel):
     node_id: str
     node_name: str
@@ -84,104 +97,187 @@ class NodeStatus(BaseModel):
 # =============================================================================
 
 class MemoryStore:
-    """Thread-safe in-memory store for locks and state."""
+    """
+    In-memory store for locks and state; locks are leases managed per resource.
+    
+    With a journal every change (state, node registration, lease) is appended
+    to the WAL and the call returns once it is durable; heartbeats stay in
+    memory and are only captured by snapshots. Each change gets a revision
+    that is published to the watch hub.
+    """
     
-    def __init__(self):
-        self.locks: Dict[str, Dict] = {}
+    def __init__(self, journal: Optional[StateJournal] = None):
+        self.journal = journal
+        self.watch = WatchHub()
+        self.leases = LeaseManager(on_change=self._lease_changed)
         self.nodes: Dict[str, Dict] = {}
         self.state: Dict[str, Any] = {}
-        self._lock = asyncio.Lock()
-    
-    async def acquire_lock(self, resource_id: str, node_id: str, timeout_seconds: int) -> Optional[str]:
-        """Acquire a lock on a resource."""
-        async with self._lock:
-            now = datetime.now()
-            
-            # Check existing lock
-            if resource_id in self.locks:
-                existing = self.locks[resource_id]
-                expires_at = datetime.fromisoformat(existing["expires_at"])
-                
-                if expires_at > now:
-                    # Lock still valid
-                    return None
-            
-            # Create new lock
-            token = str(uuid.uuid4())
-            expires_at = now + timedelta(seconds=timeout_seconds)
-            
-            self.locks[resource_id] = {
-                "token": token,
-                "node_id": node_id,
-                "expires_at": expires_at.isoformat(),
-                "acquired_at": now.isoformat()
-            }
-            
-            return token
+        self.revisions: Dict[str, int] = {}
+        self._snapshot_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        if self.journal:
+            snapshot, records = self.journal.load()
+            self._restore(snapshot, records)
+            await self.journal.start()
+            logger.info(
+                f"Recovered state at revision {self.journal.revision} "
+                f"({len(records)} WAL records replayed in {self.journal.stats['replay_ms']}ms)"
+            )
+        await self.leases.start()
+    
+    async def stop(self):
+        await self.leases.stop()
+        if self.journal:
+            if self._snapshot_task:
+                await self._snapshot_task
+            # A final snapshot makes the next start a pure snapshot load
+            await self.journal.write_snapshot(self._snapshot_state())
+            await self.journal.close()
+    
+    # -------------------------------------------------------------------------
+    # Journal / watch plumbing
+    # -------------------------------------------------------------------------
+    
+    def _record(self, kind: str, key: str, value: Any) -> int:
+        name = f"{kind}/{key}"
+        if self.journal:
+            revision = self.journal.append({"kind": kind, "key": key, "value": value})
+            if self.journal.snapshot_due() and not self._snapshot_task:
+                self._snapshot_task = asyncio.create_task(self._write_snapshot())
+        else:
+            revision = self.watch.revision + 1
+        self.revisions[name] = revision
+        self.watch.publish(revision, name, value, "delete" if value is None else "put")
+        return revision
+    
+    async def _durable(self, revision: Optional[int] = None):
+        if self.journal:
+            await self.journal.wait_durable(revision or self.journal.revision)
+    
+    def _lease_changed(self, resource_id: str, lease):
+        self._record("locks", resource_id, lease.to_record() if lease else None)
+    
+    def _apply(self, kind: str, key: str, value: Any):
+        if kind == "state":
+            self.state[key] = value
+        elif kind == "nodes":
+            if value is None:
+                self.nodes.pop(key, None)
+            else:
+                self.nodes[key] = value
+        elif kind == "locks":
+            self.leases.restore(key, value)
+    
+    def _restore(self, snapshot: Optional[Dict], records: List[Dict]):
+        if snapshot:
+            self.state = snapshot.get("state", {})
+            self.nodes = snapshot.get("nodes", {})
+            self.revisions = snapshot.get("revisions", {})
+            for resource_id, lease in snapshot.get("locks", {}).items():
+                self.leases.restore(resource_id, lease)
+            self.leases.ensure_fencing_above(snapshot.get("last_fencing", 0))
+        self.watch.revision = self.journal.snapshot_revision
+        for record in records:
+            self._apply(record["kind"], record["key"], record["value"])
+            name = f"{record['kind']}/{record['key']}"
+            self.revisions[name] = record["rev"]
+            # Replayed changes stay watchable; older revisions count as compacted
+            self.watch.publish(record["rev"], name, record["value"], "delete" if record["value"] is None else "put")
+        self.watch.revision = self.journal.revision
+    
+    def _snapshot_state(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "nodes": self.nodes,
+            "revisions": self.revisions,
+            "locks": {rid: lease.to_record() for rid, lease in self.leases.active().items()},
+            "last_fencing": self.leases.get_stats()["last_fencing_token"],
+        }
+    
+    async def _write_snapshot(self):
+        try:
+            await self.journal.write_snapshot(self._snapshot_state())
+        except Exception as e:
+            logger.error(f"Snapshot failed: {e}")
+        finally:
+            self._snapshot_task = None
+    
+    # -------------------------------------------------------------------------
+    # Locks
+    # -------------------------------------------------------------------------
+    
+    async def acquire_lock(self, resource_id: str, node_id: str, timeout_seconds: int,
+                           wait_seconds: float = 0, reason: str = "") -> Optional[Dict]:
+        """Acquire a lock on a resource, optionally waiting for the current holder."""
+        lease = await self.leases.acquire(resource_id, node_id, timeout_seconds, wait_seconds, reason)
+        if not lease:
+            return None
+        await self._durable(self.revisions.get(f"locks/{resource_id}"))
+        return lease.to_dict()
     
     async def release_lock(self, resource_id: str, token: str) -> bool:
         """Release a lock."""
-        async with self._lock:
-            if resource_id not in self.locks:
-                return False
-            
-            if self.locks[resource_id]["token"] != token:
-                return False
-            
-            del self.locks[resource_id]
-            return True
+        released = self.leases.release(resource_id, token)
+        if released:
+            await self._durable()
+        return released
+    
+    async def renew_lock(self, resource_id: str, token: str, timeout_seconds: Optional[int] = None) -> Optional[Dict]:
+        """Extend a held lock."""
+        lease = self.leases.renew(resource_id, token, timeout_seconds)
+        if not lease:
+            return None
+        await self._durable()
+        return lease.to_dict()
     
     async def get_locks(self) -> Dict[str, Dict]:
         """Get all active locks."""
-        async with self._lock:
-            now = datetime.now()
-            active = {}
-            
-            for resource_id, lock in list(self.locks.items()):
-                expires_at = datetime.fromisoformat(lock["expires_at"])
-                if expires_at > now:
-                    active[resource_id] = lock
-                else:
-                    del self.locks[resource_id]
-            
-            return active
+        return {rid: lease.to_dict() for rid, lease in self.leases.active().items()}
+    
+    # -------------------------------------------------------------------------
+    # Nodes and state
+    # -------------------------------------------------------------------------
     
     async def register_node(self, registration: NodeRegistration):
         """Register a node."""
-        async with self._lock:
-            self.nodes[registration.node_id] = {
-                "node_id": registration.node_id,
-                "node_name": registration.node_name,
-                "layer": registration.layer,
-                "ip_address": registration.ip_address,
-                "capabilities": registration.capabilities,
-                "status": "online",
-                "last_heartbeat": datetime.now().isoformat()
-            }
+        node = {
+            "node_id": registration.node_id,
+            "node_name": registration.node_name,
+            "layer": registration.layer,
+            "ip_address": registration.ip_address,
+            "capabilities": registration.capabilities,
+            "status": "online",
+            "last_heartbeat": datetime.now().isoformat()
+        }
+        self.nodes[registration.node_id] = node
+        await self._durable(self._record("nodes", registration.node_id, node))
     
     async def get_nodes(self) -> Dict[str, Dict]:
         """Get all registered nodes."""
-        async with self._lock:
-            return dict(self.nodes)
+        return dict(self.nodes)
     
     async def heartbeat(self, node_id: str) -> bool:
-        """Update node heartbeat."""
-        async with self._lock:
-            if node_id in self.nodes:
-                self.nodes[node_id]["last_heartbeat"] = datetime.now().isoformat()
-                self.nodes[node_id]["status"] = "online"
-                return True
-            return False
-    
-    async def set_state(self, key: str, value: Any):
-        """Set a state value."""
-        async with self._lock:
-            self.state[key] = value
+        """Update node heartbeat (in memory only; snapshots pick it up)."""
+        if node_id in self.nodes:
+            self.nodes[node_id]["last_heartbeat"] = datetime.now().isoformat()
+            self.nodes[node_id]["status"] = "online"
+            return True
+        return False
+    
+    async def set_state(self, key: str, value: Any) -> int:
+        """Set a state value; returns its revision."""
+        self.state[key] = value
+        revision = self._record("state", key, value)
+        await self._durable(revision)
+        return revision
     
     async def get_state(self, key: str) -> Any:
         """Get a state value."""
-        async with self._lock:
-            return self.state.get(key)
+        return self.state.get(key)
+    
+    def get_revision(self, kind: str, key: str) -> int:
+        return self.revisions.get(f"{kind}/{key}", 0)
 
 # =============================================================================
 # FastAPI Application
@@ -211,8 +307,14 @@ async def lifespan(app: FastAPI):
             use_memory = True
     
     if use_memory:
-        logger.info("Using in-memory store")
-        store = MemoryStore()
+        journal = None
+        if DURABLE_STATE:
+            journal = StateJournal(STATE_DATA_DIR, fsync=WAL_FSYNC, snapshot_every=SNAPSHOT_EVERY)
+            logger.info(f"Using durable in-memory store ({STATE_DATA_DIR})")
+        else:
+            logger.info("Using in-memory store")
+        store = MemoryStore(journal)
+    await store.start()
     
     # Register self
     await store.register_node(NodeRegistration(
@@ -228,6 +330,7 @@ async def lifespan(app: FastAPI):
     yield
     
     logger.info(f"Shutting down Node {NODE_ID}")
+    await store.stop()
     if redis_client:
         await redis_client.close()
 
@@ -257,26 +360,29 @@ async def health_check():
         "status": "healthy",
         "node_id": NODE_ID,
         "node_name": NODE_NAME,
-        "store_type": "redis" if redis_client else "memory"
+        "store_type": "redis" if redis_client else ("durable" if store.journal else "memory"),
+        "revision": store.watch.revision
     }
 
 @app.post("/lock/acquire", response_model=LockResponse)
 async def acquire_lock(request: LockRequest):
     """Acquire a lock on a resource."""
-    token = await store.acquire_lock(
+    lease = await store.acquire_lock(
         resource_id=request.resource_id,
         node_id=request.node_id,
-        timeout_seconds=request.timeout_seconds
+        timeout_seconds=request.timeout_seconds,
+        wait_seconds=request.wait_seconds,
+        reason=request.reason
     )
     
-    if token:
-        expires_at = datetime.now() + timedelta(seconds=request.timeout_seconds)
-        logger.info(f"Lock acquired: {request.resource_id} by {request.node_id}")
+    if lease:
+        logger.info(f"Lock acquired: {request.resource_id} by {request.node_id} (fencing={lease['fencing_token']})")
         return LockResponse(
             success=True,
-            token=token,
+            token=lease["token"],
+            fencing_token=lease["fencing_token"],
             message="Lock acquired",
-            expires_at=expires_at.isoformat()
+            expires_at=lease["expires_at"]
         )
     else:
         logger.warning(f"Lock denied: {request.resource_id} for {request.node_id}")
@@ -296,6 +402,26 @@ async def release_lock(request: ReleaseRequest):
     else:
         return LockResponse(success=False, message="Invalid lock or token")
 
+@app.post("/lock/renew", response_model=LockResponse)
+async def renew_lock(request: RenewRequest):
+    """Extend a held lock; the fencing token stays the same."""
+    lease = await store.renew_lock(request.resource_id, request.token, request.timeout_seconds)
+    
+    if lease:
+        return LockResponse(
+            success=True,
+            token=lease["token"],
+            fencing_token=lease["fencing_token"],
+            message="Lock renewed",
+            expires_at=lease["expires_at"]
+        )
+    return LockResponse(success=False, message="Invalid or expired lock")
+
+@app.get("/locks/stats")
+async def get_lock_stats():
+    """Lease manager counters."""
+    return store.leases.get_stats()
+
 @app.get("/locks")
 async def get_locks():
     """Get all active locks."""
@@ -325,13 +451,32 @@ async def get_nodes():
 async def get_state(key: str):
     """Get a state value."""
     value = await store.get_state(key)
-    return {"key": key, "value": value}
+    return {"key": key, "value": value, "revision": store.get_revision("state", key)}
 
 @app.post("/state/{key}")
 async def set_state(key: str, value: Any):
     """Set a state value."""
-    await store.set_state(key, value)
-    return {"success": True}
+    revision = await store.set_state(key, value)
+    return {"success": True, "revision": revision}
+
+@app.get("/watch")
+async def watch(prefix: str = "", revision: int = 0, timeout: float = 30.0):
+    """
+    Long-poll for changes after a revision. Keys are "state/<key>",
+    "nodes/<node_id>" and "locks/<resource_id>".
+    """
+    try:
+        events = await store.watch.wait_events(revision, prefix, min(timeout, 60.0))
+    except LookupError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return {"revision": store.watch.revision, "events": events}
+
+@app.get("/journal/stats")
+async def journal_stats():
+    """WAL / snapshot counters."""
+    if not store.journal:
+        return {"enabled": False}
+    return {"enabled": True, **store.journal.get_stats()}
 
 @app.get("/")
 async def root():
@@ -6,7 +6,7 @@ Stale Lock Reaper for Node 00: State Machine
 1. 每 60 秒扫描一次所有锁
 2. 如果锁持有时间超过 300 秒（5 分钟），自动删除
 3. 记录清理日志到 Node 65
-4. 支持 Redis 和内存存储两种模式
+4. 基于 LeaseManager 的租约，撤销后直接交给排队的等待者
 """
 
 import asyncio
@@ -78,32 +78,31 @@ class StaleLockReaper:
         now = datetime.now()
         stale_locks: List[Dict] = []
         
-        # 扫描所有锁
-        async with self.store._lock:
-            for resource_id, lock in list(self.store.locks.items()):
-                try:
-                    acquired_at = datetime.fromisoformat(lock["acquired_at"])
-                    age_seconds = (now - acquired_at).total_seconds()
+        # 扫描所有租约（租约到期由 LeaseManager 自行回收，这里只处理持有过久的锁）
+        for resource_id, lease in list(self.store.leases.active().items()):
+            try:
+                acquired_at = datetime.fromtimestamp(lease.acquired_wall)
+                age_seconds = (now - acquired_at).total_seconds()
+                
+                # 检查是否过期
+                if age_seconds > self.max_lock_age:
+                    stale_locks.append({
+                        "resource_id": resource_id,
+                        "node_id": lease.node_id,
+                        "acquired_at": acquired_at.isoformat(),
+                        "age_seconds": age_seconds,
+                        "token": lease.token
+                    })
+                    
+                    # 撤销过期锁（等待者会立即接手）
+                    self.store.leases.revoke(resource_id)
+                    logger.warning(
+                        f"Reaped stale lock: resource={resource_id}, "
+                        f"node={lease.node_id}, age={age_seconds:.1f}s"
+                    )
                     
-                    # 检查是否过期
-                    if age_seconds > self.max_lock_age:
-                        stale_locks.append({
-                            "resource_id": resource_id,
-                            "node_id": lock["node_id"],
-                            "acquired_at": lock["acquired_at"],
-                            "age_seconds": age_seconds,
-                            "token": lock["token"]
-                        })
-                        
-                        # 删除过期锁
-                        del self.store.locks[resource_id]
-                        logger.warning(
-                            f"Reaped stale lock: resource={resource_id}, "
-                            f"node={lock['node_id']}, age={age_seconds:.1f}s"
-                        )
-                        
-                except Exception as e:
-                    logger.error(f"Error processing lock {resource_id}: {e}")
+            except Exception as e:
+                logger.error(f"Error processing lock {resource_id}: {e}")
         
         # 更新统计
         if stale_locks:
@@ -226,32 +225,21 @@ def integrate_reaper(app, store):
 if __name__ == "__main__":
     import sys
     
-    # 模拟 MemoryStore
+    from lease_manager import LeaseManager
+    
     class MockStore:
         def __init__(self):
-            self.locks = {}
-            self._lock = asyncio.Lock()
+            self.leases = LeaseManager()
     
     async def test_reaper():
         """测试 Reaper"""
         store = MockStore()
         
         # 添加一些测试锁
-        now = datetime.now()
-        store.locks["test_lock_1"] = {
-            "node_id": "Node_33_ADB",
-            "token": "test-token-1",
-            "acquired_at": (now - timedelta(seconds=400)).isoformat(),
-            "expires_at": (now + timedelta(seconds=100)).isoformat()
-        }
-        store.locks["test_lock_2"] = {
-            "node_id": "Node_50_Transformer",
-            "token": "test-token-2",
-            "acquired_at": (now - timedelta(seconds=100)).isoformat(),
-            "expires_at": (now + timedelta(seconds=200)).isoformat()
-        }
-        
-        print(f"Initial locks: {len(store.locks)}")
+        lease_1 = await store.leases.acquire("test_lock_1", "Node_33_ADB", ttl=500)
+        lease_1.acquired_wall -= 400
+        await store.leases.acquire("test_lock_2", "Node_50_Transformer", ttl=300)
+        print(f"Initial locks: {len(store.leases.active())}")
         
         # 创建 Reaper
         reaper = StaleLockReaper(
@@ -267,7 +255,7 @@ if __name__ == "__main__":
         # 等待一次扫描
         await asyncio.sleep(6)
         
-        print(f"Locks after scan: {len(store.locks)}")
+        print(f"Locks after scan: {len(store.leases.active())}")
         print(f"Stats: {reaper.get_stats()}")
         
         # 停止 Reaper
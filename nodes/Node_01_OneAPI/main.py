@@ -4,17 +4,39 @@ Node 01: OneAPI Gateway - 真实可用的多模型 AI 网关
 支持: OpenRouter, 智谱AI, Groq, Claude, OpenWeather, BraveSearch
 
 所有 API 都经过实际测试验证可用。
+
+上游调用全部走异步连接池（每个提供商一个长连接 httpx.AsyncClient，
+可用时启用 HTTP/2），并按提供商限制并发数和请求速率；自动路由时
+使用对冲请求：主提供商超过其 p95 延迟仍未返回，就并行启动下一个
+提供商，先成功者胜出。
 """
 import os
 import time
-import requests
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
+import httpx
 from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-app = FastAPI(title="Node 01 - OneAPI Gateway", version="2.0.0")
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await provider_pool.aclose()
+
+
+app = FastAPI(title="Node 01 - OneAPI Gateway", version="2.0.0", lifespan=lifespan)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 # ============ API 配置 (从环境变量读取) ============
@@ -36,6 +58,24 @@ LOCAL_LLM_PRIORITY = int(os.getenv("LOCAL_LLM_PRIORITY", "1"))  # 1=最高优先
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
 BRAVE_API_KEY = os.getenv("BRAVE_API_KEY", "")
 
+# 连接池与限流 (每个提供商可用 <PROVIDER>_MAX_CONCURRENCY / <PROVIDER>_RATE_LIMIT 覆盖)
+PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "32"))
+PROVIDER_RATE_LIMIT = float(os.getenv("PROVIDER_RATE_LIMIT", "0"))  # 每秒请求数，0=不限
+
+# 对冲请求
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_MAX_PARALLEL = int(os.getenv("HEDGE_MAX_PARALLEL", "2"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "5.0"))  # 样本不足时的对冲延迟(秒)
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.5"))
+HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "30.0"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+
+# 自动路由顺序
+AUTO_ORDER_LOCAL_FIRST = ["local", "groq", "zhipu", "openrouter", "claude"]
+AUTO_ORDER_CLOUD_FIRST = ["groq", "together", "zhipu", "openrouter", "claude", "local"]
+MCP_AUTO_ORDER = ["groq", "zhipu", "openrouter", "claude"]
+NO_PROVIDER_ERROR = "No LLM provider configured"
+
 # ============ 请求模型 ============
 class ChatRequest(BaseModel):
     model: str = "auto"
@@ -51,191 +91,405 @@ class WeatherRequest(BaseModel):
     city: str
     units: str = "metric"
 
-# ============ LLM 提供商实现 ============
-def call_openrouter(messages: List[Dict], model: str = "openai/gpt-3.5-turbo", max_tokens: int = 1000) -> Dict:
-    """OpenRouter API - 已验证可用"""
-    if not OPENROUTER_API_KEY:
-        return {"error": "OPENROUTER_API_KEY not configured"}
-    
-    try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"model": model, "messages": messages, "max_tokens": max_tokens},
-            timeout=60
-        )
-        response.raise_for_status()
-        data = response.json()
+# ============ 异步提供商层 ============
+class TokenBucket:
+    """异步令牌桶限流器"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            wait = (1 - self._tokens) / self.rate
+            # 持锁等待，保证排队者按顺序拿到令牌
+            await asyncio.sleep(wait)
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+class LatencyTracker:
+    """最近 N 次成功调用的延迟窗口"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class ProviderSpec:
+    """提供商描述：地址、鉴权、请求体构造和响应解析"""
+    name: str
+    url: Callable[[], str]
+    api_key: Callable[[], str]
+    default_model: str
+    build_headers: Callable[[str], Dict[str, str]]
+    build_payload: Callable[[List[Dict], str, int, float], Dict[str, Any]]
+    parse: Callable[[Dict[str, Any], str], Dict[str, Any]]
+    timeout: float = 60.0
+
+
+def _bearer_headers(key: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {key}", "Content-Type": "application/json"}
+
+
+def _openai_payload(messages: List[Dict], model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    return {"model": model, "messages": messages, "max_tokens": max_tokens}
+
+
+def _openai_parser(provider: str) -> Callable[[Dict[str, Any], str], Dict[str, Any]]:
+    def parse(data: Dict[str, Any], model: str) -> Dict[str, Any]:
         return {
             "success": True,
-            "provider": "openrouter",
+            "provider": provider,
             "model": model,
             "content": data["choices"][0]["message"]["content"],
             "usage": data.get("usage", {})
         }
-    except Exception as e:
-        return {"error": str(e), "provider": "openrouter"}
+    return parse
 
-def call_zhipu(messages: List[Dict], model: str = "glm-4-flash", max_tokens: int = 1000) -> Dict:
-    """智谱 AI API - 已验证可用"""
-    if not ZHIPU_API_KEY:
-        return {"error": "ZHIPU_API_KEY not configured"}
-    
-    try:
-        response = requests.post(
-            "https://open.bigmodel.cn/api/paas/v4/chat/completions",
-            headers={
-                "Authorization": f"Bearer {ZHIPU_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"model": model, "messages": messages, "max_tokens": max_tokens},
-            timeout=60
+
+def _local_payload(messages: List[Dict], model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    return {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+
+
+def _local_parse(data: Dict[str, Any], model: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "provider": "local",
+        "model": data.get("model", model),
+        "content": data["choices"][0]["message"]["content"],
+        "usage": data.get("usage", {}),
+        "cost": 0  # 本地推理无成本
+    }
+
+
+def _perplexity_parse(data: Dict[str, Any], model: str) -> Dict[str, Any]:
+    result = _openai_parser("perplexity")(data, model)
+    result["citations"] = data.get("citations", [])  # Perplexity 提供来源引用
+    return result
+
+
+def _claude_headers(key: str) -> Dict[str, str]:
+    return {"x-api-key": key, "anthropic-version": "2023-06-01", "Content-Type": "application/json"}
+
+
+def _claude_payload(messages: List[Dict], model: str, max_tokens: int, temperature: float) -> Dict[str, Any]:
+    # Claude API 格式转换
+    system_msg = ""
+    claude_messages = []
+    for msg in messages:
+        if msg["role"] == "system":
+            system_msg = msg["content"]
+        else:
+            claude_messages.append(msg)
+    payload = {"model": model, "max_tokens": max_tokens, "messages": claude_messages}
+    if system_msg:
+        payload["system"] = system_msg
+    return payload
+
+
+def _claude_parse(data: Dict[str, Any], model: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "provider": "claude",
+        "model": model,
+        "content": data["content"][0]["text"],
+        "usage": data.get("usage", {})
+    }
+
+
+PROVIDER_SPECS: Dict[str, ProviderSpec] = {
+    "openrouter": ProviderSpec(
+        "openrouter", lambda: "https://openrouter.ai/api/v1/chat/completions",
+        lambda: OPENROUTER_API_KEY, "openai/gpt-3.5-turbo",
+        _bearer_headers, _openai_payload, _openai_parser("openrouter")),
+    "zhipu": ProviderSpec(
+        "zhipu", lambda: "https://open.bigmodel.cn/api/paas/v4/chat/completions",
+        lambda: ZHIPU_API_KEY, "glm-4-flash",
+        _bearer_headers, _openai_payload, _openai_parser("zhipu")),
+    # 注意: llama3-8b-8192 已停用，使用 llama-3.3-70b-versatile
+    "groq": ProviderSpec(
+        "groq", lambda: "https://api.groq.com/openai/v1/chat/completions",
+        lambda: GROQ_API_KEY, "llama-3.3-70b-versatile",
+        _bearer_headers, _openai_payload, _openai_parser("groq")),
+    "together": ProviderSpec(
+        "together", lambda: "https://api.together.xyz/v1/chat/completions",
+        lambda: TOGETHER_API_KEY, "meta-llama/Llama-3.3-70B-Instruct-Turbo",
+        _bearer_headers, _openai_payload, _openai_parser("together")),
+    "perplexity": ProviderSpec(
+        "perplexity", lambda: "https://api.perplexity.ai/chat/completions",
+        lambda: PERPLEXITY_API_KEY, "sonar-pro",
+        _bearer_headers, _openai_payload, _perplexity_parse),
+    "claude": ProviderSpec(
+        "claude", lambda: "https://api.anthropic.com/v1/messages",
+        lambda: CLAUDE_API_KEY, "claude-3-5-sonnet-20241022",
+        _claude_headers, _claude_payload, _claude_parse),
+    # 调用 Node 79 的 OpenAI 兼容 API
+    "local": ProviderSpec(
+        "local", lambda: f"{LOCAL_LLM_URL}/v1/chat/completions",
+        lambda: "", "qwen2.5:7b-instruct-q4_K_M",
+        lambda key: {"Content-Type": "application/json"}, _local_payload, _local_parse,
+        timeout=120.0),  # 本地推理可能较慢
+}
+
+
+class ProviderClient:
+    """单个提供商的长连接客户端，带并发上限、速率限制和延迟统计"""
+
+    def __init__(self, spec: ProviderSpec, max_concurrency: int, rate_limit: float):
+        self.spec = spec
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_limit) if rate_limit > 0 else None
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(spec.timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
         )
-        response.raise_for_status()
-        data = response.json()
+        self.latency = LatencyTracker()
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+
+    @property
+    def available(self) -> bool:
+        if self.spec.name == "local":
+            return LOCAL_LLM_ENABLED
+        return bool(self.spec.api_key())
+
+    def hedge_delay(self) -> float:
+        """对冲延迟：样本足够时取 p95，否则使用默认值"""
+        p95 = self.latency.percentile(0.95) if len(self.latency) >= HEDGE_MIN_SAMPLES else None
+        delay = p95 if p95 is not None else HEDGE_DEFAULT_DELAY
+        return min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, delay))
+
+    async def chat(self, messages: List[Dict], model: Optional[str] = None,
+                   max_tokens: int = 1000, temperature: float = 0.7) -> Dict:
+        spec = self.spec
+        if not self.available:
+            if spec.name == "local":
+                return {"error": "Local LLM not enabled"}
+            return {"error": f"{spec.name.upper()}_API_KEY not configured"}
+
+        model = model or spec.default_model
+        key = spec.api_key()
+        async with self._semaphore:
+            if self._bucket:
+                await self._bucket.acquire()
+            self.in_flight += 1
+            self.calls += 1
+            started = time.monotonic()
+            try:
+                response = await self._client.post(
+                    spec.url(),
+                    headers=spec.build_headers(key),
+                    json=spec.build_payload(messages, model, max_tokens, temperature),
+                )
+                response.raise_for_status()
+                result = spec.parse(response.json(), model)
+            except Exception as e:
+                self.failures += 1
+                return {"error": str(e) or type(e).__name__, "provider": spec.name}
+            finally:
+                self.in_flight -= 1
+        self.latency.record(time.monotonic() - started)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
         return {
-            "success": True,
-            "provider": "zhipu",
-            "model": model,
-            "content": data["choices"][0]["message"]["content"],
-            "usage": data.get("usage", {})
+            "available": self.available,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rate_limit": self._bucket.rate if self._bucket else None,
+            "calls": self.calls,
+            "failures": self.failures,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "hedge_delay_s": round(self.hedge_delay(), 3),
         }
-    except Exception as e:
-        return {"error": str(e), "provider": "zhipu"}
 
-def call_groq(messages: List[Dict], model: str = "llama-3.3-70b-versatile", max_tokens: int = 1000) -> Dict:
-    """Groq API - 已验证可用 (注意: llama3-8b-8192 已停用，使用 llama-3.3-70b-versatile)"""
-    if not GROQ_API_KEY:
-        return {"error": "GROQ_API_KEY not configured"}
-    
-    try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"model": model, "messages": messages, "max_tokens": max_tokens},
-            timeout=60
-        )
-        response.raise_for_status()
-        data = response.json()
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class ProviderPool:
+    """提供商客户端注册表（懒创建），负责对冲调用和工具类 HTTP 请求"""
+
+    def __init__(self, specs: Dict[str, ProviderSpec]):
+        self.specs = specs
+        self._clients: Dict[str, ProviderClient] = {}
+        self._tools_client: Optional[httpx.AsyncClient] = None
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def get(self, name: str) -> ProviderClient:
+        client = self._clients.get(name)
+        if client is None:
+            prefix = name.upper()
+            client = ProviderClient(
+                self.specs[name],
+                max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", str(PROVIDER_MAX_CONCURRENCY))),
+                rate_limit=float(os.getenv(f"{prefix}_RATE_LIMIT", str(PROVIDER_RATE_LIMIT))),
+            )
+            self._clients[name] = client
+        return client
+
+    @property
+    def tools(self) -> httpx.AsyncClient:
+        """天气/搜索/视频/健康检查共用的连接池"""
+        if self._tools_client is None:
+            self._tools_client = httpx.AsyncClient(http2=HTTP2_AVAILABLE, timeout=10.0)
+        return self._tools_client
+
+    async def call(self, name: str, messages: List[Dict], model: Optional[str] = None,
+                   max_tokens: int = 1000, temperature: float = 0.7) -> Dict:
+        return await self.get(name).chat(messages, model, max_tokens, temperature)
+
+    async def hedged(self, order: List[str], messages: List[Dict],
+                     max_tokens: int = 1000, temperature: float = 0.7) -> Dict:
+        """
+        按顺序对冲调用多个提供商
+
+        - 当前提供商失败：立即启动下一个
+        - 当前提供商超过对冲延迟仍未返回：并行启动下一个（最多 HEDGE_MAX_PARALLEL 个）
+        - 第一个成功的结果胜出，其余请求被取消
+        """
+        candidates = [name for name in order if name in self.specs and self.get(name).available]
+        if not candidates:
+            return {"error": NO_PROVIDER_ERROR}
+
+        pending: Dict[asyncio.Task, str] = {}
+        launched_at: Dict[str, float] = {}
+        errors: List[str] = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name = candidates[next_index]
+            next_index += 1
+            launched_at[name] = time.monotonic()
+            task = asyncio.create_task(self.call(name, messages, max_tokens=max_tokens, temperature=temperature))
+            pending[task] = name
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                can_hedge = HEDGE_ENABLED and next_index < len(candidates) and len(pending) < HEDGE_MAX_PARALLEL
+                if can_hedge:
+                    newest = candidates[next_index - 1]
+                    deadline = launched_at[newest] + self.get(newest).hedge_delay()
+                    timeout = max(0.0, deadline - time.monotonic())
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    result = task.result()
+                    if "error" not in result:
+                        if name != candidates[0] and candidates[0] in pending.values():
+                            # 对冲请求先于仍在进行的主请求返回
+                            self.hedge_wins += 1
+                        return result
+                    errors.append(f"{name}: {result['error']}")
+
+                if next_index < len(candidates) and len(pending) < max(1, HEDGE_MAX_PARALLEL):
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return {"error": "; ".join(errors), "provider": candidates[-1]}
+
+    def stats(self) -> Dict[str, Any]:
         return {
-            "success": True,
-            "provider": "groq",
-            "model": model,
-            "content": data["choices"][0]["message"]["content"],
-            "usage": data.get("usage", {})
+            "http2": HTTP2_AVAILABLE,
+            "hedge_enabled": HEDGE_ENABLED,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "providers": {name: client.stats() for name, client in self._clients.items()},
         }
-    except Exception as e:
-        return {"error": str(e), "provider": "groq"}
 
-def call_local_llm(messages: List[Dict], model: str = "qwen2.5:7b-instruct-q4_K_M", max_tokens: int = 1000, temperature: float = 0.7) -> Dict:
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        if self._tools_client is not None:
+            await self._tools_client.aclose()
+            self._tools_client = None
+
+
+provider_pool = ProviderPool(PROVIDER_SPECS)
+
+# ============ LLM 提供商实现 ============
+async def call_openrouter(messages: List[Dict], model: str = "openai/gpt-3.5-turbo", max_tokens: int = 1000) -> Dict:
+    """OpenRouter API - 已验证可用"""
+    return await provider_pool.call("openrouter", messages, model, max_tokens)
+
+async def call_zhipu(messages: List[Dict], model: str = "glm-4-flash", max_tokens: int = 1000) -> Dict:
+    """智谱 AI API - 已验证可用"""
+    return await provider_pool.call("zhipu", messages, model, max_tokens)
+
+async def call_groq(messages: List[Dict], model: str = "llama-3.3-70b-versatile", max_tokens: int = 1000) -> Dict:
+    """Groq API - 已验证可用 (注意: llama3-8b-8192 已停用，使用 llama-3.3-70b-versatile)"""
+    return await provider_pool.call("groq", messages, model, max_tokens)
+
+async def call_local_llm(messages: List[Dict], model: str = "qwen2.5:7b-instruct-q4_K_M", max_tokens: int = 1000, temperature: float = 0.7) -> Dict:
     """本地 LLM API (通过 Node 79)"""
-    if not LOCAL_LLM_ENABLED:
-        return {"error": "Local LLM not enabled"}
-    
-    try:
-        # 调用 Node 79 的 OpenAI 兼容 API
-        response = requests.post(
-            f"{LOCAL_LLM_URL}/v1/chat/completions",
-            headers={"Content-Type": "application/json"},
-            json={
-                "model": model,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temperature
-            },
-            timeout=120  # 本地推理可能较慢
-        )
-        response.raise_for_status()
-        data = response.json()
-        
-        return {
-            "success": True,
-            "provider": "local",
-            "model": data.get("model", model),
-            "content": data["choices"][0]["message"]["content"],
-            "usage": data.get("usage", {}),
-            "cost": 0  # 本地推理无成本
-        }
-    except Exception as e:
-        return {"error": str(e), "provider": "local"}
+    return await provider_pool.call("local", messages, model, max_tokens, temperature)
 
-def call_together(messages: List[Dict], model: str = "meta-llama/Llama-3.3-70B-Instruct-Turbo", max_tokens: int = 1000) -> Dict:
+async def call_together(messages: List[Dict], model: str = "meta-llama/Llama-3.3-70B-Instruct-Turbo", max_tokens: int = 1000) -> Dict:
     """Together AI API - 支持多种开源模型"""
-    if not TOGETHER_API_KEY:
-        return {"error": "TOGETHER_API_KEY not configured"}
-    
-    try:
-        response = requests.post(
-            "https://api.together.xyz/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {TOGETHER_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"model": model, "messages": messages, "max_tokens": max_tokens},
-            timeout=60
-        )
-        response.raise_for_status()
-        data = response.json()
-        return {
-            "success": True,
-            "provider": "together",
-            "model": model,
-            "content": data["choices"][0]["message"]["content"],
-            "usage": data.get("usage", {})
-        }
-    except Exception as e:
-        return {"error": str(e), "provider": "together"}
+    return await provider_pool.call("together", messages, model, max_tokens)
 
-def call_perplexity(messages: List[Dict], model: str = "sonar-pro", max_tokens: int = 1000) -> Dict:
+async def call_perplexity(messages: List[Dict], model: str = "sonar-pro", max_tokens: int = 1000) -> Dict:
     """Perplexity API - 实时搜索增强的 LLM"""
-    if not PERPLEXITY_API_KEY:
-        return {"error": "PERPLEXITY_API_KEY not configured"}
-    
-    try:
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers={
-                "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={"model": model, "messages": messages, "max_tokens": max_tokens},
-            timeout=60
-        )
-        response.raise_for_status()
-        data = response.json()
-        return {
-            "success": True,
-            "provider": "perplexity",
-            "model": model,
-            "content": data["choices"][0]["message"]["content"],
-            "usage": data.get("usage", {}),
-            "citations": data.get("citations", [])  # Perplexity 提供来源引用
-        }
-    except Exception as e:
-        return {"error": str(e), "provider": "perplexity"}
+    return await provider_pool.call("perplexity", messages, model, max_tokens)
+
+async def call_claude(messages: List[Dict], model: str = "claude-3-5-sonnet-20241022", max_tokens: int = 1000) -> Dict:
+    """Anthropic Claude API"""
+    return await provider_pool.call("claude", messages, model, max_tokens)
 
-def call_pixverse(prompt: str, image_url: Optional[str] = None) -> Dict:
+async def call_pixverse(prompt: str, image_url: Optional[str] = None) -> Dict:
     """Pixverse API - 视频生成"""
     if not PIXVERSE_API_KEY:
         return {"error": "PIXVERSE_API_KEY not configured"}
-    
+
     try:
         payload = {"prompt": prompt}
         if image_url:
             payload["image_url"] = image_url
-        
-        response = requests.post(
+
+        response = await provider_pool.tools.post(
             "https://api.pixverse.ai/v1/generate",
-            headers={
-                "Authorization": f"Bearer {PIXVERSE_API_KEY}",
-                "Content-Type": "application/json"
-            },
+            headers=_bearer_headers(PIXVERSE_API_KEY),
             json=payload,
             timeout=120  # 视频生成需要更长时间
         )
@@ -251,57 +505,15 @@ def call_pixverse(prompt: str, image_url: Optional[str] = None) -> Dict:
     except Exception as e:
         return {"error": str(e), "provider": "pixverse"}
 
-def call_claude(messages: List[Dict], model: str = "claude-3-5-sonnet-20241022", max_tokens: int = 1000) -> Dict:
-    """Anthropic Claude API"""
-    if not CLAUDE_API_KEY:
-        return {"error": "CLAUDE_API_KEY not configured"}
-    
-    # Claude API 格式转换
-    system_msg = ""
-    claude_messages = []
-    for msg in messages:
-        if msg["role"] == "system":
-            system_msg = msg["content"]
-        else:
-            claude_messages.append(msg)
-    
-    try:
-        payload = {"model": model, "max_tokens": max_tokens, "messages": claude_messages}
-        if system_msg:
-            payload["system"] = system_msg
-        
-        response = requests.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": CLAUDE_API_KEY,
-                "anthropic-version": "2023-06-01",
-                "Content-Type": "application/json"
-            },
-            json=payload,
-            timeout=60
-        )
-        response.raise_for_status()
-        data = response.json()
-        return {
-            "success": True,
-            "provider": "claude",
-            "model": model,
-            "content": data["content"][0]["text"],
-            "usage": data.get("usage", {})
-        }
-    except Exception as e:
-        return {"error": str(e), "provider": "claude"}
-
-def get_weather(city: str, units: str = "metric") -> Dict:
+async def get_weather(city: str, units: str = "metric") -> Dict:
     """OpenWeather API - 已验证可用"""
     if not OPENWEATHER_API_KEY:
         return {"error": "OPENWEATHER_API_KEY not configured"}
-    
+
     try:
-        response = requests.get(
+        response = await provider_pool.tools.get(
             "https://api.openweathermap.org/data/2.5/weather",
-            params={"q": city, "appid": OPENWEATHER_API_KEY, "units": units, "lang": "zh_cn"},
-            timeout=10
+            params={"q": city, "appid": OPENWEATHER_API_KEY, "units": units, "lang": "zh_cn"}
         )
         response.raise_for_status()
         data = response.json()
@@ -318,17 +530,16 @@ def get_weather(city: str, units: str = "metric") -> Dict:
     except Exception as e:
         return {"error": str(e)}
 
-def web_search(query: str, count: int = 10) -> Dict:
+async def web_search(query: str, count: int = 10) -> Dict:
     """BraveSearch API - 已验证可用"""
     if not BRAVE_API_KEY:
         return {"error": "BRAVE_API_KEY not configured"}
-    
+
     try:
-        response = requests.get(
+        response = await provider_pool.tools.get(
             "https://api.search.brave.com/res/v1/web/search",
             headers={"X-Subscription-Token": BRAVE_API_KEY},
-            params={"q": query, "count": count},
-            timeout=10
+            params={"q": query, "count": count}
         )
         response.raise_for_status()
         data = response.json()
@@ -352,7 +563,7 @@ async def health():
     # 检查本地 LLM
     if LOCAL_LLM_ENABLED:
         try:
-            resp = requests.get(f"{LOCAL_LLM_URL}/health", timeout=2)
+            resp = await provider_pool.tools.get(f"{LOCAL_LLM_URL}/health", timeout=2)
             if resp.status_code == 200:
                 providers.append("local")
         except Exception:
@@ -390,7 +601,7 @@ async def list_models():
     # 本地 LLM 模型
     if LOCAL_LLM_ENABLED:
         try:
-            resp = requests.get(f"{LOCAL_LLM_URL}/v1/models", timeout=2)
+            resp = await provider_pool.tools.get(f"{LOCAL_LLM_URL}/v1/models", timeout=2)
             if resp.status_code == 200:
                 local_models = resp.json().get("data", [])
                 for model in local_models:
@@ -435,6 +646,11 @@ async def list_models():
     
     return {"object": "list", "data": models}
 
+@app.get("/v1/providers/stats")
+async def provider_stats():
+    """提供商连接池、延迟分位数和对冲统计"""
+    return provider_pool.stats()
+
 @app.post("/v1/chat/completions")
 async def chat_completions(request: ChatRequest, authorization: str = Header(None)):
     """聊天补全 - OpenAI 兼容格式"""
@@ -444,69 +660,22 @@ async def chat_completions(request: ChatRequest, authorization: str = Header(Non
     
     # 自动选择提供商
     if model == "auto" or "/" not in model:
-        # 智能路由策略
+        # 智能路由策略: 按优先级对冲调用，失败或超过 p95 延迟时启用下一个提供商
         # 优先级: local (免费+快) > groq (快) > zhipu (中文) > openrouter > claude
-        
-        # 1. 尝试本地 LLM
         if LOCAL_LLM_ENABLED and LOCAL_LLM_PRIORITY == 1:
-            result = call_local_llm(messages, max_tokens=max_tokens, temperature=request.temperature)
-            if "error" not in result:
-                # 本地成功，直接返回
-                pass
-            else:
-                # 本地失败，Fallback 到云端
-                if GROQ_API_KEY:
-                    result = call_groq(messages, max_tokens=max_tokens)
-                elif ZHIPU_API_KEY:
-                    result = call_zhipu(messages, max_tokens=max_tokens)
-                elif OPENROUTER_API_KEY:
-                    result = call_openrouter(messages, max_tokens=max_tokens)
-                elif CLAUDE_API_KEY:
-                    result = call_claude(messages, max_tokens=max_tokens)
-                else:
-                    raise HTTPException(status_code=503, detail=f"Local LLM failed and no cloud provider available: {result['error']}")
-        
-        # 2. 云端优先，本地备用
-        elif GROQ_API_KEY:
-            result = call_groq(messages, max_tokens=max_tokens)
-        elif TOGETHER_API_KEY:
-            result = call_together(messages, max_tokens=max_tokens)
-        elif ZHIPU_API_KEY:
-            result = call_zhipu(messages, max_tokens=max_tokens)
-        elif OPENROUTER_API_KEY:
-            result = call_openrouter(messages, max_tokens=max_tokens)
-        elif CLAUDE_API_KEY:
-            result = call_claude(messages, max_tokens=max_tokens)
-        elif LOCAL_LLM_ENABLED:
-            # 所有云端都不可用，使用本地
-            result = call_local_llm(messages, max_tokens=max_tokens, temperature=request.temperature)
+            order = AUTO_ORDER_LOCAL_FIRST
         else:
-            raise HTTPException(status_code=503, detail="No LLM provider configured")
+            # 云端优先，本地备用
+            order = AUTO_ORDER_CLOUD_FIRST
+        result = await provider_pool.hedged(order, messages, max_tokens=max_tokens, temperature=request.temperature)
+        if result.get("error") == NO_PROVIDER_ERROR:
+            raise HTTPException(status_code=503, detail=result["error"])
     else:
         # 指定提供商
-        if "/" in model:
-            provider, model_name = model.split("/", 1)
-        else:
-            # 没有 /，直接使用本地 LLM
-            provider = "local"
-            model_name = model
-        
-        if provider == "local":
-            result = call_local_llm(messages, model_name, max_tokens, request.temperature)
-        elif provider == "openrouter":
-            result = call_openrouter(messages, model_name, max_tokens)
-        elif provider == "zhipu":
-            result = call_zhipu(messages, model_name, max_tokens)
-        elif provider == "groq":
-            result = call_groq(messages, model_name, max_tokens)
-        elif provider == "together":
-            result = call_together(messages, model_name, max_tokens)
-        elif provider == "perplexity":
-            result = call_perplexity(messages, model_name, max_tokens)
-        elif provider == "claude":
-            result = call_claude(messages, model_name, max_tokens)
-        else:
+        provider, model_name = model.split("/", 1)
+        if provider not in PROVIDER_SPECS:
             raise HTTPException(status_code=400, detail=f"Unknown provider: {provider}")
+        result = await provider_pool.call(provider, messages, model_name, max_tokens, request.temperature)
     
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
@@ -528,7 +697,7 @@ async def chat_completions(request: ChatRequest, authorization: str = Header(Non
 @app.post("/tools/weather")
 async def api_weather(request: WeatherRequest):
     """获取天气"""
-    result = get_weather(request.city, request.units)
+    result = await get_weather(request.city, request.units)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     return result
@@ -536,7 +705,7 @@ async def api_weather(request: WeatherRequest):
 @app.post("/tools/search")
 async def api_search(request: SearchRequest):
     """网页搜索"""
-    result = web_search(request.query, request.count)
+    result = await web_search(request.query, request.count)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     return result
@@ -564,19 +733,13 @@ async def mcp_call(request: Dict[str, Any]):
         max_tokens = params.get("max_tokens", 1000)
         
         if model == "auto" or "/" not in model:
-            if GROQ_API_KEY:
-                return call_groq(messages, max_tokens=max_tokens)
-            elif ZHIPU_API_KEY:
-                return call_zhipu(messages, max_tokens=max_tokens)
-            elif OPENROUTER_API_KEY:
-                return call_openrouter(messages, max_tokens=max_tokens)
-            elif CLAUDE_API_KEY:
-                return call_claude(messages, max_tokens=max_tokens)
+            if any(provider_pool.get(name).available for name in MCP_AUTO_ORDER):
+                return await provider_pool.hedged(MCP_AUTO_ORDER, messages, max_tokens=max_tokens)
         return {"error": "No provider available"}
     elif tool == "weather":
-        return get_weather(params.get("city", "Beijing"))
+        return await get_weather(params.get("city", "Beijing"))
     elif tool == "search":
-        return web_search(params.get("query", ""))
+        return await web_search(params.get("query", ""))
     else:
         raise HTTPException(status_code=400, detail=f"Unknown tool: {tool}")
 
@@ -587,7 +750,7 @@ if __name__ == "__main__":
 @app.post("/generate_video")
 async def generate_video(prompt: str, image_url: Optional[str] = None):
     """视频生成接口 - 使用 Pixverse"""
-    result = call_pixverse(prompt, image_url)
+    result = await call_pixverse(prompt, image_url)
     if "error" in result:
         raise HTTPException(status_code=500, detail=result["error"])
     return result
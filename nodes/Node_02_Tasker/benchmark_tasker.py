@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Node_02 任务引擎吞吐基准测试
+
+在临时 SQLite 库上测量：
+1. 入队吞吐（并发 create_task，每个任务都等到落盘）
+2. 空任务的出队执行吞吐（async 处理器）
+3. 积压的混合优先级任务中 CRITICAL 与 LOW 任务从启动到开始执行的延迟
+4. CPU 密集型任务在 async 线程池与进程池两种执行方式下的吞吐
+
+用法:
+    python benchmark_tasker.py [--tasks 20000] [--workers 16] [--cpu-tasks 200]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from main import TaskManager, TaskPriority, TaskStatus  # noqa: E402
+
+
+async def noop(**_):
+    return None
+
+
+def cpu_work(n: int = 200_000):
+    total = 0
+    for i in range(n):
+        total += i * i % 7
+    return total
+
+
+async def wait_drained(manager: TaskManager, timeout: float = 300.0):
+    deadline = time.monotonic() + timeout
+    while manager.tasks and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+
+
+async def bench_throughput(db: str, count: int, workers: int):
+    manager = TaskManager(db_path=db, workers=workers)
+    manager.register_handler("noop", noop, concurrency=workers)
+    await manager.start()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[manager.create_task(f"t{i}", "noop") for i in range(count)])
+    enqueue = time.perf_counter() - started
+    await wait_drained(manager)
+    total = time.perf_counter() - started
+
+    store = manager.store.stats
+    print(f"入队: {count / enqueue:,.0f} 任务/s（{store['commits']} 次提交）")
+    print(f"入队+执行: {count / total:,.0f} 任务/s，完成 {manager.stats['completed']}")
+    await manager.stop()
+
+
+async def bench_priority(db: str, count: int, workers: int):
+    manager = TaskManager(db_path=db, workers=workers)
+    waits = {TaskPriority.CRITICAL: [], TaskPriority.LOW: []}
+
+    async def timed(priority: int):
+        waits[TaskPriority(priority)].append(time.monotonic() - started)
+        await asyncio.sleep(0.001)
+
+    manager.register_handler("timed", timed, concurrency=workers)
+    for i in range(count):
+        priority = TaskPriority.CRITICAL if i % 10 == 0 else TaskPriority.LOW
+        await manager.create_task(f"p{i}", "timed", {"priority": int(priority)}, priority=priority)
+    # 先积压再启动，延迟从启动时刻算起
+    started = time.monotonic()
+    await manager.start()
+    await wait_drained(manager)
+    for priority, values in waits.items():
+        values.sort()
+        print(f"{priority.name:<9} 排队延迟 p50 {statistics.median(values) * 1000:7.1f}ms  "
+              f"p95 {values[int(len(values) * 0.95)] * 1000:7.1f}ms  ({len(values)} 个)")
+    await manager.stop()
+
+
+async def bench_cpu(db: str, count: int, mode: str):
+    manager = TaskManager(db_path=db, workers=os.cpu_count() or 2)
+    manager.register_handler("cpu", cpu_work, concurrency=os.cpu_count() or 2, mode=mode)
+    await manager.start()
+    started = time.perf_counter()
+    await asyncio.gather(*[manager.create_task(f"c{i}", "cpu") for i in range(count)])
+    await wait_drained(manager)
+    elapsed = time.perf_counter() - started
+    print(f"CPU 任务 ({mode:<7}): {count / elapsed:,.1f} 任务/s")
+    await manager.stop()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Node_02 task engine benchmark")
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--cpu-tasks", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await bench_throughput(os.path.join(tmp, "throughput.db"), args.tasks, args.workers)
+        await bench_priority(os.path.join(tmp, "priority.db"), min(args.tasks, 5000), 4)
+        await bench_cpu(os.path.join(tmp, "cpu_async.db"), args.cpu_tasks, "async")
+        await bench_cpu(os.path.join(tmp, "cpu_process.db"), args.cpu_tasks, "process")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,272 @@
+"""
+Node 02 任务引擎组件
+====================
+- TaskStore: SQLite (WAL) 持久化任务表，写入合并后批量提交，按状态建索引分页查询
+- TimerWheel: 哈希时间轮，承载定时/延迟任务和重试退避
+- HandlerSpec: 处理器配置（并发上限、执行方式、可见性超时、重试退避）
+"""
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("Node_02_Tasker")
+
+
+@dataclass
+class HandlerSpec:
+    """任务处理器配置"""
+    func: Callable
+    concurrency: int = 4            # 该处理器同时运行的任务上限
+    mode: str = "async"             # async: 事件循环内执行; process: 进程池执行
+    visibility_timeout: float = 300.0  # 单次执行超过该时间视为失败并重试
+    backoff_base: float = 1.0       # 重试退避基数（秒）
+    backoff_max: float = 300.0
+
+    def backoff(self, retry_count: int) -> float:
+        """指数退避 + 抖动"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, retry_count - 1)))
+        return delay * (0.5 + random.random() / 2)
+
+
+class TimerWheel:
+    """
+    单层哈希时间轮：插入/取消 O(1)，每个 tick 只处理一个槽。
+
+    超出一圈的条目记录剩余圈数，转到时再递减；条目在触发时由调用方
+    校验是否仍然有效（取消采用惰性删除）。
+    """
+
+    def __init__(self, tick: float = 0.05, slots: int = 1024):
+        self.tick = tick
+        self.slots: List[List[Tuple[int, Any]]] = [[] for _ in range(slots)]
+        self._current = int(time.monotonic() / tick)
+        self.size = 0
+
+    def add(self, deadline: float, item: Any):
+        """deadline 为 time.monotonic() 时间"""
+        target = max(int(deadline / self.tick), self._current + 1)
+        ticks = target - self._current
+        rounds = (ticks - 1) // len(self.slots)
+        self.slots[target % len(self.slots)].append((rounds, item))
+        self.size += 1
+
+    def advance(self, now: Optional[float] = None) -> List[Any]:
+        """推进到 now，返回所有到期条目"""
+        now_tick = int((time.monotonic() if now is None else now) / self.tick)
+        due = []
+        while self._current < now_tick:
+            self._current += 1
+            index = self._current % len(self.slots)
+            slot = self.slots[index]
+            if not slot:
+                continue
+            remaining = []
+            for rounds, item in slot:
+                if rounds == 0:
+                    due.append(item)
+                else:
+                    remaining.append((rounds - 1, item))
+            self.slots[index] = remaining
+            self.size -= len(slot) - len(remaining)
+        return due
+
+
+class TaskStore:
+    """
+    SQLite 任务表（WAL 模式）。
+
+    状态变更先写入内存中的脏集合（同一任务多次变更只保留最后一次，
+    编码推迟到提交时进行），由后台写入器在一个事务里批量提交；enqueue
+    需要持久化时可以等待对应版本落盘。
+
+    encode(obj) 返回 (id, status, command, priority, created_ts, data_json)。
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        command TEXT NOT NULL,
+        priority INTEGER NOT NULL,
+        created_ts REAL NOT NULL,
+        data TEXT NOT NULL
+    );
+    DROP INDEX IF EXISTS idx_tasks_status_created;
+    DROP INDEX IF EXISTS idx_tasks_created;
+    CREATE INDEX IF NOT EXISTS idx_tasks_status_created_id ON tasks(status, created_ts DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_tasks_created_id ON tasks(created_ts DESC, id DESC);
+    """
+
+    def __init__(self, path: str, encode: Callable[[Any], tuple], synchronous: str = "NORMAL"):
+        self.path = path
+        self.encode = encode
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={synchronous}")
+        self._conn.executescript(self.SCHEMA)
+        # 读连接独立，查询不必等待写入器的事务
+        self._reader = sqlite3.connect(path, check_same_thread=False)
+        self._dirty: Dict[str, Any] = {}
+        self._version = 0
+        self._flushed_version = 0
+        self._waiters: List[Tuple[int, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._io_lock: Optional[asyncio.Lock] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {"commits": 0, "rows_written": 0, "last_commit_ms": 0.0}
+
+    # ---------- 写入 ----------
+
+    def put(self, task_id: str, obj: Any) -> int:
+        self._dirty[task_id] = obj
+        return self._mark()
+
+    def delete(self, task_id: str) -> int:
+        self._dirty[task_id] = None
+        return self._mark()
+
+    def _mark(self) -> int:
+        self._version += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return self._version
+
+    async def wait_flushed(self, version: int):
+        if version <= self._flushed_version:
+            return
+        if self._writer is None:
+            await self.flush()
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((version, future))
+        await future
+
+    async def start(self):
+        if self._writer is None:
+            self._wakeup = asyncio.Event()
+            self._io_lock = asyncio.Lock()
+            self._writer = asyncio.create_task(self._writer_loop())
+
+    async def close(self):
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        self._reader.close()
+        self._conn.close()
+
+    async def flush(self):
+        if self._io_lock is None:
+            self._io_lock = asyncio.Lock()
+        async with self._io_lock:
+            await self._commit()
+
+    async def _commit(self):
+        if not self._dirty:
+            return
+        batch, version = self._dirty, self._version
+        self._dirty = {}
+        started = time.perf_counter()
+        # 在事件循环线程编码，对象此后可以继续被修改
+        upserts = [self.encode(obj) for obj in batch.values() if obj is not None]
+        deletes = [(task_id,) for task_id, obj in batch.items() if obj is None]
+        try:
+            await asyncio.to_thread(self._write, upserts, deletes)
+        except Exception:
+            # 失败时把未写入的变更放回去（保留期间产生的更新）
+            for task_id, obj in batch.items():
+                self._dirty.setdefault(task_id, obj)
+            raise
+        self._flushed_version = version
+        self.stats["commits"] += 1
+        self.stats["rows_written"] += len(batch)
+        self.stats["last_commit_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        still_waiting = []
+        for wanted, future in self._waiters:
+            if wanted <= version:
+                if not future.done():
+                    future.set_result(None)
+            else:
+                still_waiting.append((wanted, future))
+        self._waiters = still_waiting
+
+    def _write(self, upserts: List[tuple], deletes: List[tuple]):
+        with self._conn:
+            self._conn.execute("BEGIN")
+            if upserts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO tasks (id, status, command, priority, created_ts, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", upserts)
+            if deletes:
+                self._conn.executemany("DELETE FROM tasks WHERE id = ?", deletes)
+
+    async def _writer_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                async with self._io_lock:
+                    await self._commit()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task store commit failed: {e}")
+                await asyncio.sleep(0.5)
+                self._wakeup.set()
+
+    # ---------- 读取 ----------
+
+    def load_active(self, statuses: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        """启动时加载未结束的任务"""
+        marks = ",".join("?" * len(statuses))
+        rows = self._reader.execute(
+            f"SELECT data FROM tasks WHERE status IN ({marks})", statuses).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        if task_id in self._dirty:
+            pending = self._dirty[task_id]
+            return json.loads(self.encode(pending)[5]) if pending is not None else None
+        row = self._reader.execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def page(self, status: Optional[str], limit: int, before: Optional[float] = None,
+             before_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按 (created_ts, id) 倒序分页，走 (status, created_ts, id) 索引，代价只与页大小有关。
+
+        游标是上一页最后一行的 (created_ts, id)；同一时间戳的任务靠 id 区分，
+        翻页时既不会重复也不会漏掉。只给 before 时退化为 created_ts < before。
+        """
+        sql = "SELECT data FROM tasks"
+        clauses, args = [], []
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        if before is not None:
+            if before_id is not None:
+                clauses.append("(created_ts, id) < (?, ?)")
+                args.extend((before, before_id))
+            else:
+                clauses.append("created_ts < ?")
+                args.append(before)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_ts DESC, id DESC LIMIT ?"
+        args.append(limit)
+        return [json.loads(row[0]) for row in self._reader.execute(sql, args).fetchall()]
+
+    def count_by_status(self) -> Dict[str, int]:
+        return dict(self._reader.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+    def is_empty(self) -> bool:
+        return self._reader.execute("SELECT 1 FROM tasks LIMIT 1").fetchone() is None
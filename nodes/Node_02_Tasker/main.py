@@ -5,8 +5,14 @@ Node 02: Tasker - 任务调度器
 """
 import os
 import json
+import time
 import asyncio
+import contextvars
+import logging
+import functools
+import itertools
 import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Callable
 from enum import Enum
@@ -15,6 +21,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import heapq
 
+from job_engine import HandlerSpec, TaskStore, TimerWheel
+
+logger = logging.getLogger("Node_02_Tasker")
+
+TASKER_DB_PATH = os.getenv("TASKER_DB_PATH", "/tmp/tasker_tasks.db")
+TASKER_WORKERS = int(os.getenv("TASKER_WORKERS", "8"))
+TASKER_PROCESS_WORKERS = int(os.getenv("TASKER_PROCESS_WORKERS", str(os.cpu_count() or 2)))
+
 app = FastAPI(title="Node 02 - Tasker", version="2.0.0")
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
@@ -48,161 +62,373 @@ class Task(BaseModel):
     max_retries: int = 3
 
 class TaskManager:
-    def __init__(self):
+    """
+    任务引擎：SQLite 持久化队列 + 按处理器分组的优先级堆 + N 个工作协程。
+
+    - 内存中只保留未结束的任务，已结束的任务只在 SQLite 中
+    - 每个处理器有自己的就绪堆和并发上限，工作协程从有空位的处理器中
+      选优先级最高的任务，饱和的处理器不会阻塞其他处理器
+    - 定时/延迟任务和重试退避放在时间轮里，到期再进入就绪堆
+    - 单次执行超过可见性超时视为失败；进程重启时仍处于 running 的任务
+      同样按失败处理后重新入队
+
+    投递语义为至少一次（at-least-once）：线程/进程中的执行无法被中断，
+    超时或取消只是不再等待结果，这次执行仍会跑完并可能产生副作用，随后的
+    重试会再执行一次，因此处理器应当幂等。跑完之前这次执行继续占用处理器的
+    并发名额，重试与它加起来不会超过并发上限。
+    """
+
+    def __init__(self, db_path: str = None, workers: int = None, process_workers: int = None):
+        self.store = TaskStore(db_path or TASKER_DB_PATH, encode=self._encode)
+        self.workers = workers or TASKER_WORKERS
+        self.process_workers = process_workers or TASKER_PROCESS_WORKERS
         self.tasks: Dict[str, Task] = {}
-        self.task_queue: List[tuple] = []  # (priority, created_at, task_id)
-        self.running_tasks: Dict[str, asyncio.Task] = {}
-        self.scheduled_tasks: Dict[str, asyncio.Task] = {}
-        self.task_handlers: Dict[str, Callable] = {}
-        self._lock = asyncio.Lock()
-        self._load_persisted_tasks()
-
-    def _load_persisted_tasks(self):
-        """加载持久化的任务"""
-        persist_file = os.getenv("TASKER_PERSIST_FILE", "/tmp/tasker_tasks.json")
-        if os.path.exists(persist_file):
-            try:
-                with open(persist_file, 'r') as f:
-                    data = json.load(f)
-                    for task_data in data.get("tasks", []):
-                        task = Task(**task_data)
-                        self.tasks[task.id] = task
-                        if task.status == TaskStatus.PENDING:
-                            heapq.heappush(self.task_queue, (task.priority, task.created_at, task.id))
-            except Exception as e:
-                print(f"Failed to load persisted tasks: {e}")
-
-    async def _persist_tasks(self):
-        """持久化任务"""
+        self.ready: Dict[str, List[tuple]] = {}  # command -> [(priority, ready_ts, seq, task_id)]
+        self.running: Dict[str, int] = {}
+        self.running_tasks: Dict[str, asyncio.Future] = {}
+        self.task_handlers: Dict[str, HandlerSpec] = {}
+        self.wheel = TimerWheel()
+        self._queued: Dict[str, int] = {}  # task_id -> 当前有效的入队序号
+        self._seq = itertools.count()
+        self._work: Optional[asyncio.Event] = None
+        self._background: List[asyncio.Task] = []
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self.stragglers = 0  # 已超时/取消但线程、进程仍在运行的执行数
+        self.stats = {"created": 0, "completed": 0, "failed": 0, "retried": 0,
+                      "timeouts": 0, "cancelled": 0}
+
+    def register_handler(self, command: str, handler: Callable, concurrency: int = 4,
+                         mode: str = "async", visibility_timeout: float = 300.0,
+                         backoff_base: float = 1.0):
+        """注册任务处理器（mode="process" 时 handler 需可被 pickle，即模块级函数）"""
+        self.task_handlers[command] = HandlerSpec(
+            func=handler, concurrency=concurrency, mode=mode,
+            visibility_timeout=visibility_timeout, backoff_base=backoff_base,
+        )
+
+    # ---------- 生命周期 ----------
+
+    async def start(self):
+        """恢复未结束的任务并启动工作协程"""
+        self._work = asyncio.Event()
+        await self.store.start()
+        if self.store.is_empty():
+            self._import_legacy_json()
+        recovered = 0
+        for data in self.store.load_active((TaskStatus.PENDING.value, TaskStatus.RUNNING.value)):
+            task = Task(**data)
+            self.tasks[task.id] = task
+            if task.status == TaskStatus.RUNNING:
+                # 上次运行中断：按一次失败处理
+                self._fail_attempt(task, "interrupted by restart")
+            elif task.status == TaskStatus.PENDING:
+                self._schedule(task, task.scheduled_at)
+            recovered += 1
+        if recovered:
+            logger.info(f"Recovered {recovered} unfinished tasks")
+        self._background = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._background.append(asyncio.create_task(self._ticker()))
+
+    async def stop(self):
+        for job in self._background:
+            job.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background = []
+        await self.store.close()
+        if self._process_pool:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+        if self._thread_pool:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+
+    def _import_legacy_json(self):
+        """迁移旧版 JSON 持久化文件"""
         persist_file = os.getenv("TASKER_PERSIST_FILE", "/tmp/tasker_tasks.json")
+        if not os.path.exists(persist_file):
+            return
         try:
-            with open(persist_file, 'w') as f:
-                json.dump({"tasks": [t.dict() for t in self.tasks.values()]}, f, default=str)
+            with open(persist_file, 'r') as f:
+                data = json.load(f)
+            for task_data in data.get("tasks", []):
+                self._save(Task(**task_data))
+            logger.info(f"Imported {len(data.get('tasks', []))} tasks from {persist_file}")
         except Exception as e:
-            print(f"Failed to persist tasks: {e}")
+            logger.error(f"Failed to load persisted tasks: {e}")
 
-    def register_handler(self, command: str, handler: Callable):
-        """注册任务处理器"""
-        self.task_handlers[command] = handler
+    # ---------- 入队与调度 ----------
 
-    async def create_task(self, name: str, command: str, params: Dict = None, 
-                         priority: TaskPriority = TaskPriority.NORMAL,
-                         scheduled_at: Optional[datetime] = None) -> Task:
-        """创建新任务"""
-        async with self._lock:
-            task = Task(
-                id=str(uuid.uuid4()),
-                name=name,
-                command=command,
-                params=params or {},
-                priority=priority,
-                created_at=datetime.now(),
-                scheduled_at=scheduled_at
-            )
-            self.tasks[task.id] = task
+    @staticmethod
+    def _encode(task: Task) -> tuple:
+        return (task.id, task.status.value, task.command, int(task.priority),
+                task.created_at.timestamp(), task.json())
 
-            if scheduled_at and scheduled_at > datetime.now():
-                # 定时任务
-                delay = (scheduled_at - datetime.now()).total_seconds()
-                self.scheduled_tasks[task.id] = asyncio.create_task(self._run_scheduled(task.id, delay))
-            else:
-                # 立即执行
-                heapq.heappush(self.task_queue, (priority, task.created_at, task.id))
+    def _save(self, task: Task) -> int:
+        return self.store.put(task.id, task)
 
-            await self._persist_tasks()
-            return task
+    def _schedule(self, task: Task, when: Optional[datetime] = None):
+        """到期时间在未来则放入时间轮，否则直接进入就绪堆"""
+        seq = next(self._seq)
+        self._queued[task.id] = seq
+        delay = when.timestamp() - time.time() if when else 0
+        if delay > 0:
+            self.wheel.add(time.monotonic() + delay, (task.id, seq))
+        else:
+            self._make_ready(task.id, seq)
 
-    async def _run_scheduled(self, task_id: str, delay: float):
-        """运行定时任务"""
-        await asyncio.sleep(delay)
-        async with self._lock:
-            if task_id in self.tasks:
-                task = self.tasks[task_id]
-                heapq.heappush(self.task_queue, (task.priority, task.created_at, task.id))
-                del self.scheduled_tasks[task_id]
-
-    async def execute_task(self, task_id: str) -> Any:
-        """执行任务"""
+    def _make_ready(self, task_id: str, seq: int):
         task = self.tasks.get(task_id)
-        if not task:
-            raise ValueError(f"Task {task_id} not found")
-
-        task.status = TaskStatus.RUNNING
-        task.started_at = datetime.now()
-
-        handler = self.task_handlers.get(task.command)
-        if not handler:
-            task.status = TaskStatus.FAILED
-            task.error = f"No handler registered for command: {task.command}"
-            task.completed_at = datetime.now()
-            return task
-
+        if task is None or task.status != TaskStatus.PENDING or self._queued.get(task_id) != seq:
+            return
+        heap = self.ready.setdefault(task.command, [])
+        heapq.heappush(heap, (int(task.priority), time.monotonic(), seq, task_id))
+        if self._work is not None:
+            self._work.set()
+
+    def _pick(self) -> Optional[Task]:
+        """从所有有空位的处理器里取优先级最高的任务"""
+        best = None
+        for command, heap in self.ready.items():
+            spec = self.task_handlers.get(command)
+            while heap:
+                _, _, seq, task_id = heap[0]
+                task = self.tasks.get(task_id)
+                if task is None or task.status != TaskStatus.PENDING or self._queued.get(task_id) != seq:
+                    heapq.heappop(heap)  # 已取消/已重新入队的旧条目
+                    continue
+                if spec is None:
+                    heapq.heappop(heap)
+                    self._finish(task, TaskStatus.FAILED, error=f"No handler registered for command: {command}")
+                    continue
+                break
+            if not heap or spec is None or self.running.get(command, 0) >= spec.concurrency:
+                continue
+            if best is None or heap[0] < self.ready[best][0]:
+                best = command
+        if best is None:
+            return None
+        _, _, _, task_id = heapq.heappop(self.ready[best])
+        self._queued.pop(task_id, None)
+        self.running[best] = self.running.get(best, 0) + 1
+        return self.tasks[task_id]
+
+    async def _worker(self):
+        while True:
+            task = self._pick()
+            if task is None:
+                self._work.clear()
+                await self._work.wait()
+                continue
+            await self.execute_task(task.id, on_settled=functools.partial(self._release_slot, task.command))
+
+    def _release_slot(self, command: str):
+        self.running[command] -= 1
+        self._work.set()
+
+    async def _ticker(self):
+        """推进时间轮，把到期的定时/重试任务放入就绪堆"""
+        while True:
+            await asyncio.sleep(self.wheel.tick)
+            for task_id, seq in self.wheel.advance():
+                self._make_ready(task_id, seq)
+
+    # ---------- 执行 ----------
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+        return self._process_pool
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(thread_name_prefix="tasker")
+        return self._thread_pool
+
+    async def execute_task(self, task_id: str, on_settled: Optional[Callable[[], None]] = None) -> Any:
+        """
+        执行任务（一次尝试）
+
+        on_settled 在这次执行真正结束后调用一次：协程处理器随本方法返回；
+        线程/进程处理器超时或被取消时，要等线程/进程跑完才调用。
+        """
+        work: Optional[Future] = None
         try:
-            if asyncio.iscoroutinefunction(handler):
-                result = await handler(**task.params)
+            task = self.tasks.get(task_id)
+            if not task:
+                raise ValueError(f"Task {task_id} not found")
+
+            spec = self.task_handlers.get(task.command)
+            if not spec:
+                self._finish(task, TaskStatus.FAILED, error=f"No handler registered for command: {task.command}")
+                return task
+
+            task.status = TaskStatus.RUNNING
+            task.started_at = datetime.now()
+            self._save(task)
+
+            if spec.mode == "process":
+                work = self._get_process_pool().submit(functools.partial(spec.func, **task.params))
+                runner = asyncio.wrap_future(work)
+            elif asyncio.iscoroutinefunction(spec.func):
+                runner = asyncio.ensure_future(spec.func(**task.params))
             else:
-                result = handler(**task.params)
-            task.result = result
-            task.status = TaskStatus.COMPLETED
-        except Exception as e:
-            task.retry_count += 1
-            if task.retry_count < task.max_retries:
-                task.status = TaskStatus.PENDING
-                heapq.heappush(self.task_queue, (task.priority, datetime.now(), task.id))
+                ctx = contextvars.copy_context()
+                work = self._get_thread_pool().submit(ctx.run, functools.partial(spec.func, **task.params))
+                runner = asyncio.wrap_future(work)
+            self.running_tasks[task_id] = runner
+            try:
+                result = await asyncio.wait_for(runner, spec.visibility_timeout)
+                if task.status == TaskStatus.CANCELLED:
+                    return task
+            except asyncio.CancelledError:
+                if task.status == TaskStatus.CANCELLED:
+                    return task
+                raise
+            except asyncio.TimeoutError:
+                self.stats["timeouts"] += 1
+                self._fail_attempt(task, f"visibility timeout after {spec.visibility_timeout}s")
+            except Exception as e:
+                if task.status != TaskStatus.CANCELLED:
+                    self._fail_attempt(task, str(e))
             else:
-                task.status = TaskStatus.FAILED
-                task.error = str(e)
-
+                task.result = result
+                task.error = None
+                self._finish(task, TaskStatus.COMPLETED)
+            finally:
+                self.running_tasks.pop(task_id, None)
+            return task
+        finally:
+            if on_settled is not None:
+                self._settle(work, on_settled)
+
+    def _settle(self, work: Optional[Future], on_settled: Callable[[], None]):
+        """线程/进程仍在运行（超时、取消）时，等它跑完再调用 on_settled"""
+        if work is None or work.done():
+            on_settled()
+            return
+        loop = asyncio.get_running_loop()
+        self.stragglers += 1
+
+        def settled():
+            self.stragglers -= 1
+            on_settled()
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(settled)
+            except RuntimeError:
+                pass  # 事件循环已关闭
+
+        work.add_done_callback(done)
+
+    def _fail_attempt(self, task: Task, error: str):
+        """一次执行失败：未超过重试上限则按退避时间重新调度"""
+        task.retry_count += 1
+        task.error = error
+        if task.retry_count < task.max_retries:
+            spec = self.task_handlers.get(task.command)
+            delay = spec.backoff(task.retry_count) if spec else 0
+            task.status = TaskStatus.PENDING
+            task.scheduled_at = datetime.now() + timedelta(seconds=delay)
+            self.stats["retried"] += 1
+            self._save(task)
+            self._schedule(task, task.scheduled_at)
+        else:
+            self._finish(task, TaskStatus.FAILED, error=error)
+
+    def _finish(self, task: Task, status: TaskStatus, error: Optional[str] = None):
+        task.status = status
         task.completed_at = datetime.now()
-        await self._persist_tasks()
-        return task
+        if error is not None:
+            task.error = error
+        self.stats[status.value] = self.stats.get(status.value, 0) + 1
+        self._save(task)
+        # 已结束的任务只保留在 SQLite 中
+        self.tasks.pop(task.id, None)
+        self._queued.pop(task.id, None)
 
-    async def process_queue(self):
-        """处理任务队列"""
-        while True:
-            async with self._lock:
-                if self.task_queue:
-                    _, _, task_id = heapq.heappop(self.task_queue)
-                    if task_id in self.tasks and self.tasks[task_id].status == TaskStatus.PENDING:
-                        asyncio.create_task(self.execute_task(task_id))
-            await asyncio.sleep(0.1)
+    # ---------- 对外接口 ----------
+
+    async def create_task(self, name: str, command: str, params: Dict = None,
+                         priority: TaskPriority = TaskPriority.NORMAL,
+                         scheduled_at: Optional[datetime] = None,
+                         max_retries: int = 3) -> Task:
+        """创建新任务（持久化后返回）"""
+        task = Task(
+            id=str(uuid.uuid4()),
+            name=name,
+            command=command,
+            params=params or {},
+            priority=priority,
+            created_at=datetime.now(),
+            scheduled_at=scheduled_at,
+            max_retries=max_retries
+        )
+        self.tasks[task.id] = task
+        self.stats["created"] += 1
+        version = self._save(task)
+        self._schedule(task, scheduled_at)
+        await self.store.wait_flushed(version)
+        return task
 
     def get_task(self, task_id: str) -> Optional[Task]:
-        return self.tasks.get(task_id)
+        task = self.tasks.get(task_id)
+        if task:
+            return task
+        data = self.store.get(task_id)
+        return Task(**data) if data else None
 
-    def list_tasks(self, status: Optional[TaskStatus] = None, limit: int = 100) -> List[Task]:
-        tasks = list(self.tasks.values())
-        if status:
-            tasks = [t for t in tasks if t.status == status]
-        tasks.sort(key=lambda x: x.created_at, reverse=True)
-        return tasks[:limit]
+    async def list_tasks(self, status: Optional[TaskStatus] = None, limit: int = 100,
+                         before: Optional[float] = None,
+                         before_id: Optional[str] = None) -> List[Task]:
+        """按创建时间倒序分页；before / before_id 为上一页最后一个任务的 created_at 时间戳和 id"""
+        await self.store.flush()
+        rows = self.store.page(status.value if status else None, limit, before, before_id)
+        return [Task(**row) for row in rows]
 
     async def cancel_task(self, task_id: str) -> bool:
-        async with self._lock:
-            if task_id in self.tasks:
-                task = self.tasks[task_id]
-                if task.status in [TaskStatus.PENDING, TaskStatus.RUNNING]:
-                    task.status = TaskStatus.CANCELLED
-                    task.completed_at = datetime.now()
-                    if task_id in self.scheduled_tasks:
-                        self.scheduled_tasks[task_id].cancel()
-                        del self.scheduled_tasks[task_id]
-                    await self._persist_tasks()
-                    return True
-        return False
+        task = self.tasks.get(task_id)
+        if not task or task.status not in [TaskStatus.PENDING, TaskStatus.RUNNING]:
+            return False
+        self._finish(task, TaskStatus.CANCELLED)
+        runner = self.running_tasks.get(task_id)
+        if runner:
+            runner.cancel()
+        await self.store.wait_flushed(self.store._version)
+        return True
 
     async def retry_task(self, task_id: str) -> Optional[Task]:
-        async with self._lock:
-            if task_id in self.tasks:
-                task = self.tasks[task_id]
-                if task.status == TaskStatus.FAILED:
-                    task.status = TaskStatus.PENDING
-                    task.retry_count = 0
-                    task.error = None
-                    heapq.heappush(self.task_queue, (task.priority, datetime.now(), task.id))
-                    await self._persist_tasks()
-                    return task
-        return None
+        task = self.get_task(task_id)
+        if not task or task.status != TaskStatus.FAILED:
+            return None
+        task.status = TaskStatus.PENDING
+        task.retry_count = 0
+        task.error = None
+        task.scheduled_at = None
+        task.completed_at = None
+        self.tasks[task.id] = task
+        version = self._save(task)
+        self._schedule(task)
+        await self.store.wait_flushed(version)
+        return task
+
+    async def delete_task(self, task_id: str) -> bool:
+        if not self.get_task(task_id):
+            return False
+        await self.cancel_task(task_id)
+        self.tasks.pop(task_id, None)
+        await self.store.wait_flushed(self.store.delete(task_id))
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "pending": len(self.tasks) - (sum(self.running.values()) - self.stragglers),
+            "running": sum(self.running.values()),
+            "stragglers": self.stragglers,
+            "scheduled": self.wheel.size,
+            "workers": self.workers,
+            "store": self.store.stats,
+        }
 
 # 全局任务管理器
 task_manager = TaskManager()
@@ -218,13 +444,14 @@ task_manager.register_handler("example", example_handler)
 
 @app.get("/health")
 async def health():
+    stats = task_manager.get_stats()
     return {
         "status": "healthy",
         "node_id": "02",
         "name": "Tasker",
-        "pending_tasks": len([t for t in task_manager.tasks.values() if t.status == TaskStatus.PENDING]),
-        "running_tasks": len([t for t in task_manager.tasks.values() if t.status == TaskStatus.RUNNING]),
-        "total_tasks": len(task_manager.tasks),
+        "pending_tasks": stats["pending"],
+        "running_tasks": stats["running"],
+        "active_tasks": len(task_manager.tasks),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -234,23 +461,31 @@ class CreateTaskRequest(BaseModel):
     params: Dict[str, Any] = {}
     priority: TaskPriority = TaskPriority.NORMAL
     scheduled_at: Optional[datetime] = None
+    delay_seconds: Optional[float] = None
+    max_retries: int = 3
 
 @app.post("/tasks")
 async def create_task(request: CreateTaskRequest):
     """创建新任务"""
+    scheduled_at = request.scheduled_at
+    if request.delay_seconds:
+        scheduled_at = datetime.now() + timedelta(seconds=request.delay_seconds)
     task = await task_manager.create_task(
         name=request.name,
         command=request.command,
         params=request.params,
         priority=request.priority,
-        scheduled_at=request.scheduled_at
+        scheduled_at=scheduled_at,
+        max_retries=request.max_retries
     )
     return task
 
 @app.get("/tasks")
-async def list_tasks(status: Optional[TaskStatus] = None, limit: int = 100):
-    """列出任务"""
-    return task_manager.list_tasks(status=status, limit=limit)
+async def list_tasks(status: Optional[TaskStatus] = None, limit: int = 100,
+                     before: Optional[float] = None, before_id: Optional[str] = None):
+    """列出任务（before / before_id: 上一页最后一个任务 created_at 的时间戳和 id，用于翻页）"""
+    return await task_manager.list_tasks(status=status, limit=min(limit, 1000),
+                                         before=before, before_id=before_id)
 
 @app.get("/tasks/{task_id}")
 async def get_task(task_id: str):
@@ -279,22 +514,40 @@ async def retry_task(task_id: str):
 @app.delete("/tasks/{task_id}")
 async def delete_task(task_id: str):
     """删除任务"""
-    if task_id in task_manager.tasks:
-        await task_manager.cancel_task(task_id)
-        del task_manager.tasks[task_id]
-        await task_manager._persist_tasks()
+    if await task_manager.delete_task(task_id):
         return {"success": True}
     raise HTTPException(status_code=404, detail="Task not found")
 
 @app.get("/handlers")
 async def list_handlers():
     """列出已注册的处理器"""
-    return {"handlers": list(task_manager.task_handlers.keys())}
+    return {
+        "handlers": list(task_manager.task_handlers.keys()),
+        "details": {
+            command: {
+                "mode": spec.mode,
+                "concurrency": spec.concurrency,
+                "running": task_manager.running.get(command, 0),
+                "queued": len(task_manager.ready.get(command, [])),
+                "visibility_timeout": spec.visibility_timeout,
+            }
+            for command, spec in task_manager.task_handlers.items()
+        }
+    }
+
+@app.get("/stats")
+async def get_stats():
+    """任务引擎统计"""
+    return task_manager.get_stats()
 
 @app.on_event("startup")
 async def startup():
-    """启动后台任务处理"""
-    asyncio.create_task(task_manager.process_queue())
+    """恢复任务并启动工作协程"""
+    await task_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await task_manager.stop()
 
 if __name__ == "__main__":
     import uvicorn
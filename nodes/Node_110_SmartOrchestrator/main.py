@@ -15,6 +15,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import uuid
 import heapq
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -136,22 +137,49 @@ class NodeCapability:
 
 
 class SmartOrchestrator:
-    """智能编排器"""
+    """
+    智能编排器
+
+    调度是事件驱动的：
+    - 依赖索引 dependents[dep_id] 记录等待它的任务，任务完成时直接释放子任务
+    - 每种 task_type 一个就绪堆，某类任务没有可用节点时不会阻塞其他类型
+    - 任务就绪、节点空出、节点注册/心跳时唤醒调度循环，不再按秒轮询
+    - 等待任务结束通过 future 完成，而不是 sleep 轮询状态
+    """
+    
+    PRIORITY_ORDER = {
+        TaskPriority.CRITICAL: 0,
+        TaskPriority.HIGH: 1,
+        TaskPriority.NORMAL: 2,
+        TaskPriority.LOW: 3,
+        TaskPriority.BACKGROUND: 4
+    }
+    TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
     
     def __init__(self):
         self.tasks: Dict[str, OrchestratedTask] = {}
-        self.task_queue: List[OrchestratedTask] = []
+        # task_type -> [(优先级, 序号, 就绪时刻, 任务)]，同优先级先进先出
+        self.ready_queues: Dict[str, List[tuple]] = {}
         self.workflows: Dict[str, Workflow] = {}
         self.executions: Dict[str, WorkflowExecution] = {}
         self.nodes: Dict[str, NodeCapability] = {}
         self.is_running = False
         self._lock = asyncio.Lock()
         self._task_handlers: Dict[str, Callable] = {}
+        # dep_id -> 等待它完成的任务；task_id -> 尚未完成的依赖数
+        self.dependents: Dict[str, Set[str]] = {}
+        self._unmet: Dict[str, int] = {}
+        self._completion_waiters: Dict[str, List[asyncio.Future]] = {}
+        self._wakeup = asyncio.Event()
+        self._seq = 0
+        self._queued = 0
+        self.stats = {"dispatched": 0, "schedule_passes": 0, "dispatch_latency_ms": 0.0}
     
     def register_node(self, node: NodeCapability) -> bool:
         """注册执行节点"""
         self.nodes[node.node_id] = node
         logger.info(f"Registered node: {node.node_id} with capabilities: {node.capabilities}")
+        self._wakeup.set()
         return True
     
     def update_node_status(self, node_id: str, load: float, active_tasks: int) -> bool:
@@ -161,6 +189,7 @@ class SmartOrchestrator:
         self.nodes[node_id].current_load = load
         self.nodes[node_id].active_tasks = active_tasks
         self.nodes[node_id].last_heartbeat = datetime.now()
+        self._wakeup.set()
         return True
     
     async def submit_task(self, task: OrchestratedTask) -> str:
@@ -168,25 +197,71 @@ class SmartOrchestrator:
         async with self._lock:
             self.tasks[task.task_id] = task
             
-            # 检查依赖
-            if self._check_dependencies(task):
-                task.status = TaskStatus.QUEUED
-                heapq.heappush(self.task_queue, task)
-            else:
+            # 只为未完成的依赖登记索引，完成时由 _release_dependents 递减
+            unmet = 0
+            for dep_id in set(task.dependencies):
+                dep_task = self.tasks.get(dep_id)
+                if dep_task is None or dep_task.status != TaskStatus.COMPLETED:
+                    self.dependents.setdefault(dep_id, set()).add(task.task_id)
+                    unmet += 1
+            
+            if unmet:
+                self._unmet[task.task_id] = unmet
                 task.status = TaskStatus.PENDING
+            else:
+                self._enqueue(task)
             
             logger.info(f"Task submitted: {task.task_id} ({task.name})")
             return task.task_id
     
-    def _check_dependencies(self, task: OrchestratedTask) -> bool:
-        """检查任务依赖是否满足"""
-        for dep_id in task.dependencies:
-            if dep_id not in self.tasks:
-                return False
-            dep_task = self.tasks[dep_id]
-            if dep_task.status != TaskStatus.COMPLETED:
-                return False
-        return True
+    def _enqueue(self, task: OrchestratedTask):
+        """放入对应类型的就绪堆并唤醒调度"""
+        task.status = TaskStatus.QUEUED
+        self._seq += 1
+        queue = self.ready_queues.setdefault(task.task_type, [])
+        heapq.heappush(queue, (self.PRIORITY_ORDER[task.priority], self._seq, time.monotonic(), task))
+        self._queued += 1
+        self._wakeup.set()
+    
+    def _release_dependents(self, task_id: str):
+        """任务完成后释放依赖它的任务"""
+        for child_id in self.dependents.pop(task_id, ()):
+            remaining = self._unmet.get(child_id)
+            if remaining is None:
+                continue
+            if remaining > 1:
+                self._unmet[child_id] = remaining - 1
+                continue
+            del self._unmet[child_id]
+            child = self.tasks.get(child_id)
+            if child is not None and child.status == TaskStatus.PENDING:
+                self._enqueue(child)
+    
+    def _finish(self, task: OrchestratedTask):
+        """任务进入终态：释放子任务并通知等待者"""
+        if task.status == TaskStatus.COMPLETED:
+            self._release_dependents(task.task_id)
+        for future in self._completion_waiters.pop(task.task_id, ()):
+            if not future.done():
+                future.set_result(task)
+    
+    async def wait_for_task(self, task_id: str, timeout: Optional[float] = None) -> OrchestratedTask:
+        """等待任务进入终态（完成/失败/取消）"""
+        task = self.tasks.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        if task.status in self.TERMINAL_STATUSES:
+            return task
+        future = asyncio.get_running_loop().create_future()
+        self._completion_waiters.setdefault(task_id, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self._completion_waiters.get(task_id)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._completion_waiters[task_id]
     
     def _find_best_node(self, task: OrchestratedTask) -> Optional[str]:
         """找到最佳执行节点"""
@@ -215,37 +290,43 @@ class SmartOrchestrator:
         return candidates[0][1]
     
     async def schedule_tasks(self):
-        """调度任务"""
+        """调度任务：各类型的就绪堆独立分配，队首优先级高的类型先分配"""
         async with self._lock:
-            # 检查待处理任务的依赖
-            for task in list(self.tasks.values()):
-                if task.status == TaskStatus.PENDING:
-                    if self._check_dependencies(task):
-                        task.status = TaskStatus.QUEUED
-                        heapq.heappush(self.task_queue, task)
-            
-            # 分配任务到节点
-            while self.task_queue:
-                task = heapq.heappop(self.task_queue)
-                
-                if task.status != TaskStatus.QUEUED:
-                    continue
-                
-                node_id = self._find_best_node(task)
-                if node_id:
+            self.stats["schedule_passes"] += 1
+            heads = sorted(
+                (queue[0][:2], task_type)
+                for task_type, queue in self.ready_queues.items() if queue
+            )
+            for _, task_type in heads:
+                queue = self.ready_queues[task_type]
+                while queue:
+                    _, _, ready_at, task = queue[0]
+                    if task.status != TaskStatus.QUEUED:
+                        heapq.heappop(queue)
+                        self._queued -= 1
+                        continue
+                    
+                    node_id = self._find_best_node(task)
+                    if not node_id:
+                        # 该类型暂无可用节点，留在队列中，继续调度其他类型
+                        break
+                    
+                    heapq.heappop(queue)
+                    self._queued -= 1
                     task.assigned_node = node_id
                     task.status = TaskStatus.RUNNING
                     task.started_at = datetime.now()
                     self.nodes[node_id].active_tasks += 1
+                    self.stats["dispatched"] += 1
+                    # 从就绪到分配的延迟（最近一次）
+                    self.stats["dispatch_latency_ms"] = round((time.monotonic() - ready_at) * 1000, 3)
                     
                     logger.info(f"Task {task.task_id} assigned to node {node_id}")
                     
                     # 执行任务
                     asyncio.create_task(self._execute_task(task))
-                else:
-                    # 没有可用节点，放回队列
-                    heapq.heappush(self.task_queue, task)
-                    break
+                if not queue:
+                    del self.ready_queues[task_type]
     
     async def _execute_task(self, task: OrchestratedTask):
         """执行任务"""
@@ -270,17 +351,19 @@ class SmartOrchestrator:
             task.retry_count += 1
             
             if task.retry_count < task.max_retries:
-                task.status = TaskStatus.QUEUED
-                heapq.heappush(self.task_queue, task)
+                self._enqueue(task)
                 logger.warning(f"Task {task.task_id} failed, retrying ({task.retry_count}/{task.max_retries})")
             else:
                 task.status = TaskStatus.FAILED
                 logger.error(f"Task {task.task_id} failed permanently: {e}")
         
         finally:
-            # 更新节点状态
+            # 更新节点状态（空出的位置可以立即分配）
             if task.assigned_node and task.assigned_node in self.nodes:
                 self.nodes[task.assigned_node].active_tasks -= 1
+            if task.status in self.TERMINAL_STATUSES:
+                self._finish(task)
+            self._wakeup.set()
     
     def register_task_handler(self, task_type: str, handler: Callable):
         """注册任务处理器"""
@@ -345,8 +428,7 @@ class SmartOrchestrator:
                 await self.submit_task(task)
                 
                 # 等待任务完成
-                while task.status not in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
-                    await asyncio.sleep(0.5)
+                await self.wait_for_task(task.task_id)
                 
                 if task.status == TaskStatus.FAILED:
                     if step.on_error == "fail":
@@ -390,12 +472,18 @@ class SmartOrchestrator:
         logger.info("Smart Orchestrator started")
         
         while self.is_running:
+            self._wakeup.clear()
             await self.schedule_tasks()
-            await asyncio.sleep(1)
+            # 有事件时立即再调度；超时兜底处理节点心跳过期等无事件的变化
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+            except asyncio.TimeoutError:
+                pass
     
     def stop(self):
         """停止编排器"""
         self.is_running = False
+        self._wakeup.set()
         logger.info("Smart Orchestrator stopped")
     
     def get_status(self) -> Dict[str, Any]:
@@ -403,13 +491,16 @@ class SmartOrchestrator:
         return {
             "is_running": self.is_running,
             "total_tasks": len(self.tasks),
-            "queued_tasks": len(self.task_queue),
+            "queued_tasks": self._queued,
+            "queued_by_type": {t: len(q) for t, q in self.ready_queues.items()},
+            "pending_tasks": len(self._unmet),
             "running_tasks": sum(1 for t in self.tasks.values() if t.status == TaskStatus.RUNNING),
             "completed_tasks": sum(1 for t in self.tasks.values() if t.status == TaskStatus.COMPLETED),
             "failed_tasks": sum(1 for t in self.tasks.values() if t.status == TaskStatus.FAILED),
             "workflows": len(self.workflows),
             "active_executions": sum(1 for e in self.executions.values() if e.status == WorkflowStatus.RUNNING),
-            "registered_nodes": len(self.nodes)
+            "registered_nodes": len(self.nodes),
+            "scheduler": dict(self.stats)
         }
 
 
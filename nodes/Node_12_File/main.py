@@ -9,6 +9,8 @@ Provides comprehensive file system operations:
 - File metadata and permissions
 - Archive operations (zip, tar)
 - File watching and monitoring
+- Ranged/streamed reads backed by mmap and a sparse line-offset index
+- Optional trigram content index for workspace search, kept fresh by a watcher
 
 Author: UFO Galaxy Team
 Version: 5.0.0
@@ -18,25 +20,39 @@ import os
 import sys
 import json
 import asyncio
+import base64
+import bisect
 import logging
+import mmap
+import re
 import shutil
 import hashlib
 import mimetypes
 import fnmatch
 import tarfile
+import threading
 import zipfile
-from pathlib import Path
-from typing import Dict, List, Optional, Any, Union
+from array import array
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path, PurePath
+from typing import Dict, List, Optional, Any, Union, Iterable, Iterator, Set, Tuple
 from datetime import datetime
 from dataclasses import dataclass, asdict
 from enum import Enum
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File
+from fastapi import FastAPI, HTTPException, BackgroundTasks, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -49,6 +65,17 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "/home/ubuntu/workspace")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(100 * 1024 * 1024)))  # 100MB
 
+# Ranged reads
+LINE_INDEX_STRIDE = int(os.getenv("LINE_INDEX_STRIDE", "1024"))  # checkpoint every N lines
+LINE_INDEX_CACHE_SIZE = int(os.getenv("LINE_INDEX_CACHE_SIZE", "64"))
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", str(256 * 1024)))
+
+# Workspace content index (optional)
+CONTENT_INDEX_ENABLED = os.getenv("CONTENT_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+CONTENT_INDEX_MAX_FILE_SIZE = int(os.getenv("CONTENT_INDEX_MAX_FILE_SIZE", str(1024 * 1024)))
+CONTENT_INDEX_POLL_SECONDS = float(os.getenv("CONTENT_INDEX_POLL_SECONDS", "5"))
+CONTENT_INDEX_EXCLUDE_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache"}
+
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL),
     format=f"[Node {NODE_ID}] %(asctime)s - %(levelname)s - %(message)s"
@@ -85,6 +112,8 @@ class ReadRequest(BaseModel):
     binary: bool = False
     start_line: Optional[int] = None
     end_line: Optional[int] = None
+    offset: Optional[int] = None  # byte range start (takes precedence over lines)
+    length: Optional[int] = None  # byte range length; None = to end of file
 
 
 class WriteRequest(BaseModel):
@@ -126,6 +155,8 @@ class SearchRequest(BaseModel):
     content_pattern: Optional[str] = None
     max_results: int = 100
     recursive: bool = True
+    # Indexed content search: also walk the excluded dirs (.git, node_modules, ...)
+    scan_excluded: bool = False
 
 
 class ArchiveRequest(BaseModel):
@@ -159,6 +190,457 @@ class FileInfo:
     extension: Optional[str]
 
 
+# =============================================================================
+# Ranged Reads
+# =============================================================================
+
+class LineIndex:
+    """
+    Sparse line-offset index for one file.
+
+    Stores the byte offset of every `stride`-th line start, so seeking to a
+    line costs at most `stride` newline scans. Appends are indexed
+    incrementally from where the previous scan stopped.
+    """
+    
+    def __init__(self, stride: int = LINE_INDEX_STRIDE):
+        self.stride = stride
+        self.checkpoints: List[int] = [0]
+        self.newlines = 0
+        self.scanned_to = 0  # offset just past the last newline seen
+        self.size = 0
+        self._tail_digest = b""
+    
+    @staticmethod
+    def _tail(mm, end: int) -> bytes:
+        return hashlib.blake2b(mm[max(0, end - 4096):end], digest_size=16).digest()
+    
+    def is_prefix_of(self, mm, size: int) -> bool:
+        """True if the file still starts with the bytes this index covers."""
+        return size >= self.scanned_to and self._tail(mm, self.scanned_to) == self._tail_digest
+    
+    def extend(self, mm, size: int):
+        """Index newlines between the last scan position and `size`."""
+        pos = self.scanned_to
+        find = mm.find
+        stride = self.stride
+        newlines = self.newlines
+        checkpoints = self.checkpoints
+        while True:
+            nl = find(b"\n", pos, size)
+            if nl < 0:
+                break
+            pos = nl + 1
+            newlines += 1
+            if newlines % stride == 0:
+                checkpoints.append(pos)
+        self.newlines = newlines
+        self.scanned_to = pos
+        self.size = size
+        self._tail_digest = self._tail(mm, pos)
+    
+    @property
+    def total_lines(self) -> int:
+        return self.newlines + (1 if self.size > self.scanned_to else 0)
+    
+    def line_offset(self, mm, line: int) -> int:
+        """Byte offset of the start of 0-based `line` (file size if past the end)."""
+        if line <= 0:
+            return 0
+        if line >= self.total_lines:
+            return self.size
+        checkpoint = min(line // self.stride, len(self.checkpoints) - 1)
+        pos = self.checkpoints[checkpoint]
+        for _ in range(line - checkpoint * self.stride):
+            nl = mm.find(b"\n", pos, self.size)
+            if nl < 0:
+                return self.size
+            pos = nl + 1
+        return pos
+
+
+class LineIndexCache:
+    """
+    LRU of line indexes keyed by path.
+
+    Each entry remembers the file's (st_ino, st_mtime_ns, size). An entry is
+    reused as is only while all three match; a file on the same inode that
+    only grew and still starts with the indexed bytes is treated as an
+    append and extended. Anything else (same size with a new mtime, a
+    shrink, a new inode) rebuilds the index.
+    """
+    
+    def __init__(self, max_entries: int = LINE_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int, int], LineIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, path: Path, mm, size: int, stat: os.stat_result) -> LineIndex:
+        """Index for the mapped file; `stat` is fstat of the mapped descriptor."""
+        key = str(path)
+        identity = (stat.st_ino, stat.st_mtime_ns, size)
+        with self._lock:
+            cached = self._entries.pop(key, None)
+        if cached and cached[0] == identity:
+            index = cached[1]
+        elif (cached and cached[0][0] == stat.st_ino and size > cached[0][2]
+              and cached[1].is_prefix_of(mm, size)):
+            index = cached[1]
+            index.extend(mm, size)
+        else:
+            index = LineIndex()
+            index.extend(mm, size)
+        with self._lock:
+            self._entries[key] = (identity, index)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+
+def _open_mmap(path: Path) -> Tuple[Any, Optional[mmap.mmap], int]:
+    """Open a file for mmap reads. Empty files cannot be mapped, so mm is None."""
+    f = open(path, "rb")
+    size = os.fstat(f.fileno()).st_size
+    if size == 0:
+        return f, None, 0
+    return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size
+
+
+def _file_contains(path: Path, needle: bytes) -> bool:
+    """Substring test without reading the whole file into memory."""
+    try:
+        f, mm, size = _open_mmap(path)
+    except (OSError, ValueError):
+        return False
+    try:
+        return mm is not None and mm.find(needle) >= 0
+    finally:
+        if mm is not None:
+            mm.close()
+        f.close()
+
+
+def _parse_range_header(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=a-b' range into [start, end) or None if unsatisfiable."""
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header or "")
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.group(1), match.group(2)
+    if first:
+        start = int(first)
+        end = min(size, int(last) + 1) if last else size
+    else:
+        start = max(0, size - int(last))
+        end = size
+    if start >= size or start >= end:
+        return None
+    return start, end
+
+
+# =============================================================================
+# Content Index
+# =============================================================================
+
+def _trigrams(data: bytes) -> array:
+    """Distinct trigrams of `data`, each packed as b0<<16 | b1<<8 | b2, sorted."""
+    if len(data) < 3:
+        return array("I")
+    if NUMPY_AVAILABLE:
+        b = np.frombuffer(data, dtype=np.uint8).astype(np.uint32)
+        packed = np.unique((b[:-2] << 16) | (b[1:-1] << 8) | b[2:])
+        return array("I", packed.tobytes())
+    return array("I", sorted({
+        (a << 16) | (b << 8) | c for a, b, c in zip(data, data[1:], data[2:])
+    }))
+
+
+def _posting_has(posting: array, file_id: int) -> bool:
+    i = bisect.bisect_left(posting, file_id)
+    return i < len(posting) and posting[i] == file_id
+
+
+def _intersect(postings: List[array]) -> List[int]:
+    """File ids present in every posting list (shortest list first)."""
+    if not postings[0]:
+        return []
+    if not NUMPY_AVAILABLE:
+        ids = postings[0].tolist()
+        for posting in postings[1:]:
+            if not ids:
+                break
+            ids = [file_id for file_id in ids if _posting_has(posting, file_id)]
+        return ids
+    ids = np.frombuffer(postings[0], dtype=np.uint32).copy()
+    for posting in postings[1:]:
+        if not len(ids):
+            break
+        # The view must not outlive this call: an exported array cannot grow
+        view = np.frombuffer(posting, dtype=np.uint32)
+        pos = np.minimum(np.searchsorted(view, ids), len(view) - 1)
+        ids = ids[view[pos] == ids]
+        del view
+    return ids.tolist()
+
+
+class ContentIndex:
+    """
+    Trigram inverted index over text files in the workspace.
+
+    A content search intersects the posting lists of the pattern's trigrams
+    to get candidate files, which are then verified with an exact substring
+    test. Patterns shorter than three bytes cannot be pruned and fall back
+    to checking every indexed file.
+    
+    Trigrams are packed into one int and posting lists are sorted arrays of
+    int file ids. A (re)indexed file always gets a fresh, largest id, so
+    postings stay sorted by appending; removal bisects.
+    
+    Files the index skips (too large, binary or unreadable) and the excluded
+    directories it prunes are remembered, so searches can scan them directly
+    instead of silently missing them.
+    """
+    
+    def __init__(
+        self,
+        root: Path,
+        max_file_size: int = CONTENT_INDEX_MAX_FILE_SIZE,
+        exclude_dirs: Optional[Set[str]] = None
+    ):
+        self.root = Path(root).resolve()
+        self.max_file_size = max_file_size
+        self.exclude_dirs = exclude_dirs if exclude_dirs is not None else CONTENT_INDEX_EXCLUDE_DIRS
+        # path -> (mtime_ns, size, file id, the file's trigrams)
+        self._files: Dict[str, Tuple[int, int, int, array]] = {}
+        self._paths: Dict[int, str] = {}
+        self._postings: Dict[int, array] = {}
+        self._next_id = 0
+        self._skipped: Set[str] = set()
+        self._excluded: Set[str] = set()
+        self._lock = threading.Lock()
+        self.ready = False
+    
+    def covers(self, path: Path) -> bool:
+        try:
+            path.resolve().relative_to(self.root)
+            return True
+        except ValueError:
+            return False
+    
+    def _walk(self, excluded: Set[str]) -> Iterator[Path]:
+        """Files outside excluded dirs; the pruned dirs are added to `excluded`."""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            excluded.update(os.path.join(dirpath, d) for d in dirnames if d in self.exclude_dirs)
+            dirnames[:] = [d for d in dirnames if d not in self.exclude_dirs]
+            for name in filenames:
+                yield Path(dirpath) / name
+    
+    def note_excluded(self, path: Path):
+        """Record the excluded directory containing `path` (watcher events)."""
+        for i, part in enumerate(path.parts):
+            if part in self.exclude_dirs:
+                with self._lock:
+                    self._excluded.add(str(Path(*path.parts[:i + 1])))
+                return
+    
+    def build(self):
+        """Index every eligible file under the root (blocking)."""
+        excluded: Set[str] = set()
+        for path in self._walk(excluded):
+            self.update_file(path)
+        with self._lock:
+            self._excluded = excluded
+        self.ready = True
+        logger.info(f"Content index ready: {len(self._files)} files")
+    
+    def update_file(self, path: Path) -> bool:
+        """(Re)index one file if it changed; returns True if the index changed."""
+        key = str(path)
+        try:
+            stat = path.stat()
+        except OSError:
+            return self.remove_file(path)
+        if not path.is_file():
+            return self.remove_file(path)
+        if stat.st_size > self.max_file_size:
+            return self._skip(key)
+        with self._lock:
+            current = self._files.get(key)
+        if current and current[0] == stat.st_mtime_ns and current[1] == stat.st_size:
+            return False
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return self._skip(key)
+        if b"\0" in data[:8192]:
+            # Binary file
+            return self._skip(key)
+        grams = _trigrams(data)
+        with self._lock:
+            self._skipped.discard(key)
+            self._remove_locked(key)
+            file_id = self._next_id
+            self._next_id += 1
+            self._files[key] = (stat.st_mtime_ns, stat.st_size, file_id, grams)
+            self._paths[file_id] = key
+            postings = self._postings
+            for gram in grams:
+                posting = postings.get(gram)
+                if posting is None:
+                    postings[gram] = array("I", (file_id,))
+                else:
+                    posting.append(file_id)
+        return True
+    
+    def _remove_locked(self, key: str) -> bool:
+        entry = self._files.pop(key, None)
+        if entry is None:
+            return False
+        file_id = entry[2]
+        del self._paths[file_id]
+        for gram in entry[3]:
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            i = bisect.bisect_left(posting, file_id)
+            if i < len(posting) and posting[i] == file_id:
+                del posting[i]
+                if not posting:
+                    del self._postings[gram]
+        return True
+    
+    def _skip(self, key: str) -> bool:
+        """Drop a file the index cannot hold and remember to scan it directly."""
+        with self._lock:
+            self._skipped.add(key)
+            return self._remove_locked(key)
+    
+    def remove_file(self, path: Path) -> bool:
+        with self._lock:
+            self._skipped.discard(str(path))
+            return self._remove_locked(str(path))
+    
+    def rescan(self) -> int:
+        """Re-check every file against the index (polling watcher); returns changes."""
+        changed = 0
+        seen = set()
+        excluded: Set[str] = set()
+        for path in self._walk(excluded):
+            seen.add(str(path))
+            changed += self.update_file(path)
+        with self._lock:
+            stale = [key for key in self._files if key not in seen]
+            for key in stale:
+                self._remove_locked(key)
+            self._skipped &= seen
+            self._excluded = excluded
+        return changed + len(stale)
+    
+    def candidates(self, pattern: str, root: Path) -> List[str]:
+        """Indexed files under `root` that may contain `pattern`."""
+        needle = pattern.encode("utf-8")
+        prefix = str(root.resolve())
+        with self._lock:
+            if len(needle) < 3:
+                files = list(self._files)
+            else:
+                empty = array("I")
+                postings = sorted(
+                    (self._postings.get(gram, empty) for gram in _trigrams(needle)),
+                    key=len
+                )
+                files = [self._paths[file_id] for file_id in _intersect(postings)]
+        return sorted(_under(files, prefix))
+    
+    def uncovered(self, root: Path) -> Tuple[List[str], List[str]]:
+        """
+        Paths under `root` the index does not hold: (skipped files, excluded
+        dirs). If `root` itself lies in an excluded dir, that is the one dir.
+        """
+        prefix = str(root.resolve())
+        with self._lock:
+            for directory in self._excluded:
+                if prefix == directory or prefix.startswith(directory.rstrip(os.sep) + os.sep):
+                    return [], [prefix]
+            return sorted(_under(self._skipped, prefix)), sorted(_under(self._excluded, prefix))
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "root": str(self.root),
+                "files": len(self._files),
+                "trigrams": len(self._postings),
+                "skipped_files": len(self._skipped),
+                "excluded_dirs": len(self._excluded)
+            }
+
+
+def _under(paths: Iterable[str], prefix: str) -> Iterator[str]:
+    """Paths equal to or inside the directory `prefix`."""
+    base = prefix.rstrip(os.sep) + os.sep
+    return (p for p in paths if p == prefix or p.startswith(base))
+
+
+class ContentIndexWatcher:
+    """
+    Keeps a ContentIndex fresh.
+
+    Uses watchfiles for filesystem events when it is installed, otherwise
+    polls the tree every CONTENT_INDEX_POLL_SECONDS.
+    """
+    
+    def __init__(self, index: ContentIndex, poll_seconds: float = CONTENT_INDEX_POLL_SECONDS):
+        self.index = index
+        self.poll_seconds = poll_seconds
+        self._task: Optional[asyncio.Task] = None
+        self._stop = asyncio.Event()
+    
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self, timeout: float = 5.0):
+        # Let awatch exit through its stop event; cancelling it mid-wait
+        # would tear down the native watcher thread uncleanly.
+        self._stop.set()
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+            except Exception as e:
+                logger.warning(f"Content index watcher stopped with error: {e}")
+    
+    async def _run(self):
+        await asyncio.to_thread(self.index.build)
+        try:
+            from watchfiles import awatch, Change
+        except ImportError:
+            awatch = None
+        
+        if awatch is None:
+            while not self._stop.is_set():
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    await asyncio.to_thread(self.index.rescan)
+            return
+        
+        async for changes in awatch(self.index.root, stop_event=self._stop):
+            paths = {Path(p) for _, p in changes}
+            await asyncio.to_thread(self._apply, paths)
+    
+    def _apply(self, paths: Set[Path]):
+        for path in paths:
+            if any(part in self.index.exclude_dirs for part in path.parts):
+                self.index.note_excluded(path)
+                continue
+            if path.is_dir():
+                for child in path.rglob("*"):
+                    self.index.update_file(child)
+            else:
+                self.index.update_file(path)
+
+
 # =============================================================================
 # File Operations Service
 # =============================================================================
@@ -169,6 +651,10 @@ class FileService:
     def __init__(self, workspace_root: str = WORKSPACE_ROOT):
         self.workspace_root = Path(workspace_root)
         self.workspace_root.mkdir(parents=True, exist_ok=True)
+        self._line_indexes = LineIndexCache()
+        self.content_index: Optional[ContentIndex] = (
+            ContentIndex(self.workspace_root) if CONTENT_INDEX_ENABLED else None
+        )
         logger.info(f"FileService initialized with workspace: {self.workspace_root}")
     
     def _resolve_path(self, path: str) -> Path:
@@ -187,7 +673,7 @@ class FileService:
         return p
     
     async def read_file(self, request: ReadRequest) -> Dict[str, Any]:
-        """Read file content."""
+        """Read file content, optionally limited to a line or byte range."""
         path = self._resolve_path(request.path)
         
         if not path.exists():
@@ -197,8 +683,14 @@ class FileService:
             raise ValueError(f"Not a file: {path}")
         
         try:
+            ranged = (
+                request.offset is not None or request.length is not None
+                or request.start_line is not None or request.end_line is not None
+            )
+            if ranged:
+                return await asyncio.to_thread(self._read_range, path, request)
+            
             if request.binary:
-                import base64
                 content = path.read_bytes()
                 return {
                     "success": True,
@@ -209,12 +701,6 @@ class FileService:
                 }
             else:
                 lines = path.read_text(encoding=request.encoding).splitlines()
-                
-                if request.start_line is not None or request.end_line is not None:
-                    start = (request.start_line or 1) - 1
-                    end = request.end_line or len(lines)
-                    lines = lines[start:end]
-                
                 content = '\n'.join(lines)
                 return {
                     "success": True,
@@ -228,6 +714,92 @@ class FileService:
             logger.error(f"Read error: {e}")
             raise
     
+    def byte_range(
+        self,
+        path: Path,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        start_line: Optional[int] = None,
+        end_line: Optional[int] = None
+    ) -> Tuple[int, int, int, Optional[int]]:
+        """
+        Translate a byte or 1-based inclusive line range into [start, end).
+        
+        Returns (start, end, file_size, total_lines); total_lines is only
+        known when a line range was used.
+        """
+        f, mm, size = _open_mmap(path)
+        try:
+            total_lines = None
+            if offset is not None or length is not None:
+                start = min(max(0, offset or 0), size)
+                end = size if length is None else min(size, start + max(0, length))
+            elif mm is None:
+                start, end, total_lines = 0, 0, 0
+            else:
+                index = self._line_indexes.get(path, mm, size, os.fstat(f.fileno()))
+                total_lines = index.total_lines
+                first = max(0, (start_line or 1) - 1)
+                last = total_lines if end_line is None else max(first, end_line)
+                start = index.line_offset(mm, first)
+                end = index.line_offset(mm, last)
+            return start, end, size, total_lines
+        finally:
+            if mm is not None:
+                mm.close()
+            f.close()
+    
+    def iter_range(self, path: Path, start: int, end: int, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield bytes [start, end) of a file in chunks."""
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    
+    def _read_range(self, path: Path, request: ReadRequest) -> Dict[str, Any]:
+        """Read only the requested slice of a file (blocking)."""
+        start, end, size, total_lines = self.byte_range(
+            path, request.offset, request.length, request.start_line, request.end_line
+        )
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        
+        result = {
+            "success": True,
+            "path": str(path),
+            "offset": start,
+            "length": len(data),
+            "total_size": size
+        }
+        if total_lines is not None:
+            result["total_lines"] = total_lines
+        
+        if request.binary:
+            result.update({
+                "content": base64.b64encode(data).decode('ascii'),
+                "encoding": "base64",
+                "size": len(data)
+            })
+            return result
+        
+        # A byte range may split a multi-byte character at either edge
+        errors = "replace" if total_lines is None else "strict"
+        lines = data.decode(request.encoding, errors=errors).splitlines()
+        content = '\n'.join(lines)
+        result.update({
+            "content": content,
+            "encoding": request.encoding,
+            "lines": len(lines),
+            "size": len(content)
+        })
+        return result
+    
     async def write_file(self, request: WriteRequest) -> Dict[str, Any]:
         """Write content to file."""
         path = self._resolve_path(request.path)
@@ -398,38 +970,109 @@ class FileService:
         try:
             results = []
             
-            if request.recursive:
-                iterator = root.rglob(request.pattern)
+            index = self.content_index
+            excluded: List[str] = []
+            if request.content_pattern and index and index.ready and index.covers(root):
+                iterator, excluded = self._indexed_candidates(root, request)
+                indexed = True
             else:
-                iterator = root.glob(request.pattern)
+                if request.recursive:
+                    iterator = root.rglob(request.pattern)
+                else:
+                    iterator = root.glob(request.pattern)
+                indexed = False
             
+            needle = request.content_pattern.encode("utf-8") if request.content_pattern else None
             for item in iterator:
                 if len(results) >= request.max_results:
                     break
                 
                 # Content search if specified
-                if request.content_pattern and item.is_file():
-                    try:
-                        content = item.read_text(errors='ignore')
-                        if request.content_pattern not in content:
-                            continue
-                    except OSError:
+                if needle and item.is_file():
+                    if not await asyncio.to_thread(_file_contains, item, needle):
                         continue
                 
                 info = await self.get_file_info(str(item))
                 results.append(info)
             
+            # Excluded dirs are not indexed; walking them is a full scan, so it
+            # only happens on request and off the event loop
+            scanned = bool(excluded) and request.scan_excluded
+            if scanned and len(results) < request.max_results:
+                found = await asyncio.to_thread(
+                    self._scan_excluded, root, request, excluded, needle,
+                    request.max_results - len(results)
+                )
+                for item in found:
+                    results.append(await self.get_file_info(str(item)))
+            
             return {
                 "success": True,
                 "root": str(root),
                 "pattern": request.pattern,
                 "count": len(results),
+                "indexed": indexed,
+                "excluded_dirs": excluded,
+                "excluded_scanned": scanned,
                 "results": results
             }
         except Exception as e:
             logger.error(f"Search error: {e}")
             raise
     
+    @staticmethod
+    def _glob_matcher(root: Path, request: SearchRequest):
+        """Predicate: does a path's location relative to root match the request glob."""
+        depth = len(PurePath(request.pattern).parts)
+        resolved_root = root.resolve()
+        
+        def matches(path: str) -> bool:
+            relative = Path(path).relative_to(resolved_root)
+            if not request.recursive and len(relative.parts) != depth:
+                return False
+            return relative.match(request.pattern)
+        
+        return matches
+    
+    def _indexed_candidates(self, root: Path, request: SearchRequest) -> Tuple[Iterator[Path], List[str]]:
+        """
+        Files under root whose relative path matches the glob: the index
+        candidates, then the files the index skipped, which are checked
+        directly. Also returns the excluded dirs in scope, which are not
+        indexed and are only walked on request (_scan_excluded).
+        """
+        matches = self._glob_matcher(root, request)
+        candidates = self.content_index.candidates(request.content_pattern, root)
+        skipped, excluded = self.content_index.uncovered(root)
+        if not request.recursive:
+            depth = len(PurePath(request.pattern).parts)
+            resolved_root = root.resolve()
+            excluded = [
+                d for d in excluded if len(Path(d).relative_to(resolved_root).parts) < depth
+            ]
+        iterator = (Path(path) for paths in (candidates, skipped) for path in paths if matches(path))
+        return iterator, excluded
+    
+    def _scan_excluded(
+        self, root: Path, request: SearchRequest, excluded: List[str],
+        needle: Optional[bytes], limit: int
+    ) -> List[Path]:
+        """Walk excluded dirs for matching files containing needle (blocking)."""
+        matches = self._glob_matcher(root, request)
+        found: List[Path] = []
+        for directory in excluded:
+            for dirpath, _, filenames in os.walk(directory):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    if not matches(path):
+                        continue
+                    if needle and not _file_contains(Path(path), needle):
+                        continue
+                    found.append(Path(path))
+                    if len(found) >= limit:
+                        return found
+        return found
+    
     async def get_file_info(self, path: str) -> Dict[str, Any]:
         """Get file information."""
         p = self._resolve_path(path)
@@ -571,10 +1214,26 @@ class FileService:
 # FastAPI Application
 # =============================================================================
 
+file_service = FileService()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the content index watcher when indexing is enabled."""
+    watcher = None
+    if file_service.content_index is not None:
+        watcher = ContentIndexWatcher(file_service.content_index)
+        watcher.start()
+    yield
+    if watcher is not None:
+        await watcher.stop()
+
+
 app = FastAPI(
     title=f"Node {NODE_ID}: {NODE_NAME}",
     description="File operations service for UFO Galaxy",
-    version="5.0.0"
+    version="5.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -585,8 +1244,6 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
-file_service = FileService()
-
 
 @app.get("/health")
 async def health_check():
@@ -595,6 +1252,7 @@ async def health_check():
         "status": "healthy",
         "node_id": NODE_ID,
         "node_name": NODE_NAME,
+        "content_index": file_service.content_index.stats() if file_service.content_index else None,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -741,6 +1399,53 @@ async def download_file(path: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/stream")
+async def stream_file(
+    path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    range_header: Optional[str] = Header(None, alias="Range")
+):
+    """Stream a file, or a byte/line range of it, in chunks (supports Range)."""
+    p = file_service._resolve_path(path)
+    if not p.exists() or not p.is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    chunk_size = max(4096, min(chunk_size, 8 * 1024 * 1024))
+    media_type = mimetypes.guess_type(str(p))[0] or "application/octet-stream"
+    status_code = 200
+    try:
+        start, end, size, _ = await asyncio.to_thread(
+            file_service.byte_range, p, offset, length, start_line, end_line
+        )
+        headers = {"Accept-Ranges": "bytes"}
+        if range_header:
+            parsed = _parse_range_header(range_header, size)
+            if parsed is None:
+                raise HTTPException(
+                    status_code=416, detail="Range not satisfiable",
+                    headers={"Content-Range": f"bytes */{size}"}
+                )
+            start, end = parsed
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        headers["Content-Length"] = str(end - start)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return StreamingResponse(
+        file_service.iter_range(p, start, end, chunk_size),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+
 if __name__ == "__main__":
     logger.info(f"Starting Node {NODE_ID}: {NODE_NAME} on port {NODE_PORT}")
     uvicorn.run(app, host="0.0.0.0", port=NODE_PORT)
@@ -18,16 +18,28 @@ import asyncio
 import logging
 import json
 import os
+import sys
 import time
 import base64
+import hashlib
 import io
 import traceback
+from collections import OrderedDict
 from enum import Enum
 from dataclasses import dataclass, field
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from PIL import Image
 from aiohttp import web
 
+# 共享图像预处理池位于仓库根目录的 core 包中；独立部署（仅复制本目录）时降级为线程池
+_project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if _project_root not in sys.path:
+    sys.path.append(_project_root)
+try:
+    from core.image_preprocess import get_image_preprocess_pool
+except ImportError:
+    get_image_preprocess_pool = None
+
 # ==============================================================================
 # 日志配置
 # ==============================================================================
@@ -103,6 +115,15 @@ class OCRConfig:
     jpeg_quality: int = 85
     request_timeout: int = 60
     max_concurrent_requests: int = 10
+    batch_window_size: int = 4  # 批量请求同时在途的图像数量上限
+
+    # 结果缓存配置（精确内容哈希 + 感知哈希）
+    ocr_cache_enabled: bool = True
+    ocr_cache_max_entries: int = 512
+    ocr_cache_ttl_seconds: int = 600
+    # 感知哈希汉明距离阈值，默认 0 只做精确匹配。dHash 看不出计数器、时间戳
+    # 这类小块文字变化，开启后内容不同的截图可能命中彼此的识别结果
+    ocr_cache_phash_threshold: int = 0
 
     config_file_path: str = "config.json"
 
@@ -217,8 +238,30 @@ class DeepSeekOCR2Client:
                 },
             )
 
-    def _prepare_image(self, image_bytes: bytes) -> str:
-        """预处理图像并转为 base64"""
+    async def _prepare_image(self, image_bytes: bytes) -> str:
+        """
+        预处理图像并转为 base64
+
+        解码、缩放和重编码在共享预处理池中执行，不阻塞事件循环；
+        尺寸已合规的 JPEG 跳过重编码。
+        """
+        if get_image_preprocess_pool is not None:
+            prepared = await get_image_preprocess_pool().prepare(
+                image_bytes,
+                max_size=self.config.max_image_size,
+                quality=self.config.jpeg_quality,
+                target_format="JPEG",
+                keep_formats=("JPEG",),
+                encode_base64=True,
+            )
+            if prepared.reencoded:
+                logger.info(f"图像已预处理为 {prepared.width}x{prepared.height} JPEG")
+            return prepared.to_base64()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._prepare_image_sync, image_bytes)
+
+    def _prepare_image_sync(self, image_bytes: bytes) -> str:
+        """预处理图像并转为 base64（同步版本，预处理池不可用时在线程中执行）"""
         image = Image.open(io.BytesIO(image_bytes))
 
         # 限制最大尺寸
@@ -263,7 +306,7 @@ class DeepSeekOCR2Client:
 
         try:
             # 准备图像
-            image_b64 = self._prepare_image(image_bytes)
+            image_b64 = await self._prepare_image(image_bytes)
 
             # 构建 prompt
             if custom_prompt:
@@ -462,6 +505,182 @@ class TesseractEngine:
             return {"success": False, "error": str(e)}
 
 
+# ==============================================================================
+# OCR 结果缓存
+# ==============================================================================
+
+def compute_dhash(image_bytes: bytes, hash_size: int = 8) -> int:
+    """
+    计算图像的差值感知哈希 (dHash)
+
+    将图像缩为 (hash_size+1) x hash_size 的灰度图，比较相邻像素亮度得到
+    hash_size*hash_size 位整数。几乎相同的截图（时钟、光标、通知角标变化）
+    得到的哈希只相差少数几位。
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    # JPEG 可直接按缩小尺寸解码，避免解出整张全分辨率图像
+    image.draft("L", ((hash_size + 1) * 8, hash_size * 8))
+    small = image.convert("L").resize(
+        (hash_size + 1, hash_size), Image.Resampling.BILINEAR
+    )
+    pixels = small.tobytes()
+    width = hash_size + 1
+    value = 0
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+@dataclass
+class _CacheEntry:
+    digest: str
+    phash: Optional[int]
+    result: Dict[str, Any]
+    created_at: float
+
+
+class OCRResultCache:
+    """
+    OCR 结果缓存
+
+    两级查找：
+      1. 精确匹配：图像内容 SHA-256 + 识别参数（模式/引擎/语言/prompt）
+      2. 感知匹配（可选，phash_threshold > 0 时启用）：同一组识别参数下，
+         dHash 汉明距离不超过阈值的条目
+
+    每组识别参数（即每种模式）拥有独立的条目集合，LRU 淘汰并带 TTL。
+    只缓存主引擎成功的识别结果，降级引擎的结果不入缓存。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 600,
+        phash_threshold: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.phash_threshold = phash_threshold
+        # (参数键, 内容摘要) -> 条目，按最近使用排序
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        # 参数键 -> {内容摘要: 感知哈希}，用于感知匹配扫描
+        self._phash_index: Dict[str, Dict[str, int]] = {}
+        self._stats = {
+            "exact_hits": 0,
+            "perceptual_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def content_digest(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    @staticmethod
+    def params_key(
+        mode: OCRMode,
+        engine: OCREngine,
+        language: str,
+        custom_prompt: Optional[str],
+    ) -> str:
+        prompt_digest = (
+            hashlib.sha1(custom_prompt.encode("utf-8")).hexdigest()[:16]
+            if custom_prompt
+            else ""
+        )
+        return f"{mode.value}|{engine.value}|{language}|{prompt_digest}"
+
+    def _expired(self, entry: _CacheEntry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _remove(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+        bucket = self._phash_index.get(key[0])
+        if bucket is not None:
+            bucket.pop(key[1], None)
+            if not bucket:
+                del self._phash_index[key[0]]
+
+    def _hit(self, key: Tuple[str, str], kind: str, distance: int = 0) -> Dict[str, Any]:
+        self._entries.move_to_end(key)
+        self._stats[f"{kind}_hits"] += 1
+        result = dict(self._entries[key].result)
+        result["cached"] = True
+        result["cache_match"] = kind
+        if kind == "perceptual":
+            result["cache_distance"] = distance
+        return result
+
+    def get_exact(self, params_key: str, digest: str) -> Optional[Dict[str, Any]]:
+        """按内容摘要精确查找"""
+        key = (params_key, digest)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._expired(entry, time.time()):
+            self._remove(key)
+            return None
+        return self._hit(key, "exact")
+
+    def get_perceptual(self, params_key: str, phash: int) -> Optional[Dict[str, Any]]:
+        """在同一参数组内查找汉明距离最近且不超过阈值的条目"""
+        if self.phash_threshold <= 0:
+            return None
+        bucket = self._phash_index.get(params_key)
+        best_digest, best_distance = None, self.phash_threshold + 1
+        if bucket:
+            for digest, candidate in bucket.items():
+                distance = (candidate ^ phash).bit_count()
+                if distance < best_distance:
+                    best_digest, best_distance = digest, distance
+                    if distance == 0:
+                        break
+        if best_digest is None:
+            return None
+        key = (params_key, best_digest)
+        if self._expired(self._entries[key], time.time()):
+            self._remove(key)
+            return None
+        return self._hit(key, "perceptual", best_distance)
+
+    def record_miss(self):
+        self._stats["misses"] += 1
+
+    def put(
+        self,
+        params_key: str,
+        digest: str,
+        phash: Optional[int],
+        result: Dict[str, Any],
+    ):
+        """写入识别结果，超出容量时淘汰最久未使用的条目"""
+        key = (params_key, digest)
+        self._remove(key)
+        self._entries[key] = _CacheEntry(digest, phash, dict(result), time.time())
+        if phash is not None:
+            self._phash_index.setdefault(params_key, {})[digest] = phash
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._phash_index.clear()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        hits = self._stats["exact_hits"] + self._stats["perceptual_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
 # ==============================================================================
 # OCR 服务节点
 # ==============================================================================
@@ -486,6 +705,9 @@ class OCRNode:
         # 并发控制
         self._semaphore: Optional[asyncio.Semaphore] = None
 
+        # 结果缓存
+        self.result_cache: Optional[OCRResultCache] = None
+
         # 统计
         self._start_time = time.time()
 
@@ -505,6 +727,13 @@ class OCRNode:
 
         self._semaphore = asyncio.Semaphore(self.config.max_concurrent_requests)
 
+        if self.config.ocr_cache_enabled:
+            self.result_cache = OCRResultCache(
+                max_entries=self.config.ocr_cache_max_entries,
+                ttl_seconds=self.config.ocr_cache_ttl_seconds,
+                phash_threshold=self.config.ocr_cache_phash_threshold,
+            )
+
         # 初始化 DeepSeek OCR 2
         self.deepseek_client = DeepSeekOCR2Client(self.config)
         deepseek_ok = await self.deepseek_client.initialize()
@@ -583,6 +812,7 @@ class OCRNode:
         engine: OCREngine = OCREngine.AUTO,
         language: str = "auto",
         custom_prompt: Optional[str] = None,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         执行 OCR 识别
@@ -593,10 +823,65 @@ class OCRNode:
             engine: 指定引擎（AUTO 自动选择）
             language: 语言
             custom_prompt: 自定义 prompt
+            use_cache: 是否使用结果缓存（重复截图直接返回缓存结果，不再推理）
 
         返回:
             识别结果字典
         """
+        cache = self.result_cache if use_cache else None
+        if cache is None:
+            return await self._run_engines(
+                image_bytes, mode, engine, language, custom_prompt
+            )
+
+        params_key = OCRResultCache.params_key(mode, engine, language, custom_prompt)
+        digest = OCRResultCache.content_digest(image_bytes)
+        cached = cache.get_exact(params_key, digest)
+        if cached is not None:
+            return cached
+
+        phash = None
+        if cache.phash_threshold > 0:
+            try:
+                loop = asyncio.get_running_loop()
+                phash = await loop.run_in_executor(None, compute_dhash, image_bytes)
+            except Exception as e:
+                logger.debug(f"感知哈希计算失败，仅使用精确缓存: {e}")
+        if phash is not None:
+            cached = cache.get_perceptual(params_key, phash)
+            if cached is not None:
+                return cached
+        cache.record_miss()
+
+        result = await self._run_engines(
+            image_bytes, mode, engine, language, custom_prompt
+        )
+        if self._cacheable(engine, result):
+            cache.put(params_key, digest, phash, result)
+        return result
+
+    @staticmethod
+    def _cacheable(engine: OCREngine, result: Dict[str, Any]) -> bool:
+        """
+        只缓存主引擎的成功结果
+
+        DeepSeek 失败后的 Tesseract 降级结果，以及 AUTO 在 DeepSeek 不可用时
+        选中 Tesseract 的结果，都不能以同一参数键缓存，否则主引擎恢复后
+        仍会一直返回降级质量的文本。
+        """
+        if not result.get("success") or result.get("fallback"):
+            return False
+        return engine == OCREngine.TESSERACT or result.get("engine") != "tesseract"
+
+    async def _run_engines(
+        self,
+        image_bytes: bytes,
+        mode: OCRMode,
+        engine: OCREngine,
+        language: str,
+        custom_prompt: Optional[str],
+    ) -> Dict[str, Any]:
+        """选择引擎并执行识别（含降级逻辑）"""
         async with self._semaphore:
             # 自动选择引擎
             if engine == OCREngine.AUTO:
@@ -685,7 +970,49 @@ class OCRNode:
             logger.error(f"OCR 请求处理失败: {e}")
             return web.json_response({"error": str(e)}, status=500)
 
-    async def handle_ocr_batch(self, request: web.Request) -> web.Response:
+    async def _iter_batch(
+        self,
+        images: List[str],
+        mode: OCRMode,
+        language: str,
+        window: int,
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        以有界窗口并发处理批量图像，按完成顺序产出 (序号, 结果)
+
+        图像在进入窗口时才解码 base64，任意时刻最多 window 张图像在途，
+        大批量请求不会一次性占满内存或挤占单图请求的并发额度。
+        """
+
+        async def run_one(index: int, img_b64: str) -> Tuple[int, Dict[str, Any]]:
+            try:
+                img_bytes = base64.b64decode(img_b64)
+                return index, await self.perform_ocr(
+                    img_bytes, mode, OCREngine.AUTO, language
+                )
+            except Exception as e:
+                return index, {"success": False, "error": str(e)}
+
+        pending = set()
+        next_index = 0
+        window = max(1, window)
+        try:
+            while next_index < len(images) or pending:
+                while next_index < len(images) and len(pending) < window:
+                    pending.add(
+                        asyncio.create_task(run_one(next_index, images[next_index]))
+                    )
+                    next_index += 1
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def handle_ocr_batch(self, request: web.Request) -> web.StreamResponse:
         """
         POST /ocr/batch - 批量 OCR 识别
         
@@ -693,8 +1020,13 @@ class OCRNode:
         {
             "images": ["base64_1", "base64_2", ...],
             "mode": "free_ocr",
-            "language": "auto"
+            "language": "auto",
+            "stream": false,
+            "window": 4
         }
+
+        stream 为 true（或 Accept: application/x-ndjson）时以 NDJSON 流式返回，
+        每完成一张图像输出一行 {"index": i, ...结果}，最后一行为汇总。
         """
         try:
             data = await request.json()
@@ -707,23 +1039,44 @@ class OCRNode:
             mode_str = data.get("mode", "free_ocr")
             mode = OCRMode(mode_str) if mode_str in [m.value for m in OCRMode] else OCRMode.FREE_OCR
             language = data.get("language", "auto")
+            window = min(
+                int(data.get("window", self.config.batch_window_size)),
+                self.config.max_concurrent_requests,
+            )
+            stream = bool(data.get("stream")) or (
+                "application/x-ndjson" in request.headers.get("Accept", "")
+            )
 
-            # 并发处理
-            tasks = []
-            for img_b64 in images:
-                img_bytes = base64.b64decode(img_b64)
-                tasks.append(
-                    self.perform_ocr(img_bytes, mode, OCREngine.AUTO, language)
+            if stream:
+                response = web.StreamResponse(
+                    headers={"Content-Type": "application/x-ndjson"}
                 )
+                await response.prepare(request)
+                # 响应头已发出，之后的错误只能以一行错误记录告知客户端
+                succeeded = 0
+                try:
+                    async for index, result in self._iter_batch(
+                        images, mode, language, window
+                    ):
+                        succeeded += 1 if result.get("success") else 0
+                        line = json.dumps({"index": index, **result}, ensure_ascii=False)
+                        await response.write(line.encode("utf-8") + b"\n")
+                    summary = {"done": True, "count": len(images), "succeeded": succeeded}
+                except Exception as e:
+                    logger.error(f"批量 OCR 流式输出失败: {e}")
+                    summary = {"done": False, "error": str(e), "succeeded": succeeded}
+                try:
+                    await response.write(
+                        json.dumps(summary, ensure_ascii=False).encode("utf-8") + b"\n"
+                    )
+                    await response.write_eof()
+                except (ConnectionError, RuntimeError) as e:
+                    logger.debug(f"批量 OCR 客户端已断开: {e}")
+                return response
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            processed = []
-            for r in results:
-                if isinstance(r, Exception):
-                    processed.append({"success": False, "error": str(r)})
-                else:
-                    processed.append(r)
+            processed: List[Optional[Dict[str, Any]]] = [None] * len(images)
+            async for index, result in self._iter_batch(images, mode, language, window):
+                processed[index] = result
 
             return web.json_response(
                 {"success": True, "count": len(processed), "results": processed}
@@ -857,7 +1210,11 @@ class OCRNode:
                     "fallback_engine": self.config.fallback_engine,
                     "default_mode": self.config.default_mode,
                     "max_concurrent": self.config.max_concurrent_requests,
+                    "batch_window_size": self.config.batch_window_size,
                 },
+                "cache": (
+                    self.result_cache.stats if self.result_cache else {"enabled": False}
+                ),
             }
         )
 
@@ -959,6 +1316,8 @@ class OCRNode:
         """关闭服务"""
         if self.deepseek_client:
             await self.deepseek_client.close()
+        if get_image_preprocess_pool is not None:
+            get_image_preprocess_pool().shutdown(wait=False)
         self.status = NodeStatus.STOPPED
 
 
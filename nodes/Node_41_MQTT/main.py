@@ -5,7 +5,12 @@ Node 41: MQTT - MQTT消息队列节点
 """
 import os
 import json
+import heapq
 import asyncio
+import logging
+import itertools
+import threading
+from collections import OrderedDict, deque
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Callable
 from fastapi import FastAPI, HTTPException, WebSocket
@@ -27,6 +32,10 @@ MQTT_BROKER = os.getenv("MQTT_BROKER", "localhost")
 MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
 MQTT_USERNAME = os.getenv("MQTT_USERNAME", "")
 MQTT_PASSWORD = os.getenv("MQTT_PASSWORD", "")
+MQTT_TOPIC_BUFFER = int(os.getenv("MQTT_TOPIC_BUFFER", "100"))
+MQTT_MAX_TOPICS = int(os.getenv("MQTT_MAX_TOPICS", "10000"))
+
+logger = logging.getLogger("Node_41_MQTT")
 
 class MQTTMessage(BaseModel):
     topic: str
@@ -38,13 +47,239 @@ class MQTTSubscribeRequest(BaseModel):
     topic: str
     qos: int = 0
 
+class TopicTrie:
+    """
+    订阅主题前缀树，按层级匹配通配符 (+ / #)，匹配代价与主题深度成正比。
+
+    读操作（paho 网络线程上的 match）不加锁：写操作在锁内以写时复制的方式
+    替换子节点字典和处理器元组，读者始终看到一致的快照。
+    """
+
+    class _Node:
+        __slots__ = ("children", "handlers")
+
+        def __init__(self):
+            self.children: Dict[str, "TopicTrie._Node"] = {}
+            self.handlers: tuple = ()
+
+    def __init__(self):
+        self._root = self._Node()
+        self._lock = threading.Lock()
+        self._count = 0
+
+    def add(self, topic_filter: str, handler: Callable):
+        """注册处理器"""
+        with self._lock:
+            node = self._root
+            for level in topic_filter.split("/"):
+                child = node.children.get(level)
+                if child is None:
+                    child = self._Node()
+                    node.children = {**node.children, level: child}
+                node = child
+            if handler not in node.handlers:
+                node.handlers = node.handlers + (handler,)
+                self._count += 1
+
+    def remove(self, topic_filter: str, handler: Optional[Callable] = None) -> int:
+        """移除处理器（handler 为 None 时移除该主题的全部处理器），返回移除数量"""
+        with self._lock:
+            path = [self._root]
+            levels = topic_filter.split("/")
+            for level in levels:
+                child = path[-1].children.get(level)
+                if child is None:
+                    return 0
+                path.append(child)
+            node = path[-1]
+            before = len(node.handlers)
+            node.handlers = () if handler is None else tuple(h for h in node.handlers if h != handler)
+            removed = before - len(node.handlers)
+            self._count -= removed
+            # 剪掉空分支
+            for depth in range(len(levels), 0, -1):
+                node = path[depth]
+                if node.handlers or node.children:
+                    break
+                parent = path[depth - 1]
+                parent.children = {k: v for k, v in parent.children.items() if k != levels[depth - 1]}
+            return removed
+
+    def match(self, topic: str) -> List[Callable]:
+        """返回所有订阅过滤器匹配该主题的处理器"""
+        levels = topic.split("/")
+        # 以 $ 开头的系统主题不被首层通配符匹配
+        system = topic.startswith("$")
+        matched: List[Callable] = []
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            children = node.children
+            wildcard_ok = not (system and depth == 0)
+            if wildcard_ok:
+                multi = children.get("#")
+                if multi is not None:
+                    matched.extend(multi.handlers)
+            if depth == len(levels):
+                matched.extend(node.handlers)
+                continue
+            exact = children.get(levels[depth])
+            if exact is not None:
+                stack.append((exact, depth + 1))
+            if wildcard_ok:
+                single = children.get("+")
+                if single is not None:
+                    stack.append((single, depth + 1))
+        return matched
+
+    def __len__(self) -> int:
+        return self._count
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """单个过滤器的匹配判断（不依赖 paho）"""
+    if topic.startswith("$") and topic_filter[:1] in ("+", "#"):
+        return False
+    filter_levels = topic_filter.split("/")
+    topic_levels = topic.split("/")
+    for i, level in enumerate(filter_levels):
+        if level == "#":
+            return True
+        if i >= len(topic_levels) or (level != "+" and level != topic_levels[i]):
+            return False
+    return len(filter_levels) == len(topic_levels)
+
+
+class MessageStore:
+    """
+    消息存储：每个主题一个定长环形缓冲，外加一个全局最近消息环。
+
+    写入 O(1)，不会复制已有消息；主题数超过上限时淘汰最久未更新的主题。
+    """
+
+    def __init__(self, per_topic: int = 100, max_topics: int = 10000, recent: int = 1000):
+        self.per_topic = per_topic
+        self.max_topics = max_topics
+        self.recent: deque = deque(maxlen=recent)
+        self._topics: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self.evicted_topics = 0
+
+    def append(self, message: Dict[str, Any]):
+        topic = message["topic"]
+        with self._lock:
+            message["seq"] = next(self._seq)
+            ring = self._topics.get(topic)
+            if ring is None:
+                ring = self._topics[topic] = deque(maxlen=self.per_topic)
+                if len(self._topics) > self.max_topics:
+                    self._topics.popitem(last=False)
+                    self.evicted_topics += 1
+            else:
+                self._topics.move_to_end(topic)
+            ring.append(message)
+            self.recent.append(message)
+
+    def get(self, topic_filter: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """按主题过滤器取最近的消息（时间顺序）"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            if not topic_filter:
+                rings = [self.recent]
+            elif "+" in topic_filter or "#" in topic_filter:
+                rings = [r for t, r in self._topics.items() if topic_matches(topic_filter, t)]
+            else:
+                ring = self._topics.get(topic_filter)
+                rings = [ring] if ring is not None else []
+            # 在锁内复制尾部，避免与写入线程竞争
+            tails = [list(itertools.islice(r, max(0, len(r) - limit), None)) for r in rings]
+        if len(tails) == 1:
+            return tails[0]
+        merged = list(heapq.merge(*tails, key=lambda m: m["seq"]))
+        return merged[-limit:]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "topics": len(self._topics),
+            "recent": len(self.recent),
+            "per_topic_capacity": self.per_topic,
+            "evicted_topics": self.evicted_topics,
+        }
+
+
+class AsyncDispatcher:
+    """
+    把 paho 网络线程上收到的消息交给 asyncio 事件循环执行处理器。
+
+    网络线程只做入队；只有队列从空变为非空时才唤醒一次事件循环，
+    由事件循环批量取出执行。队列有上限，积压时丢弃最旧的待处理消息。
+    """
+
+    def __init__(self, max_pending: int = 100000):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: deque = deque()
+        self._max_pending = max_pending
+        self._scheduled = False
+        self._lock = threading.Lock()
+        self.dispatched = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+
+    def submit(self, handlers: List[Callable], message: Dict[str, Any]):
+        """由网络线程调用"""
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            self.dropped += 1
+            return
+        with self._lock:
+            if len(self._pending) >= self._max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append((handlers, message))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        loop.call_soon_threadsafe(self._drain)
+
+    def _drain(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = deque()
+            self._scheduled = False
+        for handlers, message in batch:
+            for handler in handlers:
+                try:
+                    result = handler(message)
+                    if asyncio.iscoroutine(result):
+                        self.loop.create_task(result)
+                except Exception as e:
+                    self.errors += 1
+                    logger.error(f"MQTT handler error on {message.get('topic')}: {e}")
+            self.dispatched += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
 class MQTTManager:
     def __init__(self):
         self.client = None
         self.connected = False
         self.subscriptions: Dict[str, int] = {}
-        self.messages: List[Dict] = []
-        self.message_handlers: Dict[str, List[Callable]] = {}
+        self.store = MessageStore(per_topic=MQTT_TOPIC_BUFFER, max_topics=MQTT_MAX_TOPICS)
+        self.handlers = TopicTrie()
+        self.dispatcher = AsyncDispatcher()
+        self.received = 0
         self._setup_client()
 
     def _setup_client(self):
@@ -68,30 +303,33 @@ class MQTTManager:
             self.client.subscribe(topic, qos)
 
     def _on_message(self, client, userdata, msg):
-        """消息回调"""
+        """消息回调（paho 网络线程）：写入环形缓冲，处理器交给事件循环执行"""
         message = {
             "topic": msg.topic,
-            "payload": msg.payload.decode(),
+            "payload": msg.payload.decode(errors="replace"),
             "qos": msg.qos,
             "retain": msg.retain,
             "timestamp": datetime.now().isoformat()
         }
-        self.messages.append(message)
-
-        # 限制消息数量
-        if len(self.messages) > 1000:
-            self.messages = self.messages[-1000:]
+        self.received += 1
+        self.store.append(message)
 
-        # 调用处理器
-        for topic, handlers in self.message_handlers.items():
-            if mqtt.topic_matches_sub(topic, msg.topic):
-                for handler in handlers:
-                    handler(message)
+        handlers = self.handlers.match(msg.topic)
+        if handlers:
+            self.dispatcher.submit(handlers, message)
 
     def _on_disconnect(self, client, userdata, rc):
         """断开回调"""
         self.connected = False
 
+    def add_handler(self, topic: str, handler: Callable):
+        """注册消息处理器（在事件循环中调用，可以是协程函数）"""
+        self.handlers.add(topic, handler)
+
+    def remove_handler(self, topic: str, handler: Callable = None) -> int:
+        """移除消息处理器"""
+        return self.handlers.remove(topic, handler)
+
     def connect(self, broker: str = None, port: int = None) -> bool:
         """连接MQTT代理"""
         if not MQTT_AVAILABLE:
@@ -100,6 +338,11 @@ class MQTTManager:
         broker = broker or MQTT_BROKER
         port = port or MQTT_PORT
 
+        try:
+            self.dispatcher.bind(asyncio.get_running_loop())
+        except RuntimeError:
+            pass
+
         try:
             self.client.connect(broker, port)
             self.client.loop_start()
@@ -146,16 +389,25 @@ class MQTTManager:
 
     def get_messages(self, topic: str = None, limit: int = 100) -> List[Dict]:
         """获取消息"""
-        messages = self.messages
-        if topic:
-            messages = [m for m in messages if mqtt.topic_matches_sub(topic, m["topic"])]
-        return messages[-limit:]
+        return self.store.get(topic, limit)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "handlers": len(self.handlers),
+            "store": self.store.stats(),
+            "dispatch": self.dispatcher.stats(),
+        }
 
 # 全局MQTT管理器
 mqtt_manager = MQTTManager()
 
 # ============ API 端点 ============
 
+@app.on_event("startup")
+async def startup_event():
+    mqtt_manager.dispatcher.bind(asyncio.get_running_loop())
+
 @app.get("/health")
 async def health():
     return {
@@ -165,6 +417,7 @@ async def health():
         "mqtt_available": MQTT_AVAILABLE,
         "connected": mqtt_manager.connected,
         "broker": MQTT_BROKER,
+        "stats": mqtt_manager.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -230,6 +483,26 @@ async def get_messages(topic: str = None, limit: int = 100):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.websocket("/ws")
+async def stream_messages(websocket: WebSocket, topic: str = "#"):
+    """按主题过滤器实时推送收到的消息"""
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1000)
+
+    def forward(message: Dict[str, Any]):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+    mqtt_manager.add_handler(topic, forward)
+    try:
+        while True:
+            await websocket.send_json(await queue.get())
+    except Exception:
+        pass
+    finally:
+        mqtt_manager.remove_handler(topic, forward)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8041)
@@ -3,17 +3,28 @@ Node 69: Backup & Disaster Recovery System
 UFO Galaxy 64-Core MCP Matrix - Phase 6: Immune System
 
 Automated backup with versioning and point-in-time recovery.
+
+Backups are chunked and content-addressed: node exports are streamed
+through a content-defined chunker, each chunk is stored once under its
+SHA-256 id, and every backup writes a small manifest that lists the chunk
+ids per node. Unchanged data is never written twice, incremental backups
+skip unchanged nodes via conditional requests, and restores can target a
+single node without reading the rest of the backup.
 """
 
 import os
 import json
+import base64
 import asyncio
 import logging
 import time
 import hashlib
 import gzip
 import shutil
-from typing import Dict, Optional, List, Any
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Optional, List, Any, Tuple
 from datetime import datetime, timedelta
 from contextlib import asynccontextmanager
 from enum import Enum
@@ -27,6 +38,12 @@ from pydantic import BaseModel, Field
 import uvicorn
 import httpx
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -42,6 +59,13 @@ MAX_BACKUPS = 10
 BACKUP_INTERVAL_HOURS = 6
 COMPRESSION_ENABLED = True
 
+# Chunking configuration (content-defined chunk boundaries)
+CHUNK_MIN_SIZE = int(os.getenv("BACKUP_CHUNK_MIN_SIZE", 2 * 1024))
+CHUNK_AVG_SIZE = int(os.getenv("BACKUP_CHUNK_AVG_SIZE", 8 * 1024))
+CHUNK_MAX_SIZE = int(os.getenv("BACKUP_CHUNK_MAX_SIZE", 64 * 1024))
+BACKUP_PARALLELISM = int(os.getenv("BACKUP_PARALLELISM", 8))
+MANIFEST_FORMAT = "chunked-v1"
+
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL),
     format=f"[Node {NODE_ID}] %(asctime)s - %(levelname)s - %(message)s"
@@ -84,6 +108,10 @@ class BackupMetadata:
     duration_seconds: float
     compression: bool
     path: str
+    parent_backup_id: Optional[str] = None
+    logical_size_bytes: int = 0
+    new_chunks: int = 0
+    reused_nodes: List[str] = field(default_factory=list)
 
 @dataclass
 class RestorePoint:
@@ -107,6 +135,295 @@ class RestoreRequest(BaseModel):
     target_nodes: Optional[List[str]] = None  # None = all nodes in backup
     validate_only: bool = False
 
+# =============================================================================
+# Chunk Store
+# =============================================================================
+
+def _build_gear_table() -> List[int]:
+    """Deterministic 64-bit gear table for the rolling hash."""
+    table = []
+    for i in range(256):
+        digest = hashlib.sha256(f"ufo-galaxy-gear-{i}".encode()).digest()
+        table.append(int.from_bytes(digest[:8], "big"))
+    return table
+
+_GEAR = _build_gear_table()
+_MASK64 = (1 << 64) - 1
+_GEAR_ARRAY = np.array(_GEAR, dtype=np.uint64) if NUMPY_AVAILABLE else None
+
+def _window_hashes(data: bytes) -> "np.ndarray":
+    """
+    Gear hash at every position over the last 64 bytes:
+    h[j] = sum(gear[data[j - k]] << k for k < 64), mod 2**64.
+    
+    Bytes more than 63 positions back are shifted out of the 64-bit hash,
+    so this equals the rolling hash wherever at least 64 bytes were rolled
+    in. Built by doubling the window width (1, 2, 4, ... 64).
+    """
+    h = _GEAR_ARRAY[np.frombuffer(data, dtype=np.uint8)]
+    width = 1
+    while width < 64:
+        shifted = np.zeros_like(h)
+        shifted[width:] = h[:-width]
+        shifted <<= np.uint64(width)
+        h += shifted
+        width *= 2
+    return h
+
+class ContentDefinedChunker:
+    """
+    Gear rolling-hash chunker (FastCDC style).
+
+    Boundaries depend on content rather than offsets, so an insertion only
+    changes the chunks around it and the rest of the stream still dedupes.
+    Feed data with update() and call finish() at end of stream.
+    
+    With numpy the hash is computed for a whole buffer at once, and update()
+    waits until a few maximum-size chunks are buffered so small reads do not
+    re-hash the same bytes. Boundaries are identical to the pure-Python scan.
+    """
+    
+    def __init__(
+        self,
+        min_size: int = CHUNK_MIN_SIZE,
+        avg_size: int = CHUNK_AVG_SIZE,
+        max_size: int = CHUNK_MAX_SIZE
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        bits = max(1, avg_size.bit_length() - 1)
+        # Use the high bits so a boundary depends on the last ~64 bytes
+        self.mask = ((1 << bits) - 1) << (64 - bits)
+        self._buffer = bytearray()
+        self._scan = 0
+        self._hash = 0
+        self._batch_size = 4 * max_size if NUMPY_AVAILABLE else 0
+    
+    def update(self, data: bytes) -> List[bytes]:
+        """Add data and return any chunks that are now complete."""
+        self._buffer.extend(data)
+        if len(self._buffer) < self._batch_size:
+            return []
+        return self._cut(final=False)
+    
+    def finish(self) -> List[bytes]:
+        """Flush the remaining data as the final chunk."""
+        return self._cut(final=True)
+    
+    def _cut(self, final: bool) -> List[bytes]:
+        if NUMPY_AVAILABLE:
+            return self._cut_vectorized(final)
+        return self._cut_scalar(final)
+    
+    def _cut_vectorized(self, final: bool) -> List[bytes]:
+        buf = self._buffer
+        gear = _GEAR
+        mask = self.mask
+        n = len(buf)
+        chunks = []
+        start = 0
+        hits = None
+        
+        while True:
+            first = start + self.min_size
+            limit = min(n, start + self.max_size)
+            cut = -1
+            # The hash restarts at first, so the next 63 positions have seen
+            # fewer than 64 bytes and are rolled one by one
+            warm = min(limit, first + 63)
+            h = 0
+            i = first
+            while i < warm:
+                h = ((h << 1) + gear[buf[i]]) & _MASK64
+                i += 1
+                if not h & mask:
+                    cut = i
+                    break
+            if cut < 0 and warm < limit:
+                if hits is None:
+                    hashes = _window_hashes(bytes(buf))
+                    hits = np.flatnonzero((hashes & np.uint64(mask)) == 0)
+                k = int(np.searchsorted(hits, warm))
+                if k < len(hits) and hits[k] < limit:
+                    cut = int(hits[k]) + 1
+            if cut < 0 and limit == start + self.max_size:
+                cut = limit
+            if cut < 0:
+                break
+            chunks.append(bytes(buf[start:cut]))
+            start = cut
+        
+        if final and start < n:
+            chunks.append(bytes(buf[start:]))
+            start = n
+        
+        del buf[:start]
+        return chunks
+    
+    def _cut_scalar(self, final: bool) -> List[bytes]:
+        buf = self._buffer
+        gear = _GEAR
+        mask = self.mask
+        n = len(buf)
+        chunks = []
+        start = 0
+        i = self._scan
+        h = self._hash
+        
+        while True:
+            if i < start + self.min_size:
+                i = start + self.min_size
+                h = 0
+            limit = min(n, start + self.max_size)
+            cut = -1
+            while i < limit:
+                h = ((h << 1) + gear[buf[i]]) & _MASK64
+                i += 1
+                if not h & mask:
+                    cut = i
+                    break
+            if cut < 0 and limit == start + self.max_size:
+                cut = limit
+            if cut < 0:
+                break
+            chunks.append(bytes(buf[start:cut]))
+            start = cut
+            h = 0
+        
+        if final and start < n:
+            chunks.append(bytes(buf[start:]))
+            start = n
+            i = n
+            h = 0
+        
+        del buf[:start]
+        self._scan = i - start
+        self._hash = h
+        return chunks
+
+class ChunkStore:
+    """
+    Content-addressed chunk storage.
+
+    Chunks are stored zlib-compressed under chunks/<id[:2]>/<id>, where the id
+    is the SHA-256 of the uncompressed chunk. Writing a chunk that already
+    exists is a no-op.
+    
+    A backup only records its chunk references once all of its chunks are
+    stored, so until then it holds reservations: put() and reserve() take
+    one, release() drops it, and delete() skips reserved chunks. A chunk a
+    running backup has just deduplicated against therefore cannot be
+    garbage-collected underneath it.
+    """
+    
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._reserved: Counter = Counter()
+        self._lock = threading.Lock()
+    
+    def _path(self, chunk_id: str) -> Path:
+        return self.root / chunk_id[:2] / chunk_id
+    
+    def has(self, chunk_id: str) -> bool:
+        return self._path(chunk_id).exists()
+    
+    def put(self, data: bytes, compress_level: int = 6) -> Tuple[str, int]:
+        """
+        Store a chunk and reserve it until release().
+        
+        Returns (chunk_id, bytes written; 0 if deduplicated).
+        """
+        chunk_id = hashlib.sha256(data).hexdigest()
+        path = self._path(chunk_id)
+        with self._lock:
+            self._reserved[chunk_id] += 1
+            exists = path.exists()
+        if exists:
+            return chunk_id, 0
+        path.parent.mkdir(exist_ok=True)
+        payload = zlib.compress(data, compress_level)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return chunk_id, len(payload)
+    
+    def get(self, chunk_id: str, verify: bool = True) -> bytes:
+        """Read a chunk, optionally re-hashing it to detect corruption."""
+        with open(self._path(chunk_id), "rb") as f:
+            data = zlib.decompress(f.read())
+        if verify and hashlib.sha256(data).hexdigest() != chunk_id:
+            raise ValueError(f"Chunk {chunk_id} is corrupted")
+        return data
+    
+    def reserve(self, chunk_ids: List[str]) -> List[str]:
+        """Reserve already stored chunks; returns the ids that are missing."""
+        with self._lock:
+            self._reserved.update(chunk_ids)
+            return [chunk_id for chunk_id in set(chunk_ids) if not self._path(chunk_id).exists()]
+    
+    def release(self, chunk_ids: List[str]):
+        """Drop reservations taken by put() or reserve()."""
+        with self._lock:
+            self._reserved.subtract(chunk_ids)
+            for chunk_id in set(chunk_ids):
+                if self._reserved[chunk_id] <= 0:
+                    del self._reserved[chunk_id]
+    
+    def delete(self, chunk_ids: List[str]) -> int:
+        """Delete unreserved chunks; reserved ones stay for the backup holding them."""
+        removed = 0
+        with self._lock:
+            for chunk_id in chunk_ids:
+                if self._reserved.get(chunk_id):
+                    continue
+                try:
+                    self._path(chunk_id).unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+class NodeStreamIngest:
+    """
+    Chunks and stores one node's export stream while it downloads.
+
+    Tracks the stream digest and size as data passes through, so no second
+    read is needed to checksum it.
+    """
+    
+    def __init__(self, store: ChunkStore, compress_level: int):
+        self.store = store
+        self.compress_level = compress_level
+        self.chunker = ContentDefinedChunker()
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.chunk_ids: List[str] = []
+        self.new_chunks = 0
+        self.stored_bytes = 0
+    
+    def _store(self, chunks: List[bytes]):
+        for chunk in chunks:
+            chunk_id, written = self.store.put(chunk, self.compress_level)
+            self.chunk_ids.append(chunk_id)
+            if written:
+                self.new_chunks += 1
+                self.stored_bytes += written
+    
+    def feed(self, data: bytes):
+        self.digest.update(data)
+        self.size += len(data)
+        self._store(self.chunker.update(data))
+    
+    def close(self) -> Dict[str, Any]:
+        self._store(self.chunker.finish())
+        return {
+            "digest": self.digest.hexdigest(),
+            "size": self.size,
+            "chunks": self.chunk_ids,
+        }
+
 # =============================================================================
 # Backup Storage
 # =============================================================================
@@ -141,6 +458,18 @@ class BackupStorage:
                 )
             """)
             
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS backup_chunks (
+                    backup_id TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    PRIMARY KEY (backup_id, chunk_id)
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_backup_chunks_chunk
+                ON backup_chunks (chunk_id)
+            """)
+            
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS restores (
                     restore_id TEXT PRIMARY KEY,
@@ -222,6 +551,50 @@ class BackupStorage:
                 "description": row["description"]
             }
     
+    def get_latest_completed(self) -> Optional[Dict[str, Any]]:
+        """Get the most recent completed backup."""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT backup_id FROM backups WHERE status = 'completed'
+                ORDER BY created_at DESC, rowid DESC LIMIT 1
+            """).fetchone()
+        return self.get_backup(row[0]) if row else None
+    
+    def add_chunk_refs(self, backup_id: str, chunk_ids: List[str]):
+        """Record which chunks a backup references."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO backup_chunks (backup_id, chunk_id) VALUES (?, ?)",
+                ((backup_id, chunk_id) for chunk_id in set(chunk_ids))
+            )
+            conn.commit()
+    
+    def unreferenced_chunks(self, chunk_ids: List[str]) -> List[str]:
+        """Return the chunks no backup references."""
+        unique = list(set(chunk_ids))
+        referenced = set()
+        with sqlite3.connect(self.db_path) as conn:
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                referenced.update(row[0] for row in conn.execute(
+                    f"SELECT DISTINCT chunk_id FROM backup_chunks WHERE chunk_id IN ({','.join('?' * len(batch))})",
+                    batch
+                ))
+        return [chunk_id for chunk_id in unique if chunk_id not in referenced]
+    
+    def release_chunk_refs(self, backup_id: str) -> List[str]:
+        """Drop a backup's chunk references and return chunks no longer referenced."""
+        with sqlite3.connect(self.db_path) as conn:
+            orphans = [row[0] for row in conn.execute("""
+                SELECT chunk_id FROM backup_chunks WHERE backup_id = ?
+                AND chunk_id NOT IN (
+                    SELECT chunk_id FROM backup_chunks WHERE backup_id != ?
+                )
+            """, (backup_id, backup_id))]
+            conn.execute("DELETE FROM backup_chunks WHERE backup_id = ?", (backup_id,))
+            conn.commit()
+        return orphans
+    
     def list_backups(self, limit: int = 50) -> List[Dict[str, Any]]:
         """List all backups."""
         with sqlite3.connect(self.db_path) as conn:
@@ -279,8 +652,8 @@ class BackupStorage:
             """, params)
             conn.commit()
     
-    def cleanup_old_backups(self, keep_count: int = MAX_BACKUPS):
-        """Remove old backups beyond retention limit."""
+    def cleanup_old_backups(self, keep_count: int = MAX_BACKUPS, chunk_store: Optional[ChunkStore] = None):
+        """Remove old backups beyond retention limit (and their unreferenced chunks)."""
         with sqlite3.connect(self.db_path) as conn:
             # Get backups to delete
             rows = conn.execute("""
@@ -306,7 +679,12 @@ class BackupStorage:
                 deleted.append(backup_id)
             
             conn.commit()
-            return deleted
+        
+        for backup_id in deleted:
+            orphans = self.release_chunk_refs(backup_id)
+            if chunk_store and orphans:
+                chunk_store.delete(orphans)
+        return deleted
 
 # =============================================================================
 # Backup Service
@@ -318,6 +696,9 @@ class BackupService:
     def __init__(self, backup_dir: str):
         self.storage = BackupStorage(backup_dir)
         self.backup_dir = Path(backup_dir)
+        self.chunk_store = ChunkStore(self.backup_dir / "chunks")
+        self.manifest_dir = self.backup_dir / "manifests"
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
         self.http_client = httpx.AsyncClient(timeout=30)
         
         # Known nodes and their data endpoints
@@ -348,7 +729,15 @@ class BackupService:
         return sha256.hexdigest()
     
     async def create_backup(self, request: BackupRequest) -> BackupMetadata:
-        """Create a new backup."""
+        """
+        Create a new chunked backup.
+        
+        Nodes are collected in parallel. Each export is streamed into the
+        chunk store, so only chunks that are not already stored are written.
+        For incremental backups, unchanged nodes are detected with
+        If-None-Match against the parent backup and reuse its chunk list
+        without being downloaded.
+        """
         backup_id = self._generate_backup_id()
         timestamp = datetime.utcnow().isoformat() + "Z"
         start_time = time.time()
@@ -356,6 +745,33 @@ class BackupService:
         # Determine nodes to backup
         nodes = request.nodes or list(self.node_data_endpoints.keys())
         
+        parent = None
+        parent_nodes: Dict[str, Dict[str, Any]] = {}
+        if request.backup_type == BackupType.INCREMENTAL:
+            parent = self.storage.get_latest_completed()
+            if parent:
+                try:
+                    parent_nodes = (await asyncio.to_thread(
+                        self._read_manifest, Path(parent["path"])
+                    )).get("nodes", {})
+                except Exception as e:
+                    logger.warning(f"Parent backup {parent['backup_id']} unusable, taking full backup: {e}")
+                    parent = None
+        
+        # Chunks this backup depends on stay reserved until its refs are
+        # recorded, so a concurrent delete cannot collect them
+        reserved: List[str] = []
+        if parent_nodes:
+            parent_chunks = [c for entry in parent_nodes.values() for c in entry.get("chunks", [])]
+            reserved.extend(parent_chunks)
+            missing = self.chunk_store.reserve(parent_chunks)
+            if missing:
+                logger.warning(
+                    f"Parent backup {parent['backup_id']} is missing {len(missing)} chunks, taking full backup"
+                )
+                parent = None
+                parent_nodes = {}
+        
         # Create backup metadata
         metadata = BackupMetadata(
             backup_id=backup_id,
@@ -367,39 +783,64 @@ class BackupService:
             nodes_included=nodes,
             duration_seconds=0,
             compression=request.compress,
-            path=""
+            path="",
+            parent_backup_id=parent["backup_id"] if parent else None
         )
         
         # Register backup
         self.storage.register_backup(metadata, request.description)
         
         try:
-            # Collect data from nodes
-            backup_data = {
+            compress_level = 6 if request.compress else 0
+            semaphore = asyncio.Semaphore(BACKUP_PARALLELISM)
+            
+            ingests: List[NodeStreamIngest] = []
+            
+            async def collect(node_id: str):
+                async with semaphore:
+                    return node_id, await self._stream_node_data(
+                        node_id, compress_level, ingests, parent_nodes.get(node_id)
+                    )
+            
+            # Let every node finish before failing, so no ingest is still
+            # storing chunks when the reservations are released
+            gathered = await asyncio.gather(
+                *(collect(node_id) for node_id in nodes), return_exceptions=True
+            )
+            for ingest in ingests:
+                reserved.extend(ingest.chunk_ids)
+            errors = [r for r in gathered if isinstance(r, BaseException)]
+            if errors:
+                raise errors[0]
+            results = gathered
+            
+            manifest = {
+                "format": MANIFEST_FORMAT,
                 "backup_id": backup_id,
                 "timestamp": timestamp,
                 "backup_type": request.backup_type.value,
-                "nodes": {}
+                "parent_backup_id": metadata.parent_backup_id,
+                "nodes": {},
             }
+            all_chunks: List[str] = []
+            stored_bytes = 0
+            for node_id, (entry, node_stats) in results:
+                manifest["nodes"][node_id] = entry
+                all_chunks.extend(entry["chunks"])
+                stored_bytes += node_stats["stored_bytes"]
+                metadata.new_chunks += node_stats["new_chunks"]
+                metadata.logical_size_bytes += entry["size"]
+                if node_stats.get("reused"):
+                    metadata.reused_nodes.append(node_id)
             
-            for node_id in nodes:
-                node_data = await self._collect_node_data(node_id)
-                backup_data["nodes"][node_id] = node_data
-            
-            # Write backup file
-            backup_path = self.backup_dir / f"{backup_id}.json"
-            
-            if request.compress:
-                backup_path = self.backup_dir / f"{backup_id}.json.gz"
-                with gzip.open(backup_path, "wt", encoding="utf-8") as f:
-                    json.dump(backup_data, f)
-            else:
-                with open(backup_path, "w") as f:
-                    json.dump(backup_data, f)
+            # Write manifest, hashing it as it is written
+            backup_path = self.manifest_dir / f"{backup_id}.manifest.json"
+            checksum, manifest_size = await asyncio.to_thread(
+                self._write_manifest, backup_path, manifest
+            )
+            self.storage.add_chunk_refs(backup_id, all_chunks)
             
-            # Calculate checksum and size
-            checksum = self._calculate_checksum(backup_path)
-            size_bytes = backup_path.stat().st_size
+            size_bytes = stored_bytes + manifest_size
             duration = time.time() - start_time
             
             # Update metadata
@@ -419,7 +860,7 @@ class BackupService:
             metadata.path = str(backup_path)
             
             # Cleanup old backups
-            self.storage.cleanup_old_backups()
+            self.storage.cleanup_old_backups(chunk_store=self.chunk_store)
             
             return metadata
             
@@ -428,35 +869,151 @@ class BackupService:
             self.storage.update_backup_status(backup_id, BackupStatus.FAILED)
             metadata.status = BackupStatus.FAILED
             return metadata
+        
+        finally:
+            # Chunks now referenced by this backup stay; chunks it stored but
+            # does not reference (failed backup or failed node ingest) go
+            await asyncio.to_thread(self._release_chunks, reserved)
+    
+    def _release_chunks(self, chunk_ids: List[str]):
+        """Release reservations and delete the chunks no backup references."""
+        self.chunk_store.release(chunk_ids)
+        orphans = self.storage.unreferenced_chunks(chunk_ids)
+        if orphans:
+            self.chunk_store.delete(orphans)
     
-    async def _collect_node_data(self, node_id: str) -> Dict[str, Any]:
-        """Collect data from a node."""
+    async def _stream_node_data(
+        self,
+        node_id: str,
+        compress_level: int,
+        ingests: List[NodeStreamIngest],
+        previous: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Stream a node's export into the chunk store.
+        
+        Returns (manifest entry, stats). Nodes without an export endpoint or
+        that fail are recorded with a small JSON status document, as before.
+        Every ingest started is appended to ingests, so the caller can release
+        the chunks it stored, including those of an abandoned partial stream.
+        """
         endpoint = self.node_data_endpoints.get(node_id)
+        ingest = NodeStreamIngest(self.chunk_store, compress_level)
+        ingests.append(ingest)
+        stats = {"new_chunks": 0, "stored_bytes": 0, "reused": False}
+        status = "ok"
+        etag = None
+        
+        async def store_document(document: Dict[str, Any]):
+            await asyncio.to_thread(ingest.feed, json.dumps(document).encode("utf-8"))
         
         if not endpoint:
-            # Return mock data for nodes without export endpoints
-            return {
+            status = "no_export_endpoint"
+            await store_document({
                 "status": "no_export_endpoint",
                 "timestamp": datetime.utcnow().isoformat()
-            }
+            })
+        else:
+            headers = {}
+            if previous and previous.get("status") == "ok":
+                headers["If-None-Match"] = previous.get("etag") or f'"{previous["digest"]}"'
+            try:
+                async with self.http_client.stream("GET", endpoint, headers=headers) as response:
+                    if response.status_code == 304 and previous:
+                        stats["reused"] = True
+                        return dict(previous), stats
+                    if response.status_code == 200:
+                        etag = response.headers.get("ETag")
+                        async for data in response.aiter_bytes():
+                            await asyncio.to_thread(ingest.feed, data)
+                    else:
+                        status = "error"
+                        await store_document({
+                            "status": "error",
+                            "code": response.status_code
+                        })
+            except Exception as e:
+                status = "unreachable"
+                ingest = NodeStreamIngest(self.chunk_store, compress_level)
+                ingests.append(ingest)
+                await store_document({
+                    "status": "unreachable",
+                    "error": str(e)
+                })
         
+        entry = await asyncio.to_thread(ingest.close)
+        entry["status"] = status
+        if etag:
+            entry["etag"] = etag
+        stats["new_chunks"] = ingest.new_chunks
+        stats["stored_bytes"] = ingest.stored_bytes
+        return entry, stats
+    
+    def _write_manifest(self, path: Path, manifest: Dict[str, Any]) -> Tuple[str, int]:
+        """Write a manifest atomically; returns (sha256, size) computed while writing."""
+        payload = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return hashlib.sha256(payload).hexdigest(), len(payload)
+    
+    def _read_manifest(self, path: Path, expected_checksum: Optional[str] = None) -> Dict[str, Any]:
+        with open(path, "rb") as f:
+            payload = f.read()
+        if expected_checksum and hashlib.sha256(payload).hexdigest() != expected_checksum:
+            raise ValueError("Backup checksum mismatch - possible corruption")
+        return json.loads(payload)
+    
+    @staticmethod
+    def _is_chunked(backup: Dict[str, Any]) -> bool:
+        return (backup.get("path") or "").endswith(".manifest.json")
+    
+    def _read_node_data(self, entry: Dict[str, Any]) -> Any:
+        """Reassemble and decode one node's data from its chunks."""
+        digest = hashlib.sha256()
+        parts = []
+        for chunk_id in entry["chunks"]:
+            chunk = self.chunk_store.get(chunk_id)
+            digest.update(chunk)
+            parts.append(chunk)
+        if digest.hexdigest() != entry["digest"]:
+            raise ValueError("Node data digest mismatch - possible corruption")
+        payload = b"".join(parts)
         try:
-            response = await self.http_client.get(endpoint)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {
-                    "status": "error",
-                    "code": response.status_code
-                }
-        except Exception as e:
-            return {
-                "status": "unreachable",
-                "error": str(e)
-            }
+            return json.loads(payload)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return {"status": "raw", "content_base64": base64.b64encode(payload).decode()}
+    
+    def _load_legacy_backup(self, backup: Dict[str, Any]) -> Dict[str, Any]:
+        """Load a single-file backup written before chunked backups."""
+        backup_path = Path(backup["path"])
+        if backup["compression"]:
+            with gzip.open(backup_path, "rt", encoding="utf-8") as f:
+                backup_data = json.load(f)
+        else:
+            with open(backup_path, "r") as f:
+                backup_data = json.load(f)
+        if self._calculate_checksum(backup_path) != backup["checksum"]:
+            raise ValueError("Backup checksum mismatch - possible corruption")
+        return backup_data.get("nodes", {})
+    
+    def load_node_data(self, backup: Dict[str, Any], node_ids: List[str]) -> Dict[str, Any]:
+        """Load data for the requested nodes only, verifying integrity."""
+        if not self._is_chunked(backup):
+            nodes = self._load_legacy_backup(backup)
+            return {node_id: nodes[node_id] for node_id in node_ids if node_id in nodes}
+        manifest = self._read_manifest(Path(backup["path"]), backup["checksum"])
+        entries = manifest.get("nodes", {})
+        return {
+            node_id: self._read_node_data(entries[node_id])
+            for node_id in node_ids if node_id in entries
+        }
     
     async def restore_backup(self, request: RestoreRequest) -> RestorePoint:
-        """Restore from a backup."""
+        """Restore from a backup (optionally only some nodes)."""
         restore_id = self._generate_restore_id()
         timestamp = datetime.utcnow().isoformat() + "Z"
         start_time = time.time()
@@ -485,20 +1042,8 @@ class BackupService:
         self.storage.register_restore(restore_point)
         
         try:
-            # Load backup data
-            backup_path = Path(backup["path"])
-            
-            if backup["compression"]:
-                with gzip.open(backup_path, "rt", encoding="utf-8") as f:
-                    backup_data = json.load(f)
-            else:
-                with open(backup_path, "r") as f:
-                    backup_data = json.load(f)
-            
-            # Verify checksum
-            actual_checksum = self._calculate_checksum(backup_path)
-            if actual_checksum != backup["checksum"]:
-                raise ValueError("Backup checksum mismatch - possible corruption")
+            # Load and verify only the data for the target nodes
+            node_data = await asyncio.to_thread(self.load_node_data, backup, target_nodes)
             
             if request.validate_only:
                 restore_point.status = RestoreStatus.COMPLETED
@@ -514,8 +1059,8 @@ class BackupService:
             self.storage.update_restore_status(restore_id, RestoreStatus.RESTORING)
             
             for node_id in target_nodes:
-                if node_id in backup_data.get("nodes", {}):
-                    await self._restore_node_data(node_id, backup_data["nodes"][node_id])
+                if node_id in node_data:
+                    await self._restore_node_data(node_id, node_data[node_id])
             
             # Complete restore
             duration = time.time() - start_time
@@ -563,6 +1108,31 @@ class BackupService:
         actual_checksum = self._calculate_checksum(backup_path)
         checksum_valid = actual_checksum == backup["checksum"]
         
+        result = {
+            "backup_id": backup_id,
+            "checksum_valid": checksum_valid,
+            "stored_checksum": backup["checksum"],
+            "actual_checksum": actual_checksum
+        }
+        
+        if self._is_chunked(backup):
+            # Re-hash every referenced chunk and each node's reassembled stream
+            corrupted_nodes = []
+            try:
+                manifest = self._read_manifest(backup_path)
+                for node_id, entry in manifest.get("nodes", {}).items():
+                    try:
+                        self._read_node_data(entry)
+                    except Exception:
+                        corrupted_nodes.append(node_id)
+                readable = True
+            except Exception:
+                readable = False
+            result["corrupted_nodes"] = corrupted_nodes
+            result["readable"] = readable
+            result["valid"] = checksum_valid and readable and not corrupted_nodes
+            return result
+        
         # Try to read the file
         try:
             if backup["compression"]:
@@ -575,14 +1145,18 @@ class BackupService:
         except Exception as e:
             readable = False
         
-        return {
-            "valid": checksum_valid and readable,
-            "backup_id": backup_id,
-            "checksum_valid": checksum_valid,
-            "readable": readable,
-            "stored_checksum": backup["checksum"],
-            "actual_checksum": actual_checksum
-        }
+        result["readable"] = readable
+        result["valid"] = checksum_valid and readable
+        return result
+    
+    def delete_backup(self, backup_id: str):
+        """Delete a backup's files and any chunks only it referenced."""
+        backup = self.storage.get_backup(backup_id)
+        if backup and backup["path"] and Path(backup["path"]).exists():
+            Path(backup["path"]).unlink()
+        orphans = self.storage.release_chunk_refs(backup_id)
+        if orphans:
+            self.chunk_store.delete(orphans)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get backup statistics."""
@@ -660,6 +1234,10 @@ async def create_backup(request: BackupRequest):
         "backup_id": metadata.backup_id,
         "status": metadata.status.value,
         "size_bytes": metadata.size_bytes,
+        "logical_size_bytes": metadata.logical_size_bytes,
+        "new_chunks": metadata.new_chunks,
+        "parent_backup_id": metadata.parent_backup_id,
+        "reused_nodes": metadata.reused_nodes,
         "duration_seconds": metadata.duration_seconds,
         "nodes_included": metadata.nodes_included
     }
@@ -692,6 +1270,20 @@ async def get_backup(backup_id: str):
         raise HTTPException(status_code=404, detail="Backup not found")
     return backup
 
+@app.get("/backups/{backup_id}/nodes/{node_id}")
+async def get_backup_node_data(backup_id: str, node_id: str):
+    """Get one node's data from a backup without loading the rest."""
+    backup = service.storage.get_backup(backup_id)
+    if not backup or backup["status"] != "completed":
+        raise HTTPException(status_code=404, detail="Backup not found")
+    try:
+        data = await asyncio.to_thread(service.load_node_data, backup, [node_id])
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if node_id not in data:
+        raise HTTPException(status_code=404, detail="Node not in backup")
+    return {"backup_id": backup_id, "node_id": node_id, "data": data[node_id]}
+
 @app.get("/verify/{backup_id}")
 async def verify_backup(backup_id: str):
     """Verify backup integrity."""
@@ -704,9 +1296,8 @@ async def delete_backup(backup_id: str):
     if not backup:
         raise HTTPException(status_code=404, detail="Backup not found")
     
-    # Delete file
-    if backup["path"] and Path(backup["path"]).exists():
-        Path(backup["path"]).unlink()
+    # Delete manifest/file and unreferenced chunks
+    service.delete_backup(backup_id)
     
     # Update status
     service.storage.update_backup_status(backup_id, BackupStatus.CORRUPTED)
@@ -721,7 +1312,7 @@ async def get_stats():
 @app.post("/cleanup")
 async def cleanup_old_backups(keep_count: int = MAX_BACKUPS):
     """Cleanup old backups."""
-    deleted = service.storage.cleanup_old_backups(keep_count)
+    deleted = service.storage.cleanup_old_backups(keep_count, chunk_store=service.chunk_store)
     return {
         "deleted_count": len(deleted),
         "deleted_backups": deleted
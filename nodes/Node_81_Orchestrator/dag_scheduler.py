@@ -0,0 +1,259 @@
+"""
+Node 81 工作流 DAG 调度组件
+==========================
+- DurationHistory: 按任务签名记录历史耗时（EWMA），为关键路径估算提供依据
+- ConcurrencyLimits: 跨工作流共享的全局并发上限 + 单节点并发上限
+- DAGScheduler: 入度计数 + 就绪堆的并发 DAG 执行器
+    * 父任务全部结束的瞬间启动子任务，不再按"波次"等待
+    * 单个工作流的并发上限，加上共享的全局/单节点上限
+    * 就绪任务按关键路径长度（自身估计耗时 + 最长后继链）从大到小调度
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DurationHistory:
+    """
+    任务耗时历史。
+
+    以任务签名（类型 + 调用的节点/端点）为键做指数滑动平均；没有记录的
+    签名依次退回到所涉节点的平均耗时、全局默认值。
+    """
+
+    def __init__(self, alpha: float = 0.3, default: float = 1.0, max_keys: int = 10000):
+        self.alpha = alpha
+        self.default = default
+        self.max_keys = max_keys
+        self._by_key: Dict[Hashable, float] = {}
+        self._by_node: Dict[str, float] = {}
+
+    def _update(self, table: Dict, key: Hashable, value: float):
+        previous = table.get(key)
+        if previous is None:
+            if len(table) >= self.max_keys:
+                # 淘汰最早插入的键（dict 保持插入顺序）
+                table.pop(next(iter(table)))
+            table[key] = value
+        else:
+            table[key] = previous + self.alpha * (value - previous)
+
+    def record(self, key: Hashable, nodes: Iterable[str], duration: float):
+        self._update(self._by_key, key, duration)
+        for node in nodes:
+            self._update(self._by_node, node, duration)
+
+    def estimate(self, key: Hashable, nodes: Iterable[str]) -> float:
+        value = self._by_key.get(key)
+        if value is not None:
+            return value
+        node_values = [self._by_node[n] for n in nodes if n in self._by_node]
+        if node_values:
+            return max(node_values)
+        return self.default
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+
+class ConcurrencyLimits:
+    """
+    跨工作流共享的并发上限。
+
+    编排器持有一个实例并传给每个 DAGScheduler，所以全局上限和单节点上限
+    约束的是所有并发工作流的总和。任务结束释放名额时唤醒所有等待中的
+    调度器，由它们各自重新尝试派发。
+    """
+
+    def __init__(self, max_concurrency: int = 32, per_node_concurrency: int = 8):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_node_concurrency = max(1, per_node_concurrency)
+        self.running = 0
+        self.node_load: Dict[str, int] = {}
+        self._waiters: List[asyncio.Future] = []
+
+    def try_acquire(self, nodes: Iterable[str]) -> bool:
+        """有空位时占用一个全局名额和所涉每个节点的名额"""
+        nodes = tuple(nodes)
+        if self.running >= self.max_concurrency:
+            return False
+        if any(self.node_load.get(n, 0) >= self.per_node_concurrency for n in nodes):
+            return False
+        self.running += 1
+        for n in nodes:
+            self.node_load[n] = self.node_load.get(n, 0) + 1
+        return True
+
+    def release(self, nodes: Iterable[str]):
+        self.running -= 1
+        for n in nodes:
+            load = self.node_load[n] - 1
+            if load:
+                self.node_load[n] = load
+            else:
+                del self.node_load[n]
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def changed(self) -> asyncio.Future:
+        """下一次释放名额时完成的 future"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        return waiter
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "per_node_concurrency": self.per_node_concurrency,
+            "node_load": dict(self.node_load),
+        }
+
+
+class DAGScheduler:
+    """
+    一次工作流的 DAG 执行。
+
+    graph: {task_id: [依赖的 task_id, ...]}
+    nodes: {task_id: 该任务占用的节点集合}，用于单节点并发限制
+    estimates: {task_id: 估计耗时}，用于计算关键路径优先级
+    run(task_id): 执行单个任务的协程；任务结束（无论成败）即视为依赖满足，
+                  与原有顺序执行的语义一致。
+    max_concurrency: 本工作流自身的并发上限
+    limits: 共享的全局/单节点上限；不传时只对本工作流生效
+            （上限为 max_concurrency / per_node_concurrency）
+    """
+
+    def __init__(
+        self,
+        graph: Dict[str, List[str]],
+        nodes: Dict[str, Set[str]],
+        estimates: Dict[str, float],
+        max_concurrency: int = 32,
+        per_node_concurrency: int = 8,
+        limits: Optional[ConcurrencyLimits] = None,
+    ):
+        self.graph = graph
+        self.nodes = nodes
+        self.estimates = estimates
+        self.max_concurrency = max(1, max_concurrency)
+        self.limits = limits or ConcurrencyLimits(max_concurrency, per_node_concurrency)
+
+        self.children: Dict[str, List[str]] = {task_id: [] for task_id in graph}
+        self.indegree: Dict[str, int] = {}
+        for task_id, deps in graph.items():
+            unique = set(deps)
+            missing = [d for d in unique if d not in graph]
+            if missing:
+                raise ValueError(f"Task {task_id} depends on unknown tasks: {missing}")
+            self.indegree[task_id] = len(unique)
+            for dep in unique:
+                self.children[dep].append(task_id)
+
+        self.order = self._topological_order()
+        self.rank = self._critical_path_rank()
+
+    def _topological_order(self) -> List[str]:
+        indegree = dict(self.indegree)
+        queue = deque(t for t, d in indegree.items() if d == 0)
+        order = []
+        while queue:
+            task_id = queue.popleft()
+            order.append(task_id)
+            for child in self.children[task_id]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        if len(order) != len(self.graph):
+            cyclic = sorted(t for t, d in indegree.items() if d > 0)
+            raise ValueError(f"Circular dependency detected among tasks: {cyclic}")
+        return order
+
+    def _critical_path_rank(self) -> Dict[str, float]:
+        """rank = 自身估计耗时 + 后继中最长的 rank（逆拓扑序一次遍历）"""
+        rank: Dict[str, float] = {}
+        for task_id in reversed(self.order):
+            tail = max((rank[c] for c in self.children[task_id]), default=0.0)
+            rank[task_id] = self.estimates.get(task_id, 0.0) + tail
+        return rank
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """按估计耗时给出关键路径及其长度"""
+        if not self.order:
+            return [], 0.0
+        current = max((t for t in self.order if self.indegree[t] == 0), key=self.rank.__getitem__)
+        length = self.rank[current]
+        path = [current]
+        while self.children[current]:
+            current = max(self.children[current], key=self.rank.__getitem__)
+            path.append(current)
+        return path, length
+
+    async def run(self, run: Callable[[str], Awaitable[Any]],
+                  on_start: Optional[Callable[[str, asyncio.Task], None]] = None) -> Dict[str, Any]:
+        """执行整个 DAG，返回 {task_id: run 的返回值}"""
+        seq = itertools.count()
+        ready: List[Tuple[float, int, str]] = []
+        for task_id in self.order:
+            if self.indegree[task_id] == 0:
+                heapq.heappush(ready, (-self.rank[task_id], next(seq), task_id))
+
+        indegree = dict(self.indegree)
+        limits = self.limits
+        running: Dict[asyncio.Task, str] = {}
+        results: Dict[str, Any] = {}
+
+        def dispatch():
+            blocked = []
+            while ready and len(running) < self.max_concurrency and limits.running < limits.max_concurrency:
+                entry = heapq.heappop(ready)
+                task_id = entry[2]
+                if not limits.try_acquire(self.nodes.get(task_id, ())):
+                    blocked.append(entry)
+                    continue
+                task = asyncio.create_task(run(task_id))
+                running[task] = task_id
+                if on_start is not None:
+                    on_start(task_id, task)
+            for entry in blocked:
+                heapq.heappush(ready, entry)
+
+        changed: Optional[asyncio.Future] = None
+        try:
+            dispatch()
+            while running or ready:
+                waiting = set(running)
+                if ready and len(running) < self.max_concurrency:
+                    # 被共享上限挡住：其他工作流释放名额时也要醒来
+                    if changed is None or changed.done():
+                        changed = limits.changed()
+                    waiting.add(changed)
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task is changed:
+                        continue
+                    task_id = running.pop(task)
+                    limits.release(self.nodes.get(task_id, ()))
+                    results[task_id] = task.result()
+                    for child in self.children[task_id]:
+                        indegree[child] -= 1
+                        if indegree[child] == 0:
+                            heapq.heappush(ready, (-self.rank[child], next(seq), child))
+                dispatch()
+        finally:
+            if changed is not None and not changed.done():
+                changed.cancel()
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+            for task_id in running.values():
+                limits.release(self.nodes.get(task_id, ()))
+        return results
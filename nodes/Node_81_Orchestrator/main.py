@@ -8,6 +8,7 @@ Node 81: Orchestrator - 统一编排器
 3. 工作流编排 - 管理任务执行流程
 4. 结果聚合 - 汇总各节点结果
 5. 错误处理 - 自动重试和降级
+6. DAG 调度 - 依赖满足即并发启动，按历史耗时的关键路径优先
 
 优势：
 - 简化复杂任务
@@ -36,6 +37,8 @@ from pydantic import BaseModel, Field
 import uvicorn
 import httpx
 
+from dag_scheduler import ConcurrencyLimits, DAGScheduler, DurationHistory
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -62,6 +65,10 @@ NODE_SERVICES = {
 DEFAULT_TIMEOUT = int(os.getenv("DEFAULT_TIMEOUT", "30"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 
+# 工作流并发配置
+MAX_CONCURRENT_TASKS = int(os.getenv("MAX_CONCURRENT_TASKS", "32"))
+PER_NODE_CONCURRENCY = int(os.getenv("PER_NODE_CONCURRENCY", "8"))
+
 logging.basicConfig(
     level=getattr(logging, LOG_LEVEL),
     format=f"[Node {NODE_ID}] %(asctime)s - %(levelname)s - %(message)s"
@@ -109,6 +116,7 @@ class WorkflowRequest(BaseModel):
     tasks: List[Task]
     save_to_memory: bool = True
     user_id: Optional[str] = "default"
+    max_concurrency: Optional[int] = None  # 本工作流的并发上限（同时受全局上限约束）
 
 class TaskResult(BaseModel):
     task_id: str
@@ -126,6 +134,8 @@ class WorkflowResult(BaseModel):
     started_at: str
     completed_at: Optional[str] = None
     duration: Optional[float] = None
+    critical_path: Optional[List[str]] = None
+    critical_path_estimate: Optional[float] = None
 
 # =============================================================================
 # Orchestrator Service
@@ -138,6 +148,9 @@ class OrchestratorService:
         self.http_client = httpx.AsyncClient(timeout=60)
         self.workflows: Dict[str, WorkflowResult] = {}
         self.running_tasks: Dict[str, asyncio.Task] = {}
+        self.durations = DurationHistory()
+        # 全局/单节点并发上限由所有工作流共享
+        self.limits = ConcurrencyLimits(MAX_CONCURRENT_TASKS, PER_NODE_CONCURRENCY)
     
     async def call_node(self, call: NodeCall) -> Any:
         """调用节点"""
@@ -319,6 +332,12 @@ class OrchestratorService:
         else:
             raise ValueError(f"Unsupported task type: {task.task_type}")
     
+    @staticmethod
+    def task_signature(task: Task) -> str:
+        """同类任务共享耗时历史：类型 + 依次调用的节点/端点"""
+        calls = "|".join(f"{c.node_id}{c.endpoint}" for c in task.calls)
+        return f"{task.task_type.value}:{calls}"
+    
     async def execute_workflow(self, request: WorkflowRequest) -> WorkflowResult:
         """执行工作流"""
         workflow_id = request.workflow_id or f"wf_{datetime.now().strftime('%Y%m%d%H%M%S')}"
@@ -337,37 +356,47 @@ class OrchestratorService:
         self.workflows[workflow_id] = workflow_result
         
         try:
-            # 构建依赖图
+            # 构建依赖图（入度 + 关键路径优先级）
             task_map = {task.task_id: task for task in request.tasks}
-            completed_tasks: Dict[str, TaskResult] = {}
+            if len(task_map) != len(request.tasks):
+                raise ValueError("Duplicate task_id in workflow")
             context = {}
             
-            # 执行任务（简单的拓扑排序）
-            remaining_tasks = set(task_map.keys())
+            task_nodes = {tid: {c.node_id for c in t.calls} for tid, t in task_map.items()}
+            estimates = {
+                tid: self.durations.estimate(self.task_signature(t), task_nodes[tid])
+                for tid, t in task_map.items()
+            }
+            scheduler = DAGScheduler(
+                graph={tid: list(t.dependencies or []) for tid, t in task_map.items()},
+                nodes=task_nodes,
+                estimates=estimates,
+                max_concurrency=request.max_concurrency or MAX_CONCURRENT_TASKS,
+                limits=self.limits,
+            )
+            path, path_estimate = scheduler.critical_path()
+            workflow_result.critical_path = path
+            workflow_result.critical_path_estimate = round(path_estimate, 3)
             
-            while remaining_tasks:
-                # 找到所有依赖已满足的任务
-                ready_tasks = [
-                    task_id for task_id in remaining_tasks
-                    if all(dep in completed_tasks for dep in task_map[task_id].dependencies)
-                ]
+            async def run(task_id: str) -> TaskResult:
+                task = task_map[task_id]
+                result = await self.execute_task(task, context)
+                workflow_result.tasks.append(result)
                 
-                if not ready_tasks:
-                    raise ValueError("Circular dependency detected or missing dependencies")
-                
-                # 执行就绪的任务
-                for task_id in ready_tasks:
-                    task = task_map[task_id]
-                    result = await self.execute_task(task, context)
-                    
-                    completed_tasks[task_id] = result
-                    workflow_result.tasks.append(result)
-                    
-                    # 更新上下文
-                    if result.status == TaskStatus.COMPLETED and result.result:
-                        context[task_id] = result.result
-                    
-                    remaining_tasks.remove(task_id)
+                # 更新上下文
+                if result.status == TaskStatus.COMPLETED and result.result:
+                    context[task_id] = result.result
+                # 跳过的任务没有耗时，不计入历史
+                if result.duration is not None:
+                    self.durations.record(self.task_signature(task), task_nodes[task_id], result.duration)
+                return result
+            
+            def track(task_id: str, handle: asyncio.Task):
+                key = f"{workflow_id}:{task_id}"
+                self.running_tasks[key] = handle
+                handle.add_done_callback(lambda _: self.running_tasks.pop(key, None))
+            
+            await scheduler.run(run, on_start=track)
             
             # 完成工作流
             end_time = datetime.now()
@@ -510,7 +539,8 @@ async def root():
             "Task decomposition",
             "Workflow orchestration",
             "Node coordination",
-            "Error handling"
+            "Error handling",
+            "Concurrent DAG scheduling"
         ],
         "task_types": [t.value for t in TaskType]
     }
@@ -521,6 +551,8 @@ async def health():
         "status": "healthy",
         "active_workflows": len(orchestrator.workflows),
         "running_tasks": len(orchestrator.running_tasks),
+        "duration_estimates": len(orchestrator.durations),
+        "concurrency": orchestrator.limits.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
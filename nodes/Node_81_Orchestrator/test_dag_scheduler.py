@@ -0,0 +1,201 @@
+"""
+Node 81 DAG 调度器测试
+"""
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dag_scheduler import ConcurrencyLimits, DAGScheduler
+
+
+class LoadProbe:
+    """记录执行期间的全局与单节点峰值并发"""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.running = 0
+        self.peak = 0
+        self.node_load = {}
+        self.node_peak = {}
+        self.finished = []
+
+    def runner(self, workflow, delay=0.01):
+        async def run(task_id):
+            nodes = self.nodes[workflow][task_id]
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            for n in nodes:
+                self.node_load[n] = self.node_load.get(n, 0) + 1
+                self.node_peak[n] = max(self.node_peak.get(n, 0), self.node_load[n])
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.running -= 1
+                for n in nodes:
+                    self.node_load[n] -= 1
+            self.finished.append((workflow, task_id))
+            return task_id
+        return run
+
+
+def fan_out(width, node_of):
+    graph = {"root": []}
+    nodes = {"root": {node_of(0)}}
+    for i in range(width):
+        graph[f"t{i}"] = ["root"]
+        nodes[f"t{i}"] = {node_of(i)}
+    return graph, nodes
+
+
+class TestDAGScheduler(unittest.TestCase):
+    def test_dependencies_respected(self):
+        graph = {"a": [], "b": ["a"], "c": ["a"], "d": ["b", "c"]}
+        order = []
+
+        async def run(task_id):
+            order.append(task_id)
+            await asyncio.sleep(0)
+            return task_id
+
+        scheduler = DAGScheduler(graph, {t: set() for t in graph}, {t: 1.0 for t in graph})
+        results = asyncio.run(scheduler.run(run))
+        self.assertEqual(set(results), set(graph))
+        self.assertEqual(order[0], "a")
+        self.assertEqual(order[-1], "d")
+
+    def test_circular_dependency_rejected(self):
+        with self.assertRaises(ValueError):
+            DAGScheduler({"a": ["b"], "b": ["a"]}, {}, {})
+
+
+class TestSharedLimits(unittest.TestCase):
+    def test_two_workflows_share_global_and_node_caps(self):
+        limits = ConcurrencyLimits(max_concurrency=6, per_node_concurrency=2)
+        wf_a = fan_out(12, lambda i: f"node_{i % 3}")
+        wf_b = fan_out(12, lambda i: f"node_{i % 4}")
+        probe = LoadProbe({"a": wf_a[1], "b": wf_b[1]})
+
+        async def main():
+            # 每个工作流自身上限都高于全局上限，只有共享上限能拦住
+            sched_a = DAGScheduler(wf_a[0], wf_a[1], {}, max_concurrency=10, limits=limits)
+            sched_b = DAGScheduler(wf_b[0], wf_b[1], {}, max_concurrency=10, limits=limits)
+            return await asyncio.gather(sched_a.run(probe.runner("a")), sched_b.run(probe.runner("b")))
+
+        res_a, res_b = asyncio.run(main())
+        self.assertEqual(set(res_a), set(wf_a[0]))
+        self.assertEqual(set(res_b), set(wf_b[0]))
+        self.assertLessEqual(probe.peak, 6)
+        self.assertGreater(probe.peak, 2)
+        for node, peak in probe.node_peak.items():
+            self.assertLessEqual(peak, 2, node)
+        self.assertEqual(limits.running, 0)
+        self.assertEqual(limits.node_load, {})
+
+    def test_blocked_workflow_wakes_when_other_releases(self):
+        # 全局只有 1 个名额：b 必须在 a 的任务释放后被唤醒，不能卡死
+        limits = ConcurrencyLimits(max_concurrency=1, per_node_concurrency=1)
+        graph = {"x": [], "y": []}
+        nodes = {"x": {"n"}, "y": {"n"}}
+        probe = LoadProbe({"a": nodes, "b": nodes})
+
+        async def main():
+            runs = [
+                DAGScheduler(graph, nodes, {}, limits=limits).run(probe.runner(name))
+                for name in ("a", "b")
+            ]
+            return await asyncio.wait_for(asyncio.gather(*runs), timeout=5)
+
+        asyncio.run(main())
+        self.assertEqual(len(probe.finished), 4)
+        self.assertEqual(probe.peak, 1)
+
+    def test_failure_releases_slots(self):
+        limits = ConcurrencyLimits(max_concurrency=4, per_node_concurrency=4)
+        graph = {"ok": [], "bad": [], "slow": []}
+        nodes = {t: {"n"} for t in graph}
+
+        async def run(task_id):
+            if task_id == "bad":
+                raise RuntimeError("boom")
+            await asyncio.sleep(0.05 if task_id == "slow" else 0)
+            return task_id
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(DAGScheduler(graph, nodes, {}, limits=limits).run(run))
+        self.assertEqual(limits.running, 0)
+        self.assertEqual(limits.node_load, {})
+
+
+try:
+    import main as orchestrator_main
+except ImportError:  # fastapi / httpx 未安装
+    orchestrator_main = None
+
+
+@unittest.skipIf(orchestrator_main is None, "fastapi/httpx not installed")
+class TestOrchestratorConcurrentWorkflows(unittest.TestCase):
+    def test_concurrent_workflows_respect_service_caps(self):
+        m = orchestrator_main
+        with mock.patch.object(m, "MAX_CONCURRENT_TASKS", 4), \
+                mock.patch.object(m, "PER_NODE_CONCURRENCY", 2):
+            service = m.OrchestratorService()
+        self.assertEqual(service.limits.max_concurrency, 4)
+
+        state = {"running": 0, "peak": 0, "node": {}, "node_peak": {}}
+
+        async def fake_call_node(call):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            state["node"][call.node_id] = state["node"].get(call.node_id, 0) + 1
+            state["node_peak"][call.node_id] = max(
+                state["node_peak"].get(call.node_id, 0), state["node"][call.node_id])
+            try:
+                await asyncio.sleep(0.01)
+            finally:
+                state["running"] -= 1
+                state["node"][call.node_id] -= 1
+            return {"ok": True}
+
+        def workflow(name):
+            return m.WorkflowRequest(
+                workflow_id=name,
+                description=name,
+                tasks=[
+                    m.Task(
+                        task_id=f"{name}_{i}",
+                        task_type=m.TaskType.SIMPLE,
+                        description=f"{name}_{i}",
+                        calls=[m.NodeCall(node_id=f"{i % 2:02d}", endpoint="/x")],
+                    )
+                    for i in range(8)
+                ],
+                max_concurrency=8,
+                save_to_memory=False,
+            )
+
+        async def main():
+            service.call_node = fake_call_node
+            try:
+                return await asyncio.gather(
+                    service.execute_workflow(workflow("wf_a")),
+                    service.execute_workflow(workflow("wf_b")),
+                )
+            finally:
+                await service.http_client.aclose()
+
+        results = asyncio.run(main())
+        for result in results:
+            self.assertEqual(result.status, m.TaskStatus.COMPLETED)
+            self.assertEqual(len(result.tasks), 8)
+        self.assertLessEqual(state["peak"], 4)
+        for node, peak in state["node_peak"].items():
+            self.assertLessEqual(peak, 2, node)
+        self.assertEqual(service.limits.running, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,6 +27,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from PIL import Image
 
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.append(_project_root)
+
+try:
+    from nodes.common.frame_ring import FrameRingClient
+except ImportError:
+    FrameRingClient = None
+
 app = FastAPI(title="Node 90 - MultimodalVision", version="1.0.0")
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +54,9 @@ NODE_15_OCR_URL = os.getenv("NODE_15_OCR_URL", "http://localhost:8015")
 NODE_45_DESKTOP_URL = os.getenv("NODE_45_DESKTOP_URL", "http://localhost:8045")
 NODE_95_WEBRTC_URL = os.getenv("NODE_95_WEBRTC_URL", "http://localhost:8095")
 
+# 与 Node_95 同机部署时直接读取共享内存帧环，否则回退到 HTTP
+frame_client = FrameRingClient(NODE_95_WEBRTC_URL) if FrameRingClient else None
+
 # 多模态 LLM
 llm_client = None
 try:
@@ -167,6 +179,17 @@ async def capture_screen(request: CaptureScreenRequest) -> Dict[str, Any]:
             return {"success": False, "error": "device_id is required for Android"}
         
         try:
+            if frame_client is not None:
+                frame = frame_client.read_local(request.device_id, copy=True)
+                if frame is not None:
+                    return {
+                        "success": True,
+                        "image_base64": await frame.to_base64_jpeg(),
+                        "timestamp": datetime.fromtimestamp(frame.timestamp).isoformat(),
+                        "frame_size": {"width": frame.width, "height": frame.height},
+                        "source": "webrtc_shm"
+                    }
+            
             result = await call_node(
                 NODE_95_WEBRTC_URL,
                 "/get_latest_frame",
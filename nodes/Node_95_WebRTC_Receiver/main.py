@@ -7,6 +7,8 @@ Node_95: WebRTC 接收器 - 完整实现版本
 3. H.264 视频解码
 4. 提供 HTTP API 供 Node_90 (VLM) 调用
 5. 支持实时截图和 MJPEG 流
+6. 每设备帧代理：每个新帧按格式/质量只编码一次，所有订阅者共享编码结果
+7. 同机共享内存帧环 (nodes/common/frame_ring.py)，供本机消费者零拷贝读取
 
 依赖：
 - aiortc: WebRTC 实现
@@ -22,9 +24,13 @@ import asyncio
 import logging
 import base64
 import io
+import os
+import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
@@ -37,6 +43,19 @@ from aiortc import RTCPeerConnection, RTCSessionDescription, RTCIceCandidate, Vi
 from aiortc.contrib.media import MediaRecorder
 import av
 
+_project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+if _project_root not in sys.path:
+    sys.path.append(_project_root)
+
+try:
+    from nodes.common.frame_ring import FrameRingWriter
+except ImportError:
+    FrameRingWriter = None
+
+# 共享内存帧环
+FRAME_RING_ENABLED = os.getenv("FRAME_RING_ENABLED", "true").lower() == "true"
+FRAME_RING_SLOTS = int(os.getenv("FRAME_RING_SLOTS", "3"))
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -50,6 +69,114 @@ app = FastAPI(title="Node_95: WebRTC Receiver", version="2.0")
 # 全局状态
 # ============================================================================
 
+# 帧编码线程池（PIL 编码期间释放 GIL，不阻塞事件循环）
+_encode_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="frame-encode")
+
+# 支持的编码格式 -> PIL 格式名
+ENCODE_FORMATS = {"jpeg": "JPEG", "png": "PNG"}
+
+
+def _encode_frame(frame: np.ndarray, fmt: str, quality: int) -> bytes:
+    """把 numpy 帧编码为图像字节（在线程池中执行）"""
+    img = Image.fromarray(frame)
+    buffered = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(buffered, format=fmt, quality=quality)
+    else:
+        img.save(buffered, format=fmt)
+    return buffered.getvalue()
+
+
+@dataclass
+class EncodedFrame:
+    """某一代帧的编码结果，base64 按需生成并缓存"""
+    generation: int
+    data: bytes
+    _base64: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode('utf-8')
+        return self._base64
+
+
+class FrameBroker:
+    """
+    单设备帧代理
+    
+    - 每收到新帧，代数 (generation) +1，并丢弃上一代的编码缓存
+    - 同一代帧按 (格式, 质量) 只编码一次；并发请求共享同一个编码任务
+    - 订阅者通过 wait_for_frame 等待新一代帧，帧不变时不会被唤醒
+    """
+    
+    def __init__(self, device_id: str):
+        self.device_id = device_id
+        self.frame: Optional[np.ndarray] = None
+        self.generation = 0
+        self._encoded: Dict[Tuple[str, int], EncodedFrame] = {}
+        self._encoding: Dict[Tuple[int, str, int], asyncio.Future] = {}
+        self._new_frame = asyncio.Event()
+        self.subscribers = 0
+        self.stats = {"encodes": 0, "cache_hits": 0}
+    
+    def publish(self, frame: np.ndarray):
+        """发布新帧并唤醒等待中的订阅者"""
+        self.frame = frame
+        self.generation += 1
+        self._encoded.clear()
+        event, self._new_frame = self._new_frame, asyncio.Event()
+        event.set()
+    
+    async def wait_for_frame(self, after_generation: int, timeout: Optional[float] = None) -> int:
+        """等待代数大于 after_generation 的帧，返回当前代数（超时返回原代数）"""
+        while self.generation <= after_generation:
+            try:
+                await asyncio.wait_for(self._new_frame.wait(), timeout)
+            except asyncio.TimeoutError:
+                return self.generation
+        return self.generation
+    
+    async def get_encoded(self, fmt: str = "JPEG", quality: int = 90) -> Optional[EncodedFrame]:
+        """获取当前帧的编码结果，必要时在线程池中编码一次"""
+        frame, generation = self.frame, self.generation
+        if frame is None:
+            return None
+        
+        key = (fmt, quality)
+        cached = self._encoded.get(key)
+        if cached is not None and cached.generation == generation:
+            self.stats["cache_hits"] += 1
+            return cached
+        
+        task_key = (generation, fmt, quality)
+        future = self._encoding.get(task_key)
+        if future is None:
+            # 编码任务独立于请求方：某个订阅者断开不会取消其他人正在等待的编码
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(_encode_executor, _encode_frame, frame, fmt, quality)
+            self._encoding[task_key] = future
+            future.add_done_callback(
+                lambda f: self._on_encoded(task_key, f)
+            )
+        else:
+            self.stats["cache_hits"] += 1
+        data = await asyncio.shield(future)
+        cached = self._encoded.get(key)
+        if cached is not None and cached.generation == generation:
+            return cached
+        return EncodedFrame(generation, data)
+    
+    def _on_encoded(self, task_key: Tuple[int, str, int], future: asyncio.Future):
+        self._encoding.pop(task_key, None)
+        if future.cancelled() or future.exception() is not None:
+            return
+        generation, fmt, quality = task_key
+        self.stats["encodes"] += 1
+        if generation == self.generation:
+            self._encoded[(fmt, quality)] = EncodedFrame(generation, future.result())
+
+
 class WebRTCState:
     """WebRTC 状态管理"""
     
@@ -60,6 +187,8 @@ class WebRTCState:
         # 最新帧
         self.latest_frames: Dict[str, np.ndarray] = {}
         self.frame_timestamps: Dict[str, datetime] = {}
+        self.brokers: Dict[str, FrameBroker] = {}
+        self.frame_rings: Dict[str, Optional["FrameRingWriter"]] = {}
         
         # WebSocket 连接
         self.signaling_connections: Dict[str, WebSocket] = {}
@@ -77,6 +206,48 @@ class WebRTCState:
         self.latest_frames[device_id] = frame
         self.frame_timestamps[device_id] = datetime.now()
         self.stats["total_frames_received"] += 1
+        self.get_broker(device_id).publish(frame)
+        self._publish_to_ring(device_id, frame)
+    
+    def _publish_to_ring(self, device_id: str, frame: np.ndarray):
+        """写入共享内存帧环；不可用时（无 /dev/shm 等）对该设备停用"""
+        if not FRAME_RING_ENABLED or FrameRingWriter is None:
+            return
+        ring = self.frame_rings.get(device_id)
+        if ring is None:
+            if device_id in self.frame_rings:
+                return
+            ring = FrameRingWriter(device_id, slots=FRAME_RING_SLOTS)
+            self.frame_rings[device_id] = ring
+        try:
+            ring.publish(frame)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[{device_id}] Shared-memory frame ring disabled: {e}")
+            ring.close()
+            self.frame_rings[device_id] = None
+    
+    def close_frame_rings(self):
+        """释放所有共享内存段"""
+        for ring in self.frame_rings.values():
+            if ring is not None:
+                ring.close()
+        self.frame_rings.clear()
+    
+    def get_broker(self, device_id: str) -> FrameBroker:
+        """获取设备的帧代理（不存在时创建，订阅者可先于设备连接）"""
+        broker = self.brokers.get(device_id)
+        if broker is None:
+            broker = FrameBroker(device_id)
+            self.brokers[device_id] = broker
+        return broker
+    
+    def encode_stats(self) -> Dict[str, int]:
+        """汇总所有设备的编码统计"""
+        return {
+            "total_frames_encoded": sum(b.stats["encodes"] for b in self.brokers.values()),
+            "encode_cache_hits": sum(b.stats["cache_hits"] for b in self.brokers.values()),
+            "mjpeg_subscribers": sum(b.subscribers for b in self.brokers.values())
+        }
     
     def get_latest_frame(self, device_id: str) -> Optional[np.ndarray]:
         """获取最新帧"""
@@ -305,7 +476,7 @@ async def root():
         "service": "Node_95: WebRTC Receiver",
         "version": "2.0",
         "status": "running",
-        "stats": state.stats,
+        "stats": {**state.stats, **state.encode_stats()},
         "active_devices": list(state.latest_frames.keys())
     }
 
@@ -341,36 +512,17 @@ async def get_latest_frame(request: FrameRequest):
             content={"error": f"Device {device_id} is not streaming"}
         )
     
-    # 转换格式
-    if request.format == "jpeg":
-        # 转换为 JPEG
-        img = Image.fromarray(frame)
-        buffered = io.BytesIO()
-        img.save(buffered, format="JPEG", quality=90)
-        img_bytes = buffered.getvalue()
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-    
+    # 转换格式（同一帧的编码结果在所有调用方之间共享）
+    if request.format in ("jpeg", "base64"):
+        encoded = await state.get_broker(device_id).get_encoded("JPEG", 90)
     elif request.format == "png":
-        # 转换为 PNG
-        img = Image.fromarray(frame)
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        img_bytes = buffered.getvalue()
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-    
-    elif request.format == "base64":
-        # 直接返回 base64
-        img = Image.fromarray(frame)
-        buffered = io.BytesIO()
-        img.save(buffered, format="JPEG", quality=90)
-        img_bytes = buffered.getvalue()
-        img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-    
+        encoded = await state.get_broker(device_id).get_encoded("PNG", 0)
     else:
         return JSONResponse(
             status_code=400,
             content={"error": f"Unsupported format: {request.format}"}
         )
+    img_base64 = encoded.base64
     
     return {
         "success": True,
@@ -390,22 +542,25 @@ async def stream_mjpeg(device_id: str):
     MJPEG 流端点
     供浏览器或其他客户端实时查看
     """
+    broker = state.get_broker(device_id)
+    
     async def generate():
-        while True:
-            frame = state.get_latest_frame(device_id)
-            
-            if frame is not None:
-                # 转换为 JPEG
-                img = Image.fromarray(frame)
-                buffered = io.BytesIO()
-                img.save(buffered, format="JPEG", quality=85)
-                img_bytes = buffered.getvalue()
+        broker.subscribers += 1
+        generation = 0
+        try:
+            while True:
+                # 只在有新帧时唤醒；所有订阅者共享同一份 JPEG 编码
+                generation = await broker.wait_for_frame(generation)
+                encoded = await broker.get_encoded("JPEG", 85)
+                if encoded is None:
+                    continue
+                generation = encoded.generation
                 
                 # 发送 MJPEG 帧
                 yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + img_bytes + b'\r\n')
-            
-            await asyncio.sleep(0.033)  # ~30 FPS
+                       b'Content-Type: image/jpeg\r\n\r\n' + encoded.data + b'\r\n')
+        finally:
+            broker.subscribers -= 1
     
     return StreamingResponse(
         generate(),
@@ -418,11 +573,13 @@ async def list_devices():
     devices = []
     
     for device_id in state.latest_frames.keys():
+        ring = state.frame_rings.get(device_id)
         devices.append({
             "device_id": device_id,
             "is_receiving": state.is_receiving(device_id),
             "last_frame_time": state.frame_timestamps.get(device_id, datetime.now()).isoformat(),
-            "has_peer_connection": device_id in state.peer_connections
+            "has_peer_connection": device_id in state.peer_connections,
+            "shm_segment": ring.name if ring is not None else None
         })
     
     return {
@@ -430,6 +587,11 @@ async def list_devices():
         "total": len(devices)
     }
 
+@app.on_event("shutdown")
+async def shutdown():
+    """关闭时释放共享内存帧环"""
+    state.close_frame_rings()
+
 # ============================================================================
 # 主程序
 # ============================================================================
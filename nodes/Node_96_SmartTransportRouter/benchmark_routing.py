@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+"""
+Node_96 路由策略基准测试
+
+回放一段混合消息轨迹（不同优先级、大小、到达时间），分别用
+自适应策略 (adaptive) 和旧的随机策略 (random) 路由，比较端到端送达延迟的
+尾部分位数。
+
+传输层使用模拟链路：每个协议有自己的基础延迟、带宽、并发容量和错误率，
+并在回放中段让 WebSocket 链路劣化，考察策略能否及时避开。
+
+用法:
+    python benchmark_routing.py [--messages 3000] [--rate 600] [--seed 7]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from main import (  # noqa: E402
+    BaseTransport, MessagePriority, NodeConfig, Protocol, RoutingRule, SmartTransportRouter,
+)
+
+
+class SimulatedTransport(BaseTransport):
+    """模拟链路：基础延迟抖动 + 按带宽计算的传输时间 + 有限并发造成的排队"""
+
+    def __init__(self, protocol: Protocol, latency: float, bandwidth: float,
+                 concurrency: int, error_rate: float, rng: random.Random):
+        super().__init__(protocol)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.degradation = 1.0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._rng = rng
+
+    async def send(self, endpoint: str, data: Dict[str, Any]) -> bool:
+        async with self._slots:
+            delay = self.latency * self._rng.lognormvariate(0, 0.3) * self.degradation
+            delay += data.get("size_bytes", 0) / self.bandwidth
+            await asyncio.sleep(delay)
+            return self._rng.random() >= self.error_rate
+
+
+def build_trace(count: int, rate: float, seed: int) -> List[Tuple[float, Dict[str, Any]]]:
+    """生成 (到达时间, 消息) 轨迹：以小的遥测消息为主，夹杂中等和大块消息"""
+    rng = random.Random(seed)
+    trace = []
+    t = 0.0
+    for i in range(count):
+        t += rng.expovariate(rate)
+        kind = rng.random()
+        if kind < 0.7:
+            priority, size = MessagePriority.LOW, rng.randint(200, 2_000)
+        elif kind < 0.9:
+            priority, size = MessagePriority.MEDIUM, rng.randint(2_000, 64_000)
+        elif kind < 0.97:
+            priority, size = MessagePriority.HIGH, rng.randint(200, 8_000)
+        else:
+            priority, size = MessagePriority.LOW, rng.randint(256_000, 2_000_000)
+        trace.append((t, {"id": i, "priority": priority, "size_bytes": size}))
+    return trace
+
+
+def build_router(policy: str, seed: int) -> Tuple[SmartTransportRouter, Dict[Protocol, SimulatedTransport]]:
+    config = NodeConfig(
+        endpoints={
+            Protocol.HTTP: "http://bench/data",
+            Protocol.WEBSOCKET: "ws://bench/events",
+            Protocol.MQTT: "bench_topic",
+        },
+        routing_rules={
+            "high_priority_realtime": RoutingRule(MessagePriority.HIGH, 16, [Protocol.WEBSOCKET, Protocol.HTTP]),
+            "medium_priority_reliable": RoutingRule(MessagePriority.MEDIUM, 1024, [Protocol.HTTP, Protocol.WEBSOCKET]),
+            "low_priority_bulk": RoutingRule(MessagePriority.LOW, 5120, [Protocol.HTTP, Protocol.MQTT, Protocol.WEBSOCKET]),
+        },
+        log_level="WARNING",
+        selection_policy=policy,
+        probe_interval_s=1.0,
+        batching_enabled=False,  # 只比较协议选择策略
+    )
+    router = SmartTransportRouter(config)
+    rng = random.Random(seed)
+    transports = {
+        Protocol.HTTP: SimulatedTransport(Protocol.HTTP, 0.020, 8e6, 32, 0.01, rng),
+        Protocol.WEBSOCKET: SimulatedTransport(Protocol.WEBSOCKET, 0.008, 4e6, 16, 0.002, rng),
+        Protocol.MQTT: SimulatedTransport(Protocol.MQTT, 0.015, 1e6, 8, 0.005, rng),
+    }
+    router.transports = dict(transports)
+    return router, transports
+
+
+async def replay(policy: str, trace: List[Tuple[float, Dict[str, Any]]], seed: int) -> Dict[str, Any]:
+    router, transports = build_router(policy, seed)
+    duration = trace[-1][0]
+    latencies: List[float] = []
+    failures = 0
+
+    async def deliver(message: Dict[str, Any]):
+        nonlocal failures
+        started = time.monotonic()
+        if not await router.route_message(dict(message)):
+            failures += 1
+        latencies.append(time.monotonic() - started)
+
+    async def degrade():
+        # 回放中段 WebSocket 链路延迟放大 10 倍
+        await asyncio.sleep(duration * 0.35)
+        transports[Protocol.WEBSOCKET].degradation = 10.0
+        await asyncio.sleep(duration * 0.3)
+        transports[Protocol.WEBSOCKET].degradation = 1.0
+
+    tasks = [asyncio.create_task(degrade())]
+    start = time.monotonic()
+    for arrival, message in trace:
+        wait = start + arrival - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        tasks.append(asyncio.create_task(deliver(message)))
+    await asyncio.gather(*tasks)
+
+    latencies.sort()
+
+    def pct(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+
+    usage = {p.name: m.samples for p, m in router.protocol_metrics.items()}
+    return {
+        "policy": policy,
+        "mean": statistics.fmean(latencies) * 1000,
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": latencies[-1] * 1000,
+        "failures": failures,
+        "usage": usage,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Node_96 routing policy benchmark")
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--rate", type=float, default=600.0, help="平均到达速率（条/秒）")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    trace = build_trace(args.messages, args.rate, args.seed)
+    print(f"回放 {len(trace)} 条消息，时长 {trace[-1][0]:.1f}s")
+    print(f"{'policy':<10}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'fail':>6}  usage")
+    for policy in ("random", "adaptive"):
+        r = await replay(policy, trace, args.seed)
+        print(
+            f"{r['policy']:<10}{r['mean']:>8.1f}ms{r['p50']:>7.1f}ms{r['p95']:>7.1f}ms"
+            f"{r['p99']:>7.1f}ms{r['max']:>7.1f}ms{r['failures']:>6}  {r['usage']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
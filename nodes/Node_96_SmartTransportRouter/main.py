@@ -1,4 +1,3 @@
-'''
 # -*- coding: utf-8 -*-
 
 """
@@ -7,16 +6,30 @@ Node_96_SmartTransportRouter: 智能传输路由节点
 该节点实现了一个智能路由服务，能够根据消息的属性（如优先级、大小）
 动态选择最合适的传输协议（HTTP, WebSocket, MQTT）进行数据转发。
 它通过 FastAPI 提供健康检查和状态查询的 API 接口。
+
+协议选择基于实时链路指标：每个协议及每个 (协议, 端点) 维护 EWMA 延迟、
+EWMA 吞吐、EWMA 错误率和在途消息数，在路由规则允许的候选协议中选择
+预计送达时间最短的一个。路由规则在启动时预编译为按优先级、按大小分段的
+查找表；错误历史保存在定长环形缓冲区中。
+
+传输层对每个端点保持长连接（HTTP keep-alive 连接池、WebSocket 连接池、
+每个 broker 一个 MQTT 客户端）。批量帧是新的消息信封，接收方需要能解析，
+因此合并默认关闭，只对明确声明支持批量帧的端点开启：开启后小的低优先级
+消息按 Nagle 方式在 linger 时间内合并为批量帧发送；中、高优先级消息绕过
+合并直接发送。
 """
 
 import asyncio
+import bisect
 import logging
 import json
+import os
 import random
 import time
+from collections import deque
 from dataclasses import dataclass, field, asdict
 from enum import Enum, auto
-from typing import Dict, Any, Optional, List, Type
+from typing import Dict, Any, Optional, List, Type, Tuple, FrozenSet
 
 # 第三方库，需要预先安装：pip install fastapi uvicorn python-multipart
 from fastapi import FastAPI, HTTPException, status
@@ -86,15 +99,197 @@ class NodeConfig:
         routing_rules (Dict[str, RoutingRule]): 路由规则名称到规则对象的映射
         log_level (str): 日志记录级别
         health_check_port (int): 健康检查服务监听的端口
+        selection_policy (str): 协议选择策略，"adaptive"（按预计送达时间）或 "random"
+        ewma_alpha (float): 链路指标 EWMA 的平滑系数
+        probe_interval_s (float): 候选协议超过此时间未被使用时，优先探测一次以刷新指标
+        error_history_size (int): 错误历史环形缓冲区容量
+        batching_enabled (bool): 是否合并小的低优先级消息（默认关闭）
+        batch_endpoints (FrozenSet[str]): 声明能解析批量帧的端点，只有这些端点参与合并
+        batch_linger_ms (float): 合并等待时间（毫秒），从批次中第一条消息入队开始计时
+        batch_max_messages (int): 单个批量帧的最大消息数
+        batch_max_bytes (int): 单个批量帧的最大字节数
+        batch_message_max_bytes (int): 超过此大小的消息不参与合并
+        http_pool_size (int): 每个 HTTP 端点的最大连接数
+        ws_pool_size (int): 每个 WebSocket 端点的长连接数
+        mqtt_broker (str): MQTT 端点未写明 broker 时使用的默认 broker
+        mqtt_port (int): 默认 broker 端口
+        mqtt_qos (int): 发布使用的 QoS
     """
     node_id: str = "Node_96_SmartTransportRouter"
     endpoints: Dict[Protocol, str] = field(default_factory=dict)
     routing_rules: Dict[str, RoutingRule] = field(default_factory=dict)
     log_level: str = "INFO"
     health_check_port: int = 8080
+    selection_policy: str = "adaptive"
+    ewma_alpha: float = 0.2
+    probe_interval_s: float = 30.0
+    error_history_size: int = 256
+    batching_enabled: bool = False
+    batch_endpoints: FrozenSet[str] = frozenset()
+    batch_linger_ms: float = 5.0
+    batch_max_messages: int = 64
+    batch_max_bytes: int = 64 * 1024
+    batch_message_max_bytes: int = 4 * 1024
+    http_pool_size: int = 8
+    ws_pool_size: int = 2
+    mqtt_broker: str = "localhost"
+    mqtt_port: int = 1883
+    mqtt_qos: int = 0
+
+
+# --- 3.1 链路指标与路由表 ---
+# 各协议的先验指标（尚无观测数据时使用）：(基础延迟秒, 吞吐字节/秒)
+PROTOCOL_PRIORS: Dict[Protocol, Tuple[float, float]] = {
+    Protocol.HTTP: (0.2, 2 * 1024 * 1024),
+    Protocol.WEBSOCKET: (0.1, 4 * 1024 * 1024),
+    Protocol.MQTT: (0.15, 512 * 1024),
+}
+
+
+class LinkMetrics:
+    """
+    单条链路（协议或协议+端点）的实时指标。
+
+    - latency: 扣除传输时间后的基础延迟 EWMA（秒）
+    - throughput: 吞吐 EWMA（字节/秒），只用足够大的消息更新
+    - error_rate: 失败率 EWMA（0~1）
+    - in_flight: 当前在途消息数（队列深度）
+    """
+    # 小于此大小的消息传输时间可忽略，不用于估计吞吐
+    MIN_THROUGHPUT_SAMPLE = 64 * 1024
+
+    def __init__(self, base_latency: float, throughput: float, alpha: float = 0.2):
+        self.alpha = alpha
+        self.latency = base_latency
+        self.throughput = throughput
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.samples = 0
+        self.last_used = 0.0
+
+    def expected_delivery_time(self, size_bytes: int) -> float:
+        """预计送达时间：基础延迟 + 传输时间，加上排队等待，再按失败重试期望放大"""
+        service = self.latency + size_bytes / self.throughput
+        queueing = self.in_flight * service
+        success = max(0.05, 1.0 - self.error_rate)
+        return (service + queueing) / success
+
+    def begin(self):
+        self.in_flight += 1
+        self.last_used = time.monotonic()
+
+    def end(self, success: bool, elapsed: float, size_bytes: int):
+        self.in_flight = max(0, self.in_flight - 1)
+        a = self.alpha
+        self.error_rate += a * ((0.0 if success else 1.0) - self.error_rate)
+        if not success:
+            return
+        self.samples += 1
+        if size_bytes >= self.MIN_THROUGHPUT_SAMPLE:
+            transfer = max(1e-6, elapsed - self.latency)
+            self.throughput += a * (size_bytes / transfer - self.throughput)
+        base = max(0.0, elapsed - size_bytes / self.throughput)
+        self.latency += a * (base - self.latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": round(self.latency * 1000, 2),
+            "throughput_kbps": round(self.throughput / 1024, 1),
+            "error_rate": round(self.error_rate, 4),
+            "in_flight": self.in_flight,
+            "samples": self.samples,
+        }
+
+
+class CompiledRoutingTable:
+    """
+    预编译的路由规则表。
+
+    对每个优先级，把适用规则的 max_size 从大到小排序并计算“大小不超过该上限时
+    的候选协议并集”，查找时只需一次二分。
+    """
+
+    def __init__(self, rules: Dict[str, RoutingRule]):
+        self._tables: Dict[MessagePriority, Tuple[List[int], List[FrozenSet[Protocol]]]] = {}
+        for priority in MessagePriority:
+            applicable = [
+                (rule.max_size_kb * 1024, rule.allowed_protocols)
+                for rule in rules.values()
+                if priority.value >= rule.priority_threshold.value
+            ]
+            limits = sorted({limit for limit, _ in applicable})
+            candidates = [
+                frozenset(p for limit, protocols in applicable if limit >= bound for p in protocols)
+                for bound in limits
+            ]
+            self._tables[priority] = (limits, candidates)
+
+    def candidates(self, priority: MessagePriority, size_bytes: int) -> FrozenSet[Protocol]:
+        limits, candidates = self._tables[priority]
+        index = bisect.bisect_left(limits, size_bytes)
+        if index >= len(limits):
+            return frozenset()
+        return candidates[index]
+
+
+def estimate_message_size(obj: Any, _depth: int = 0) -> int:
+    """
+    估算消息序列化后的字节数，无需真正执行 json.dumps。
+
+    字符串/字节按长度计，容器按元素递归累加并加上分隔符开销；
+    嵌套过深的部分按固定值估计。
+    """
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return len(obj)
+    if isinstance(obj, str):
+        return len(obj) + 2
+    if obj is None or isinstance(obj, (bool, int, float, Enum)):
+        return 8
+    if _depth > 8:
+        return 64
+    if isinstance(obj, dict):
+        return 2 + sum(
+            len(str(k)) + 4 + estimate_message_size(v, _depth + 1) for k, v in obj.items()
+        )
+    if isinstance(obj, (list, tuple, set)):
+        return 2 + sum(estimate_message_size(v, _depth + 1) + 1 for v in obj)
+    return len(str(obj))
 
 
 # --- 4. 传输协议处理器 ---
+# 可选依赖：缺失时对应协议发送直接失败，由路由器的错误率指标自然避开
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:
+    mqtt = None
+
+
+def _json_default(obj: Any) -> Any:
+    """消息中的枚举（如 priority）按名称序列化"""
+    if isinstance(obj, Enum):
+        return obj.name
+    return str(obj)
+
+
+def encode_message(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+
+def encode_batch(messages: List[Dict[str, Any]]) -> str:
+    """批量帧格式：{"type": "batch", "count": N, "messages": [...]}"""
+    return encode_message({"type": "batch", "count": len(messages), "messages": messages})
+
+
 # 定义所有传输协议处理器的基类
 class BaseTransport:
     """传输协议处理器的抽象基类"""
@@ -114,62 +309,324 @@ class BaseTransport:
         """
         raise NotImplementedError("子类必须实现 send 方法")
 
+    async def send_batch(self, endpoint: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        以一个批量帧发送多条消息。默认实现逐条发送，子类可覆盖为单帧发送。
+
+        Returns:
+            bool: 全部发送成功返回 True
+        """
+        results = [await self.send(endpoint, message) for message in messages]
+        return all(results)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """连接池状态"""
+        return {}
+
+    async def close(self):
+        """关闭所有长连接"""
+
 # HTTP 传输实现
 class HttpTransport(BaseTransport):
-    """HTTP 协议传输实现（模拟）"""
-    def __init__(self):
+    """
+    HTTP 协议传输实现。
+
+    每个端点一个长连接 httpx.AsyncClient（keep-alive 连接池），
+    批量帧以单个 POST 发送。
+    """
+    def __init__(self, pool_size: int = 8, timeout: float = 10.0):
         super().__init__(Protocol.HTTP)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._clients: Dict[str, Any] = {}
+
+    def _client(self, endpoint: str):
+        client = self._clients.get(endpoint)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+            self._clients[endpoint] = client
+        return client
 
-    async def send(self, endpoint: str, data: Dict[str, Any]) -> bool:
-        logger.info(f"【模拟】使用 HTTP 发送数据到 {endpoint}")
+    async def _post(self, endpoint: str, body: str, batch_count: int = 0) -> bool:
+        if httpx is None:
+            logger.error("HTTP 传输不可用: 未安装 httpx")
+            return False
+        headers = {"Content-Type": "application/json"}
+        if batch_count:
+            headers["X-Batch-Count"] = str(batch_count)
         try:
-            # 在实际应用中，这里会使用 aiohttp 或 httpx 库
-            await asyncio.sleep(random.uniform(0.1, 0.3))  # 模拟网络延迟
-            if random.random() < 0.95: # 模拟 95% 的成功率
-                logger.info(f"HTTP 发送成功: {json.dumps(data, ensure_ascii=False)}")
+            response = await self._client(endpoint).post(endpoint, content=body.encode("utf-8"), headers=headers)
+            if response.is_success:
                 return True
-            else:
-                logger.error("HTTP 发送失败: 模拟网络错误")
-                return False
+            logger.error(f"HTTP 发送失败: {endpoint} 返回 {response.status_code}")
+            return False
         except Exception as e:
             logger.error(f"HTTP 传输异常: {e}")
             return False
 
+    async def send(self, endpoint: str, data: Dict[str, Any]) -> bool:
+        return await self._post(endpoint, encode_message(data))
+
+    async def send_batch(self, endpoint: str, messages: List[Dict[str, Any]]) -> bool:
+        return await self._post(endpoint, encode_batch(messages), len(messages))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {"endpoints": list(self._clients), "pool_size": self.pool_size}
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
 # WebSocket 传输实现
 class WebSocketTransport(BaseTransport):
-    """WebSocket 协议传输实现（模拟）"""
-    def __init__(self):
+    """
+    WebSocket 协议传输实现。
+
+    每个端点维护最多 pool_size 条长连接，按轮询分配；连接断开时
+    丢弃并在下次使用时重连，发送失败会在新连接上重试一次。
+    """
+    def __init__(self, pool_size: int = 2, open_timeout: float = 5.0):
         super().__init__(Protocol.WEBSOCKET)
+        self.pool_size = max(1, pool_size)
+        self.open_timeout = open_timeout
+        self._pools: Dict[str, List[Any]] = {}
+        self._locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+        self._next: Dict[str, int] = {}
+        self.reconnects = 0
+
+    async def _connection(self, endpoint: str, slot: int):
+        pool = self._pools.setdefault(endpoint, [None] * self.pool_size)
+        conn = pool[slot]
+        if conn is not None:
+            return conn
+        lock = self._locks.setdefault((endpoint, slot), asyncio.Lock())
+        async with lock:
+            if pool[slot] is None:
+                pool[slot] = await websockets.connect(endpoint, open_timeout=self.open_timeout)
+                self.reconnects += 1
+            return pool[slot]
+
+    def _discard(self, endpoint: str, slot: int, conn: Any):
+        pool = self._pools.get(endpoint)
+        if pool is not None and pool[slot] is conn:
+            pool[slot] = None
+            asyncio.ensure_future(conn.close())
+
+    async def _send_frame(self, endpoint: str, frame: str) -> bool:
+        if websockets is None:
+            logger.error("WebSocket 传输不可用: 未安装 websockets")
+            return False
+        slot = self._next.get(endpoint, 0)
+        self._next[endpoint] = (slot + 1) % self.pool_size
+        for attempt in range(2):
+            conn = None
+            try:
+                conn = await self._connection(endpoint, slot)
+                await conn.send(frame)
+                return True
+            except Exception as e:
+                if conn is not None:
+                    self._discard(endpoint, slot, conn)
+                if attempt == 1 or conn is None:
+                    logger.error(f"WebSocket 传输异常: {e}")
+                    return False
+        return False
 
     async def send(self, endpoint: str, data: Dict[str, Any]) -> bool:
-        logger.info(f"【模拟】使用 WebSocket 发送数据到 {endpoint}")
-        try:
-            # 在实际应用中，这里会使用 websockets 库
-            await asyncio.sleep(random.uniform(0.05, 0.15)) # 模拟更低的网络延迟
-            logger.info(f"WebSocket 发送成功: {json.dumps(data, ensure_ascii=False)}")
-            return True
-        except Exception as e:
-            logger.error(f"WebSocket 传输异常: {e}")
-            return False
+        return await self._send_frame(endpoint, encode_message(data))
+
+    async def send_batch(self, endpoint: str, messages: List[Dict[str, Any]]) -> bool:
+        return await self._send_frame(endpoint, encode_batch(messages))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {
+            "pool_size": self.pool_size,
+            "connections": {
+                endpoint: sum(conn is not None for conn in pool) for endpoint, pool in self._pools.items()
+            },
+            "connects": self.reconnects,
+        }
+
+    async def close(self):
+        for pool in self._pools.values():
+            for conn in pool:
+                if conn is not None:
+                    try:
+                        await conn.close()
+                    except Exception:
+                        pass
+        self._pools.clear()
 
 # MQTT 传输实现
 class MqttTransport(BaseTransport):
-    """MQTT 协议传输实现（模拟）"""
-    def __init__(self):
-        super().__init__(Protocol.MQTT)
+    """
+    MQTT 协议传输实现。
 
-    async def send(self, endpoint: str, data: Dict[str, Any]) -> bool:
-        topic = endpoint  # 在 MQTT 中，endpoint 通常是 topic
-        logger.info(f"【模拟】使用 MQTT 发布消息到 Topic '{topic}'")
+    端点格式为 "mqtt://host:port/topic"，或仅写 topic（使用默认 broker）。
+    每个 broker 复用一个长连接客户端（paho 网络线程），发布操作只是入队，
+    不阻塞事件循环。
+    """
+    def __init__(self, default_broker: str = "localhost", default_port: int = 1883,
+                 qos: int = 0, connect_timeout: float = 5.0):
+        super().__init__(Protocol.MQTT)
+        self.default_broker = default_broker
+        self.default_port = default_port
+        self.qos = qos
+        self.connect_timeout = connect_timeout
+        self._clients: Dict[Tuple[str, int], Any] = {}
+        self._connected: Dict[Tuple[str, int], asyncio.Event] = {}
+        self._locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+
+    def _parse(self, endpoint: str) -> Tuple[str, int, str]:
+        if endpoint.startswith("mqtt://"):
+            address, _, topic = endpoint[len("mqtt://"):].partition("/")
+            host, _, port = address.partition(":")
+            return host or self.default_broker, int(port or self.default_port), topic
+        return self.default_broker, self.default_port, endpoint
+
+    def _new_client(self, key: Tuple[str, int], loop: asyncio.AbstractEventLoop):
+        api = getattr(mqtt, "CallbackAPIVersion", None)
+        client = mqtt.Client(api.VERSION2) if api is not None else mqtt.Client()
+        event = self._connected.setdefault(key, asyncio.Event())
+
+        def on_connect(_client, _userdata, _flags, reason, *_):
+            if not getattr(reason, "is_failure", reason != 0):
+                loop.call_soon_threadsafe(event.set)
+
+        def on_disconnect(*_):
+            loop.call_soon_threadsafe(event.clear)
+
+        client.on_connect = on_connect
+        client.on_disconnect = on_disconnect
+        return client
+
+    async def _client(self, host: str, port: int):
+        key = (host, port)
+        client = self._clients.get(key)
+        if client is None:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._new_client(key, asyncio.get_running_loop())
+                    client.connect_async(host, port)
+                    client.loop_start()  # 网络线程负责重连
+                    self._clients[key] = client
+        await asyncio.wait_for(self._connected[key].wait(), self.connect_timeout)
+        return client
+
+    async def _publish(self, endpoint: str, payload: str) -> bool:
+        if mqtt is None:
+            logger.error("MQTT 传输不可用: 未安装 paho-mqtt")
+            return False
+        host, port, topic = self._parse(endpoint)
         try:
-            # 在实际应用中，这里会使用 gmqtt 或 paho-mqtt 库
-            await asyncio.sleep(random.uniform(0.1, 0.2))
-            logger.info(f"MQTT 发布成功: {json.dumps(data, ensure_ascii=False)}")
-            return True
+            client = await self._client(host, port)
+            info = client.publish(topic, payload, qos=self.qos)
+            if info.rc == mqtt.MQTT_ERR_SUCCESS:
+                return True
+            logger.error(f"MQTT 发布失败: rc={info.rc}")
+            return False
+        except asyncio.TimeoutError:
+            logger.error(f"MQTT 传输异常: 连接 {host}:{port} 超时")
+            return False
         except Exception as e:
             logger.error(f"MQTT 传输异常: {e}")
             return False
 
+    async def send(self, endpoint: str, data: Dict[str, Any]) -> bool:
+        return await self._publish(endpoint, encode_message(data))
+
+    async def send_batch(self, endpoint: str, messages: List[Dict[str, Any]]) -> bool:
+        return await self._publish(endpoint, encode_batch(messages))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {
+            "brokers": {
+                f"{host}:{port}": self._connected.get((host, port), asyncio.Event()).is_set()
+                for host, port in self._clients
+            }
+        }
+
+    async def close(self):
+        for client in self._clients.values():
+            client.disconnect()
+            client.loop_stop()
+        self._clients.clear()
+        self._connected.clear()
+
+
+class MessageBatcher:
+    """
+    单个 (协议, 端点) 的 Nagle 式合并器。
+
+    第一条消息入队时启动 linger 计时器；计时到期、条数达到上限或字节数达到
+    上限时，把队列中的消息作为一个批量帧发送。每条消息的调用方等待所在
+    批次的发送结果及其实际发送耗时（不含 linger 等待），后者用于更新链路延迟。
+    """
+
+    def __init__(self, transport: BaseTransport, endpoint: str, linger_s: float,
+                 max_messages: int, max_bytes: int):
+        self.transport = transport
+        self.endpoint = endpoint
+        self.linger_s = linger_s
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._pending_bytes = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set = set()
+        self.stats = {"batches": 0, "batched_messages": 0}
+
+    async def submit(self, message: Dict[str, Any], size_bytes: int) -> Tuple[bool, float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((message, future))
+        self._pending_bytes += size_bytes
+        if len(self._pending) >= self.max_messages or self._pending_bytes >= self.max_bytes:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.linger_s, self.flush)
+        return await asyncio.shield(future)
+
+    def flush(self):
+        """立即发送当前队列（不等待结果）"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_bytes = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        messages = [message for message, _ in batch]
+        started = time.monotonic()
+        try:
+            if len(messages) == 1:
+                ok = await self.transport.send(self.endpoint, messages[0])
+            else:
+                ok = await self.transport.send_batch(self.endpoint, messages)
+        except Exception as e:
+            logger.error(f"批量发送异常 ({self.transport.protocol.name} {self.endpoint}): {e}")
+            ok = False
+        elapsed = time.monotonic() - started
+        self.stats["batches"] += 1
+        self.stats["batched_messages"] += len(messages)
+        for _, future in batch:
+            if not future.done():
+                future.set_result((ok, elapsed))
+
+    async def close(self):
+        self.flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
 
 # --- 5. 主服务类 ---
 class SmartTransportRouter:
@@ -186,51 +643,128 @@ class SmartTransportRouter:
         self.config = config
         self.status = NodeStatus.INITIALIZING
         self.transports: Dict[Protocol, BaseTransport] = {
-            Protocol.HTTP: HttpTransport(),
-            Protocol.WEBSOCKET: WebSocketTransport(),
-            Protocol.MQTT: MqttTransport(),
+            Protocol.HTTP: HttpTransport(pool_size=config.http_pool_size),
+            Protocol.WEBSOCKET: WebSocketTransport(pool_size=config.ws_pool_size),
+            Protocol.MQTT: MqttTransport(config.mqtt_broker, config.mqtt_port, qos=config.mqtt_qos),
         }
+        self.batchers: Dict[Tuple[Protocol, str], MessageBatcher] = {}
         self.stats = {
             "start_time": time.time(),
             "messages_processed": 0,
             "messages_succeeded": 0,
             "messages_failed": 0,
-            "errors": [],
+            "errors_total": 0,
+            "errors": deque(maxlen=self.config.error_history_size),
+        }
+        self.routing_table = CompiledRoutingTable(self.config.routing_rules)
+        self.protocol_metrics: Dict[Protocol, LinkMetrics] = {
+            protocol: self._new_metrics(protocol) for protocol in Protocol
         }
+        self.endpoint_metrics: Dict[Tuple[Protocol, str], LinkMetrics] = {}
         logger.setLevel(self.config.log_level)
         logger.info(f"节点 {self.config.node_id} 初始化完成")
 
-    async def _select_protocol(self, message: Dict[str, Any]) -> Optional[Protocol]:
+    def _new_metrics(self, protocol: Protocol) -> LinkMetrics:
+        latency, throughput = PROTOCOL_PRIORS[protocol]
+        return LinkMetrics(latency, throughput, self.config.ewma_alpha)
+
+    def _link(self, protocol: Protocol) -> LinkMetrics:
+        """协议在当前端点上的指标（端点变更后重新学习）"""
+        endpoint = self.config.endpoints.get(protocol, "")
+        key = (protocol, endpoint)
+        metrics = self.endpoint_metrics.get(key)
+        if metrics is None:
+            metrics = self.endpoint_metrics[key] = self._new_metrics(protocol)
+        return metrics
+
+    def _record_error(self, text: str):
+        self.stats["errors_total"] += 1
+        self.stats["errors"].append(f"[{time.time()}] {text}")
+
+    def _message_size(self, message: Dict[str, Any]) -> int:
+        """消息大小：优先使用调用方给出的 size_bytes，否则估算"""
+        hint = message.get("size_bytes")
+        if isinstance(hint, int) and hint >= 0:
+            return hint
+        return estimate_message_size(message)
+
+    async def _select_protocol(self, message: Dict[str, Any], size_bytes: Optional[int] = None) -> Optional[Protocol]:
         """
         根据消息属性和路由规则选择最合适的协议。
 
         Args:
             message (Dict[str, Any]): 待发送的消息体
+            size_bytes (Optional[int]): 已知的消息大小，未提供时估算
 
         Returns:
             Optional[Protocol]: 返回选中的协议，如果没有合适的则返回 None
         """
         msg_priority = message.get("priority", MessagePriority.LOW)
-        msg_size_kb = len(json.dumps(message).encode('utf-8')) / 1024
+        if size_bytes is None:
+            size_bytes = self._message_size(message)
+
+        candidates = [
+            p for p in self.routing_table.candidates(msg_priority, size_bytes)
+            if p in self.config.endpoints
+        ]
+        if not candidates:
+            logger.warning(
+                f"没有找到匹配的路由规则，无法选择协议 (优先级: {msg_priority.name}, 大小: {size_bytes} B)"
+            )
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        if self.config.selection_policy == "random":
+            return random.choice(candidates)
+
+        now = time.monotonic()
+        links = {p: self._link(p) for p in candidates}
+        # 长时间未使用的候选先探测一次，避免一次劣化后被永久冷落
+        stale = [
+            p for p, link in links.items()
+            if link.in_flight == 0 and now - link.last_used > self.config.probe_interval_s
+        ]
+        if stale:
+            selected = min(stale, key=lambda p: links[p].last_used)
+        else:
+            selected = min(candidates, key=lambda p: links[p].expected_delivery_time(size_bytes))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"选择协议 {selected.name} (优先级: {msg_priority.name}, 大小: {size_bytes} B, "
+                f"预计: {{{', '.join(f'{p.name}: {links[p].expected_delivery_time(size_bytes):.3f}s' for p in candidates)}}})"
+            )
+        return selected
 
-        logger.info(f"开始为消息选择协议 (优先级: {msg_priority.name}, 大小: {msg_size_kb:.2f} KB)")
+    def _should_batch(self, endpoint: str, message: Dict[str, Any], size_bytes: int) -> bool:
+        """只对支持批量帧的端点合并小的低优先级消息；中、高优先级消息直接发送"""
+        return (
+            self.config.batching_enabled
+            and endpoint in self.config.batch_endpoints
+            and message.get("priority", MessagePriority.LOW) == MessagePriority.LOW
+            and size_bytes <= self.config.batch_message_max_bytes
+        )
 
-        # 遍历所有规则，找到最匹配的一个
-        # 规则可以设计的更复杂，例如按顺序匹配或评分制，这里使用简单遍历
-        candidate_protocols = []
-        for rule_name, rule in self.config.routing_rules.items():
-            if msg_priority.value >= rule.priority_threshold.value and msg_size_kb <= rule.max_size_kb:
-                logger.info(f"消息匹配规则 '{rule_name}'，候选协议: {[p.name for p in rule.allowed_protocols]}")
-                candidate_protocols.extend(rule.allowed_protocols)
-        
-        if not candidate_protocols:
-            logger.warning("没有找到匹配的路由规则，无法选择协议")
-            return None
+    def _batcher(self, protocol: Protocol, endpoint: str, transport: BaseTransport) -> MessageBatcher:
+        key = (protocol, endpoint)
+        batcher = self.batchers.get(key)
+        if batcher is None:
+            batcher = MessageBatcher(
+                transport, endpoint,
+                linger_s=self.config.batch_linger_ms / 1000,
+                max_messages=self.config.batch_max_messages,
+                max_bytes=self.config.batch_max_bytes,
+            )
+            self.batchers[key] = batcher
+        return batcher
 
-        # 从候选协议中随机选择一个（可以替换为更复杂的负载均衡策略）
-        selected = random.choice(list(set(candidate_protocols)))
-        logger.info(f"最终选择协议: {selected.name}")
-        return selected
+    async def close(self):
+        """发送所有待合并的消息并关闭长连接"""
+        self.status = NodeStatus.STOPPED
+        for batcher in self.batchers.values():
+            await batcher.close()
+        for transport in self.transports.values():
+            await transport.close()
 
     async def route_message(self, message: Dict[str, Any]) -> bool:
         """
@@ -243,11 +777,12 @@ class SmartTransportRouter:
             bool: 路由和发送成功返回 True，否则返回 False
         """
         self.stats["messages_processed"] += 1
-        protocol = await self._select_protocol(message)
+        size_bytes = self._message_size(message)
+        protocol = await self._select_protocol(message, size_bytes)
 
         if protocol is None:
             self.stats["messages_failed"] += 1
-            self.stats["errors"].append(f"[{time.time()}] No suitable protocol found for message.")
+            self._record_error("No suitable protocol found for message.")
             return False
 
         endpoint = self.config.endpoints.get(protocol)
@@ -256,15 +791,34 @@ class SmartTransportRouter:
         if not endpoint or not transport:
             logger.error(f"协议 {protocol.name} 的端点或处理器未配置")
             self.stats["messages_failed"] += 1
-            self.stats["errors"].append(f"[{time.time()}] Endpoint or handler for {protocol.name} not configured.")
+            self._record_error(f"Endpoint or handler for {protocol.name} not configured.")
             return False
 
-        success = await transport.send(endpoint, message)
+        links = (self.protocol_metrics[protocol], self._link(protocol))
+        for link in links:
+            link.begin()
+        started = time.monotonic()
+        success = False
+        elapsed = None
+        try:
+            if self._should_batch(endpoint, message, size_bytes):
+                # 延迟样本只取批次的实际发送耗时，linger 等待不计入链路延迟
+                success, elapsed = await self._batcher(protocol, endpoint, transport).submit(
+                    message, size_bytes
+                )
+            else:
+                success = await transport.send(endpoint, message)
+        finally:
+            if elapsed is None:
+                elapsed = time.monotonic() - started
+            for link in links:
+                link.end(success, elapsed, size_bytes)
+
         if success:
             self.stats["messages_succeeded"] += 1
         else:
             self.stats["messages_failed"] += 1
-            self.stats["errors"].append(f"[{time.time()}] Failed to send message via {protocol.name}.")
+            self._record_error(f"Failed to send message via {protocol.name}.")
         
         return success
 
@@ -291,7 +845,18 @@ class SmartTransportRouter:
             "status": self.status.name,
             "uptime": time.time() - self.stats["start_time"],
             "configuration": asdict(self.config),
-            "statistics": self.stats
+            "statistics": {**self.stats, "errors": list(self.stats["errors"])},
+            "transports": {p.name: t.pool_stats() for p, t in self.transports.items()},
+            "batching": {
+                f"{p.name}:{endpoint}": dict(b.stats) for (p, endpoint), b in self.batchers.items()
+            },
+            "link_metrics": {
+                "protocols": {p.name: m.to_dict() for p, m in self.protocol_metrics.items()},
+                "endpoints": {
+                    f"{p.name}:{endpoint}": m.to_dict()
+                    for (p, endpoint), m in self.endpoint_metrics.items()
+                },
+            },
         }
 
 
@@ -305,6 +870,13 @@ async def startup_event():
     global router
     # 创建默认配置
     default_config = NodeConfig(
+        mqtt_broker=os.getenv("MQTT_BROKER", "localhost"),
+        mqtt_port=int(os.getenv("MQTT_PORT", "1883")),
+        batching_enabled=os.getenv("BATCHING_ENABLED", "0") == "1",
+        batch_endpoints=frozenset(
+            e.strip() for e in os.getenv("BATCH_ENDPOINTS", "").split(",") if e.strip()
+        ),
+        batch_linger_ms=float(os.getenv("BATCH_LINGER_MS", "5")),
         endpoints={
             Protocol.HTTP: "http://api.example.com/data",
             Protocol.WEBSOCKET: "ws://ws.example.com/events",
@@ -333,6 +905,12 @@ async def startup_event():
     asyncio.create_task(router.run())
     logger.info("FastAPI 应用启动，路由器已初始化并运行")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """FastAPI 应用关闭时发送剩余批次并释放长连接"""
+    if router:
+        await router.close()
+
 @app.get("/health", summary="健康检查接口", tags=["Monitoring"])
 async def health_check():
     """
@@ -395,4 +973,3 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=config.health_check_port
     )
-'''
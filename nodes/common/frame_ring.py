@@ -0,0 +1,432 @@
+"""
+Frame Ring - 同机共享内存帧环
+=============================
+Node_95 把每台设备的最新解码帧写入一个 multiprocessing.shared_memory 环形缓冲区，
+同机的消费者（Node_90、VLM 管线等）直接映射读取，不再经过
+JPEG 编码 -> base64 -> JSON -> 解码 的 HTTP 往返。
+
+内存布局（小端）：
+  全局头 64 字节: magic | version | slots | state | slot_capacity | generation | latest_slot
+                  | owner（设备 ID 的 blake2b 摘要）| writer_pid
+  每个槽位: 64 字节槽头 + slot_capacity 字节像素数据
+  槽头: seq | generation | timestamp | height | width | channels | dtype | nbytes
+
+一致性采用 seqlock：写入方写槽位前把 seq 置为奇数，写完再置为偶数；
+读取方在读数据前后各读一次 seq，两次相同且为偶数才算读到完整帧。
+环中有多个槽位，写入方总是写“最旧”的槽位，零拷贝读取的视图在
+接下来 slots-1 帧内不会被覆盖，可用 RingFrame.still_valid() 复核。
+
+帧尺寸超过槽位容量时，写入方把旧段标记为 retired 并按同名重建，
+读取方发现后自动重新挂载。
+
+段名由可读前缀和完整设备 ID 的摘要组成，不同设备不会撞名；段头记录
+所属设备和写入进程，写入方只接管本设备遗留（已 retired 或写入进程已退出）
+的段，读取方也只接受属于本设备的段。
+
+用法:
+    # 生产方 (Node_95)
+    writer = FrameRingWriter(device_id)
+    writer.publish(frame)          # frame: np.ndarray (H, W, C)
+
+    # 消费方
+    client = FrameRingClient("http://localhost:8095")
+    frame = await client.get_frame(device_id)   # 优先共享内存，失败回退 HTTP
+    if frame:
+        image_b64 = await frame.to_base64_jpeg()
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import re
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+
+MAGIC = b"UFRB"
+VERSION = 2
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 64
+
+STATE_LIVE = 1
+STATE_RETIRED = 2
+
+# magic, version, slots, state, slot_capacity, generation, latest_slot, owner, writer_pid
+_HEADER = struct.Struct("<4sHHIQQI8sI")
+_GENERATION_OFFSET = 4 + 2 + 2 + 4 + 8
+# seq, generation, timestamp, height, width, channels, dtype, nbytes
+_SLOT_HEADER = struct.Struct("<QQdIII8sQ")
+_SEQ = struct.Struct("<Q")
+
+DEFAULT_SLOTS = 3
+
+
+def device_digest(device_id: str) -> bytes:
+    """设备 ID 的 8 字节摘要，用于段名和段头中的所属设备"""
+    return hashlib.blake2b(device_id.encode("utf-8"), digest_size=8).digest()
+
+
+def segment_name(device_id: str) -> str:
+    """
+    设备 ID -> 共享内存段名
+
+    POSIX 段名只允许有限字符且长度受限，清洗后的前缀只为可读；
+    唯一性由完整设备 ID 的摘要保证（dev-1 与 dev_1 不会撞名）。
+    """
+    safe = re.sub(r"[^A-Za-z0-9_]", "_", device_id)[:24]
+    return f"ufo_frames_{safe}_{device_digest(device_id).hex()}"
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _align(n: int, to: int = 64) -> int:
+    return (n + to - 1) // to * to
+
+
+# 本进程写入方创建的段；resource_tracker 里的登记归写入方所有，
+# 同进程的读取方挂载时不能替它注销
+_owned_segments: set = set()
+
+
+def _attach(name: str, track: bool = False) -> shared_memory.SharedMemory:
+    """
+    挂载已有段；track=False 时不让本进程的 resource_tracker 接管它
+
+    Python 3.13 之前，挂载方进程退出时 resource_tracker 会把段 unlink 掉，
+    导致生产方的段被消费方“顺手”删除，所以挂载后立即注销这次登记。
+    要亲自 unlink 的挂载方（清理遗留段）传 track=True，保留登记。
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=track)
+    shm = shared_memory.SharedMemory(name=name)
+    if not track and os.name == "posix" and name not in _owned_segments:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class FrameRingWriter:
+    """单设备帧环写入方（每台设备只应有一个写入方）"""
+
+    def __init__(self, device_id: str, slots: int = DEFAULT_SLOTS, min_capacity: int = 0):
+        self.device_id = device_id
+        self.name = segment_name(device_id)
+        self.owner = device_digest(device_id)
+        self.slots = max(2, slots)
+        self.min_capacity = min_capacity
+        self.generation = 0
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._capacity = 0
+        self._next_slot = 0
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + self._capacity)
+
+    def _create(self, capacity: int):
+        self._retire()
+        self._capacity = _align(max(capacity, self.min_capacity))
+        size = HEADER_SIZE + self.slots * (SLOT_HEADER_SIZE + self._capacity)
+        try:
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        except FileExistsError:
+            self._remove_stale()
+            self._shm = shared_memory.SharedMemory(name=self.name, create=True, size=size)
+        _owned_segments.add(self.name)
+        _HEADER.pack_into(
+            self._shm.buf, 0, MAGIC, VERSION, self.slots, STATE_LIVE,
+            self._capacity, self.generation, 0, self.owner, os.getpid()
+        )
+        for slot in range(self.slots):
+            _SLOT_HEADER.pack_into(
+                self._shm.buf, self._slot_offset(slot), 0, 0, 0.0, 0, 0, 0, b"", 0
+            )
+        self._next_slot = 0
+
+    def _remove_stale(self):
+        """
+        删除同名的遗留段（上次进程异常退出）
+
+        只删除属于本设备、且已 retired 或写入进程已退出（或就是本进程）的段；
+        段属于其他设备、格式不明或仍有存活的写入方时抛出 FileExistsError，
+        绝不删除别人的段。
+        """
+        existing = _attach(self.name, track=True)
+        try:
+            if len(existing.buf) < HEADER_SIZE:
+                raise FileExistsError(f"Shared memory segment {self.name} has an unknown format")
+            magic, version, _, state, _, _, _, owner, pid = _HEADER.unpack_from(existing.buf, 0)
+            if magic != MAGIC or version != VERSION:
+                raise FileExistsError(f"Shared memory segment {self.name} has an unknown format")
+            if owner != self.owner:
+                raise FileExistsError(
+                    f"Shared memory segment {self.name} belongs to another device"
+                )
+            if state == STATE_LIVE and pid != os.getpid() and _pid_alive(pid):
+                raise FileExistsError(
+                    f"Shared memory segment {self.name} is in use by writer process {pid}"
+                )
+        finally:
+            existing.close()
+        try:
+            existing.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _retire(self):
+        if self._shm is None:
+            return
+        # 通知已挂载的读取方重新挂载
+        struct.pack_into("<I", self._shm.buf, 8, STATE_RETIRED)
+        self._shm.close()
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        _owned_segments.discard(self.name)
+        self._shm = None
+
+    def publish(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """写入一帧，返回其代数"""
+        frame = np.ascontiguousarray(frame)
+        if frame.ndim not in (2, 3):
+            raise ValueError(f"Unsupported frame shape: {frame.shape}")
+        if self._shm is None or frame.nbytes > self._capacity:
+            self._create(frame.nbytes)
+
+        buf = self._shm.buf
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        offset = self._slot_offset(slot)
+        seq = _SEQ.unpack_from(buf, offset)[0]
+
+        # seqlock: 奇数表示正在写
+        _SEQ.pack_into(buf, offset, seq + 1)
+        data_offset = offset + SLOT_HEADER_SIZE
+        buf[data_offset:data_offset + frame.nbytes] = frame.reshape(-1).view(np.uint8)
+        self.generation += 1
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 0
+        _SLOT_HEADER.pack_into(
+            buf, offset, seq + 1, self.generation,
+            timestamp if timestamp is not None else time.time(),
+            height, width, channels, frame.dtype.str.encode("ascii"), frame.nbytes
+        )
+        _SEQ.pack_into(buf, offset, seq + 2)
+
+        # 最后再发布到全局头
+        struct.pack_into("<QI", buf, _GENERATION_OFFSET, self.generation, slot)
+        return self.generation
+
+    def close(self, unlink: bool = True):
+        if self._shm is None:
+            return
+        if unlink:
+            self._retire()
+        else:
+            self._shm.close()
+            self._shm = None
+
+
+@dataclass
+class RingFrame:
+    """从共享内存或 HTTP 读到的一帧"""
+    array: np.ndarray
+    generation: int
+    timestamp: float
+    source: str  # "shm" / "http"
+    jpeg_base64: Optional[str] = None  # HTTP 来源时保留原始编码，避免重复编码
+    _reader: Optional["FrameRingReader"] = None
+    _slot: int = -1
+    _seq: int = -1
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    def still_valid(self) -> bool:
+        """零拷贝视图是否仍未被写入方覆盖（拷贝或 HTTP 来源恒为 True）"""
+        if self._reader is None:
+            return True
+        return self._reader._slot_seq(self._slot) == self._seq
+
+    def to_jpeg_bytes(self, quality: int = 90) -> bytes:
+        from PIL import Image
+        buffered = io.BytesIO()
+        Image.fromarray(self.array).save(buffered, format="JPEG", quality=quality)
+        return buffered.getvalue()
+
+    async def to_base64_jpeg(self, quality: int = 90) -> str:
+        """JPEG base64（在线程中编码；HTTP 来源直接复用原始数据）"""
+        if self.jpeg_base64 is not None:
+            return self.jpeg_base64
+        data = await asyncio.to_thread(self.to_jpeg_bytes, quality)
+        return base64.b64encode(data).decode("utf-8")
+
+
+class FrameRingReader:
+    """单设备帧环读取方"""
+
+    def __init__(self, device_id: str, retries: int = 5):
+        self.device_id = device_id
+        self.name = segment_name(device_id)
+        self.owner = device_digest(device_id)
+        self.retries = retries
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._slots = 0
+        self._capacity = 0
+
+    def _ensure_attached(self) -> bool:
+        if self._shm is not None:
+            state = struct.unpack_from("<I", self._shm.buf, 8)[0]
+            if state == STATE_LIVE:
+                return True
+            self.close()
+        try:
+            shm = _attach(self.name)
+        except (FileNotFoundError, OSError):
+            return False
+        magic, version, slots, state, capacity, _, _, owner, _ = _HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != VERSION or state != STATE_LIVE or owner != self.owner:
+            shm.close()
+            return False
+        self._shm, self._slots, self._capacity = shm, slots, capacity
+        return True
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * (SLOT_HEADER_SIZE + self._capacity)
+
+    def _slot_seq(self, slot: int) -> int:
+        if self._shm is None:
+            return -1
+        return _SEQ.unpack_from(self._shm.buf, self._slot_offset(slot))[0]
+
+    def read(self, copy: bool = False, after_generation: int = 0) -> Optional[RingFrame]:
+        """
+        读取最新帧
+
+        Args:
+            copy: False 时返回指向共享内存的只读视图（零拷贝），
+                  需在使用后用 still_valid() 确认未被覆盖
+            after_generation: 只返回代数更大的帧
+        """
+        if not self._ensure_attached():
+            return None
+        buf = self._shm.buf
+        for _ in range(self.retries):
+            generation, slot = struct.unpack_from("<QI", buf, _GENERATION_OFFSET)
+            if generation == 0 or generation <= after_generation:
+                return None
+            offset = self._slot_offset(slot)
+            seq_before = _SEQ.unpack_from(buf, offset)[0]
+            if seq_before % 2:
+                continue
+            (_, slot_generation, timestamp, height, width, channels,
+             dtype, nbytes) = _SLOT_HEADER.unpack_from(buf, offset)
+            if slot_generation != generation:
+                continue
+            shape = (height, width, channels) if channels else (height, width)
+            array = np.frombuffer(
+                buf, dtype=np.dtype(dtype.rstrip(b"\0").decode("ascii")),
+                count=int(np.prod(shape)), offset=offset + SLOT_HEADER_SIZE
+            ).reshape(shape)
+            if copy:
+                array = array.copy()
+            if _SEQ.unpack_from(buf, offset)[0] != seq_before:
+                continue
+            if copy:
+                return RingFrame(array, generation, timestamp, "shm")
+            array.flags.writeable = False
+            return RingFrame(array, generation, timestamp, "shm", None, self, slot, seq_before)
+        return None
+
+    def close(self):
+        if self._shm is None:
+            return
+        try:
+            self._shm.close()
+        except BufferError:
+            # 仍有零拷贝视图引用该段；交给 GC 在视图释放后回收
+            pass
+        self._shm = None
+
+
+class FrameRingClient:
+    """
+    帧获取客户端：优先读本机共享内存帧环，不可用或帧过期时回退到 Node_95 HTTP 接口
+    """
+
+    def __init__(self, node95_url: str = "http://localhost:8095", max_age: float = 5.0,
+                 timeout: float = 10.0):
+        self.node95_url = node95_url.rstrip("/")
+        self.max_age = max_age
+        self.timeout = timeout
+        self._readers: Dict[str, FrameRingReader] = {}
+        self.stats = {"shm_hits": 0, "http_fallbacks": 0}
+
+    def read_local(self, device_id: str, copy: bool = False) -> Optional[RingFrame]:
+        """只读共享内存；帧超过 max_age 视为设备已停止推流"""
+        reader = self._readers.get(device_id)
+        if reader is None:
+            reader = self._readers[device_id] = FrameRingReader(device_id)
+        frame = reader.read(copy=copy)
+        if frame is None or time.time() - frame.timestamp > self.max_age:
+            return None
+        return frame
+
+    async def get_frame(self, device_id: str, copy: bool = False) -> Optional[RingFrame]:
+        frame = self.read_local(device_id, copy=copy)
+        if frame is not None:
+            self.stats["shm_hits"] += 1
+            return frame
+        self.stats["http_fallbacks"] += 1
+        return await self._fetch_http(device_id)
+
+    async def _fetch_http(self, device_id: str) -> Optional[RingFrame]:
+        import httpx
+        from PIL import Image
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.post(
+                    f"{self.node95_url}/get_latest_frame",
+                    json={"device_id": device_id, "format": "jpeg"}
+                )
+            if response.status_code != 200:
+                return None
+            data = response.json()
+        except Exception:
+            return None
+        frame_data = data.get("frame_data")
+        if not frame_data:
+            return None
+        image = await asyncio.to_thread(
+            lambda: np.asarray(Image.open(io.BytesIO(base64.b64decode(frame_data))))
+        )
+        return RingFrame(image, 0, time.time(), "http", jpeg_base64=frame_data)
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers.clear()
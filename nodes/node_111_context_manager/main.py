@@ -6,8 +6,11 @@ Node 111: Context Manager - 上下文管理节点
 import json
 import time
 import hashlib
+import itertools
+import sqlite3
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Deque, Iterable, Set
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 import threading
@@ -87,6 +90,174 @@ class HistoryRecord:
         return asdict(self)
 
 
+class ExpiryWheel:
+    """
+    哈希时间轮：按到期时间把条目挂到槽上，插入 O(1)，每个 tick 只处理一个槽。
+
+    超过一圈的条目记录剩余圈数；条目触发后由调用方校验是否仍然有效。
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 4096):
+        self.tick = tick
+        self._slots: List[List[Tuple[int, Any]]] = [[] for _ in range(slots)]
+        self._current = int(time.time() / tick)
+        self.size = 0
+
+    def add(self, deadline: float, item: Any):
+        """deadline 为 time.time() 时间戳"""
+        target = max(int(deadline / self.tick), self._current + 1)
+        rounds = (target - self._current - 1) // len(self._slots)
+        self._slots[target % len(self._slots)].append((rounds, item))
+        self.size += 1
+
+    def advance(self, now: Optional[float] = None) -> List[Any]:
+        """推进到 now，返回所有到期条目"""
+        now_tick = int((time.time() if now is None else now) / self.tick)
+        due = []
+        while self._current < now_tick:
+            self._current += 1
+            index = self._current % len(self._slots)
+            slot = self._slots[index]
+            if not slot:
+                continue
+            remaining = []
+            for rounds, item in slot:
+                if rounds == 0:
+                    due.append(item)
+                else:
+                    remaining.append((rounds - 1, item))
+            self._slots[index] = remaining
+            self.size -= len(slot) - len(remaining)
+        return due
+
+
+class SessionStore:
+    """
+    分层会话存储（调用方负责加锁）
+
+    - 热层：OrderedDict 按访问顺序排列，查找 O(1)
+    - 冷层：超过 max_hot 时最久未访问的会话溢出到 SQLite（配置了 spill_path 时）
+    - 二级索引：user_id -> 会话集合，status -> 会话集合（覆盖冷热两层）
+    - 到期时间以时间戳缓存，不再每次解析 ISO 字符串
+    """
+
+    def __init__(self, max_hot: int = 100000, spill_path: Optional[str] = None):
+        self.max_hot = max_hot
+        self._hot: "OrderedDict[str, Session]" = OrderedDict()
+        self._expires: Dict[str, float] = {}
+        self._by_user: Dict[str, Set[str]] = {}
+        self._by_status: Dict[SessionStatus, Set[str]] = {status: set() for status in SessionStatus}
+        self._status: Dict[str, SessionStatus] = {}
+        self._cold = None
+        if spill_path:
+            self._cold = sqlite3.connect(spill_path, check_same_thread=False)
+            # 冷层只是内存的延伸，不要求落盘持久
+            self._cold.execute("PRAGMA journal_mode=WAL")
+            self._cold.execute("PRAGMA synchronous=OFF")
+            self._cold.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            self._cold.execute("DELETE FROM sessions")  # 索引只在内存中，重启后冷层数据无法关联
+            self._cold.commit()
+        self.stats = {"spilled": 0, "promoted": 0}
+
+    def __len__(self) -> int:
+        return len(self._status)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._status
+
+    @property
+    def hot_count(self) -> int:
+        return len(self._hot)
+
+    @property
+    def user_count(self) -> int:
+        return len(self._by_user)
+
+    def put(self, session: Session):
+        sid = session.session_id
+        self._hot[sid] = session
+        self._hot.move_to_end(sid)
+        self._expires[sid] = datetime.fromisoformat(session.expires_at).timestamp()
+        self._by_user.setdefault(session.user_id, set()).add(sid)
+        self._index_status(sid, session.status)
+        self._spill_if_needed()
+
+    def get(self, session_id: str) -> Optional[Session]:
+        session = self._hot.get(session_id)
+        if session is not None:
+            self._hot.move_to_end(session_id)
+            return session
+        if self._cold is None or session_id not in self._status:
+            return None
+        row = self._cold.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        self._cold.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        session = Session.from_dict(json.loads(row[0]))
+        self._hot[session_id] = session
+        self.stats["promoted"] += 1
+        self._spill_if_needed()
+        return session
+
+    def pop(self, session_id: str) -> Optional[Session]:
+        session = self.get(session_id)
+        if session is None:
+            return None
+        del self._hot[session_id]
+        self._expires.pop(session_id, None)
+        user_sessions = self._by_user.get(session.user_id)
+        if user_sessions is not None:
+            user_sessions.discard(session_id)
+            if not user_sessions:
+                del self._by_user[session.user_id]
+        status = self._status.pop(session_id, None)
+        if status is not None:
+            self._by_status[status].discard(session_id)
+        return session
+
+    def set_status(self, session: Session, status: SessionStatus):
+        session.status = status
+        self._index_status(session.session_id, status)
+
+    def expires_ts(self, session_id: str) -> float:
+        return self._expires.get(session_id, 0.0)
+
+    def ids_for_user(self, user_id: str) -> Iterable[str]:
+        return tuple(self._by_user.get(user_id, ()))
+
+    def ids_with_status(self, status: SessionStatus) -> Iterable[str]:
+        return tuple(self._by_status[status])
+
+    def all_ids(self) -> Iterable[str]:
+        return tuple(self._status)
+
+    def _index_status(self, session_id: str, status: SessionStatus):
+        previous = self._status.get(session_id)
+        if previous is not None:
+            self._by_status[previous].discard(session_id)
+        self._status[session_id] = status
+        self._by_status[status].add(session_id)
+
+    def _spill_if_needed(self):
+        if self._cold is None or len(self._hot) <= self.max_hot:
+            return
+        # 一次溢出到 90%，避免每次插入都触发一次小批量写入
+        target = int(self.max_hot * 0.9)
+        rows = []
+        while len(self._hot) > target:
+            session_id, session = self._hot.popitem(last=False)
+            rows.append((session_id, json.dumps(session.to_dict(), ensure_ascii=False, default=str)))
+        self._cold.executemany("INSERT OR REPLACE INTO sessions (session_id, data) VALUES (?, ?)", rows)
+        self._cold.commit()
+        self.stats["spilled"] += len(rows)
+
+    def close(self):
+        if self._cold is not None:
+            self._cold.close()
+            self._cold = None
+
+
 class ContextManager:
     """
     上下文管理器核心类
@@ -95,15 +266,32 @@ class ContextManager:
 
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
-        self._sessions: Dict[str, Session] = {}
-        self._user_profiles: Dict[str, UserProfile] = {}
-        self._history_records: List[HistoryRecord] = []
         self._lock = threading.RLock()
 
         # 配置项
         self.session_timeout = self.config.get('session_timeout', 3600)  # 默认1小时
         self.max_history_per_session = self.config.get('max_history_per_session', 100)
-        self.cleanup_interval = self.config.get('cleanup_interval', 300)  # 5分钟
+        self.max_history_per_user = self.config.get('max_history_per_user', 1000)
+        self.max_history_total = self.config.get('max_history_total', self.max_history_per_session * 100)
+        self.cleanup_interval = self.config.get('cleanup_interval', 1.0)  # 时间轮 tick（秒）
+        self.expired_retention = self.config.get('expired_retention', 3600)  # 过期/关闭会话保留时长
+
+        self._sessions = SessionStore(
+            max_hot=self.config.get('max_hot_sessions', 100000),
+            spill_path=self.config.get('spill_path')
+        )
+        self._user_profiles: Dict[str, UserProfile] = {}
+        self._profiles_by_tag: Dict[str, Set[str]] = {}
+
+        # 历史记录：每个会话/用户各自一个定长队列，外加全局最近记录
+        self._history_records: Deque[HistoryRecord] = deque(maxlen=self.max_history_total)
+        self._history_by_session: Dict[str, Deque[HistoryRecord]] = {}
+        self._history_by_user: Dict[str, Deque[HistoryRecord]] = {}
+        self._id_counter = itertools.count()
+
+        # 到期时间轮：("expire" | "evict", session_id)
+        self._wheel = ExpiryWheel(tick=self.cleanup_interval)
+        self._stop_event = threading.Event()
 
         # 启动清理线程
         self._cleanup_thread = threading.Thread(target=self._cleanup_expired_sessions, daemon=True)
@@ -124,7 +312,8 @@ class ContextManager:
                 metadata=metadata or {}
             )
 
-            self._sessions[session_id] = session
+            self._sessions.put(session)
+            self._wheel.add(self._sessions.expires_ts(session_id), ("expire", session_id))
 
             self._add_history_record(
                 session_id=session_id,
@@ -156,7 +345,7 @@ class ContextManager:
             if 'metadata' in updates:
                 session.metadata.update(updates['metadata'])
             if 'status' in updates:
-                session.status = SessionStatus(updates['status'])
+                self._set_status(session, SessionStatus(updates['status']))
 
             session.last_activity = datetime.now().isoformat()
 
@@ -176,7 +365,7 @@ class ContextManager:
             if not session:
                 return False
 
-            session.status = SessionStatus.CLOSED
+            self._set_status(session, SessionStatus.CLOSED)
 
             self._add_history_record(
                 session_id=session_id,
@@ -190,7 +379,7 @@ class ContextManager:
     def destroy_session(self, session_id: str) -> bool:
         """销毁会话（彻底删除）"""
         with self._lock:
-            session = self._sessions.pop(session_id, None)
+            session = self._sessions.pop(session_id)
             if session:
                 self._add_history_record(
                     session_id=session_id,
@@ -203,12 +392,16 @@ class ContextManager:
 
     def list_sessions(self, user_id: Optional[str] = None, 
                       status: Optional[SessionStatus] = None) -> List[Session]:
-        """列出会话"""
+        """列出会话（走用户/状态索引，只加载命中的会话）"""
         with self._lock:
-            sessions = list(self._sessions.values())
-
             if user_id:
-                sessions = [s for s in sessions if s.user_id == user_id]
+                ids = self._sessions.ids_for_user(user_id)
+            elif status:
+                ids = self._sessions.ids_with_status(status)
+            else:
+                ids = self._sessions.all_ids()
+
+            sessions = [s for s in (self._sessions.get(sid) for sid in ids) if s is not None]
 
             if status:
                 sessions = [s for s in sessions if s.status == status]
@@ -229,7 +422,9 @@ class ContextManager:
                 tags=tags or []
             )
 
+            self._unindex_profile(user_id)
             self._user_profiles[user_id] = profile
+            self._index_profile(profile)
             return profile
 
     def get_user_profile(self, user_id: str) -> Optional[UserProfile]:
@@ -252,7 +447,9 @@ class ContextManager:
             if 'preferences' in updates:
                 profile.preferences.update(updates['preferences'])
             if 'tags' in updates:
+                self._unindex_profile(user_id)
                 profile.tags = list(set(profile.tags + updates['tags']))
+                self._index_profile(profile)
             if 'metadata' in updates:
                 profile.metadata.update(updates['metadata'])
 
@@ -264,17 +461,19 @@ class ContextManager:
     def delete_user_profile(self, user_id: str) -> bool:
         """删除用户画像"""
         with self._lock:
+            self._unindex_profile(user_id)
             return self._user_profiles.pop(user_id, None) is not None
 
     def list_user_profiles(self, tags: Optional[List[str]] = None) -> List[UserProfile]:
         """列出用户画像"""
         with self._lock:
-            profiles = list(self._user_profiles.values())
-
-            if tags:
-                profiles = [p for p in profiles if any(tag in p.tags for tag in tags)]
+            if not tags:
+                return list(self._user_profiles.values())
 
-            return profiles
+            user_ids = set()
+            for tag in tags:
+                user_ids |= self._profiles_by_tag.get(tag, set())
+            return [self._user_profiles[uid] for uid in user_ids]
 
     # ==================== 上下文信息检索 ====================
 
@@ -358,27 +557,35 @@ class ContextManager:
                    action_type: Optional[str] = None,
                    limit: int = 50,
                    offset: int = 0) -> List[HistoryRecord]:
-        """查询历史记录"""
+        """查询历史记录（按时间倒序；从最窄的索引队列开始过滤）"""
         with self._lock:
-            records = self._history_records.copy()
-
             if session_id:
-                records = [r for r in records if r.session_id == session_id]
-
-            if user_id:
-                records = [r for r in records if r.user_id == user_id]
-
-            if action_type:
-                records = [r for r in records if r.action_type == action_type]
-
-            records.sort(key=lambda r: r.timestamp, reverse=True)
-
-            return records[offset:offset + limit]
+                source = self._history_by_session.get(session_id, ())
+            elif user_id:
+                source = self._history_by_user.get(user_id, ())
+            else:
+                source = self._history_records
+
+            records = []
+            skipped = 0
+            for r in reversed(source):
+                if session_id and user_id and r.user_id != user_id:
+                    continue
+                if action_type and r.action_type != action_type:
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                records.append(r)
+                if len(records) >= limit:
+                    break
+
+            return records
 
     def get_session_history_summary(self, session_id: str) -> Dict[str, Any]:
         """获取会话历史摘要"""
         with self._lock:
-            records = [r for r in self._history_records if r.session_id == session_id]
+            records = self._history_by_session.get(session_id, ())
 
             action_counts = {}
             for r in records:
@@ -396,39 +603,72 @@ class ContextManager:
         """清除历史记录"""
         with self._lock:
             if session_id:
-                original_count = len(self._history_records)
-                self._history_records = [r for r in self._history_records if r.session_id != session_id]
-                return original_count - len(self._history_records)
+                removed = self._history_by_session.pop(session_id, None)
+                if not removed:
+                    return 0
+                user_ids = {r.user_id for r in removed}
+                for uid in user_ids:
+                    user_records = self._history_by_user.get(uid)
+                    if user_records is not None:
+                        self._history_by_user[uid] = deque(
+                            (r for r in user_records if r.session_id != session_id),
+                            maxlen=self.max_history_per_user)
+                self._history_records = deque(
+                    (r for r in self._history_records if r.session_id != session_id),
+                    maxlen=self.max_history_total)
+                return len(removed)
             else:
                 count = len(self._history_records)
                 self._history_records.clear()
+                self._history_by_session.clear()
+                self._history_by_user.clear()
                 return count
 
     # ==================== 内部方法 ====================
 
     def _generate_session_id(self, user_id: str) -> str:
         """生成会话ID"""
-        timestamp = str(time.time())
-        data = f"{user_id}:{timestamp}"
+        data = f"{user_id}:{time.time()}:{next(self._id_counter)}"
         return hashlib.sha256(data.encode()).hexdigest()[:32]
 
     def _generate_record_id(self) -> str:
         """生成记录ID"""
-        timestamp = str(time.time())
-        return hashlib.sha256(timestamp.encode()).hexdigest()[:16]
+        data = f"{time.time()}:{next(self._id_counter)}"
+        return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+    def _set_status(self, session: Session, status: SessionStatus):
+        """修改状态并维护索引；关闭/过期的会话在保留期后移出内存"""
+        previous = session.status
+        self._sessions.set_status(session, status)
+        if status in (SessionStatus.CLOSED, SessionStatus.EXPIRED) and previous != status:
+            self._wheel.add(time.time() + self.expired_retention, ("evict", session.session_id))
 
     def _is_session_valid(self, session: Session) -> bool:
         """检查会话是否有效"""
-        if session.status == SessionStatus.CLOSED:
+        if session.status in (SessionStatus.CLOSED, SessionStatus.EXPIRED):
             return False
 
-        expires_at = datetime.fromisoformat(session.expires_at)
-        if datetime.now() > expires_at:
-            session.status = SessionStatus.EXPIRED
+        if time.time() > self._sessions.expires_ts(session.session_id):
+            self._set_status(session, SessionStatus.EXPIRED)
             return False
 
         return True
 
+    def _index_profile(self, profile: UserProfile):
+        for tag in profile.tags:
+            self._profiles_by_tag.setdefault(tag, set()).add(profile.user_id)
+
+    def _unindex_profile(self, user_id: str):
+        profile = self._user_profiles.get(user_id)
+        if not profile:
+            return
+        for tag in profile.tags:
+            users = self._profiles_by_tag.get(tag)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._profiles_by_tag[tag]
+
     def _add_history_record(self, session_id: str, user_id: str, 
                            action_type: str, content: Dict[str, Any]):
         """添加历史记录"""
@@ -441,23 +681,59 @@ class ContextManager:
         )
         self._history_records.append(record)
 
-        if len(self._history_records) > self.max_history_per_session * 100:
-            self._history_records = self._history_records[-self.max_history_per_session * 50:]
+        session_records = self._history_by_session.get(session_id)
+        if session_records is None:
+            session_records = self._history_by_session[session_id] = deque(maxlen=self.max_history_per_session)
+        session_records.append(record)
+
+        user_records = self._history_by_user.get(user_id)
+        if user_records is None:
+            user_records = self._history_by_user[user_id] = deque(maxlen=self.max_history_per_user)
+        user_records.append(record)
 
     def _cleanup_expired_sessions(self):
-        """清理过期会话的后台线程"""
-        while True:
-            time.sleep(self.cleanup_interval)
-            with self._lock:
-                expired_sessions = []
-                for session_id, session in self._sessions.items():
-                    if not self._is_session_valid(session):
-                        expired_sessions.append(session_id)
+        """清理过期会话的后台线程：每个 tick 只处理时间轮上到期的槽"""
+        while not self._stop_event.wait(self.cleanup_interval):
+            self.expire_due()
 
-                for session_id in expired_sessions:
-                    session = self._sessions.get(session_id)
-                    if session:
-                        session.status = SessionStatus.EXPIRED
+    def expire_due(self, now: Optional[float] = None) -> int:
+        """处理时间轮上已到期的条目，返回处理的会话数"""
+        with self._lock:
+            handled = 0
+            for action, session_id in self._wheel.advance(now):
+                session = self._sessions.get(session_id)
+                if session is None:
+                    continue
+                if action == "expire":
+                    if session.status in (SessionStatus.ACTIVE, SessionStatus.IDLE):
+                        self._set_status(session, SessionStatus.EXPIRED)
+                        handled += 1
+                elif session.status in (SessionStatus.CLOSED, SessionStatus.EXPIRED):
+                    # 保留期已过：移出内存，会话历史一并释放
+                    self._sessions.pop(session_id)
+                    self._history_by_session.pop(session_id, None)
+                    handled += 1
+            return handled
+
+    def get_stats(self) -> Dict[str, Any]:
+        """存储统计"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "hot_sessions": self._sessions.hot_count,
+                "users": self._sessions.user_count,
+                "profiles": len(self._user_profiles),
+                "history_records": len(self._history_records),
+                "timer_entries": self._wheel.size,
+                **self._sessions.stats,
+            }
+
+    def shutdown(self):
+        """停止清理线程并关闭冷存储"""
+        self._stop_event.set()
+        self._cleanup_thread.join(timeout=2)
+        with self._lock:
+            self._sessions.close()
 
 
 # ==================== 对外接口 ====================
@@ -479,8 +755,10 @@ def get_context_manager() -> ContextManager:
 
 
 def reset_context_manager():
-    """重置全局上下文管理器实例"""
+    """重置全局上下文管理器实例（先停掉清理线程并关闭冷存储）"""
     global _context_manager
+    if _context_manager is not None:
+        _context_manager.shutdown()
     _context_manager = None
 
 